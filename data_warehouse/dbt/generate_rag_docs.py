@@ -4,31 +4,60 @@ Convert dbt manifest.json and catalog.json to RAG-friendly Markdown documentatio
 
 This script processes dbt artifacts and generates individual Markdown files
 for each model, source, and macro, making them more suitable for RAG systems.
+
+Generation is incremental: each document's rendered content is hashed and only
+new or changed files are written; files of nodes that no longer exist are removed.
+Every run writes a change manifest (CHANGES.json: added/changed/removed files and
+the SHA-256 of every current file) that the RAG import script applies as a delta.
+
+A machine-readable table index (table_index.json: layer, columns, upstream,
+downstream and synonyms of every model and source) is written next to the docs;
+the server loads it once to resolve the tables a question refers to.
 """
 
+import hashlib
 import json
 import os
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
+CHANGE_MANIFEST = "CHANGES.json"
+TABLE_INDEX = "table_index.json"
+TABLE_INDEX_VERSION = 1
+# Layer of a model by name prefix (every layer is built into the same schema, see dbt_project.yml)
+LAYER_BY_PREFIX = {'stg_': 'staging', 'dim_': 'dimensions', 'fact_': 'facts', 'fct_': 'facts', 'mart_': 'marts', 'src_': 'source'}
+# Lines that change on every run without changing the document
+VOLATILE_LINE_PREFIXES = ("Generated on:",)
+
+
+def content_hash(content: str) -> str:
+    """Hash of a document's content, ignoring volatile lines such as the generation timestamp."""
+    stable = '\n'.join(line for line in content.split('\n') if not line.startswith(VOLATILE_LINE_PREFIXES))
+    return hashlib.sha256(stable.encode('utf-8')).hexdigest()
+
 
 class DbtRagDocGenerator:
     """Generate RAG-friendly documentation from dbt artifacts."""
     
-    def __init__(self, target_dir: str, output_dir: str = "rag_docs"):
+    def __init__(self, target_dir: str, output_dir: str = "rag_docs", full: bool = False):
         """
         Initialize the generator.
         
         Args:
             target_dir: Path to dbt target directory (contains manifest.json and catalog.json)
             output_dir: Output directory for generated Markdown files
+            full: Rewrite every file (reported as changed) even if its content did not change
         """
         self.target_dir = Path(target_dir)
         self.output_dir = Path(output_dir)
         self.manifest: Dict[str, Any] = {}
         self.catalog: Dict[str, Any] = {}
         self.child_map: Dict[str, List[str]] = {}  # Maps node_id to list of nodes that depend on it
+        self.full = full
+        self.previous_files: Dict[str, Dict[str, str]] = {}  # filename -> hashes from the last change manifest
+        self.files: Dict[str, Dict[str, str]] = {}  # filename -> hashes of this run
+        self.changes: Dict[str, List[str]] = {'added': [], 'changed': [], 'removed': []}
         
         # Create output directory
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -81,6 +110,14 @@ class DbtRagDocGenerator:
         # Initialize child_map for all nodes and sources
         all_nodes = {**self.manifest.get('nodes', {}), **self.manifest.get('sources', {})}
         
+        # dbt writes the child map into the manifest; use it when present instead of scanning all nodes
+        manifest_child_map = self.manifest.get('child_map')
+        if manifest_child_map:
+            self.child_map = {unique_id: [c for c in manifest_child_map.get(unique_id, []) if c in all_nodes]
+                              for unique_id in all_nodes}
+            print(f"Loaded lineage map with {len([k for k, v in self.child_map.items() if v])} nodes with downstream dependencies")
+            return
+        
         for unique_id in all_nodes.keys():
             self.child_map[unique_id] = []
         
@@ -311,6 +348,152 @@ class DbtRagDocGenerator:
         
         return '\n'.join(lines)
     
+    def load_previous_state(self):
+        """Load the file hashes recorded by the previous run's change manifest."""
+        manifest_path = self.output_dir / CHANGE_MANIFEST
+        if not manifest_path.exists():
+            return
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                self.previous_files = json.load(f).get('files', {})
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not read {manifest_path}, regenerating all files: {e}")
+    
+    def write_doc(self, filename: str, content: str) -> bool:
+        """
+        Write a document if its content changed since the previous run.
+        
+        Returns:
+            True if the file was written
+        """
+        filepath = self.output_dir / filename
+        digest = content_hash(content)
+        previous = self.previous_files.get(filename)
+        if not self.full and previous and previous.get('hash') == digest and filepath.exists():
+            self.files[filename] = previous
+            return False
+        
+        data = content.encode('utf-8')
+        with open(filepath, 'wb') as f:
+            f.write(data)
+        self.files[filename] = {'hash': digest, 'sha256': hashlib.sha256(data).hexdigest()}
+        self.changes['changed' if previous else 'added'].append(filename)
+        return True
+    
+    def remove_stale_docs(self):
+        """Remove files generated by the previous run whose node no longer exists."""
+        for filename in sorted(set(self.previous_files) - set(self.files)):
+            filepath = self.output_dir / filename
+            if filepath.exists():
+                filepath.unlink()
+            self.changes['removed'].append(filename)
+            print(f"  Removed: {filename}")
+    
+    def write_change_manifest(self) -> Path:
+        """Write the change manifest (delta of this run and hashes of all current files)."""
+        manifest = {
+            'generated_at': datetime.now().isoformat(),
+            'dbt_generated_at': self.manifest.get('metadata', {}).get('generated_at'),
+            **self.changes,
+            'unchanged': len(self.files) - len(self.changes['added']) - len(self.changes['changed']),
+            'files': dict(sorted(self.files.items())),
+        }
+        manifest_path = self.output_dir / CHANGE_MANIFEST
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        return manifest_path
+    
+    def get_table_name(self, node: Dict[str, Any]) -> str:
+        """Name of the relation a model or source is materialized as."""
+        if node.get('resource_type') == 'source':
+            return node.get('identifier') or node.get('name', '')
+        return node.get('alias') or node.get('name', '')
+    
+    def get_layer(self, node: Dict[str, Any]) -> str:
+        """Warehouse layer of a model or source (source, staging, dimensions, facts, marts)."""
+        if node.get('resource_type') == 'source':
+            return 'source'
+        name = node.get('name', '')
+        for prefix, prefix_layer in LAYER_BY_PREFIX.items():
+            if name.startswith(prefix):
+                return prefix_layer
+        return 'other'
+    
+    def get_synonyms(self, node: Dict[str, Any], table_name: str, layer: str) -> List[str]:
+        """
+        Terms a question may use for a table.
+        
+        Synonyms declared in the node's meta (meta.synonyms) are always included; models outside the
+        staging layer also get their name without the layer prefix, with spaces and in singular/plural.
+        """
+        meta = {**node.get('config', {}).get('meta', {}), **node.get('meta', {})}
+        declared = meta.get('synonyms', [])
+        synonyms = [declared] if isinstance(declared, str) else list(declared)
+        
+        if layer not in ('source', 'staging'):
+            base = table_name
+            for prefix in LAYER_BY_PREFIX:
+                if base.startswith(prefix):
+                    base = base[len(prefix):]
+                    break
+            inflected = base[:-1] if base.endswith('s') else f"{base}s"
+            for term in (base, inflected):
+                synonyms.extend([term, term.replace('_', ' ')])
+        
+        seen = {table_name.lower()}
+        result = []
+        for synonym in synonyms:
+            synonym = synonym.strip().lower()
+            if synonym and synonym not in seen:
+                seen.add(synonym)
+                result.append(synonym)
+        return result
+    
+    def build_table_index(self) -> Dict[str, Any]:
+        """Build the table index: table -> layer, columns, upstream, downstream and synonyms."""
+        all_nodes = {**self.manifest.get('nodes', {}), **self.manifest.get('sources', {})}
+        parent_map = self.manifest.get('parent_map') or {}
+        
+        table_names = {
+            unique_id: self.get_table_name(node)
+            for unique_id, node in all_nodes.items()
+            if node.get('resource_type') in ('model', 'source')
+        }
+        
+        tables = {}
+        for unique_id, table_name in sorted(table_names.items(), key=lambda item: item[1]):
+            node = all_nodes[unique_id]
+            layer = self.get_layer(node)
+            catalog_info = self.get_catalog_info(unique_id) or {}
+            columns = catalog_info.get('columns') or node.get('columns', {})
+            parents = parent_map.get(unique_id) or node.get('depends_on', {}).get('nodes', [])
+            tables[table_name] = {
+                'unique_id': unique_id,
+                'resource_type': node.get('resource_type'),
+                'layer': layer,
+                'database': node.get('database', ''),
+                'schema': node.get('schema', ''),
+                'description': self.get_node_description(node).strip().split('\n')[0],
+                'columns': sorted(columns),
+                'upstream': sorted({table_names[p] for p in parents if p in table_names}),
+                'downstream': sorted({table_names[c] for c in self.child_map.get(unique_id, []) if c in table_names}),
+                'synonyms': self.get_synonyms(node, table_name, layer),
+            }
+        
+        return {
+            'version': TABLE_INDEX_VERSION,
+            'dbt_generated_at': self.manifest.get('metadata', {}).get('generated_at'),
+            'tables': tables,
+        }
+    
+    def write_table_index(self) -> Path:
+        """Write table_index.json (not a RAG document, so it is not tracked in the change manifest)."""
+        index_path = self.output_dir / TABLE_INDEX
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump(self.build_table_index(), f, indent=2, ensure_ascii=False)
+        print(f"Generated table index: {index_path}")
+        return index_path
+    
     def generate_index(self, all_docs: List[Dict[str, str]]):
         """Generate an index file listing all documentation."""
         lines = []
@@ -336,18 +519,16 @@ class DbtRagDocGenerator:
         
         lines.append("")
         
-        index_path = self.output_dir / "README.md"
-        with open(index_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(lines))
-        
-        print(f"Generated index: {index_path}")
+        if self.write_doc("README.md", '\n'.join(lines)):
+            print(f"Generated index: {self.output_dir / 'README.md'}")
     
     def generate_all_docs(self):
-        """Generate documentation for all nodes in manifest."""
+        """Generate documentation for all nodes in manifest (only new or changed files are written)."""
         nodes = self.manifest.get('nodes', {})
         sources = self.manifest.get('sources', {})
         
         all_docs = []
+        self.load_previous_state()
         
         # Process models
         print("\nGenerating model documentation...")
@@ -355,20 +536,17 @@ class DbtRagDocGenerator:
             if node.get('resource_type') == 'model':
                 model_name = node.get('name', 'unknown')
                 filename = f"model_{model_name}.md"
-                filepath = self.output_dir / filename
                 
                 content = self.generate_model_doc(unique_id, node)
                 
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                
                 all_docs.append({
                     'type': 'model',
                     'name': model_name,
                     'filename': filename,
                     'unique_id': unique_id
                 })
-                print(f"  Generated: {filename}")
+                if self.write_doc(filename, content):
+                    print(f"  Generated: {filename}")
         
         # Process sources
         print("\nGenerating source documentation...")
@@ -376,20 +554,17 @@ class DbtRagDocGenerator:
             source_name = source_node.get('source_name', 'unknown')
             table_name = source_node.get('name', 'unknown')
             filename = f"source_{source_name}_{table_name}.md"
-            filepath = self.output_dir / filename
             
             content = self.generate_source_doc(unique_id, source_node)
             
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
             all_docs.append({
                 'type': 'source',
                 'name': f"{source_name}.{table_name}",
                 'filename': filename,
                 'unique_id': unique_id
             })
-            print(f"  Generated: {filename}")
+            if self.write_doc(filename, content):
+                print(f"  Generated: {filename}")
         
         # Generate index
         print("\nGenerating index...")
@@ -399,7 +574,14 @@ class DbtRagDocGenerator:
         print("\nGenerating lineage graph...")
         self.generate_lineage_graph(all_docs)
         
-        print(f"\n✅ Generated {len(all_docs)} documentation files in {self.output_dir}")
+        self.remove_stale_docs()
+        self.write_table_index()
+        manifest_path = self.write_change_manifest()
+        
+        print(f"\n✅ {len(self.files)} documentation files in {self.output_dir}: "
+              f"{len(self.changes['added'])} added, {len(self.changes['changed'])} changed, "
+              f"{len(self.changes['removed'])} removed")
+        print(f"Change manifest: {manifest_path}")
         return all_docs
     
     def generate_lineage_graph(self, all_docs: List[Dict[str, str]]):
@@ -540,11 +722,8 @@ class DbtRagDocGenerator:
                     lines.append("*End of lineage (no downstream dependencies)*")
                     lines.append("")
         
-        lineage_path = self.output_dir / "LINEAGE.md"
-        with open(lineage_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(lines))
-        
-        print(f"Generated lineage graph: {lineage_path}")
+        if self.write_doc("LINEAGE.md", '\n'.join(lines)):
+            print(f"Generated lineage graph: {self.output_dir / 'LINEAGE.md'}")
 
 
 def main():
@@ -566,12 +745,18 @@ def main():
         default='rag_docs',
         help='Output directory for Markdown files (default: rag_docs)'
     )
+    parser.add_argument(
+        '--full',
+        action='store_true',
+        help='Rewrite all files and report them as changed, so the RAG import re-embeds everything'
+    )
     
     args = parser.parse_args()
     
     generator = DbtRagDocGenerator(
         target_dir=args.target_dir,
-        output_dir=args.output_dir
+        output_dir=args.output_dir,
+        full=args.full
     )
     
     try:
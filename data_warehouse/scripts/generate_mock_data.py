@@ -26,19 +26,33 @@ USAGE:
 
   # Generate data with custom user count
   python generate_mock_data.py --users 200 --databricks
+
+  # Reproducible load-test dataset with 100x the daily volume
+  python generate_mock_data.py --users 100000 --scale 100 --seed 42
 """
 
 import os
+import io
+import csv
 import sys
 import argparse
 import random
+from time import perf_counter
+import uuid
 from datetime import datetime, timedelta, time
 from decimal import Decimal
+import numpy as np
 import psycopg2
 from psycopg2.extras import execute_batch
 from dotenv import load_dotenv
 from faker import Faker
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet staging (COPY INTO) is optional
+    pa = None
+
 # Load environment variables from .env file
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
 
@@ -63,6 +77,25 @@ DATABRICKS_CONFIG = {
     'schema': os.getenv('DATABRICKS_SCHEMA', 'public')
 }
 
+# Databricks bulk loading
+# - copy:   rows are written to a local Parquet file in staging_dir, uploaded to staging_path
+#           (a Unity Catalog Volume) with PUT, and loaded with COPY INTO; without staging_path,
+#           staging_dir itself must be visible to the warehouse (e.g. a mounted Volume/DBFS path)
+# - params: parameterized multi-row INSERT, at most max_params_per_statement bound values per statement
+#           (no SQL text built from the values; the connector's executemany sends one request per row)
+# - insert: multi-row INSERT statements with literal values (batch_insert_databricks), kept as a fallback
+# 'auto' picks copy from copy_min_rows rows (only when staging_path is set and pyarrow is installed)
+# and params otherwise; insert is only used when asked for. Measure the methods against the target
+# warehouse with --benchmark-load before changing these thresholds.
+BULK_LOAD_METHODS = ['auto', 'copy', 'params', 'insert']
+BULK_LOAD_CONFIG = {
+    'method': os.getenv('DATABRICKS_LOAD_METHOD', 'auto'),
+    'staging_dir': os.getenv('DATABRICKS_STAGING_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.staging')),
+    'staging_path': os.getenv('DATABRICKS_STAGING_PATH'),
+    'copy_min_rows': int(os.getenv('DATABRICKS_COPY_MIN_ROWS', '50000')),
+    'max_params_per_statement': int(os.getenv('DATABRICKS_MAX_PARAMS_PER_STATEMENT', '2000')),
+}
+
 # Shanghai Metro Lines (station names in English)
 SHANGHAI_METRO_STATIONS = {
     'Line 1': ['Fujin Road', 'Youyi West Road', 'Bao\'an Highway', 'Gongfu Xincun', 'Hulan Road', 'Tonghe Xincun', 'Gonghang Road', 'Pengpu Xincun', 'Wenushui Road', 'Shanghai Circus World', 'Yanchang Road', 'North Zhongshan Road', 'Shanghai Railway Station', 'Hanzhong Road', 'Xinzha Road', 'People\'s Square', 'South Huangpi Road', 'South Shaanxi Road', 'Changshu Road', 'Hengshan Road', 'Xujiahui', 'Shanghai Stadium', 'Caobao Road', 'Shanghai South Railway Station', 'Jinjiang Amusement Park', 'Xinzhuang'],
@@ -87,6 +120,17 @@ METRO_START_HOUR = 5
 METRO_END_HOUR = 23
 METRO_END_MINUTE = 30
 
+# Topup amounts (RMB) and their distribution
+TOPUP_AMOUNTS = [50.00, 100.00, 200.00, 500.00]
+TOPUP_AMOUNT_WEIGHTS = [0.4, 0.3, 0.2, 0.1]
+
+# Transactions and topups are generated as columns for whole runs of days at once;
+# a batch holds at most this many rows (a single larger day forms its own batch)
+DEFAULT_BATCH_ROWS = 100000
+
+# 'HH:MM:00' for every minute of the day, indexed by hour * 60 + minute
+TIME_STRINGS = np.array([f"{h:02d}:{m:02d}:00" for h in range(24) for m in range(60)], dtype=object)
+
 
 def get_db_connection(use_databricks=False):
     """Establish database connection (Supabase/PostgreSQL or Databricks)"""
@@ -101,7 +145,9 @@ def get_db_connection(use_databricks=False):
             conn = databricks_sql.connect(
                 server_hostname=DATABRICKS_CONFIG['server_hostname'],
                 http_path=DATABRICKS_CONFIG['http_path'],
-                access_token=DATABRICKS_CONFIG['access_token']
+                access_token=DATABRICKS_CONFIG['access_token'],
+                # PUT uploads of staged Parquet files are only allowed from this directory
+                staging_allowed_local_path=os.path.abspath(BULK_LOAD_CONFIG['staging_dir'])
             )
             print(f"✓ Connected to Databricks: {DATABRICKS_CONFIG['catalog']}.{DATABRICKS_CONFIG['schema']}")
             return conn
@@ -158,6 +204,153 @@ def batch_insert_databricks(cursor, table_name, columns, values_list, conn, batc
             print(f"  Inserted batch {i//batch_size + 1}/{(total_rows + batch_size - 1)//batch_size} ({len(batch)} rows)")
 
 
+def parameterized_insert_databricks(cursor, table_name, columns, values_list, conn):
+    """
+    Parameterized multi-row INSERT: each statement binds a VALUES list of as many rows as fit in
+    BULK_LOAD_CONFIG['max_params_per_statement'], followed by a single commit
+    """
+    rows_per_statement = max(1, BULK_LOAD_CONFIG['max_params_per_statement'] // len(columns))
+    row_placeholders = f"({', '.join(['?'] * len(columns))})"
+    for i in range(0, len(values_list), rows_per_statement):
+        batch = values_list[i:i + rows_per_statement]
+        cursor.execute(
+            f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES {', '.join([row_placeholders] * len(batch))}",
+            [value for row in batch for value in row]
+        )
+    conn.commit()
+
+
+_table_types = {}
+
+
+def get_table_types(cursor, table_name):
+    """Column name -> data type of a Databricks table (cached per table)"""
+    if table_name not in _table_types:
+        cursor.execute(f"DESCRIBE TABLE {table_name}")
+        types = {}
+        for col_name, data_type, *_ in cursor.fetchall():
+            if not col_name or col_name.startswith('#'):
+                break  # partition/detail sections follow the column list
+            types[col_name] = data_type
+        _table_types[table_name] = types
+    return _table_types[table_name]
+
+
+def copy_into_databricks(cursor, table_name, columns, values, conn):
+    """
+    Stage the columns as one Parquet file and load it with COPY INTO
+
+    The file is written to BULK_LOAD_CONFIG['staging_dir'] and, when staging_path is set, uploaded there
+    with PUT. Columns are cast to the table's types in the COPY INTO select (the file holds generated
+    strings for dates and times). COPY INTO skips files it has already loaded, so every file gets a unique name.
+    """
+    table = table_name.split('.')[-1]
+    local_dir = os.path.abspath(os.path.join(BULK_LOAD_CONFIG['staging_dir'], table))
+    os.makedirs(local_dir, exist_ok=True)
+    file_name = f"part-{uuid.uuid4().hex}.parquet"
+    local_file = os.path.join(local_dir, file_name)
+    pq.write_table(pa.table(dict(zip(columns, values))), local_file)
+
+    source_dir = local_dir
+    staging_path = BULK_LOAD_CONFIG['staging_path']
+    try:
+        if staging_path:
+            source_dir = f"{staging_path.rstrip('/')}/{table}"
+            cursor.execute(f"PUT '{local_file}' INTO '{source_dir}/{file_name}' OVERWRITE")
+
+        types = get_table_types(cursor, table_name)
+        select_list = ', '.join(f"CAST({c} AS {types[c]}) AS {c}" if c in types else c for c in columns)
+        cursor.execute(f"""
+            COPY INTO {table_name}
+            FROM (SELECT {select_list} FROM '{source_dir}')
+            FILEFORMAT = PARQUET
+            FILES = ('{file_name}')
+        """)
+        conn.commit()
+
+        if staging_path:
+            cursor.execute(f"REMOVE '{source_dir}/{file_name}'")
+    finally:
+        os.remove(local_file)
+
+
+def choose_load_method(row_count, method=None):
+    """Resolve the bulk load method ('auto' picks by row count, see BULK_LOAD_CONFIG)"""
+    method = method or BULK_LOAD_CONFIG['method']
+    if method == 'copy' and pa is None:
+        raise RuntimeError("COPY INTO loading needs pyarrow to write Parquet files. Install it with: pip install pyarrow")
+    if method != 'auto':
+        return method
+    # Without a staging Volume the local staging_dir is rarely readable by the warehouse, so copy stays opt-in
+    if row_count >= BULK_LOAD_CONFIG['copy_min_rows'] and BULK_LOAD_CONFIG['staging_path'] and pa is not None:
+        return 'copy'
+    return 'params'
+
+
+def bulk_load_databricks(cursor, conn, table, columns, values, method=None):
+    """
+    Load one batch given as columns into a Databricks table and report the load rate
+
+    Returns the method that was used (see BULK_LOAD_CONFIG).
+    """
+    table_name = f"{DATABRICKS_CONFIG['catalog']}.{DATABRICKS_CONFIG['schema']}.{table}"
+    row_count = len(values[0]) if values else 0
+    method = choose_load_method(row_count, method)
+
+    start = perf_counter()
+    if method == 'copy':
+        copy_into_databricks(cursor, table_name, columns, values, conn)
+    elif method == 'params':
+        parameterized_insert_databricks(cursor, table_name, columns, list(zip(*values)), conn)
+    else:
+        batch_insert_databricks(cursor, table_name, columns, list(zip(*values)), conn)
+    elapsed = perf_counter() - start
+
+    print(f"  Loaded {row_count} rows into {table} via {method} in {elapsed:.2f}s ({row_count / max(elapsed, 1e-9):,.0f} rows/s)")
+    return method
+
+
+def write_columnar_batch(cursor, conn, table, columns, values, use_databricks=False):
+    """
+    Write one batch given as columns (lists of equal length)
+
+    PostgreSQL: streamed with COPY ... FROM STDIN (CSV; None becomes NULL).
+    Databricks: loaded with bulk_load_databricks.
+    """
+    if use_databricks:
+        bulk_load_databricks(cursor, conn, table, columns, values)
+        return
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(zip(*values))
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    conn.commit()
+
+
+def day_batches(daily_counts, batch_rows):
+    """Split the day range into runs of consecutive days holding at most batch_rows rows each"""
+    batches = []
+    first = 0
+    rows = 0
+    for day, count in enumerate(daily_counts):
+        if day > first and rows + count > batch_rows:
+            batches.append((first, day))
+            first, rows = day, 0
+        rows += count
+    if len(daily_counts) > first:
+        batches.append((first, len(daily_counts)))
+    return batches
+
+
+def year_2025_days():
+    """Dates of 2025 and their 'YYYY-MM-DD' strings"""
+    start_date = datetime(2025, 1, 1)
+    end_date = datetime(2025, 12, 31)
+    dates = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    return dates, np.array([d.date().isoformat() for d in dates], dtype=object)
+
+
 def clear_all_data(conn, use_databricks=False):
     """Clear all existing data from database tables"""
     print("\nClearing existing data from database...")
@@ -232,9 +425,8 @@ def generate_users(count, conn, use_databricks=False):
     
     # Batch insert
     if use_databricks:
-        table_name = f"{DATABRICKS_CONFIG['catalog']}.{DATABRICKS_CONFIG['schema']}.src_users"
         columns = ['user_id', 'card_number', 'card_type', 'is_verified', 'created_at', 'updated_at']
-        batch_insert_databricks(cursor, table_name, columns, users, conn)
+        bulk_load_databricks(cursor, conn, 'src_users', columns, list(zip(*users)))
     else:
         insert_query = """
             INSERT INTO users (card_number, card_type, is_verified, created_at, updated_at)
@@ -334,9 +526,8 @@ def generate_stations(conn, use_databricks=False):
     
     # Batch insert
     if use_databricks:
-        table_name = f"{DATABRICKS_CONFIG['catalog']}.{DATABRICKS_CONFIG['schema']}.src_stations"
         columns = ['station_id', 'station_name', 'station_type', 'latitude', 'longitude', 'district', 'created_at']
-        batch_insert_databricks(cursor, table_name, columns, stations, conn)
+        bulk_load_databricks(cursor, conn, 'src_stations', columns, list(zip(*stations)))
     else:
         insert_query = """
             INSERT INTO stations (station_name, station_type, latitude, longitude, district, created_at)
@@ -432,9 +623,8 @@ def generate_routes(station_ids, conn, use_databricks=False):
     
     # Batch insert
     if use_databricks:
-        table_name = f"{DATABRICKS_CONFIG['catalog']}.{DATABRICKS_CONFIG['schema']}.src_routes"
         columns = ['route_id', 'route_name', 'route_type', 'route_number', 'start_station_id', 'end_station_id', 'created_at']
-        batch_insert_databricks(cursor, table_name, columns, routes, conn)
+        bulk_load_databricks(cursor, conn, 'src_routes', columns, list(zip(*routes)))
     else:
         insert_query = """
             INSERT INTO routes (route_name, route_type, route_number, start_station_id, end_station_id, created_at)
@@ -460,215 +650,139 @@ def generate_routes(station_ids, conn, use_databricks=False):
         return result
 
 
-def generate_transactions(user_ids, station_ids, route_ids, days, transactions_per_day, conn, use_databricks=False):
-    """Generate transaction records for the entire year 2025 with realistic patterns"""
+def generate_transactions(user_ids, station_ids, route_ids, days, transactions_per_day, conn, use_databricks=False,
+                          rng=None, scale=1.0, batch_rows=DEFAULT_BATCH_ROWS):
+    """
+    Generate transaction records for the entire year 2025 with realistic patterns
+
+    All columns of a batch of days are drawn at once from the numpy Generator (seed it for
+    reproducible datasets); scale multiplies the daily volume for load-test datasets.
+    """
     print(f"Generating transactions for 2025 full year with realistic patterns...")
+    rng = rng if rng is not None else np.random.default_rng()
     cursor = conn.cursor()
-    
-    transactions = []
-    # Fixed date range for 2025
-    start_date = datetime(2025, 1, 1)
-    end_date = datetime(2025, 12, 31)
-    days = (end_date - start_date).days + 1  # 365 days
-    
-    batch_size = 1000
+
+    dates, date_strings = year_2025_days()
+    days = len(dates)  # 365 days
+    is_weekend = np.array([d.weekday() >= 5 for d in dates])  # Saturday=5, Sunday=6
+
+    # Daily transactions: 800-1200 on weekdays, 60% volume (480-720) on weekends
+    daily_counts = np.where(is_weekend, rng.integers(480, 721, days), rng.integers(800, 1201, days))
+    daily_counts = np.maximum(1, np.rint(daily_counts * scale)).astype(np.int64)
+
+    users = np.asarray(user_ids)
+    stations = np.asarray(station_ids)
+    routes = np.asarray(route_ids)
+
+    if use_databricks:
+        table = 'src_transactions'
+        columns = ['transaction_id', 'user_id', 'station_id', 'route_id', 'transaction_date', 'transaction_time', 'amount', 'transaction_type', 'created_at']
+    else:
+        table = 'transactions'
+        columns = ['user_id', 'station_id', 'route_id', 'transaction_date', 'transaction_time', 'amount', 'transaction_type', 'created_at']
+
     transaction_id = 1  # Start transaction_id counter
-    
-    # Rush hour definitions
-    morning_rush_hours = list(range(7, 10))  # 7-9 AM
-    evening_rush_hours = list(range(17, 20))  # 5-7 PM
-    
-    for day_offset in range(days):
-        current_date = start_date + timedelta(days=day_offset)
-        
-        # Adjust transaction volume based on day of week
-        is_weekend = current_date.weekday() >= 5  # Saturday=5, Sunday=6
-        
-        # Daily transactions with random fluctuation (800-1200 range)
-        if is_weekend:
-            # 60% volume on weekends (480-720 range)
-            daily_transactions = random.randint(480, 720)
-        else:
-            # Full volume on weekdays (800-1200 range)
-            daily_transactions = random.randint(800, 1200)
-        
-        for _ in range(daily_transactions):
-            user_id = random.choice(user_ids)
-            station_id = random.choice(station_ids)
-            route_id = random.choice(route_ids) if route_ids and random.random() > 0.3 else None
-            
-            # Generate transaction time with rush hour bias
-            if not is_weekend and random.random() < 0.5:
-                # 50% chance during rush hours on weekdays
-                if random.random() < 0.5:
-                    hour = random.choice(morning_rush_hours)
-                else:
-                    hour = random.choice(evening_rush_hours)
-            else:
-                # Regular distribution during operating hours
-                hour = random.randint(METRO_START_HOUR, METRO_END_HOUR)
-            
-            if hour == METRO_END_HOUR:
-                minute = random.randint(0, METRO_END_MINUTE)
-            else:
-                minute = random.randint(0, 59)
-            transaction_time = time(hour, minute)
-            
-            # Generate transaction amount (typical metro fare: 3-9 RMB)
-            amount = Decimal(str(round(random.uniform(3.0, 9.0), 2)))
-            
-            transaction_type = random.choices(TRANSACTION_TYPES, weights=TRANSACTION_TYPE_WEIGHTS)[0]
-            
-            if use_databricks:
-                transactions.append((
-                    transaction_id,
-                    user_id,
-                    station_id,
-                    route_id,
-                    current_date.date(),
-                    transaction_time,
-                    amount,
-                    transaction_type,
-                    datetime.combine(current_date.date(), transaction_time)
-                ))
-            else:
-                transactions.append((
-                    user_id,
-                    station_id,
-                    route_id,
-                    current_date.date(),
-                    transaction_time,
-                    amount,
-                    transaction_type,
-                    datetime.combine(current_date.date(), transaction_time)
-                ))
-            
-            transaction_id += 1
-            
-            # Batch insert when reaching batch size
-            if len(transactions) >= batch_size:
-                if use_databricks:
-                    table_name = f"{DATABRICKS_CONFIG['catalog']}.{DATABRICKS_CONFIG['schema']}.src_transactions"
-                    columns = ['transaction_id', 'user_id', 'station_id', 'route_id', 'transaction_date', 'transaction_time', 'amount', 'transaction_type', 'created_at']
-                    batch_insert_databricks(cursor, table_name, columns, transactions, conn)
-                else:
-                    insert_query = """
-                        INSERT INTO transactions 
-                        (user_id, station_id, route_id, transaction_date, transaction_time, amount, transaction_type, created_at)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    """
-                    execute_batch(cursor, insert_query, transactions)
-                    conn.commit()
-                print(f"  Inserted {len(transactions)} transactions (day {day_offset + 1}/{days}, {current_date.strftime('%Y-%m-%d')})...")
-                transactions = []
-    
-    # Insert remaining transactions
-    if transactions:
+    for first_day, last_day in day_batches(daily_counts, batch_rows):
+        day = np.repeat(np.arange(first_day, last_day), daily_counts[first_day:last_day])
+        n = len(day)
+
+        route_column = np.full(n, None, dtype=object)
+        if len(routes):
+            has_route = rng.random(n) > 0.3
+            route_column[has_route] = rng.choice(routes, int(has_route.sum())).astype(object)
+
+        # Transaction time with rush hour bias: on weekdays 50% fall in the morning (7-9) or evening (17-19) rush
+        rush = ~is_weekend[day] & (rng.random(n) < 0.5)
+        rush_hour = np.where(rng.random(n) < 0.5, rng.integers(7, 10, n), rng.integers(17, 20, n))
+        hour = np.where(rush, rush_hour, rng.integers(METRO_START_HOUR, METRO_END_HOUR + 1, n))
+        minute = np.where(hour == METRO_END_HOUR, rng.integers(0, METRO_END_MINUTE + 1, n), rng.integers(0, 60, n))
+        date_column = date_strings[day]
+        time_column = TIME_STRINGS[hour * 60 + minute]
+
+        values = [
+            rng.choice(users, n).tolist(),
+            rng.choice(stations, n).tolist(),
+            route_column.tolist(),
+            date_column.tolist(),
+            time_column.tolist(),
+            np.round(rng.uniform(3.0, 9.0, n), 2).tolist(),  # typical metro fare: 3-9 RMB
+            rng.choice(TRANSACTION_TYPES, n, p=TRANSACTION_TYPE_WEIGHTS).tolist(),
+            (date_column + " " + time_column).tolist(),
+        ]
         if use_databricks:
-            table_name = f"{DATABRICKS_CONFIG['catalog']}.{DATABRICKS_CONFIG['schema']}.src_transactions"
-            columns = ['transaction_id', 'user_id', 'station_id', 'route_id', 'transaction_date', 'transaction_time', 'amount', 'transaction_type', 'created_at']
-            batch_insert_databricks(cursor, table_name, columns, transactions, conn)
-        else:
-            insert_query = """
-                INSERT INTO transactions 
-                (user_id, station_id, route_id, transaction_date, transaction_time, amount, transaction_type, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            execute_batch(cursor, insert_query, transactions)
-            conn.commit()
-    
+            values.insert(0, list(range(transaction_id, transaction_id + n)))
+        write_columnar_batch(cursor, conn, table, columns, values, use_databricks)
+        transaction_id += n
+        print(f"  Inserted {n} transactions (days {first_day + 1}-{last_day}/{days}, up to {date_strings[last_day - 1]})...")
+
     cursor.close()
-    print(f"✓ Generated transactions for entire year 2025 (365 days)")
+    print(f"✓ Generated {transaction_id - 1} transactions for entire year 2025 ({days} days)")
 
 
-def generate_topups(user_ids, days, conn, use_databricks=False):
-    """Generate top-up records for the entire year 2025"""
+def generate_topups(user_ids, days, conn, use_databricks=False, rng=None, scale=1.0, batch_rows=DEFAULT_BATCH_ROWS):
+    """Generate top-up records for the entire year 2025 (columnar, see generate_transactions)"""
     print(f"Generating topups for 2025 full year...")
+    rng = rng if rng is not None else np.random.default_rng()
     cursor = conn.cursor()
-    
-    topups = []
-    topup_id = 1  # Start topup_id counter
-    # Fixed date range for 2025
-    start_date = datetime(2025, 1, 1)
-    end_date = datetime(2025, 12, 31)
-    days = (end_date - start_date).days + 1  # 365 days
-    
+
+    dates, date_strings = year_2025_days()
+    days = len(dates)  # 365 days
+    day_of_month = np.array([d.day for d in dates])
+
     # Average 1.5 topups per user per month, spread across the year
-    topups_per_day = max(1, int(len(user_ids) * 1.5 / 30))
-    
-    for day_offset in range(days):
-        current_date = start_date + timedelta(days=day_offset)
-        
-        # More topups at beginning of month (payday effect)
-        if current_date.day <= 5:
-            daily_topups = int(topups_per_day * random.uniform(1.5, 2.0))
-        elif current_date.day <= 10:
-            daily_topups = int(topups_per_day * random.uniform(1.2, 1.5))
-        else:
-            daily_topups = random.randint(int(topups_per_day * 0.5), int(topups_per_day * 1.2))
-        
-        for _ in range(daily_topups):
-            user_id = random.choice(user_ids)
-            
-            # Generate topup time (anytime during day, with peak during lunch and evening)
-            if random.random() < 0.3:
-                # 30% during lunch time (12-14)
-                hour = random.randint(12, 14)
-            elif random.random() < 0.5:
-                # 20% during evening (18-21)
-                hour = random.randint(18, 21)
-            else:
-                # 50% distributed throughout the day
-                hour = random.randint(6, 22)
-            
-            minute = random.randint(0, 59)
-            topup_time = time(hour, minute)
-            
-            # Generate topup amount (typical: 50, 100, 200, 500 RMB)
-            amount_options = [50.00, 100.00, 200.00, 500.00]
-            amount_weights = [0.4, 0.3, 0.2, 0.1]
-            amount = Decimal(str(random.choices(amount_options, weights=amount_weights)[0]))
-            
-            payment_method = random.choices(PAYMENT_METHODS, weights=PAYMENT_METHOD_WEIGHTS)[0]
-            
-            if use_databricks:
-                topups.append((
-                    topup_id,
-                    user_id,
-                    current_date.date(),
-                    topup_time,
-                    amount,
-                    payment_method,
-                    datetime.combine(current_date.date(), topup_time)
-                ))
-            else:
-                topups.append((
-                    user_id,
-                    current_date.date(),
-                    topup_time,
-                    amount,
-                    payment_method,
-                    datetime.combine(current_date.date(), topup_time)
-                ))
-            
-            topup_id += 1
-    
-    # Batch insert
+    topups_per_day = max(1, int(len(user_ids) * 1.5 / 30 * scale))
+
+    # More topups at beginning of month (payday effect)
+    daily_counts = np.where(
+        day_of_month <= 5,
+        (topups_per_day * rng.uniform(1.5, 2.0, days)).astype(np.int64),
+        np.where(
+            day_of_month <= 10,
+            (topups_per_day * rng.uniform(1.2, 1.5, days)).astype(np.int64),
+            rng.integers(int(topups_per_day * 0.5), int(topups_per_day * 1.2) + 1, days),
+        ),
+    )
+
+    users = np.asarray(user_ids)
+
     if use_databricks:
-        table_name = f"{DATABRICKS_CONFIG['catalog']}.{DATABRICKS_CONFIG['schema']}.src_topups"
+        table = 'src_topups'
         columns = ['topup_id', 'user_id', 'topup_date', 'topup_time', 'amount', 'payment_method', 'created_at']
-        batch_insert_databricks(cursor, table_name, columns, topups, conn)
     else:
-        insert_query = """
-            INSERT INTO topups 
-            (user_id, topup_date, topup_time, amount, payment_method, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        execute_batch(cursor, insert_query, topups, page_size=500)
-        conn.commit()
-    
+        table = 'topups'
+        columns = ['user_id', 'topup_date', 'topup_time', 'amount', 'payment_method', 'created_at']
+
+    topup_id = 1  # Start topup_id counter
+    for first_day, last_day in day_batches(daily_counts, batch_rows):
+        day = np.repeat(np.arange(first_day, last_day), daily_counts[first_day:last_day])
+        n = len(day)
+        if n == 0:
+            continue
+
+        # Topup time: 30% during lunch (12-14), 35% in the evening (18-21), the rest throughout the day (6-22)
+        hour = np.where(
+            rng.random(n) < 0.3,
+            rng.integers(12, 15, n),
+            np.where(rng.random(n) < 0.5, rng.integers(18, 22, n), rng.integers(6, 23, n)),
+        )
+        date_column = date_strings[day]
+        time_column = TIME_STRINGS[hour * 60 + rng.integers(0, 60, n)]
+
+        values = [
+            rng.choice(users, n).tolist(),
+            date_column.tolist(),
+            time_column.tolist(),
+            rng.choice(TOPUP_AMOUNTS, n, p=TOPUP_AMOUNT_WEIGHTS).tolist(),
+            rng.choice(PAYMENT_METHODS, n, p=PAYMENT_METHOD_WEIGHTS).tolist(),
+            (date_column + " " + time_column).tolist(),
+        ]
+        if use_databricks:
+            values.insert(0, list(range(topup_id, topup_id + n)))
+        write_columnar_batch(cursor, conn, table, columns, values, use_databricks)
+        topup_id += n
+
     cursor.close()
-    print(f"✓ Generated {len(topups)} topups for entire year 2025")
+    print(f"✓ Generated {topup_id - 1} topups for entire year 2025")
 
 
 def verify_data(conn, use_databricks=False):
@@ -696,6 +810,50 @@ def verify_data(conn, use_databricks=False):
     cursor.close()
 
 
+def benchmark_load_methods(conn, sizes, rng):
+    """
+    Time every Databricks load method on synthetic topup batches of the given sizes
+
+    Rows are written to a scratch copy of src_topups that is dropped afterwards. copy is
+    measured only when pyarrow is installed.
+    """
+    catalog = DATABRICKS_CONFIG['catalog']
+    schema = DATABRICKS_CONFIG['schema']
+    table = 'tmp_load_benchmark'
+    table_name = f"{catalog}.{schema}.{table}"
+    columns = ['topup_id', 'user_id', 'topup_date', 'topup_time', 'amount', 'payment_method', 'created_at']
+    methods = [method for method in BULK_LOAD_METHODS if method != 'auto' and (method != 'copy' or pa is not None)]
+
+    print(f"\nBenchmarking load methods ({', '.join(methods)}) into {table_name}...")
+    cursor = conn.cursor()
+    results = []
+    try:
+        cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+        cursor.execute(f"CREATE TABLE {table_name} LIKE {catalog}.{schema}.src_topups")
+        for n in sizes:
+            time_column = TIME_STRINGS[rng.integers(6 * 60, 23 * 60, n)]
+            values = [
+                list(range(1, n + 1)),
+                rng.integers(1, 101, n).tolist(),
+                ['2025-01-01'] * n,
+                time_column.tolist(),
+                rng.choice(TOPUP_AMOUNTS, n, p=TOPUP_AMOUNT_WEIGHTS).tolist(),
+                rng.choice(PAYMENT_METHODS, n, p=PAYMENT_METHOD_WEIGHTS).tolist(),
+                ("2025-01-01 " + time_column).tolist(),
+            ]
+            for method in methods:
+                start = perf_counter()
+                bulk_load_databricks(cursor, conn, table, columns, values, method)
+                results.append((n, method, perf_counter() - start))
+    finally:
+        cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+        cursor.close()
+
+    print("\nLoad rates:")
+    for n, method, elapsed in results:
+        print(f"  {n:>10,} rows  {method:<6} {elapsed:>9.2f}s  {n / max(elapsed, 1e-9):>12,.0f} rows/s")
+
+
 def main():
     parser = argparse.ArgumentParser(description='Generate mock data for Shanghai Transport Card database (2025 full year)')
     parser.add_argument('--users', type=int, default=100, help='Number of users to generate (default: 100)')
@@ -709,8 +867,21 @@ def main():
     parser.add_argument('--skip-routes', action='store_true', help='Skip route generation')
     parser.add_argument('--skip-transactions', action='store_true', help='Skip transaction generation')
     parser.add_argument('--skip-topups', action='store_true', help='Skip topup generation')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for a reproducible dataset')
+    parser.add_argument('--scale', type=float, default=1.0,
+                       help='Multiplier for daily transaction and topup volume, e.g. 100 for load-test datasets (default: 1.0)')
+    parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS,
+                       help=f'Maximum rows generated and written per batch (default: {DEFAULT_BATCH_ROWS})')
+    parser.add_argument('--load-method', choices=BULK_LOAD_METHODS, default=BULK_LOAD_CONFIG['method'],
+                       help='Databricks bulk load method: Parquet + COPY INTO, parameterized multi-row INSERT, '
+                            'literal multi-row INSERT, or auto (by batch size, default)')
+    parser.add_argument('--benchmark-load', metavar='ROWS',
+                       help='Time every Databricks load method on comma-separated batch sizes (e.g. 100,1000,10000) '
+                            'in a scratch table, then exit without generating data')
     
     args = parser.parse_args()
+    if args.benchmark_load and not args.databricks:
+        parser.error('--benchmark-load requires --databricks')
     
     # Validate database configuration
     if args.databricks:
@@ -731,19 +902,31 @@ def main():
         print(f"  Target: Databricks")
         print(f"  Catalog.Schema: {DATABRICKS_CONFIG['catalog']}.{DATABRICKS_CONFIG['schema']}")
         print(f"  Tables: src_users, src_stations, src_routes, src_transactions, src_topups")
+        print(f"  Load method: {args.load_method}" + (f" (staging: {BULK_LOAD_CONFIG['staging_path']})" if BULK_LOAD_CONFIG['staging_path'] else ""))
     else:
         print(f"  Target: Supabase/PostgreSQL")
         print(f"  Database Host: {DB_CONFIG['host']}")
         print(f"  Database Name: {DB_CONFIG['database']}")
     print(f"  Users: {args.users}")
     print(f"  Date Range: 2025-01-01 to 2025-12-31 (Full Year)")
-    print(f"  Daily Transactions: 800-1200 (weekdays), 480-720 (weekends)")
+    print(f"  Daily Transactions: 800-1200 (weekdays), 480-720 (weekends), scale x{args.scale:g}")
+    print(f"  Seed: {args.seed if args.seed is not None else 'random'}")
     print(f"  Clear existing data: {not args.skip_clear}")
     print("=" * 60)
     
+    # Users, stations and routes use the random module, transactions and topups a numpy Generator
+    if args.seed is not None:
+        random.seed(args.seed)
+    rng = np.random.default_rng(args.seed)
+    BULK_LOAD_CONFIG['method'] = args.load_method
+
     conn = get_db_connection(use_databricks=args.databricks)
     
     try:
+        if args.benchmark_load:
+            benchmark_load_methods(conn, [int(size) for size in args.benchmark_load.split(',')], rng)
+            return
+
         # Clear existing data before generation
         if not args.skip_clear:
             clear_all_data(conn, use_databricks=args.databricks)
@@ -766,13 +949,15 @@ def main():
                 print("Error: Users and stations must be generated before transactions")
                 sys.exit(1)
             generate_transactions(user_ids, station_ids, route_ids, args.days, 
-                                1000, conn, use_databricks=args.databricks)  # transactions_per_day is deprecated, using fixed value
+                                1000, conn, use_databricks=args.databricks,  # transactions_per_day is deprecated, using fixed value
+                                rng=rng, scale=args.scale, batch_rows=args.batch_rows)
         
         if not args.skip_topups:
             if not user_ids:
                 print("Error: Users must be generated before topups")
                 sys.exit(1)
-            generate_topups(user_ids, args.days, conn, use_databricks=args.databricks)
+            generate_topups(user_ids, args.days, conn, use_databricks=args.databricks,
+                            rng=rng, scale=args.scale, batch_rows=args.batch_rows)
         
         verify_data(conn, use_databricks=args.databricks)
         
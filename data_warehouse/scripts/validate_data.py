@@ -5,15 +5,22 @@ Basic Data Statistics Script for Shanghai Transport Card Database
 
 Note: Detailed data validation and cleaning logic should be implemented in dbt tests.
 This script only provides basic statistics and connection testing.
+
+Each table is profiled in a single scan (row count, null counts, HyperLogLog distinct
+estimates, min/max and histograms for every column); tables are profiled concurrently.
+The profile is cached and compared with the previous run to report drift.
 """
 
 import os
 import sys
 import json
 import argparse
-from datetime import datetime, time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, time
 from decimal import Decimal
-from collections import defaultdict
+from collections import Counter, defaultdict
+import numpy as np
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
@@ -30,14 +37,270 @@ DB_CONFIG = {
     'password': os.getenv('SUPABASE_DB_PASSWORD')
 }
 
+TABLES = ['users', 'stations', 'routes', 'transactions', 'topups']
+
+# Profiling
+PROFILE_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.profile_cache.json')
+PROFILE_CHUNK_ROWS = 50000  # rows fetched per round trip from the server-side cursor
+PROFILE_WORKERS = 4  # tables profiled at once (one connection each)
+HLL_PRECISION = 12  # 4096 registers, ~1.6% standard error
+HISTOGRAM_BINS = 10
+HISTOGRAM_SAMPLE_SIZE = 10000  # numeric histograms are built from a uniform sample of this size
+MAX_TRACKED_VALUES = 1000  # text/boolean columns with more distinct values get no value histogram
+TOP_VALUES = 10
+
+# Drift thresholds against the previous profile
+DRIFT_THRESHOLDS = {
+    'row_count_change': 0.10,  # relative
+    'null_rate_change': 0.05,  # absolute
+    'distinct_change': 0.20,  # relative
+    'mean_change': 0.10,  # relative
+    'histogram_distance': 0.10,  # total variation distance between normalized histograms
+}
+
+INTEGER_TYPES = {'smallint', 'integer', 'bigint'}
+FLOAT_TYPES = {'numeric', 'real', 'double precision'}
+UNHASHABLE_TYPES = {'json', 'jsonb', 'ARRAY'}  # profiled through their string form
+
+
+class HyperLogLog:
+    """HyperLogLog distinct-count sketch over 64-bit hashes (vectorized with numpy)"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.p = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        if len(hashes) == 0:
+            return
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # rank = leading zeros in the remaining 64-p bits + 1; frexp gives the exact bit length
+        # (the remaining bits fit in a float64 mantissa)
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = (64 - self.p + 1 - bit_length).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def estimate(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m * self.m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * self.m and zeros:
+            return int(round(self.m * np.log(self.m / zeros)))  # linear counting for small cardinalities
+        return int(round(raw))
+
+
+def hash_numbers(values):
+    """splitmix64 finalizer over the bit patterns of an int64/float64 array"""
+    with np.errstate(over='ignore'):
+        x = values.view(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+
+def hash_objects(values):
+    """Stable 64-bit hashes of arbitrary values (via their string form)"""
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(str(v).encode('utf-8'), digest_size=8).digest(), 'little') for v in values),
+        dtype=np.uint64, count=len(values)
+    )
+
+
+class ColumnProfile:
+    """Accumulates the statistics of one column chunk by chunk"""
+
+    def __init__(self, name, data_type, rng):
+        self.name = name
+        self.data_type = data_type
+        if data_type in INTEGER_TYPES:
+            self.kind = 'integer'
+        elif data_type in FLOAT_TYPES:
+            self.kind = 'float'
+        elif data_type == 'date' or data_type.startswith(('timestamp', 'time')):
+            self.kind = 'temporal'
+        else:
+            self.kind = 'text'
+        self.rng = rng
+        self.count = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.total = 0.0
+        self.hll = HyperLogLog()
+        self.sample = np.empty(0)
+        self.sample_keys = np.empty(0)
+        self.buckets = Counter()  # months for temporal columns, values for text columns
+        self.tracking_values = self.kind == 'text'
+
+    def add(self, values):
+        # np.array(values, dtype=object) would turn equal-length lists (ARRAY/json rows) into a 2-D array
+        column = np.empty(len(values), dtype=object)
+        column[:] = values
+        present = column[column != None]  # noqa: E711 - elementwise comparison
+        self.count += len(column)
+        self.nulls += len(column) - len(present)
+        if len(present) == 0:
+            return
+        if self.kind in ('integer', 'float'):
+            self._add_numbers(present.astype(np.int64 if self.kind == 'integer' else np.float64))
+        elif self.data_type in UNHASHABLE_TYPES:
+            self._add_objects(Counter(json.dumps(v, sort_keys=True, default=str) for v in present))
+        else:
+            self._add_objects(Counter(present.tolist()))
+
+    def _add_numbers(self, numbers):
+        low, high = numbers.min().item(), numbers.max().item()
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        self.total += float(numbers.sum(dtype=np.float64))
+        self.hll.add_hashes(hash_numbers(numbers if self.kind == 'integer' else numbers + 0.0))  # + 0.0 folds -0.0 into 0.0
+        # Bottom-k sampling: keep the values with the smallest random keys (a uniform sample of the column)
+        keys = np.concatenate([self.sample_keys, self.rng.random(len(numbers))])
+        sample = np.concatenate([self.sample, numbers.astype(np.float64)])
+        if len(keys) > HISTOGRAM_SAMPLE_SIZE:
+            keep = np.argpartition(keys, HISTOGRAM_SAMPLE_SIZE)[:HISTOGRAM_SAMPLE_SIZE]
+            keys, sample = keys[keep], sample[keep]
+        self.sample_keys, self.sample = keys, sample
+
+    def _add_objects(self, counts):
+        distinct = list(counts)
+        low, high = min(distinct), max(distinct)
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        self.hll.add_hashes(hash_objects(distinct))
+        if self.kind == 'temporal':
+            for value, n in counts.items():
+                if isinstance(value, (date, datetime)):
+                    self.buckets[f"{value.year:04d}-{value.month:02d}"] += n
+                else:
+                    self.buckets[f"{value.hour:02d}:00"] += n
+        elif self.tracking_values:
+            self.buckets.update(counts)
+            if len(self.buckets) > MAX_TRACKED_VALUES:
+                self.tracking_values = False
+                self.buckets = Counter()
+
+    def result(self):
+        present = self.count - self.nulls
+        profile = {
+            'data_type': self.data_type,
+            'null_count': self.nulls,
+            'null_rate': round(self.nulls / self.count, 6) if self.count else 0.0,
+            'distinct_estimate': min(self.hll.estimate(), present),
+            'min': self.min if self.kind in ('integer', 'float') else (None if self.min is None else str(self.min)),
+            'max': self.max if self.kind in ('integer', 'float') else (None if self.max is None else str(self.max)),
+        }
+        if self.kind in ('integer', 'float') and present:
+            profile['mean'] = self.total / present
+            counts, edges = np.histogram(self.sample, bins=HISTOGRAM_BINS, range=(self.min, self.max))
+            scale = present / len(self.sample)
+            profile['histogram'] = {'edges': [round(float(e), 6) for e in edges],
+                                    'counts': [int(round(c * scale)) for c in counts]}
+        elif self.kind == 'temporal' and self.buckets:
+            profile['histogram'] = {'buckets': dict(sorted(self.buckets.items()))}
+        elif self.buckets:
+            profile['histogram'] = {'buckets': {str(k): v for k, v in self.buckets.most_common(TOP_VALUES)}}
+        return profile
+
+
+def histogram_distance(previous, current):
+    """Total variation distance between two histograms with the same bins (None if not comparable)"""
+    if not previous or not current:
+        return None
+    if 'buckets' in previous and 'buckets' in current:
+        keys = set(previous['buckets']) | set(current['buckets'])
+        before = [previous['buckets'].get(k, 0) for k in keys]
+        after = [current['buckets'].get(k, 0) for k in keys]
+    elif previous.get('edges') == current.get('edges'):
+        before, after = previous['counts'], current['counts']
+    else:
+        return None
+    before_total, after_total = sum(before), sum(after)
+    if not before_total or not after_total:
+        return None
+    return 0.5 * sum(abs(b / before_total - a / after_total) for b, a in zip(before, after))
+
+
+def relative_change(previous, current):
+    if previous in (None, 0) or current is None:
+        return None
+    return (current - previous) / abs(previous)
+
+
+def compare_profiles(previous, current):
+    """Drift findings of one table against its previous profile"""
+    drift = []
+    change = relative_change(previous.get('row_count'), current['row_count'])
+    if change is not None and abs(change) > DRIFT_THRESHOLDS['row_count_change']:
+        drift.append({'column': None, 'metric': 'row_count', 'previous': previous['row_count'],
+                      'current': current['row_count'], 'change': round(change, 4)})
+
+    for column, profile in current['profile'].items():
+        before = previous.get('profile', {}).get(column)
+        if before is None:
+            drift.append({'column': column, 'metric': 'new_column'})
+            continue
+        checks = [
+            ('null_rate', profile['null_rate'] - before['null_rate'], DRIFT_THRESHOLDS['null_rate_change']),
+            ('distinct_estimate', relative_change(before['distinct_estimate'], profile['distinct_estimate']),
+             DRIFT_THRESHOLDS['distinct_change']),
+            ('mean', relative_change(before.get('mean'), profile.get('mean')), DRIFT_THRESHOLDS['mean_change']),
+            ('histogram', histogram_distance(before.get('histogram'), profile.get('histogram')),
+             DRIFT_THRESHOLDS['histogram_distance']),
+        ]
+        for metric, value, threshold in checks:
+            if value is not None and abs(value) > threshold:
+                drift.append({'column': column, 'metric': metric, 'previous': before.get(metric),
+                              'current': profile.get(metric), 'change': round(value, 4)})
+    for column in previous.get('profile', {}):
+        if column not in current['profile']:
+            drift.append({'column': column, 'metric': 'dropped_column'})
+    return drift
+
+
+def format_drift(finding):
+    """One-line description of a drift finding"""
+    target = finding['column'] or 'table'
+    if 'change' not in finding:
+        return f"{target}: {finding['metric'].replace('_', ' ')}"
+    if finding['metric'] == 'histogram':
+        return f"{target}: histogram distance {finding['change']:.2f}"
+    return f"{target}: {finding['metric']} {finding.get('previous')} -> {finding.get('current')} ({finding['change']:+.2%})"
+
+
+def load_profile_cache(path):
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"  ⚠ Could not read profile cache {path}: {e}")
+        return {}
+
+
+def save_profile_cache(path, statistics):
+    cache = {'timestamp': datetime.now().isoformat(),
+             'tables': {table: {'row_count': stats['row_count'], 'profile': stats['profile']}
+                        for table, stats in statistics.items()}}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, default=str)
+
 
 class DataStatistics:
     """Basic data statistics class - detailed validation should be done in dbt tests"""
     
-    def __init__(self, conn):
+    def __init__(self, conn, connect=None, workers=PROFILE_WORKERS, cache_file=PROFILE_CACHE_FILE):
         self.conn = conn
         self.cursor = conn.cursor(cursor_factory=RealDictCursor)
         self.stats = {}
+        # Tables are profiled concurrently, each on its own connection from connect()
+        self.connect = connect or get_db_connection
+        self.workers = workers
+        self.cache_file = cache_file
+        self.drift = {}
         
     def check_table_exists(self, table_name):
         """Check if table exists"""
@@ -50,158 +313,98 @@ class DataStatistics:
         """, (table_name,))
         return self.cursor.fetchone()['exists']
     
-    def get_table_statistics(self, table_name):
-        """Get basic statistics for a table"""
-        if not self.check_table_exists(table_name):
+    def get_columns(self, table_names):
+        """Column information of the given tables (one information_schema query); missing tables are absent"""
+        self.cursor.execute("""
+            SELECT table_name, column_name, data_type, is_nullable
+            FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = ANY(%s)
+            ORDER BY table_name, ordinal_position
+        """, (list(table_names),))
+        columns = defaultdict(list)
+        for row in self.cursor.fetchall():
+            columns[row['table_name']].append({
+                'column_name': row['column_name'],
+                'data_type': row['data_type'],
+                'is_nullable': row['is_nullable']
+            })
+        return columns
+    
+    def profile_table(self, table_name, columns, conn=None):
+        """
+        Profile every column of a table in one scan
+
+        Rows are streamed through a server-side cursor in chunks of PROFILE_CHUNK_ROWS and
+        folded into per-column accumulators (see ColumnProfile).
+        """
+        own_conn = conn is None
+        conn = conn or self.connect()
+        rng = np.random.default_rng(0)  # fixed seed: the same data gives the same histogram sample
+        profiles = [ColumnProfile(c['column_name'], c['data_type'], rng) for c in columns]
+        column_list = ', '.join(f'"{c["column_name"]}"' for c in columns)
+        row_count = 0
+        try:
+            with conn.cursor(name=f"profile_{table_name}") as cursor:
+                cursor.itersize = PROFILE_CHUNK_ROWS
+                cursor.execute(f'SELECT {column_list} FROM "{table_name}"')
+                while True:
+                    rows = cursor.fetchmany(PROFILE_CHUNK_ROWS)
+                    if not rows:
+                        break
+                    row_count += len(rows)
+                    for profile, values in zip(profiles, zip(*rows)):
+                        profile.add(values)
+            conn.rollback()  # end the read-only transaction of the named cursor
+        finally:
+            if own_conn:
+                conn.close()
+        return row_count, {p.name: p.result() for p in profiles}
+    
+    def get_table_statistics(self, table_name, columns=None, conn=None):
+        """Get basic statistics for a table (single scan, see profile_table)"""
+        if columns is None:
+            columns = self.get_columns([table_name]).get(table_name)
+        if not columns:
             print(f"  ⚠ Table '{table_name}' does not exist")
             return None
         
-        stats = {}
-        
-        # Row count
-        self.cursor.execute(f"SELECT COUNT(*) as count FROM {table_name}")
-        stats['row_count'] = self.cursor.fetchone()['count']
-        
-        # Column information
-        self.cursor.execute("""
-            SELECT column_name, data_type, is_nullable
-            FROM information_schema.columns
-            WHERE table_schema = 'public' AND table_name = %s
-            ORDER BY ordinal_position
-        """, (table_name,))
-        stats['columns'] = self.cursor.fetchall()
+        stats = {'columns': columns}
+        stats['row_count'], stats['profile'] = self.profile_table(table_name, columns, conn)
         
         # Date range (if date columns exist)
         date_columns = ['created_at', 'transaction_date', 'topup_date']
         for col in date_columns:
-            if any(c['column_name'] == col for c in stats['columns']):
-                self.cursor.execute(f"""
-                    SELECT MIN({col}) as min_date, MAX({col}) as max_date
-                    FROM {table_name}
-                    WHERE {col} IS NOT NULL
-                """)
-                date_range = self.cursor.fetchone()
-                if date_range and date_range['min_date']:
-                    stats[f'{col}_range'] = {
-                        'min': str(date_range['min_date']),
-                        'max': str(date_range['max_date'])
-                    }
+            profile = stats['profile'].get(col)
+            if profile and profile['min'] is not None:
+                stats[f'{col}_range'] = {'min': profile['min'], 'max': profile['max']}
         
         return stats
     
-    def get_all_statistics(self):
-        """Get statistics for all tables"""
-        tables = ['users', 'stations', 'routes', 'transactions', 'topups']
-        
+    def get_all_statistics(self, tables=TABLES):
+        """Get statistics for all tables (profiled concurrently) and compare them with the cached previous run"""
         print("Collecting table statistics...")
+        columns = self.get_columns(tables)
         for table in tables:
-            print(f"  Analyzing {table}...")
-            stats = self.get_table_statistics(table)
-            if stats:
-                self.stats[table] = stats
-    
-    def generate_report(self, output_format='json', output_file=None):
-        """Generate statistics report"""
-        report = {
-            'timestamp': datetime.now().isoformat(),
-            'statistics': self.stats,
-            'note': 'For detailed data validation and cleaning, use dbt tests (dbt test)'
-        }
+            if table not in columns:
+                print(f"  ⚠ Table '{table}' does not exist")
         
-        if output_format == 'json':
-            report_str = json.dumps(report, indent=2, default=str)
-        elif output_format == 'html':
-            report_str = self.generate_html_report(report)
-        else:
-            report_str = self.generate_text_report(report)
+        present = [table for table in tables if table in columns]
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(present) or 1))) as pool:
+            futures = {table: pool.submit(self.get_table_statistics, table, columns[table]) for table in present}
+            for table in present:
+                self.stats[table] = futures[table].result()
+                print(f"  ✓ Profiled {table}: {self.stats[table]['row_count']:,} rows, {len(columns[table])} columns")
         
-        if output_file:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(report_str)
-            print(f"\nReport saved to: {output_file}")
-        else:
-            print("\n" + "=" * 60)
-            print("VALIDATION REPORT")
-            print("=" * 60)
-            print(report_str)
-        
-        return report
-    
-    def generate_text_report(self, report):
-        """Generate text format report"""
-        lines = []
-        lines.append(f"Data Statistics Report - {report['timestamp']}")
-        lines.append("=" * 60)
-        lines.append("\n" + report.get('note', ''))
-        lines.append("\nTable Statistics:")
-        lines.append("-" * 60)
-        
-        for table_name, stats in report['statistics'].items():
-            lines.append(f"\n{table_name.upper()}:")
-            lines.append(f"  Row Count: {stats.get('row_count', 0):,}")
-            
-            if 'columns' in stats:
-                lines.append(f"  Columns: {len(stats['columns'])}")
-            
-            # Show date ranges if available
-            for key, value in stats.items():
-                if key.endswith('_range'):
-                    col_name = key.replace('_range', '')
-                    lines.append(f"  {col_name} Range: {value.get('min', 'N/A')} to {value.get('max', 'N/A')}")
-        
-        lines.append("\n" + "=" * 60)
-        lines.append("Note: For detailed data validation, run 'dbt test' after setting up dbt models")
-        
-        return "\n".join(lines)
-    
-    def generate_html_report(self, report):
-        """Generate HTML format report"""
-        html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Data Statistics Report</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 20px; }}
-        h1 {{ color: #333; }}
-        .statistics {{ background: #f5f5f5; padding: 15px; margin: 10px 0; }}
-        .note {{ background: #fff3cd; padding: 15px; margin: 10px 0; border-left: 4px solid #ffc107; }}
-        table {{ border-collapse: collapse; width: 100%; margin: 20px 0; }}
-        th, td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-        th {{ background-color: #4CAF50; color: white; }}
-    </style>
-</head>
-<body>
-    <h1>Data Statistics Report</h1>
-    <p>Generated: {report['timestamp']}</p>
-    
-    <div class="note">
-        <strong>Note:</strong> {report.get('note', 'For detailed data validation, use dbt tests')}
-    </div>
-    
-    <div class="statistics">
-        <h2>Table Statistics</h2>
-"""
-        for table_name, stats in report['statistics'].items():
-            html += f"""
-        <h3>{table_name.upper()}</h3>
-        <table>
-            <tr><th>Metric</th><th>Value</th></tr>
-            <tr><td>Row Count</td><td>{stats.get('row_count', 0):,}</td></tr>
-            <tr><td>Columns</td><td>{len(stats.get('columns', []))}</td></tr>
-"""
-            for key, value in stats.items():
-                if key.endswith('_range'):
-                    col_name = key.replace('_range', '')
-                    html += f"<tr><td>{col_name} Range</td><td>{value.get('min', 'N/A')} to {value.get('max', 'N/A')}</td></tr>"
-            html += "</table>"
-        
-        html += """
-    </div>
-</body>
-</html>
-"""
-        return html
+        if self.cache_file:
+            previous = load_profile_cache(self.cache_file)
+            for table, stats in self.stats.items():
+                if table in previous.get('tables', {}):
+                    self.drift[table] = compare_profiles(previous['tables'][table], stats)
+                    stats['drift'] = self.drift[table]
+            if previous:
+                drifted = sum(1 for findings in self.drift.values() if findings)
+                print(f"  Compared with profile of {previous.get('timestamp')}: {drifted} table(s) with drift")
+            save_profile_cache(self.cache_file, self.stats)
     
     def close(self):
         """Close database connection"""
@@ -255,6 +458,15 @@ class DataStatistics:
                 if key.endswith('_range'):
                     col_name = key.replace('_range', '')
                     lines.append(f"  {col_name} Range: {value.get('min', 'N/A')} to {value.get('max', 'N/A')}")
+            
+            if stats.get('profile'):
+                lines.append(f"  {'Column':<20} {'Nulls':>10} {'Distinct~':>10}  Min .. Max")
+                for column, profile in stats['profile'].items():
+                    lines.append(f"  {column:<20} {profile['null_count']:>10,} {profile['distinct_estimate']:>10,}  "
+                                 f"{profile['min']} .. {profile['max']}")
+            
+            for finding in stats.get('drift', []):
+                lines.append(f"  ⚠ Drift: {format_drift(finding)}")
         
         lines.append("\n" + "=" * 60)
         lines.append("Note: For detailed data validation, run 'dbt test' after setting up dbt models")
@@ -301,7 +513,15 @@ class DataStatistics:
                 if key.endswith('_range'):
                     col_name = key.replace('_range', '')
                     html += f"<tr><td>{col_name} Range</td><td>{value.get('min', 'N/A')} to {value.get('max', 'N/A')}</td></tr>"
+            for finding in stats.get('drift', []):
+                html += f"<tr><td>Drift</td><td>{format_drift(finding)}</td></tr>"
             html += "</table>"
+            if stats.get('profile'):
+                html += "<table><tr><th>Column</th><th>Type</th><th>Nulls</th><th>Distinct (est.)</th><th>Min</th><th>Max</th></tr>"
+                for column, profile in stats['profile'].items():
+                    html += (f"<tr><td>{column}</td><td>{profile['data_type']}</td><td>{profile['null_count']:,}</td>"
+                             f"<td>{profile['distinct_estimate']:,}</td><td>{profile['min']}</td><td>{profile['max']}</td></tr>")
+                html += "</table>"
         
         html += """
     </div>
@@ -329,6 +549,11 @@ def main():
     parser.add_argument('--format', choices=['json', 'html', 'text'], default='text',
                        help='Output format (default: text)')
     parser.add_argument('--output', type=str, help='Output file path (optional)')
+    parser.add_argument('--workers', type=int, default=PROFILE_WORKERS,
+                       help=f'Tables profiled concurrently (default: {PROFILE_WORKERS})')
+    parser.add_argument('--cache-file', type=str, default=PROFILE_CACHE_FILE,
+                       help='Profile cache compared against for drift and updated after the run')
+    parser.add_argument('--no-cache', action='store_true', help='Neither compare with nor update the profile cache')
     
     args = parser.parse_args()
     
@@ -349,7 +574,7 @@ def main():
     print("=" * 60)
     
     conn = get_db_connection()
-    stats = DataStatistics(conn)
+    stats = DataStatistics(conn, workers=args.workers, cache_file=None if args.no_cache else args.cache_file)
     
     try:
         stats.get_all_statistics()
@@ -0,0 +1,59 @@
+"""Databricks load method selection and the parameterized multi-row INSERT."""
+
+import pytest
+
+import generate_mock_data as gmd
+
+
+class FakeCursor:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, parameters=None):
+        self.statements.append((sql, parameters))
+
+
+class FakeConnection:
+    commits = 0
+
+    def commit(self):
+        self.commits += 1
+
+
+@pytest.fixture
+def load_config(monkeypatch):
+    config = dict(gmd.BULK_LOAD_CONFIG, method='auto', staging_path=None, copy_min_rows=1000,
+                  max_params_per_statement=6)
+    monkeypatch.setattr(gmd, 'BULK_LOAD_CONFIG', config)
+    return config
+
+
+@pytest.mark.parametrize("rows", [1, 10, 1888, 50000])
+def test_auto_uses_parameterized_insert_without_staging_path(load_config, rows):
+    assert gmd.choose_load_method(rows) == 'params'
+
+
+def test_auto_picks_copy_for_large_batches_with_staging_path(load_config, monkeypatch):
+    pytest.importorskip("pyarrow")
+    load_config['staging_path'] = '/Volumes/workspace/public/staging'
+    assert gmd.choose_load_method(999) == 'params'
+    assert gmd.choose_load_method(1000) == 'copy'
+
+
+def test_explicit_method_is_kept(load_config):
+    assert gmd.choose_load_method(5000, 'params') == 'params'
+    assert gmd.choose_load_method(1, 'insert') == 'insert'
+
+
+def test_parameterized_insert_binds_several_rows_per_statement(load_config):
+    cursor, conn = FakeCursor(), FakeConnection()
+    rows = [(i, f"name {i}") for i in range(7)]
+
+    gmd.parameterized_insert_databricks(cursor, 'cat.sch.t', ['id', 'name'], rows, conn)
+
+    # 6 parameters per statement -> 3 rows, so 7 rows take 3 statements instead of 7
+    assert [sql.count('(?, ?)') for sql, _ in cursor.statements] == [3, 3, 1]
+    assert [value for _, parameters in cursor.statements for value in parameters] == \
+        [value for row in rows for value in row]
+    assert all(sql.startswith('INSERT INTO cat.sch.t (id, name) VALUES') for sql, _ in cursor.statements)
+    assert conn.commits == 1
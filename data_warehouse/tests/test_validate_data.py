@@ -0,0 +1,42 @@
+"""Single-scan column profiles and the HyperLogLog distinct estimate."""
+
+import numpy as np
+import pytest
+
+from validate_data import ColumnProfile, HyperLogLog, hash_numbers
+
+
+def profile(data_type, *chunks):
+    column = ColumnProfile('c', data_type, np.random.default_rng(0))
+    for chunk in chunks:
+        column.add(chunk)
+    return column.result()
+
+
+@pytest.mark.parametrize("data_type", ['ARRAY', 'jsonb'])
+def test_equal_length_list_values_stay_one_value_per_row(data_type):
+    result = profile(data_type, [[1, 2], [3, 4]], [None, [1, 2], [5, 6]])
+
+    assert result['null_count'] == 1
+    assert result['null_rate'] == pytest.approx(1 / 5)
+    assert result['distinct_estimate'] == 3
+
+
+def test_integer_profile_across_chunks():
+    result = profile('integer', [3, None, 1], [2, 2, None])
+
+    assert result['null_count'] == 2
+    assert (result['min'], result['max']) == (1, 3)
+    assert result['mean'] == pytest.approx(2.0)
+    assert result['distinct_estimate'] == 3
+    assert sum(result['histogram']['counts']) == 4
+
+
+@pytest.mark.parametrize("cardinality", [100, 50000])
+def test_hyperloglog_estimate_is_within_a_few_percent(cardinality):
+    hll = HyperLogLog()
+    values = np.arange(cardinality, dtype=np.int64)
+    hll.add_hashes(hash_numbers(values))
+    hll.add_hashes(hash_numbers(values[: cardinality // 2]))  # repeats do not count
+
+    assert hll.estimate() == pytest.approx(cardinality, rel=0.05)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark for chart time-axis processing.
+
+Compares per-label regex parsing + sorted() (how chart labels used to be
+handled) with the vectorized time_axis module: detect the format once,
+build a typed sort-key array, argsort and format in one pass.
+
+Usage:
+    python scripts/benchmark_time_axis.py [--labels 100000] [--repeat 3]
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add parent directory to path to import modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd  # noqa: E402
+
+from src.chains.time_axis import chronological_order, detect_time_format, format_time_labels  # noqa: E402
+
+MONTH_ABBREVIATIONS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def legacy_sort_key(label: str):
+    """Per-label key in the style of the previous row-by-row implementation"""
+    match = re.match(r'^(\d{4})[-/](\d{1,2})[-/](\d{1,2})$', label)
+    if match:
+        return int(match.group(1)) * 10000 + int(match.group(2)) * 100 + int(match.group(3))
+    match = re.match(r'^(\d{4})[-/]?(\d{1,2})$', label)
+    if match:
+        return int(match.group(1)) * 100 + int(match.group(2))
+    match = re.match(r'(\d{4})[-/]?Q(\d)', label, re.IGNORECASE)
+    if match:
+        return int(match.group(1)) * 10 + int(match.group(2))
+    return 0
+
+
+def legacy_format(label: str) -> str:
+    match = re.match(r'^(\d{4})[-/](\d{1,2})[-/](\d{1,2})$', label)
+    if match:
+        return f"{MONTH_ABBREVIATIONS[int(match.group(2)) - 1]} {int(match.group(3))}, {match.group(1)}"
+    return label
+
+
+def make_labels(kind: str, count: int, seed: int = 42):
+    rng = random.Random(seed)
+    start = date(2015, 1, 1)
+    if kind == "daily":
+        return [(start + timedelta(days=rng.randrange(3650))).isoformat() for _ in range(count)]
+    if kind == "monthly":
+        return [f"{2000 + rng.randrange(25)}-{rng.randrange(1, 13):02d}" for _ in range(count)]
+    if kind == "quarterly":
+        return [f"{2000 + rng.randrange(25)}-Q{rng.randrange(1, 5)}" for _ in range(count)]
+    raise ValueError(kind)
+
+
+def best_of(repeat: int, func):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chart time-axis sorting and formatting")
+    parser.add_argument("--labels", type=int, default=100_000, help="Number of labels per format")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'format':<10} {'legacy sort':>12} {'legacy fmt':>11} {'axis sort':>10} {'axis fmt':>9} {'speedup':>8}")
+    for kind in ("daily", "monthly", "quarterly"):
+        labels = make_labels(kind, args.labels)
+        column = pd.Series(labels)
+
+        legacy_sort_ms, legacy_sorted = best_of(args.repeat, lambda: sorted(labels, key=legacy_sort_key))
+        legacy_fmt_ms, _ = best_of(args.repeat, lambda: [legacy_format(label) for label in legacy_sorted])
+
+        def axis_sort():
+            time_format = detect_time_format(column)
+            return time_format, column.iloc[chronological_order(column, time_format)]
+
+        axis_sort_ms, (time_format, axis_sorted) = best_of(args.repeat, axis_sort)
+        axis_fmt_ms, _ = best_of(args.repeat, lambda: format_time_labels(axis_sorted, time_format))
+
+        assert [legacy_sort_key(label) for label in axis_sorted] == [legacy_sort_key(label) for label in legacy_sorted]
+        speedup = (legacy_sort_ms + legacy_fmt_ms) / max(axis_sort_ms + axis_fmt_ms, 1e-9)
+        print(f"{kind:<10} {legacy_sort_ms:>10.1f}ms {legacy_fmt_ms:>9.1f}ms {axis_sort_ms:>8.1f}ms "
+              f"{axis_fmt_ms:>7.1f}ms {speedup:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,17 @@
 """
 Script to create a RAG datasource named "Databricks" and import all files from data_warehouse/dbt/rag_docs
 This script mimics the behavior of uploading files through the web interface.
+
+Only the delta is applied: the SHA-256 of every doc (from the generator's CHANGES.json
+manifest, or hashed from disk without one) is compared with the content_hash of the files
+already in the datasource. New and changed docs are imported (a changed doc replaces its
+previous version), docs that no longer exist are removed together with their vectors,
+and unchanged docs are not re-embedded. Use --full to re-import everything.
 """
+import argparse
 import asyncio
+import hashlib
+import json
 import sys
 import uuid
 from pathlib import Path
@@ -17,9 +26,11 @@ from src.database.db_operations import (
     get_datasource,
     save_file_info,
     update_file_processing_status,
-    get_datasources
+    get_datasources,
+    get_files_by_datasource,
+    delete_file_record_and_associated_data
 )
-from src.document_loaders.file_processor import process_uploaded_file
+from src.document_loaders.file_processor import process_uploaded_file, remove_from_index
 from src.models.data_models import DataSourceType, FileType, ProcessingStatus
 from src.config.config import DATA_DIR
 
@@ -37,6 +48,7 @@ UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 # Source directory for RAG docs
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 RAG_DOCS_DIR = PROJECT_ROOT / "data_warehouse" / "dbt" / "rag_docs"
+CHANGE_MANIFEST = RAG_DOCS_DIR / "CHANGES.json"
 
 
 def get_file_type(file_path: Path) -> FileType:
@@ -52,10 +64,81 @@ def get_file_type(file_path: Path) -> FileType:
     return file_type_mapping.get(extension, FileType.UNKNOWN)
 
 
+def load_doc_hashes() -> dict:
+    """
+    SHA-256 of every markdown doc, by filename
+
+    Taken from the generator's change manifest when it lists exactly the docs on disk,
+    otherwise computed from the files.
+    """
+    md_files = {path.name: path for path in RAG_DOCS_DIR.glob("*.md")}
+    if CHANGE_MANIFEST.exists():
+        try:
+            manifest = json.loads(CHANGE_MANIFEST.read_text(encoding='utf-8'))
+            logger.info(
+                f"Change manifest: {len(manifest.get('added', []))} added, {len(manifest.get('changed', []))} changed, "
+                f"{len(manifest.get('removed', []))} removed, {manifest.get('unchanged', 0)} unchanged"
+            )
+            files = manifest.get('files', {})
+            if set(files) == set(md_files):
+                return {name: info['sha256'] for name, info in files.items()}
+            logger.warning("Change manifest does not match the docs on disk, hashing the files instead")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not read change manifest {CHANGE_MANIFEST}: {e}")
+    return {name: hashlib.sha256(path.read_bytes()).hexdigest() for name, path in md_files.items()}
+
+
+def plan_delta(doc_hashes: dict, existing_files: list, full: bool = False) -> dict:
+    """
+    Compare the docs with the files already in the datasource
+
+    Returns:
+        Dict with 'import' (filenames to import), 'remove' (file records to delete once the
+        imports are done) and 'unchanged' (filenames that are kept as they are)
+    """
+    by_name = {}
+    for file in existing_files:
+        by_name.setdefault(file['original_filename'], []).append(file)
+
+    to_import, to_remove, unchanged = [], [], []
+    for name, sha256 in sorted(doc_hashes.items()):
+        records = by_name.pop(name, [])
+        current = None if full else next(
+            (f for f in records if f.get('content_hash') == sha256 and f['processing_status'] != ProcessingStatus.FAILED.value),
+            None
+        )
+        if current:
+            unchanged.append(name)
+        else:
+            to_import.append(name)
+        # Older versions, duplicates and failed imports of the doc
+        to_remove.extend(f for f in records if f is not current)
+
+    # Docs that no longer exist
+    for records in by_name.values():
+        to_remove.extend(records)
+
+    return {'import': to_import, 'remove': to_remove, 'unchanged': unchanged}
+
+
+async def remove_file_from_datasource(file: dict) -> bool:
+    """Delete a file record, its upload and its vectors in the datasource index"""
+    try:
+        removed_vectors = await remove_from_index(file['datasource_id'], file['id'])
+        if await delete_file_record_and_associated_data(file['id']):
+            logger.info(f"Removed file: {file['original_filename']} (ID: {file['id']}, {removed_vectors} vectors)")
+            return True
+        return False
+    except Exception as e:
+        logger.error(f"Error removing file {file['original_filename']} (ID: {file['id']}): {e}", exc_info=True)
+        return False
+
+
 async def import_file_to_datasource(
     file_path: Path,
     datasource_id: int,
-    original_filename: str
+    original_filename: str,
+    content_hash: str = None
 ) -> bool:
     """
     Import a single file to the datasource.
@@ -86,7 +169,8 @@ async def import_file_to_datasource(
             original_filename=original_filename,
             file_type=file_type.value,
             file_size=file_size,
-            datasource_id=datasource_id
+            datasource_id=datasource_id,
+            content_hash=content_hash
         )
 
         if not file_id:
@@ -108,6 +192,11 @@ async def import_file_to_datasource(
                 original_filename=original_filename,
                 file_type=file_type.value
             )
+            # process_uploaded_file records failures in the file status instead of raising
+            processed = next((f for f in await get_files_by_datasource(datasource_id) if f['id'] == file_id), None)
+            if not processed or processed['processing_status'] != ProcessingStatus.COMPLETED.value:
+                logger.error(f"Processing failed for file: {original_filename}")
+                return False
             logger.info(f"Successfully processed file: {original_filename}")
             return True
         except Exception as processing_error:
@@ -125,9 +214,9 @@ async def import_file_to_datasource(
         return False
 
 
-async def create_and_import_databricks_datasource():
+async def create_and_import_databricks_datasource(full: bool = False, dry_run: bool = False):
     """
-    Main function to create Databricks datasource and import all files from rag_docs directory
+    Main function to create Databricks datasource and apply the rag_docs delta to it
     """
     logger.info("Starting Databricks RAG datasource creation and import process")
 
@@ -146,7 +235,7 @@ async def create_and_import_databricks_datasource():
             break
 
     # Create datasource if it doesn't exist
-    if not databricks_datasource:
+    if not databricks_datasource and not dry_run:
         logger.info("Creating new Databricks datasource...")
         databricks_datasource = await create_datasource(
             name="Databricks",
@@ -159,48 +248,81 @@ async def create_and_import_databricks_datasource():
             return False
 
         logger.info(f"Created Databricks datasource (ID: {databricks_datasource['id']})")
-    else:
+    elif databricks_datasource:
         logger.info(f"Using existing Databricks datasource (ID: {databricks_datasource['id']})")
 
-    datasource_id = databricks_datasource['id']
+    datasource_id = databricks_datasource['id'] if databricks_datasource else None
 
-    # Get all markdown files from rag_docs directory
-    md_files = list(RAG_DOCS_DIR.glob("*.md"))
-    logger.info(f"Found {len(md_files)} markdown files in {RAG_DOCS_DIR}")
+    # Hashes of all markdown docs in the rag_docs directory
+    doc_hashes = load_doc_hashes()
+    logger.info(f"Found {len(doc_hashes)} markdown files in {RAG_DOCS_DIR}")
 
-    if not md_files:
+    if not doc_hashes:
         logger.warning("No markdown files found to import")
         return False
 
-    # Import each file
+    existing_files = await get_files_by_datasource(datasource_id) if datasource_id else []
+    delta = plan_delta(doc_hashes, existing_files, full=full)
+    logger.info(
+        f"Delta: {len(delta['import'])} to import, {len(delta['remove'])} file records to remove, "
+        f"{len(delta['unchanged'])} unchanged"
+    )
+    if dry_run:
+        for name in delta['import']:
+            logger.info(f"  import: {name}")
+        for file in delta['remove']:
+            logger.info(f"  remove: {file['original_filename']} (ID: {file['id']})")
+        return True
+
+    # Import new and changed files first, so a doc is never missing from the datasource
     success_count = 0
     fail_count = 0
+    failed = set()
 
-    for file_path in sorted(md_files):
-        original_filename = file_path.name
+    for original_filename in delta['import']:
         logger.info(f"Importing file: {original_filename}")
 
         success = await import_file_to_datasource(
-            file_path=file_path,
+            file_path=RAG_DOCS_DIR / original_filename,
             datasource_id=datasource_id,
-            original_filename=original_filename
+            original_filename=original_filename,
+            content_hash=doc_hashes[original_filename]
         )
 
         if success:
             success_count += 1
         else:
             fail_count += 1
+            failed.add(original_filename)
+
+    # Then remove replaced and deleted docs (a doc whose new version failed keeps its old version)
+    removed_count = 0
+    for file in delta['remove']:
+        if file['original_filename'] in failed and file['processing_status'] == ProcessingStatus.COMPLETED.value:
+            continue
+        if await remove_file_from_datasource(file):
+            removed_count += 1
+        else:
+            fail_count += 1
 
-    logger.info(f"Import completed: {success_count} succeeded, {fail_count} failed")
+    logger.info(
+        f"Import completed: {success_count} imported, {removed_count} removed, "
+        f"{len(delta['unchanged'])} unchanged, {fail_count} failed"
+    )
     logger.info(f"Databricks datasource (ID: {datasource_id}) is ready for use in the web interface")
 
-    return True
+    return fail_count == 0
 
 
 async def main():
     """Entry point"""
+    parser = argparse.ArgumentParser(description='Apply data_warehouse/dbt/rag_docs changes to the "Databricks" RAG datasource')
+    parser.add_argument('--full', action='store_true', help='Re-import (and re-embed) every doc')
+    parser.add_argument('--dry-run', action='store_true', help='Only show the delta that would be applied')
+    args = parser.parse_args()
+
     try:
-        success = await create_and_import_databricks_datasource()
+        success = await create_and_import_databricks_datasource(full=args.full, dry_run=args.dry_run)
         if success:
             logger.info("Script completed successfully")
             sys.exit(0)
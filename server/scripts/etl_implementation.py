@@ -7,16 +7,25 @@ ELT Implementation for Wide Table Architecture
 import sqlite3
 import pandas as pd
 from datetime import datetime, timedelta
+import argparse
+import time
 import uuid
 import re
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import List, Dict, Any, Callable, Iterator, Union
 
 class ELTProcessor:
-    def __init__(self, db_path: str = "server/data/smart.db"):
+    def __init__(self, db_path: str = "server/data/smart.db", chunk_size: int = 5000,
+                 max_workers: int = 4, busy_timeout: float = 300.0):
         """初始化ELT处理器"""
         self.db_path = db_path
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.busy_timeout = busy_timeout
+        self._run_started = time.perf_counter()
         self.batch_id = self.generate_batch_id()
         self.conn = None
+        self.stage_timings: List[Dict[str, Any]] = []
         
     def generate_batch_id(self) -> str:
         """生成批次ID"""
@@ -26,6 +35,9 @@ class ELTProcessor:
         """连接数据库"""
         self.conn = sqlite3.connect(self.db_path)
         self.conn.row_factory = sqlite3.Row
+        # WAL下读写互不阻塞；NORMAL在WAL模式下仍保证一致性，只在检查点时fsync
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
         return self.conn
     
     def close_db(self):
@@ -47,11 +59,23 @@ class ELTProcessor:
             results.append(dict(zip(columns, row)))
         return results
     
-    def execute_batch_insert(self, sql: str, data: List[Dict]):
+    def fetch_chunks(self, sql: str, params: tuple = None) -> Iterator[List[Dict]]:
+        """按 chunk_size 分块读取查询结果（fetchmany），内存占用与结果集大小无关"""
+        cursor = self.conn.cursor()
+        cursor.execute(sql, params or ())
+        columns = [description[0] for description in cursor.description]
+        while True:
+            rows = cursor.fetchmany(self.chunk_size)
+            if not rows:
+                break
+            yield [dict(zip(columns, row)) for row in rows]
+
+    def execute_batch_insert(self, sql: str, data: List[Dict], commit: bool = True):
         """批量插入数据"""
         cursor = self.conn.cursor()
-        cursor.executemany(sql, [tuple(record.values()) for record in data])
-        self.conn.commit()
+        cursor.executemany(sql, (tuple(record.values()) for record in data))
+        if commit:
+            self.conn.commit()
     
     def standardize_phone(self, phone: str) -> str:
         """标准化电话号码"""
@@ -204,8 +228,35 @@ class ELTProcessor:
         
         return max(0, score)
 
+    def parse_timestamp(self, value) -> datetime:
+        """解析源表中的时间字符串（保留小数秒），无法解析时返回 None"""
+        if not isinstance(value, str):
+            return None
+        # 清理日期字符串，移除可能的额外字符
+        clean_date_str = value.split(' ')[0] + ' ' + value.split(' ')[1] if ' ' in value else value
+        try:
+            # 尝试解析 'YYYY-MM-DD HH:MM:SS' 格式
+            return datetime.strptime(clean_date_str, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            try:
+                # 尝试解析 ISO 格式
+                return datetime.fromisoformat(clean_date_str)
+            except ValueError:
+                return None
+
+    def normalize_timestamp(self, value) -> str:
+        """SQL阶段使用的时间规范化，结果与逐行引擎写入的 datetime 相同"""
+        parsed = self.parse_timestamp(value)
+        # sqlite3 的默认 datetime 适配器同样写入 isoformat(" ")
+        return parsed.isoformat(sep=' ') if parsed else None
+
+    @staticmethod
+    def py_round(value, ndigits: int):
+        """SQL阶段使用的舍入，与逐行引擎的 round(float(x), n) 相同"""
+        return round(float(value), ndigits) if value is not None else None
+
     # DIM层ELT方法
-    def extract_dim_customer(self) -> List[Dict]:
+    def extract_dim_customer(self, chunked: bool = False) -> Union[List[Dict], Iterator[List[Dict]]]:
         """全量抽取客户数据"""
         sql = """
         SELECT 
@@ -220,7 +271,7 @@ class ELTProcessor:
             updated_at
         FROM customers
         """
-        return self.execute_query(sql)
+        return self.fetch_chunks(sql) if chunked else self.execute_query(sql)
     
     def transform_dim_customer(self, raw_data: List[Dict]) -> List[Dict]:
         """转换客户维度数据"""
@@ -248,7 +299,7 @@ class ELTProcessor:
             transformed_data.append(transformed_record)
         return transformed_data
     
-    def load_dim_customer(self, transformed_data: List[Dict]):
+    def load_dim_customer(self, transformed_data: List[Dict], commit: bool = True):
         """加载客户维度数据"""
         sql = """
         INSERT OR REPLACE INTO dim_customer (
@@ -257,9 +308,9 @@ class ELTProcessor:
             days_since_update, is_active_customer, etl_batch_id, etl_timestamp
         ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """
-        self.execute_batch_insert(sql, transformed_data)
+        self.execute_batch_insert(sql, transformed_data, commit)
     
-    def extract_dim_product(self) -> List[Dict]:
+    def extract_dim_product(self, chunked: bool = False) -> Union[List[Dict], Iterator[List[Dict]]]:
         """全量抽取产品数据"""
         sql = """
         SELECT 
@@ -269,7 +320,7 @@ class ELTProcessor:
             unit_price
         FROM products
         """
-        return self.execute_query(sql)
+        return self.fetch_chunks(sql) if chunked else self.execute_query(sql)
     
     def transform_dim_product(self, raw_data: List[Dict]) -> List[Dict]:
         """转换产品维度数据"""
@@ -287,7 +338,7 @@ class ELTProcessor:
             transformed_data.append(transformed_record)
         return transformed_data
     
-    def load_dim_product(self, transformed_data: List[Dict]):
+    def load_dim_product(self, transformed_data: List[Dict], commit: bool = True):
         """加载产品维度数据"""
         sql = """
         INSERT OR REPLACE INTO dim_product (
@@ -295,10 +346,10 @@ class ELTProcessor:
             etl_batch_id, etl_timestamp
         ) VALUES (?, ?, ?, ?, ?, ?, ?)
         """
-        self.execute_batch_insert(sql, transformed_data)
+        self.execute_batch_insert(sql, transformed_data, commit)
 
     # DWD层ELT方法
-    def extract_dwd_sales_detail(self) -> List[Dict]:
+    def extract_dwd_sales_detail(self, chunked: bool = False) -> Union[List[Dict], Iterator[List[Dict]]]:
         """全量抽取销售数据"""
         sql = """
         SELECT 
@@ -311,7 +362,7 @@ class ELTProcessor:
             s.sale_date
         FROM sales s
         """
-        return self.execute_query(sql)
+        return self.fetch_chunks(sql) if chunked else self.execute_query(sql)
     
     def transform_dwd_sales_detail(self, raw_data: List[Dict]) -> List[Dict]:
         """转换销售明细数据"""
@@ -350,7 +401,7 @@ class ELTProcessor:
             transformed_data.append(transformed_record)
         return transformed_data
     
-    def load_dwd_sales_detail(self, transformed_data: List[Dict]):
+    def load_dwd_sales_detail(self, transformed_data: List[Dict], commit: bool = True):
         """加载销售明细数据"""
         sql = """
         INSERT OR REPLACE INTO dwd_sales_detail (
@@ -359,9 +410,9 @@ class ELTProcessor:
             data_quality_score, etl_batch_id, etl_timestamp
         ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """
-        self.execute_batch_insert(sql, transformed_data)
+        self.execute_batch_insert(sql, transformed_data, commit)
     
-    def extract_dwd_inventory_detail(self) -> List[Dict]:
+    def extract_dwd_inventory_detail(self, chunked: bool = False) -> Union[List[Dict], Iterator[List[Dict]]]:
         """全量抽取库存数据"""
         sql = """
         SELECT 
@@ -372,29 +423,14 @@ class ELTProcessor:
         FROM inventory i
         LEFT JOIN products p ON i.product_id = p.product_id
         """
-        return self.execute_query(sql)
+        return self.fetch_chunks(sql) if chunked else self.execute_query(sql)
     
     def transform_dwd_inventory_detail(self, raw_data: List[Dict]) -> List[Dict]:
         """转换库存明细数据"""
         transformed_data = []
         for record in raw_data:
-            # 解析日期，处理不同的日期格式
-            last_updated_str = record['last_updated']
-            if isinstance(last_updated_str, str):
-                # 清理日期字符串，移除可能的额外字符
-                clean_date_str = last_updated_str.split(' ')[0] + ' ' + last_updated_str.split(' ')[1] if ' ' in last_updated_str else last_updated_str
-                try:
-                    # 尝试解析 'YYYY-MM-DD HH:MM:SS' 格式
-                    last_updated = datetime.strptime(clean_date_str, '%Y-%m-%d %H:%M:%S')
-                except ValueError:
-                    try:
-                        # 尝试解析 ISO 格式
-                        last_updated = datetime.fromisoformat(clean_date_str)
-                    except ValueError:
-                        # 如果都失败，使用当前时间
-                        last_updated = datetime.now()
-            else:
-                last_updated = datetime.now()
+            # 解析日期，如果失败使用当前时间
+            last_updated = self.parse_timestamp(record['last_updated']) or datetime.now()
             
             days_since_update = (datetime.now() - last_updated).days
             stock_value = record['stock_level'] * float(record['unit_price']) if record['unit_price'] else 0
@@ -419,7 +455,7 @@ class ELTProcessor:
             transformed_data.append(transformed_record)
         return transformed_data
     
-    def load_dwd_inventory_detail(self, transformed_data: List[Dict]):
+    def load_dwd_inventory_detail(self, transformed_data: List[Dict], commit: bool = True):
         """加载库存明细数据"""
         sql = """
         INSERT OR REPLACE INTO dwd_inventory_detail (
@@ -428,10 +464,10 @@ class ELTProcessor:
             is_low_stock, turnover_ratio, data_quality_score, etl_batch_id, etl_timestamp
         ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """
-        self.execute_batch_insert(sql, transformed_data)
+        self.execute_batch_insert(sql, transformed_data, commit)
 
     # DWS层ELT方法
-    def extract_dws_sales_cube(self) -> List[Dict]:
+    def extract_dws_sales_cube(self, chunked: bool = False) -> Union[List[Dict], Iterator[List[Dict]]]:
         """从DWD层抽取销售数据用于立方体聚合"""
         sql = """
         SELECT 
@@ -448,7 +484,7 @@ class ELTProcessor:
         LEFT JOIN dim_product p ON s.product_id = p.product_id
         GROUP BY s.sale_date, s.product_id, p.category, p.price_range, s.sale_value_range
         """
-        return self.execute_query(sql)
+        return self.fetch_chunks(sql) if chunked else self.execute_query(sql)
     
     def transform_dws_sales_cube(self, raw_data: List[Dict]) -> List[Dict]:
         """转换销售立方体数据"""
@@ -461,7 +497,7 @@ class ELTProcessor:
                 'price_range': record['price_range'],
                 'sale_value_range': record['sale_value_range'],
                 'transaction_count': record['transaction_count'],
-                'total_amount': round(float(record['total_amount']), 2),
+                'total_revenue': round(float(record['total_amount']), 2),
                 'total_quantity_sold': record['total_quantity'],
                 'avg_transaction_value': round(float(record['avg_transaction_value']), 2),
                 'unique_products': 1,  # 在立方体中每个记录代表一个产品
@@ -471,18 +507,18 @@ class ELTProcessor:
             transformed_data.append(transformed_record)
         return transformed_data
     
-    def load_dws_sales_cube(self, transformed_data: List[Dict]):
+    def load_dws_sales_cube(self, transformed_data: List[Dict], commit: bool = True):
         """加载销售立方体数据"""
         sql = """
         INSERT OR REPLACE INTO dws_sales_cube (
             sale_date, product_id, category, price_range, sale_value_range,
-            transaction_count, total_quantity_sold, total_amount, avg_transaction_value,
+            transaction_count, total_revenue, total_quantity_sold, avg_transaction_value,
             unique_products, etl_batch_id, etl_timestamp
         ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """
-        self.execute_batch_insert(sql, transformed_data)
+        self.execute_batch_insert(sql, transformed_data, commit)
     
-    def extract_dws_inventory_cube(self) -> List[Dict]:
+    def extract_dws_inventory_cube(self, chunked: bool = False) -> Union[List[Dict], Iterator[List[Dict]]]:
         """从DWD层抽取库存数据用于立方体聚合"""
         sql = """
         SELECT 
@@ -504,7 +540,7 @@ class ELTProcessor:
         GROUP BY DATE(i.last_updated), i.product_id, p.category, p.price_range,
                  i.stock_status, i.is_low_stock, i.is_stale_data
         """
-        return self.execute_query(sql)
+        return self.fetch_chunks(sql) if chunked else self.execute_query(sql)
     
     def transform_dws_inventory_cube(self, raw_data: List[Dict]) -> List[Dict]:
         """转换库存立方体数据"""
@@ -530,7 +566,7 @@ class ELTProcessor:
             transformed_data.append(transformed_record)
         return transformed_data
     
-    def load_dws_inventory_cube(self, transformed_data: List[Dict]):
+    def load_dws_inventory_cube(self, transformed_data: List[Dict], commit: bool = True):
         """加载库存立方体数据"""
         sql = """
         INSERT OR REPLACE INTO dws_inventory_cube (
@@ -540,84 +576,616 @@ class ELTProcessor:
             etl_batch_id, etl_timestamp
         ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """
-        self.execute_batch_insert(sql, transformed_data)
+        self.execute_batch_insert(sql, transformed_data, commit)
+
+    # 集合式ELT：每个阶段编译为一条 INSERT … SELECT，在数据库内完成转换与聚合，
+    # 数据不经过Python对象，内存占用与表大小无关。只有难以用SQL表达的逻辑注册为UDF。
+    # 时间解析与舍入同样使用UDF（normalize_timestamp / py_round），保证与逐行引擎输出一致：
+    # SQLite 的 DATETIME() 会丢弃小数秒，ROUND() 对 x.xx5 的舍入方向也与 Python round() 不同。
+    #
+    # DIM/DWD阶段按源表的高水位列(watermark)增量抽取：{where} 在全量模式下为空，
+    # 增量模式下只选取 watermark_from < 列值 <= watermark_to 的新增/变更行。
+    # DWS立方体由DWD派生：全量模式清空重算，增量模式只删除并重算受影响的分组。
+    # depends_on 声明阶段依赖，互不依赖的分支（销售/库存）由调度器并行执行。
+    # {target} 为临时暂存表：计算在各自连接上并行完成，最后在短写事务中合并到目标表。
+    SQL_STAGES = [
+        {"stage": "dim_customer", "layer": "DIM", "table": "dim_customer", "depends_on": [],
+         "source": "customers", "watermark": "updated_at", "sql": """
+        INSERT INTO {target} (
+            customer_id, customer_name, contact_person, email, phone,
+            address, customer_type, region, created_at, updated_at,
+            days_since_update, is_active_customer, etl_batch_id, etl_timestamp
+        )
+        SELECT
+            customer_id,
+            COALESCE(TRIM(customer_name), ''),
+            TRIM(contact_person),
+            LOWER(TRIM(email)),
+            standardize_phone(phone),
+            TRIM(address),
+            CASE WHEN customer_type IS NULL OR customer_type = '' THEN 'REGULAR'
+                 ELSE UPPER(TRIM(customer_type)) END,
+            extract_region(address),
+            COALESCE(normalize_timestamp(created_at), :now),
+            COALESCE(normalize_timestamp(updated_at), :now),
+            CAST(JULIANDAY(:now) - JULIANDAY(COALESCE(normalize_timestamp(updated_at), :now)) AS INTEGER),
+            1,  -- 与 determine_active_status 一致：演示项目中所有客户都是活跃的
+            :batch_id,
+            :etl_timestamp
+        FROM customers
+        {where}
+        """},
+        {"stage": "dim_product", "layer": "DIM", "table": "dim_product", "depends_on": [],
+         "source": "products", "watermark": "updated_at", "sql": """
+        INSERT INTO {target} (
+            product_id, product_name, category, unit_price, price_range,
+            etl_batch_id, etl_timestamp
+        )
+        SELECT
+            product_id,
+            COALESCE(TRIM(product_name), ''),
+            CASE WHEN category IS NULL OR category = '' THEN 'UNKNOWN'
+                 ELSE UPPER(TRIM(category)) END,
+            py_round(unit_price, 2),
+            CASE WHEN unit_price < 50 THEN 'Low'
+                 WHEN unit_price < 200 THEN 'Medium'
+                 WHEN unit_price < 500 THEN 'High'
+                 ELSE 'Premium' END,
+            :batch_id,
+            :etl_timestamp
+        FROM products
+        {where}
+        """},
+        {"stage": "dwd_sales_detail", "layer": "DWD", "table": "dwd_sales_detail", "depends_on": [],
+         "source": "sales", "watermark": "s.created_at",
+         # 增量模式下在加载前后各执行一次：记录变更行的旧分组与新分组
+         "incremental_capture": """
+        INSERT OR IGNORE INTO etl_dirty_sales_groups (batch_id, sale_date, product_id)
+        SELECT DISTINCT :batch_id, d.sale_date, d.product_id
+        FROM sales s
+        JOIN dwd_sales_detail d ON d.sale_id = s.sale_id
+        {where}
+        """,
+         "sql": """
+        INSERT INTO {target} (
+            sale_id, product_id, customer_id, quantity_sold, price_per_unit,
+            total_amount, calculated_total, sale_date, sale_value_range,
+            data_quality_score, etl_batch_id, etl_timestamp
+        )
+        SELECT
+            s.sale_id,
+            s.product_id,
+            NULL,  -- 与逐行实现一致：销售明细不关联客户ID
+            s.quantity_sold,
+            py_round(s.price_per_unit, 2),
+            py_round(s.total_amount, 2),
+            py_round(s.quantity_sold * s.price_per_unit, 2),
+            COALESCE(DATE(s.sale_date), DATE(:now)),
+            CASE WHEN s.total_amount < 100 THEN 'Low'
+                 WHEN s.total_amount < 500 THEN 'Medium'
+                 WHEN s.total_amount < 1000 THEN 'High'
+                 ELSE 'Premium' END,
+            -- calculate_sales_quality_score 的SQL版本
+            MAX(0, 100
+                - CASE WHEN s.sale_id IS NULL OR s.sale_id = '' THEN 20 ELSE 0 END
+                - CASE WHEN s.product_id IS NULL OR s.product_id = '' THEN 20 ELSE 0 END
+                - CASE WHEN s.total_amount IS NULL OR s.total_amount = 0 THEN 15 ELSE 0 END
+                - CASE WHEN ABS(COALESCE(s.quantity_sold, 0) * COALESCE(s.price_per_unit, 0)
+                                - COALESCE(s.total_amount, 0)) > 0.01 THEN 10 ELSE 0 END
+                - CASE WHEN COALESCE(s.quantity_sold, 0) <= 0 THEN 10 ELSE 0 END
+                - CASE WHEN COALESCE(s.price_per_unit, 0) <= 0 THEN 10 ELSE 0 END
+                - CASE WHEN s.sale_date IS NULL OR s.sale_date = '' THEN 0
+                       WHEN DATE(s.sale_date) IS NULL OR DATE(s.sale_date) > DATE(:now) THEN 15
+                       ELSE 0 END),
+            :batch_id,
+            :etl_timestamp
+        FROM sales s
+        {where}
+        """},
+        {"stage": "dwd_inventory_detail", "layer": "DWD", "table": "dwd_inventory_detail", "depends_on": ["dim_product"],
+         "source": "inventory", "watermark": "i.last_updated",
+         # 产品单价变化会影响库存价值，因此本批次变更的产品也重新派生
+         "incremental_extra": "i.product_id IN (SELECT product_id FROM dim_product WHERE etl_batch_id = :batch_id)",
+         "sql": """
+        INSERT INTO {target} (
+            product_id, stock_level, last_updated, stock_status,
+            days_since_update, is_stale_data, stock_value, reorder_point,
+            is_low_stock, turnover_ratio, data_quality_score, etl_batch_id, etl_timestamp
+        )
+        SELECT
+            product_id,
+            stock_level,
+            last_updated,
+            CASE WHEN stock_level > 10 THEN 'In Stock'
+                 WHEN stock_level > 0 THEN 'Low Stock'
+                 ELSE 'Out of Stock' END,
+            days_since_update,
+            days_since_update > 7,
+            py_round(stock_level * COALESCE(unit_price, 0), 2),
+            reorder_point,
+            stock_level < reorder_point,
+            py_round(turnover_ratio(product_id), 4),
+            -- calculate_inventory_quality_score 的SQL版本（无法解析的时间按当前时间处理，不扣分）
+            MAX(0, 100
+                - CASE WHEN product_id IS NULL OR product_id = '' THEN 25 ELSE 0 END
+                - CASE WHEN stock_level IS NULL THEN 25 ELSE 0 END
+                - CASE WHEN raw_last_updated IS NULL OR raw_last_updated = '' THEN 25 ELSE 0 END
+                - CASE WHEN COALESCE(stock_level, 0) < 0 THEN 15 ELSE 0 END
+                - CASE WHEN days_since_update > 30 THEN 10 ELSE 0 END),
+            :batch_id,
+            :etl_timestamp
+        FROM (
+            SELECT
+                i.product_id,
+                i.stock_level,
+                i.last_updated AS raw_last_updated,
+                COALESCE(normalize_timestamp(i.last_updated), :now) AS last_updated,
+                CAST(JULIANDAY(:now) - JULIANDAY(COALESCE(normalize_timestamp(i.last_updated), :now)) AS INTEGER) AS days_since_update,
+                p.unit_price,
+                reorder_point(i.product_id) AS reorder_point
+            FROM inventory i
+            LEFT JOIN products p ON i.product_id = p.product_id
+            {where}
+        )
+        """},
+        {"stage": "dws_sales_cube", "layer": "DWS", "table": "dws_sales_cube", "depends_on": ["dwd_sales_detail", "dim_product"],
+         # 本批次变更的产品（类别/价格区间）影响其全部分组
+         "incremental_prepare": """
+        INSERT OR IGNORE INTO etl_dirty_sales_groups (batch_id, sale_date, product_id)
+        SELECT DISTINCT :batch_id, sale_date, product_id
+        FROM dwd_sales_detail
+        WHERE product_id IN (SELECT product_id FROM dim_product WHERE etl_batch_id = :batch_id)
+        """,
+         "incremental_scope": "(sale_date, product_id) IN "
+                              "(SELECT sale_date, product_id FROM etl_dirty_sales_groups WHERE batch_id = :batch_id)",
+         "incremental_where": "WHERE (s.sale_date, s.product_id) IN "
+                              "(SELECT sale_date, product_id FROM etl_dirty_sales_groups WHERE batch_id = :batch_id)",
+         "incremental_cleanup": "DELETE FROM etl_dirty_sales_groups WHERE batch_id = :batch_id",
+         "sql": """
+        INSERT INTO {target} (
+            sale_date, product_id, category, price_range, sale_value_range,
+            transaction_count, total_quantity_sold, total_revenue, avg_transaction_value,
+            unique_products, etl_batch_id, etl_timestamp
+        )
+        SELECT
+            s.sale_date,
+            s.product_id,
+            p.category,
+            p.price_range,
+            s.sale_value_range,
+            COUNT(*),
+            SUM(s.quantity_sold),
+            py_round(SUM(s.total_amount), 2),
+            py_round(AVG(s.total_amount), 2),
+            1,  -- 在立方体中每个记录代表一个产品
+            :batch_id,
+            :etl_timestamp
+        FROM dwd_sales_detail s
+        LEFT JOIN dim_product p ON s.product_id = p.product_id
+        {where}
+        GROUP BY s.sale_date, s.product_id, p.category, p.price_range, s.sale_value_range
+        """},
+        # 每个产品在DWD中只有一行，因此按产品删除并重算即可覆盖其旧分组
+        {"stage": "dws_inventory_cube", "layer": "DWS", "table": "dws_inventory_cube", "depends_on": ["dwd_inventory_detail", "dim_product"],
+         "incremental_scope": "product_id IN (SELECT product_id FROM dwd_inventory_detail WHERE etl_batch_id = :batch_id "
+                              "UNION SELECT product_id FROM dim_product WHERE etl_batch_id = :batch_id)",
+         "incremental_where": "WHERE i.product_id IN (SELECT product_id FROM dwd_inventory_detail WHERE etl_batch_id = :batch_id "
+                              "UNION SELECT product_id FROM dim_product WHERE etl_batch_id = :batch_id)",
+         "sql": """
+        INSERT INTO {target} (
+            last_updated_date, product_id, category, price_range, stock_status,
+            is_low_stock, is_stale_data, product_count, total_stock_level,
+            total_stock_value, avg_stock_level, avg_stock_value, avg_turnover_ratio,
+            etl_batch_id, etl_timestamp
+        )
+        SELECT
+            DATE(i.last_updated),
+            i.product_id,
+            p.category,
+            p.price_range,
+            i.stock_status,
+            i.is_low_stock,
+            i.is_stale_data,
+            COUNT(*),
+            SUM(i.stock_level),
+            py_round(SUM(i.stock_value), 2),
+            py_round(AVG(i.stock_level), 2),
+            py_round(AVG(i.stock_value), 2),
+            py_round(AVG(i.turnover_ratio), 4),
+            :batch_id,
+            :etl_timestamp
+        FROM dwd_inventory_detail i
+        LEFT JOIN dim_product p ON i.product_id = p.product_id
+        {where}
+        GROUP BY DATE(i.last_updated), i.product_id, p.category, p.price_range,
+                 i.stock_status, i.is_low_stock, i.is_stale_data
+        """},
+    ]
+
+    # 增量加载的元数据：源表高水位、批次血缘、待重算的销售立方体分组
+    METADATA_DDL = """
+    CREATE TABLE IF NOT EXISTS etl_watermarks (
+        source_table TEXT PRIMARY KEY,
+        watermark_column TEXT NOT NULL,
+        high_water_mark TEXT,
+        etl_batch_id TEXT,
+        updated_at TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS etl_batch_log (
+        etl_batch_id TEXT NOT NULL,
+        stage TEXT NOT NULL,
+        mode TEXT NOT NULL,
+        source_table TEXT,
+        watermark_from TEXT,
+        watermark_to TEXT,
+        rows_deleted INTEGER,
+        rows_written INTEGER,
+        started_at TIMESTAMP,
+        seconds REAL,
+        PRIMARY KEY (etl_batch_id, stage)
+    );
+    CREATE TABLE IF NOT EXISTS etl_dirty_sales_groups (
+        batch_id TEXT NOT NULL,
+        sale_date DATE NOT NULL,
+        product_id TEXT NOT NULL,
+        PRIMARY KEY (batch_id, sale_date, product_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_sales_created_at ON sales (created_at);
+    CREATE INDEX IF NOT EXISTS idx_inventory_last_updated ON inventory (last_updated);
+    """
+
+    def register_udfs(self, conn: sqlite3.Connection = None):
+        """注册SQL阶段使用的Python UDF"""
+        conn = conn or self.conn
+        conn.create_function("standardize_phone", 1, self.standardize_phone, deterministic=True)
+        conn.create_function("extract_region", 1, self.extract_region_from_address, deterministic=True)
+        conn.create_function("reorder_point", 1, self.calculate_reorder_point, deterministic=True)
+        conn.create_function("turnover_ratio", 1, self.calculate_turnover_ratio, deterministic=True)
+        conn.create_function("normalize_timestamp", 1, self.normalize_timestamp, deterministic=True)
+        conn.create_function("py_round", 2, self.py_round, deterministic=True)
+
+    def open_stage_connection(self) -> sqlite3.Connection:
+        """为一个阶段打开独立连接（自动提交模式，事务由阶段显式控制）"""
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self.register_udfs(conn)
+        return conn
+
+    def ensure_metadata_tables(self, conn: sqlite3.Connection = None):
+        """创建增量加载所需的元数据表与源表索引"""
+        (conn or self.conn).executescript(self.METADATA_DDL)
+
+    def get_watermark(self, source_table: str, conn: sqlite3.Connection = None):
+        """读取源表的高水位"""
+        row = (conn or self.conn).execute(
+            "SELECT high_water_mark FROM etl_watermarks WHERE source_table = ?", (source_table,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_watermarks(self) -> List[Dict]:
+        """读取全部源表的高水位"""
+        return self.execute_query("SELECT * FROM etl_watermarks ORDER BY source_table")
+
+    def get_batch_lineage(self, batch_id: str = None) -> List[Dict]:
+        """读取批次血缘（默认当前批次）"""
+        return self.execute_query(
+            "SELECT * FROM etl_batch_log WHERE etl_batch_id = ? ORDER BY started_at",
+            (batch_id or self.batch_id,)
+        )
+
+    def run_sql_stage(self, stage: Dict[str, Any], mode: str = "full", conn: sqlite3.Connection = None) -> int:
+        """
+        执行一个集合式阶段，返回写入的行数
+
+        1. 读取源表高水位并确定本批次上界；
+        2. 在连接私有的临时表中计算阶段结果（只持有读快照，可与其他阶段并行）；
+        3. 在一个 BEGIN IMMEDIATE 写事务中删除待重算数据、合并暂存结果、推进高水位并记录批次血缘。
+        """
+        conn = conn or self.open_stage_connection()
+        now = datetime.now()
+        params = {
+            "batch_id": self.batch_id,
+            "etl_timestamp": now.isoformat(sep=' '),
+            "now": now.strftime('%Y-%m-%d %H:%M:%S'),
+            "watermark_from": None,
+            "watermark_to": None,
+        }
+        incremental = mode == "incremental"
+        table = stage["table"]
+        staging = f"temp.stage_{stage['stage']}"
+        source = stage.get("source")
+        where = ""
+        rows_deleted = 0
+
+        if source:
+            column = stage["watermark"]
+            bare_column = column.split(".")[-1]
+            # 先确定本批次的上界，再按 (from, to] 区间抽取，避免与并发写入的行交错
+            params["watermark_to"] = conn.execute(f"SELECT MAX({bare_column}) FROM {source}").fetchone()[0]
+            if incremental:
+                params["watermark_from"] = self.get_watermark(source, conn) or ""
+                where = f"WHERE ({column} > :watermark_from AND {column} <= :watermark_to)"
+                if stage.get("incremental_extra"):
+                    where = f"{where} OR {stage['incremental_extra']}"
+        elif incremental:
+            where = stage["incremental_where"]
+
+        if incremental and stage.get("incremental_prepare"):
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(stage["incremental_prepare"], params)
+
+        conn.execute(f"DROP TABLE IF EXISTS {staging}")
+        conn.execute(f"CREATE TEMP TABLE stage_{stage['stage']} AS SELECT * FROM main.{table} WHERE 0")
+        try:
+            rows = conn.execute(stage["sql"].format(target=staging, where=where), params).rowcount
+            columns = ", ".join(row[1] for row in conn.execute(f"PRAGMA main.table_info({table})"))
+
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                if incremental and stage.get("incremental_capture"):
+                    conn.execute(stage["incremental_capture"].format(where=where), params)
+
+                if incremental and stage.get("incremental_scope"):
+                    rows_deleted = conn.execute(f"DELETE FROM {table} WHERE {stage['incremental_scope']}", params).rowcount
+                elif not source:
+                    # 全量模式：立方体完全由DWD层派生，清空后整体重算
+                    rows_deleted = conn.execute(f"DELETE FROM {table}").rowcount
+
+                conn.execute(f"INSERT OR REPLACE INTO main.{table} ({columns}) SELECT {columns} FROM {staging}")
+
+                if incremental and stage.get("incremental_capture"):
+                    conn.execute(stage["incremental_capture"].format(where=where), params)
+                if incremental and stage.get("incremental_cleanup"):
+                    conn.execute(stage["incremental_cleanup"], params)
+                if not incremental and stage["stage"] == "dws_sales_cube":
+                    conn.execute("DELETE FROM etl_dirty_sales_groups")
+
+                if source and params["watermark_to"] is not None:
+                    conn.execute("""
+                        INSERT OR REPLACE INTO etl_watermarks (
+                            source_table, watermark_column, high_water_mark, etl_batch_id, updated_at
+                        ) VALUES (?, ?, ?, ?, ?)
+                    """, (source, stage["watermark"].split(".")[-1], params["watermark_to"], self.batch_id, params["now"]))
+
+                conn.execute("""
+                    INSERT OR REPLACE INTO etl_batch_log (
+                        etl_batch_id, stage, mode, source_table, watermark_from, watermark_to,
+                        rows_deleted, rows_written, started_at, seconds
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (self.batch_id, stage["stage"], mode, source, params["watermark_from"], params["watermark_to"],
+                      rows_deleted, rows, params["etl_timestamp"], (datetime.now() - now).total_seconds()))
+        finally:
+            conn.execute(f"DROP TABLE IF EXISTS {staging}")
+
+        if rows_deleted:
+            print(f"    [{stage['stage']}] 删除了 {rows_deleted} 条待重算记录")
+        return rows
+
+    def run_python_stage(self, stage: str, extract: Callable, transform: Callable, load: Callable) -> int:
+        """
+        流式执行一个阶段，返回写入的行数
+
+        抽取按 chunk_size 分块（fetchmany），每块转换后立即加载，整个阶段在一个事务中提交；
+        任一时刻内存中只有一个数据块。
+        """
+        extracted = 0
+        rows = 0
+        with self.conn:
+            for chunk in extract(chunked=True):
+                extracted += len(chunk)
+                transformed_data = transform(chunk)
+                load(transformed_data, commit=False)
+                rows += len(transformed_data)
+        print(f"    抽取了 {extracted} 条记录")
+        return rows
+
+    def _timed_stage(self, stage: str, layer: str, run: Callable[[], int]):
+        """执行阶段并记录耗时与行数（可在工作线程中调用）"""
+        print(f"  开始 {stage} ({layer})...")
+        start = time.perf_counter()
+        rows = run()
+        end = time.perf_counter()
+        self.stage_timings.append({
+            "stage": stage, "layer": layer, "rows": rows, "seconds": end - start,
+            "started": start - self._run_started, "finished": end - self._run_started,
+        })
+        print(f"  完成 {stage}: 加载了 {rows} 条记录，耗时 {end - start:.3f}s")
+
+    def print_stage_timings(self):
+        """打印各阶段耗时汇总，以及总耗时与关键路径的对比"""
+        print("各阶段耗时:")
+        timings = sorted(self.stage_timings, key=lambda timing: timing["started"])
+        for timing in timings:
+            rate = timing["rows"] / timing["seconds"] if timing["seconds"] > 0 else 0
+            print(f"  {timing['layer']:<4} {timing['stage']:<22} {timing['rows']:>10,} 行 "
+                  f"{timing['seconds']:>9.3f}s  [{timing['started']:.3f}s → {timing['finished']:.3f}s]  ({rate:,.0f} 行/秒)")
+        if not timings:
+            return
+        wall = max(timing["finished"] for timing in timings)
+        total = sum(timing["seconds"] for timing in timings)
+        path, path_seconds = self.critical_path()
+        print(f"  总耗时 {wall:.3f}s（各阶段累计 {total:.3f}s）")
+        if path:
+            print(f"  关键路径 {' → '.join(path)}: {path_seconds:.3f}s")
+
+    def critical_path(self):
+        """按本次各阶段耗时计算依赖图上的最长路径"""
+        seconds = {timing["stage"]: timing["seconds"] for timing in self.stage_timings}
+        depends_on = {stage["stage"]: stage["depends_on"] for stage in self.SQL_STAGES}
+        best: Dict[str, Any] = {}
+
+        def longest(name):
+            if name not in best:
+                upstream = [longest(dep) for dep in depends_on.get(name, []) if dep in seconds]
+                path, total = max(upstream, key=lambda item: item[1], default=([], 0.0))
+                best[name] = (path + [name], total + seconds[name])
+            return best[name]
+
+        return max((longest(name) for name in seconds), key=lambda item: item[1], default=([], 0.0))
+
+    def select_stages(self, stages: List[str] = None, include_downstream: bool = True) -> List[str]:
+        """
+        选择要执行的阶段（按声明顺序）
+
+        stages 为空时选择全部阶段；include_downstream 时加入所选阶段的全部下游阶段，
+        用于单独重跑某个阶段并刷新依赖它的结果。
+        """
+        names = [stage["stage"] for stage in self.SQL_STAGES]
+        if not stages:
+            return names
+        unknown = set(stages) - set(names)
+        if unknown:
+            raise ValueError(f"未知的ELT阶段: {', '.join(sorted(unknown))}")
+        selected = set(stages)
+        if include_downstream:
+            changed = True
+            while changed:
+                changed = False
+                for stage in self.SQL_STAGES:
+                    if stage["stage"] not in selected and selected & set(stage["depends_on"]):
+                        selected.add(stage["stage"])
+                        changed = True
+        return [name for name in names if name in selected]
+
+    def run_full_elt_process(self, engine: str = "sql", stages: List[str] = None, include_downstream: bool = True):
+        """
+        运行完整的ELT流程
+
+        engine: "sql" 每个阶段在数据库内以 INSERT … SELECT 执行，按依赖关系并行调度；
+                "python" 原有的逐行抽取-转换-加载实现，按顺序执行
+        stages: 只运行指定阶段（默认全部），include_downstream 时连同其下游阶段一起重跑
+        """
+        if engine not in ("sql", "python"):
+            raise ValueError(f"未知的ELT引擎: {engine}")
+        print(f"开始ELT流程，批次ID: {self.batch_id}，引擎: {engine}")
+        self.stage_timings = []
+        self._run_started = time.perf_counter()
 
-    def run_full_elt_process(self):
-        """运行完整的ELT流程"""
-        print(f"开始ELT流程，批次ID: {self.batch_id}")
-        
         try:
             self.connect_db()
-            
-            # 1. DIM层处理
-            print("开始DIM层处理...")
-            
-            # 客户维度
-            print("  处理客户维度...")
-            customer_raw = self.extract_dim_customer()
-            print(f"    抽取了 {len(customer_raw)} 条客户记录")
-            customer_transformed = self.transform_dim_customer(customer_raw)
-            self.load_dim_customer(customer_transformed)
-            print(f"    加载了 {len(customer_transformed)} 条客户维度记录")
-            
-            # 产品维度
-            print("  处理产品维度...")
-            product_raw = self.extract_dim_product()
-            print(f"    抽取了 {len(product_raw)} 条产品记录")
-            product_transformed = self.transform_dim_product(product_raw)
-            self.load_dim_product(product_transformed)
-            print(f"    加载了 {len(product_transformed)} 条产品维度记录")
-            
-            # 2. DWD层处理
-            print("开始DWD层处理...")
-            
-            # 销售明细
-            print("  处理销售明细...")
-            sales_raw = self.extract_dwd_sales_detail()
-            print(f"    抽取了 {len(sales_raw)} 条销售记录")
-            sales_transformed = self.transform_dwd_sales_detail(sales_raw)
-            self.load_dwd_sales_detail(sales_transformed)
-            print(f"    加载了 {len(sales_transformed)} 条销售明细记录")
-            
-            # 库存明细
-            print("  处理库存明细...")
-            inventory_raw = self.extract_dwd_inventory_detail()
-            print(f"    抽取了 {len(inventory_raw)} 条库存记录")
-            inventory_transformed = self.transform_dwd_inventory_detail(inventory_raw)
-            self.load_dwd_inventory_detail(inventory_transformed)
-            print(f"    加载了 {len(inventory_transformed)} 条库存明细记录")
-            
-            # 3. DWS层处理
-            print("开始DWS层处理...")
-            
-            # 销售立方体
-            print("  处理销售立方体...")
-            sales_cube_raw = self.extract_dws_sales_cube()
-            print(f"    抽取了 {len(sales_cube_raw)} 条销售立方体记录")
-            sales_cube_transformed = self.transform_dws_sales_cube(sales_cube_raw)
-            self.load_dws_sales_cube(sales_cube_transformed)
-            print(f"    加载了 {len(sales_cube_transformed)} 条销售立方体记录")
-            
-            # 库存立方体
-            print("  处理库存立方体...")
-            inventory_cube_raw = self.extract_dws_inventory_cube()
-            print(f"    抽取了 {len(inventory_cube_raw)} 条库存立方体记录")
-            inventory_cube_transformed = self.transform_dws_inventory_cube(inventory_cube_raw)
-            self.load_dws_inventory_cube(inventory_cube_transformed)
-            print(f"    加载了 {len(inventory_cube_transformed)} 条库存立方体记录")
-            
+
+            if engine == "sql":
+                self.run_sql_stages("full", stages, include_downstream)
+            else:
+                selected = self.select_stages(stages, include_downstream)
+                python_stages = [
+                    ("dim_customer", "DIM", self.extract_dim_customer, self.transform_dim_customer, self.load_dim_customer),
+                    ("dim_product", "DIM", self.extract_dim_product, self.transform_dim_product, self.load_dim_product),
+                    ("dwd_sales_detail", "DWD", self.extract_dwd_sales_detail, self.transform_dwd_sales_detail, self.load_dwd_sales_detail),
+                    ("dwd_inventory_detail", "DWD", self.extract_dwd_inventory_detail, self.transform_dwd_inventory_detail, self.load_dwd_inventory_detail),
+                    ("dws_sales_cube", "DWS", self.extract_dws_sales_cube, self.transform_dws_sales_cube, self.load_dws_sales_cube),
+                    ("dws_inventory_cube", "DWS", self.extract_dws_inventory_cube, self.transform_dws_inventory_cube, self.load_dws_inventory_cube),
+                ]
+                for stage, layer, extract, transform, load in python_stages:
+                    if stage not in selected:
+                        continue
+                    self._timed_stage(stage, layer, lambda: self.run_python_stage(stage, extract, transform, load))
+
+            self.print_stage_timings()
             print("ELT流程完成！")
-            
+
         except Exception as e:
             print(f"ELT流程失败: {str(e)}")
             raise
         finally:
             self.close_db()
 
+    def run_incremental_elt_process(self, stages: List[str] = None, include_downstream: bool = True):
+        """
+        运行增量ELT流程
+
+        DIM/DWD层只处理源表高水位之后新增或变更的行，DWS立方体只重算受影响的分组。
+        首次运行（尚无高水位）等同于全量加载。注意 days_since_update / is_stale_data
+        等随时间变化的列只在行被重新处理时刷新，需要时可定期运行全量流程。
+        """
+        print(f"开始增量ELT流程，批次ID: {self.batch_id}")
+        self.stage_timings = []
+        self._run_started = time.perf_counter()
+
+        try:
+            self.connect_db()
+            self.run_sql_stages("incremental", stages, include_downstream)
+            self.print_stage_timings()
+            print("增量ELT流程完成！")
+
+        except Exception as e:
+            print(f"增量ELT流程失败: {str(e)}")
+            raise
+        finally:
+            self.close_db()
+
+    def run_sql_stages(self, mode: str, stages: List[str] = None, include_downstream: bool = True):
+        """
+        按依赖关系调度集合式阶段
+
+        依赖均已完成的阶段立即提交到线程池，每个阶段使用独立连接；互不依赖的分支
+        （如销售与库存）并行计算，总耗时趋近关键路径。任一阶段失败后不再启动新阶段，
+        已启动的阶段执行完毕后抛出异常。
+        """
+        selected = self.select_stages(stages, include_downstream)
+        by_name = {stage["stage"]: stage for stage in self.SQL_STAGES}
+        self.ensure_metadata_tables()
+        print(f"执行阶段: {', '.join(selected)}（并行度 {self.max_workers}）")
+
+        def run_stage(name):
+            conn = self.open_stage_connection()
+            try:
+                stage = by_name[name]
+                self._timed_stage(name, stage["layer"], lambda: self.run_sql_stage(stage, mode, conn))
+            finally:
+                conn.close()
+
+        # 只考虑本次选中的上游；未选中的上游视为已完成
+        pending = {name: set(by_name[name]["depends_on"]) & set(selected) for name in selected}
+        running = {}
+        failure = None
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while running or (pending and failure is None):
+                if failure is None:
+                    for name in [name for name, deps in pending.items() if not deps]:
+                        del pending[name]
+                        running[pool.submit(run_stage, name)] = name
+                if not running:
+                    raise ValueError(f"ELT阶段存在循环依赖: {', '.join(pending)}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    if future.exception() is not None:
+                        failure = failure or future.exception()
+                        print(f"  阶段 {name} 失败: {future.exception()}")
+                        continue
+                    for deps in pending.values():
+                        deps.discard(name)
+        if failure is not None:
+            if pending:
+                print(f"  未执行的阶段: {', '.join(pending)}")
+            raise failure
+
 def main():
     """主函数"""
-    processor = ELTProcessor()
-    processor.run_full_elt_process()
+    parser = argparse.ArgumentParser(description="宽表架构ELT处理")
+    parser.add_argument("--db-path", default="server/data/smart.db", help="SQLite数据库路径")
+    parser.add_argument("--engine", choices=["sql", "python"], default="sql",
+                        help="sql: 库内集合式执行（默认）；python: 逐行转换")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量模式：只处理高水位之后的新增/变更行（仅 sql 引擎）")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="python 引擎每批读取/写入的行数")
+    parser.add_argument("--workers", type=int, default=4, help="sql 引擎并行执行的最大阶段数")
+    parser.add_argument("--stage", action="append", dest="stages",
+                        help="只重跑指定阶段及其下游阶段（可重复指定）")
+    parser.add_argument("--no-downstream", action="store_true", help="与 --stage 一起使用时不重跑下游阶段")
+    args = parser.parse_args()
+
+    processor = ELTProcessor(args.db_path, chunk_size=args.chunk_size, max_workers=args.workers)
+    include_downstream = not args.no_downstream
+    if args.incremental:
+        if args.engine != "sql":
+            parser.error("--incremental 仅支持 sql 引擎")
+        processor.run_incremental_elt_process(args.stages, include_downstream)
+    else:
+        processor.run_full_elt_process(args.engine, args.stages, include_downstream)
 
 if __name__ == "__main__":
     main()
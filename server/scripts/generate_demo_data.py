@@ -5,6 +5,7 @@ Generates realistic business data for 2022-2024 (3 years)
 Creates customers, products, orders, sales, and inventory data with proper relationships
 """
 
+import argparse
 import sqlite3
 import random
 import uuid
@@ -12,6 +13,8 @@ from datetime import datetime, timedelta
 from pathlib import Path
 import logging
 
+import numpy as np
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -24,6 +27,7 @@ NUM_CUSTOMERS = 200          # was 80
 NUM_PRODUCTS = 80            # was 35
 ORDERS_PER_YEAR = 2000       # was 800
 SALES_PER_YEAR = 8000        # was 3000
+SALES_BATCH_SIZE = 100000    # sales generated and inserted per batch
 
 # Business data templates
 CUSTOMER_TYPES = ['VIP', 'regular', 'wholesale']
@@ -255,72 +259,95 @@ def generate_orders(cursor, customers, years=[2022, 2023, 2024]):
     logger.info(f"Generated {len(orders)} orders")
     return orders
 
-def generate_sales(cursor, customers, products, orders, years=[2022, 2023, 2024]):
-    """Generate sales data for specified years"""
+def generate_sales(cursor, customers, products, orders, years=[2022, 2023, 2024],
+                   sales_per_year=SALES_PER_YEAR, rng=None, batch_size=SALES_BATCH_SIZE):
+    """
+    Generate sales data for specified years
+
+    Columns are drawn in batches from a numpy Generator; each sale picks one of its customer's
+    orders through a customer -> orders index instead of scanning all orders. Returns the number of sales.
+    """
     logger.info(f"Generating sales for years {years}...")
-    
-    sales = []
-    sales_per_year = SALES_PER_YEAR // len(years)
-    
+    rng = rng if rng is not None else np.random.default_rng()
+
+    sales_per_year = sales_per_year // len(years)
+
+    # Customer -> orders index: order positions grouped by customer, with each customer's slice
+    customer_index = {c['customer_id']: i for i, c in enumerate(customers)}
+    order_customers = np.array([customer_index[o['customer_id']] for o in orders], dtype=np.int64)
+    orders_by_customer = np.argsort(order_customers, kind='stable')
+    order_counts = np.bincount(order_customers, minlength=len(customers))
+    order_starts = np.concatenate(([0], np.cumsum(order_counts)[:-1]))
+    order_ids = np.array([o['order_id'] for o in orders] + [None], dtype=object)
+
+    # Per-customer and per-product attributes as arrays
+    customer_ids = np.array([c['customer_id'] for c in customers], dtype=object)
+    max_discount = np.array([0.3 if c['customer_type'] == 'VIP' else 0.15 for c in customers])
+    product_ids = np.array([p['product_id'] for p in products], dtype=object)
+    product_names = np.array([p['product_name'] for p in products], dtype=object)
+    unit_prices = np.array([p['unit_price'] for p in products])
+    # Quantity based on product category
+    max_quantity = np.array([5 if p['category'] == 'Services' else 10 if p['category'] == 'Software' else 50
+                             for p in products])
+    salespeople = np.array(SALESPEOPLE, dtype=object)
+
+    # Sale IDs keep the SALE_<8 hex> format; a random base plus a sequence keeps them unique
+    next_sale_number = int(rng.integers(0, 2**32))
+    total = 0
+
     for year in years:
         start_date = datetime(year, 1, 1)
-        end_date = datetime(year, 12, 31)
-        
-        for i in range(sales_per_year):
-            sale_id = generate_sale_id()
-            customer = random.choice(customers)
-            product = random.choice(products)
-            
-            # Find a random order for this customer (or create a standalone sale)
-            customer_orders = [o for o in orders if o['customer_id'] == customer['customer_id']]
-            order = random.choice(customer_orders) if customer_orders else None
-            
+        date_strings = np.array([(start_date + timedelta(days=d)).isoformat(sep=' ') for d in range(365)], dtype=object)
+
+        for offset in range(0, sales_per_year, batch_size):
+            n = min(batch_size, sales_per_year - offset)
+            customer = rng.integers(0, len(customers), n)
+            product = rng.integers(0, len(products), n)
+
+            # A random order of this customer (or a standalone sale when the customer has none)
+            counts = order_counts[customer]
+            has_order = counts > 0
+            order = np.full(n, len(orders))
+            order[has_order] = orders_by_customer[
+                order_starts[customer[has_order]] + (rng.random(int(has_order.sum())) * counts[has_order]).astype(np.int64)
+            ]
+
             # Sale date within the year
-            sale_date = start_date + timedelta(days=random.randint(0, 364))
-            
-            # Quantity based on product category
-            if product['category'] == 'Services':
-                quantity = random.randint(1, 5)
-            elif product['category'] == 'Software':
-                quantity = random.randint(1, 10)
-            else:
-                quantity = random.randint(1, 50)
-            
+            sale_date = date_strings[rng.integers(0, 365, n)]
+            quantity = rng.integers(1, max_quantity[product] + 1)
+
             # Price per unit (may have discounts)
-            base_price = product['unit_price']
-            discount_rate = random.uniform(0, 0.3) if customer['customer_type'] == 'VIP' else random.uniform(0, 0.15)
-            price_per_unit = base_price * (1 - discount_rate)
+            base_price = unit_prices[product]
+            price_per_unit = base_price * (1 - rng.uniform(0, max_discount[customer]))
             total_amount = price_per_unit * quantity
             discount_amount = (base_price - price_per_unit) * quantity
-            
-            sale = {
-                'sale_id': sale_id,
-                'order_id': order['order_id'] if order else None,
-                'customer_id': customer['customer_id'],
-                'product_id': product['product_id'],
-                'product_name': product['product_name'],
-                'quantity_sold': quantity,
-                'price_per_unit': round(price_per_unit, 2),
-                'total_amount': round(total_amount, 2),
-                'sale_date': sale_date,
-                'salesperson': random.choice(SALESPEOPLE),
-                'discount_amount': round(discount_amount, 2),
-                'created_at': sale_date
-            }
-            sales.append(sale)
-    
-    # Insert sales
-    cursor.executemany('''
-        INSERT OR REPLACE INTO sales 
-        (sale_id, order_id, customer_id, product_id, product_name, quantity_sold, price_per_unit, 
-         total_amount, sale_date, salesperson, discount_amount, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', [(s['sale_id'], s['order_id'], s['customer_id'], s['product_id'], s['product_name'], 
-           s['quantity_sold'], s['price_per_unit'], s['total_amount'], s['sale_date'], 
-           s['salesperson'], s['discount_amount'], s['created_at']) for s in sales])
-    
-    logger.info(f"Generated {len(sales)} sales records")
-    return sales
+
+            sale_ids = [f"SALE_{(next_sale_number + k) % 2**32:08X}" for k in range(n)]
+            next_sale_number += n
+
+            cursor.executemany('''
+                INSERT OR REPLACE INTO sales 
+                (sale_id, order_id, customer_id, product_id, product_name, quantity_sold, price_per_unit, 
+                 total_amount, sale_date, salesperson, discount_amount, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', zip(
+                sale_ids,
+                order_ids[order].tolist(),
+                customer_ids[customer].tolist(),
+                product_ids[product].tolist(),
+                product_names[product].tolist(),
+                quantity.tolist(),
+                np.round(price_per_unit, 2).tolist(),
+                np.round(total_amount, 2).tolist(),
+                sale_date.tolist(),
+                salespeople[rng.integers(0, len(SALESPEOPLE), n)].tolist(),
+                np.round(discount_amount, 2).tolist(),
+                sale_date.tolist(),
+            ))
+            total += n
+
+    logger.info(f"Generated {total} sales records")
+    return total
 
 def generate_inventory(cursor, products):
     """Generate inventory data"""
@@ -364,7 +391,16 @@ def generate_inventory(cursor, products):
 
 def main():
     """Main function to generate all demo data"""
+    parser = argparse.ArgumentParser(description="Generate demo ERP data")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for a reproducible dataset")
+    parser.add_argument("--sales-per-year", type=int, default=SALES_PER_YEAR,
+                        help=f"Total sales across the generated years (default: {SALES_PER_YEAR})")
+    args = parser.parse_args()
+
     logger.info("Starting demo data generation...")
+    if args.seed is not None:
+        random.seed(args.seed)
+    rng = np.random.default_rng(args.seed)
     
     # Ensure database directory exists
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
@@ -488,7 +524,7 @@ def main():
         order_count = cursor.fetchone()[0]
         logger.info(f"Order count after generation: {order_count}")
         
-        sales = generate_sales(cursor, customers, products, orders)
+        sale_total = generate_sales(cursor, customers, products, orders, sales_per_year=args.sales_per_year, rng=rng)
         logger.info("Sales generated, checking count...")
         cursor.execute("SELECT COUNT(*) FROM sales")
         sale_count = cursor.fetchone()[0]
@@ -515,7 +551,7 @@ def main():
         logger.info(f"  - {len(customers)} customers")
         logger.info(f"  - {len(products)} products")
         logger.info(f"  - {len(orders)} orders")
-        logger.info(f"  - {len(sales)} sales records")
+        logger.info(f"  - {sale_total} sales records")
         logger.info(f"  - {len(inventory)} inventory records")
         
         # Verify data integrity
@@ -2,6 +2,6 @@
 Agents module - Contains intelligent agents and processing logic
 """
 
-from .intelligent_agent import get_answer_from, initialize_app_state
+from .intelligent_agent import get_answer_from, initialize_app_state, warm_up_models
  
-__all__ = ['get_answer_from', 'initialize_app_state'] 
\ No newline at end of file
+__all__ = ['get_answer_from', 'initialize_app_state', 'warm_up_models'] 
\ No newline at end of file
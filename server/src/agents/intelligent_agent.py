@@ -1,29 +1,15 @@
 import os
 from typing import Optional, List, Dict, Any, Union
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_community.utilities import SQLDatabase
-from langchain_community.agent_toolkits import create_sql_agent
-from langchain.agents import AgentType
-from langchain_community.embeddings import SentenceTransformerEmbeddings
-
-# Import databricks-sqlalchemy to register SQLAlchemy dialect for Databricks
-# This must be imported before sqlalchemy.create_engine is called
-try:
-    from databricks.sqlalchemy import base  # noqa: F401
-except ImportError:
-    pass  # databricks-sqlalchemy is optional if not using Databricks
-
-# Also import databricks.sql for fallback direct connection
-try:
-    import databricks.sql  # noqa: F401
-except ImportError:
-    pass  # databricks-sql-connector is optional if not using Databricks
-
-# Import smart SQLDatabase factory that uses SQLAlchemy dialect for Databricks
+
+# Heavy / optional subsystems (PyPDF2, python-docx, pandas, FAISS, RetrievalQA,
+# Databricks dialect) are imported inside the functions that need them so that
+# importing this module stays cheap; see warm_up_models() for model start-up.
+
+# Import smart SQLDatabase factory (registers the Databricks SQLAlchemy dialect on first Databricks connection)
 from ..utils.databricks_adapter import create_sql_database
-from langchain_community.vectorstores import FAISS
+from ..utils.metrics import record_cache_lookup
+from ..utils.startup import mark_component_failed, mark_component_ready, mark_component_starting
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.chains import RetrievalQA
 from langchain.docstore.document import Document
 from ..database.db_operations import (
     initialize_database,  # Changed: initialize_app_database -> initialize_database
@@ -36,16 +22,14 @@ from ..models.data_models import DataSourceType, ProcessingStatus # Import DataS
 from dotenv import load_dotenv
 from pathlib import Path # Added Path
 import logging # Added logging
-import pandas as pd # Added pandas
 import re
+import time
 import asyncio
+import threading
 from ..config.config import Config
 # Factory imports
 from ..models.llm_factory import get_llm, get_reasoning_llm, get_llm_status, reset_llm
 from ..models.embedding_factory import get_embeddings, get_embeddings_status, reset_embeddings
-# Imports for file parsing
-import PyPDF2
-from docx import Document as DocxDocument
 
 
 # Defer logging configuration to centralized start.py
@@ -70,8 +54,13 @@ UPLOAD_DIR = Path(__file__).resolve().parent.parent.parent / "data" / "uploads"
 # Use DATABASE_URL from configuration (supports Databricks or other backends)
 DB_URI = Config.DATABASE_URL
 
+# Shared model instances, created lazily by get_agent_llm()/get_agent_embeddings()
+# or eagerly by warm_up_models() at application startup
 llm = None
 embeddings = None # Initialize embeddings variable
+# Separate locks so LLM and embedding initialization can run concurrently
+_llm_init_lock = threading.Lock()
+_embeddings_init_lock = threading.Lock()
 
 
 # Helper functions for parsing files
@@ -79,6 +68,7 @@ def _extract_text_from_pdf(file_path: Path) -> str:
     logger.info(f"Extracting text from PDF: {file_path}")
     text = ""
     try:
+        import PyPDF2
         with open(file_path, 'rb') as f:
             reader = PyPDF2.PdfReader(f)
             for page_num in range(len(reader.pages)):
@@ -93,6 +83,7 @@ def _extract_text_from_docx(file_path: Path) -> str:
     logger.info(f"Extracting text from DOCX: {file_path}")
     text = ""
     try:
+        from docx import Document as DocxDocument
         doc = DocxDocument(file_path)
         for para in doc.paragraphs:
             text += para.text + "\n"
@@ -105,6 +96,7 @@ def _extract_text_from_csv_pandas(file_path: Path) -> str:
     logger.info(f"Extracting text from CSV using pandas: {file_path}")
     text = ""
     try:
+        import pandas as pd
         df = pd.read_csv(file_path, on_bad_lines='skip')
         # Convert each row to a string, then join all row strings
         # We include column names for context for each row, and join with a clear separator.
@@ -123,6 +115,7 @@ def _extract_text_from_xlsx_pandas(file_path: Path) -> str:
     logger.info(f"Extracting text from XLSX using pandas: {file_path}")
     text = ""
     try:
+        import pandas as pd
         xls = pd.ExcelFile(file_path)
         sheet_texts = []
         for sheet_name in xls.sheet_names:
@@ -139,83 +132,85 @@ def _extract_text_from_xlsx_pandas(file_path: Path) -> str:
         logger.error(f"Error extracting text from XLSX {file_path} with pandas: {e}", exc_info=True)
     return text
 
-# Initialize LLM using factory (strict mode - no simulation)
-try:
-    llm = get_llm()
-    llm_status = get_llm_status()
-    logger.info(f"LLM initialized successfully - Provider: {llm_status.get('provider')}, Model: {llm_status.get('model')}")
-    if llm_status.get('base_url'):
-        logger.info(f"Using API endpoint: {llm_status.get('base_url')}")
-except Exception as e:
-    logger.error(f"LLM initialization failed: {e}")
-    
-    # Check if it's a Bedrock SSO issue and try to refresh
-    if "bedrock" in str(e).lower() and "sso" in str(e).lower():
-        logger.warning("Detected Bedrock SSO issue, attempting automatic refresh...")
-        try:
-            from ..models.llm_factory import refresh_sso_token
-            from ..config.config import Config
-            
-            if Config.ENABLE_AUTO_SSO_REFRESH:
-                profile = Config.AWS_PROFILE or "DevOpsPermissionSet-412381743093"
-                if refresh_sso_token(profile):
-                    logger.info("SSO refreshed, retrying LLM initialization...")
-                    llm = get_llm()
-                    llm_status = get_llm_status()
-                    logger.info(f"LLM initialized successfully after SSO refresh - Provider: {llm_status.get('provider')}, Model: {llm_status.get('model')}")
-                else:
-                    logger.error("SSO refresh failed, LLM initialization aborted")
-                    llm = None
-            else:
-                logger.error("Auto-SSO refresh is disabled")
-                llm = None
-        except Exception as sso_error:
-            logger.error(f"SSO refresh attempt failed: {sso_error}")
-            llm = None
-    else:
-        logger.error("Please check your LLM configuration in .env file")
-        llm = None
-
-# Initialize Embeddings using factory
-try:
-    logger.info("Starting initialization of embedding model using factory...")
-    embeddings = get_embeddings()
-    embedding_status = get_embeddings_status()
-    logger.info(f"Embedding model initialized successfully - Provider: {embedding_status.get('provider')}, Model: {embedding_status.get('model')}")
-except Exception as e:
-    logger.error(f"Embedding model initialization failed: {e}", exc_info=True)
-    
-    # Check if it's a Bedrock SSO issue and try to refresh
-    if "bedrock" in str(e).lower() and "sso" in str(e).lower():
-        logger.warning("Detected Bedrock SSO issue for embeddings, attempting automatic refresh...")
-        try:
-            from ..models.llm_factory import refresh_sso_token
-            from ..config.config import Config
-            
-            if Config.ENABLE_AUTO_SSO_REFRESH:
-                profile = Config.AWS_PROFILE or "DevOpsPermissionSet-412381743093"
-                if refresh_sso_token(profile):
-                    logger.info("SSO refreshed, retrying embedding initialization...")
-                    embeddings = get_embeddings()
-                    embedding_status = get_embeddings_status()
-                    logger.info(f"Embedding model initialized successfully after SSO refresh - Provider: {embedding_status.get('provider')}, Model: {embedding_status.get('model')}")
-                else:
-                    logger.error("SSO refresh failed, embedding initialization aborted")
-                    embeddings = None
-            else:
-                logger.error("Auto-SSO refresh is disabled")
-                embeddings = None
-        except Exception as sso_error:
-            logger.error(f"SSO refresh attempt failed: {sso_error}")
-            embeddings = None
-    else:
-        embeddings = None
+def _retry_after_sso_refresh(error: Exception, component: str, factory):
+    """Retry a Bedrock model factory once after an automatic SSO refresh; returns None on failure"""
+    if not ("bedrock" in str(error).lower() and "sso" in str(error).lower()):
+        return None
+
+    logger.warning(f"Detected Bedrock SSO issue for {component}, attempting automatic refresh...")
+    try:
+        from ..models.llm_factory import refresh_sso_token
+
+        if not Config.ENABLE_AUTO_SSO_REFRESH:
+            logger.error("Auto-SSO refresh is disabled")
+            return None
+        profile = Config.AWS_PROFILE or "DevOpsPermissionSet-412381743093"
+        if not refresh_sso_token(profile):
+            logger.error(f"SSO refresh failed, {component} initialization aborted")
+            return None
+        logger.info(f"SSO refreshed, retrying {component} initialization...")
+        return factory()
+    except Exception as sso_error:
+        logger.error(f"SSO refresh attempt failed: {sso_error}")
+        return None
+
+
+def _initialize_llm():
+    """Create the LLM using the factory (strict mode - no simulation); returns None on failure"""
+    try:
+        instance = get_llm()
+        llm_status = get_llm_status()
+        logger.info(f"LLM initialized successfully - Provider: {llm_status.get('provider')}, Model: {llm_status.get('model')}")
+        if llm_status.get('base_url'):
+            logger.info(f"Using API endpoint: {llm_status.get('base_url')}")
+        return instance
+    except Exception as e:
+        logger.error(f"LLM initialization failed: {e}")
+        instance = _retry_after_sso_refresh(e, "LLM", get_llm)
+        if instance is None:
+            logger.error("Please check your LLM configuration in .env file")
+        return instance
+
+
+def _initialize_embeddings():
+    """Create the embedding model using the factory; returns None on failure"""
+    try:
+        logger.info("Starting initialization of embedding model using factory...")
+        instance = get_embeddings()
+        embedding_status = get_embeddings_status()
+        logger.info(f"Embedding model initialized successfully - Provider: {embedding_status.get('provider')}, Model: {embedding_status.get('model')}")
+        return instance
+    except Exception as e:
+        logger.error(f"Embedding model initialization failed: {e}", exc_info=True)
+        return _retry_after_sso_refresh(e, "embedding", get_embeddings)
+
+
+def get_agent_llm():
+    """Return the shared LLM, initializing it on first use (None if unavailable)"""
+    global llm
+    if llm is None:
+        with _llm_init_lock:
+            if llm is None:
+                llm = _initialize_llm()
+    return llm
+
+
+def get_agent_embeddings():
+    """Return the shared embedding model, initializing it on first use (None if unavailable)"""
+    global embeddings
+    if embeddings is None:
+        with _embeddings_init_lock:
+            if embeddings is None:
+                embeddings = _initialize_embeddings()
+    return embeddings
 
 async def perform_rag_retrieval(query: str, datasource: Dict[str, Any], k: int = 10) -> Dict[str, Any]:
     """
     Performs RAG retrieval only, returning Top K documents with similarity scores.
     This function extracts the retrieval logic from perform_rag_query for use in the new workflow.
     """
+    from langchain_community.vectorstores import FAISS
+    embeddings = get_agent_embeddings()
     logger.info(f"RAG Retrieval - Query: '{query}', K: {k}, Datasource: {datasource['name']}")
     
     if not embeddings:
@@ -314,6 +309,7 @@ async def perform_rag_retrieval(query: str, datasource: Dict[str, Any], k: int =
         vector_store_path = VECTOR_STORE_DIR / f"datasource_{datasource['id']}.faiss"
         
         should_rebuild = False
+        record_cache_lookup("vector_store", cache_key in _vector_store_cache)
         
         if cache_key in _vector_store_cache:
             logger.info(f"Using cached vector store for datasource {datasource['id']}")
@@ -346,11 +342,12 @@ async def perform_rag_retrieval(query: str, datasource: Dict[str, Any], k: int =
                 should_rebuild = True
         
         if should_rebuild or not vector_store_path.exists():
-            logger.info("Creating FAISS vector store from chunks...")
+            # Built in memory only: the persistent index belongs to the ingestion workers,
+            # which merge into it under the index locks with deterministic chunk ids
+            logger.info("Creating in-memory FAISS vector store from chunks...")
             vector_store = FAISS.from_documents(chunked_docs, embeddings)
-            vector_store.save_local(str(vector_store_path))
             _vector_store_cache[cache_key] = vector_store
-            logger.info(f"Created, saved and cached vector store for datasource {datasource['id']}")
+            logger.info(f"Created and cached vector store for datasource {datasource['id']}")
         
         # 5. Perform retrieval with similarity scores
         logger.info(f"Performing similarity search with k={k}")
@@ -389,6 +386,10 @@ async def perform_rag_query(query: str, datasource: Dict[str, Any]) -> Dict[str,
     """
     Performs RAG retrieval and Q&A for the specified data source.
     """
+    from langchain_community.vectorstores import FAISS
+    from langchain.chains import RetrievalQA
+    llm = get_agent_llm()
+    embeddings = get_agent_embeddings()
     logger.info(f"Attempting RAG query on datasource: {datasource['name']} (ID: {datasource['id']}) for query: '{query}'")
 
     if not llm:
@@ -516,6 +517,7 @@ async def perform_rag_query(query: str, datasource: Dict[str, Any]) -> Dict[str,
         vector_store_path = VECTOR_STORE_DIR / f"datasource_{datasource['id']}.faiss"
         
         should_rebuild = False
+        record_cache_lookup("vector_store", cache_key in _vector_store_cache)
         
         if cache_key in _vector_store_cache:
             logger.info(f"Using cached vector store for datasource {datasource['id']}")
@@ -548,11 +550,12 @@ async def perform_rag_query(query: str, datasource: Dict[str, Any]) -> Dict[str,
                 should_rebuild = True
         
         if should_rebuild or not vector_store_path.exists():
-            logger.info("Creating FAISS vector store from chunks...")
+            # Built in memory only: the persistent index belongs to the ingestion workers,
+            # which merge into it under the index locks with deterministic chunk ids
+            logger.info("Creating in-memory FAISS vector store from chunks...")
             vector_store = FAISS.from_documents(chunked_docs, embeddings)
-            vector_store.save_local(str(vector_store_path))
             _vector_store_cache[cache_key] = vector_store
-            logger.info(f"Created, saved and cached vector store for datasource {datasource['id']}")
+            logger.info(f"Created and cached vector store for datasource {datasource['id']}")
 
         # 5. Perform retrieval (RetrievalQA chain)
         logger.info("Setting up RetrievalQA chain...")
@@ -713,6 +716,7 @@ async def get_answer_from_sqltable_datasource(query: str, active_datasource: Dic
     """
     Queries the dynamically created SQL table associated with the specified data source using LangChain SQL Agent.
     """
+    llm = get_agent_llm()
     logger.info(f"Attempting SQL Agent query on datasource: {active_datasource['name']} (ID: {active_datasource['id']}) for query: '{query}'")
 
     if not llm:
@@ -963,6 +967,7 @@ async def get_answer_from(query: str, query_type: str = "sales", active_datasour
     Main function to get answers from the system.
     Routes the query based on the query_type and active_datasource.
     """
+    llm = get_agent_llm()
     # If no active_datasource provided, get the current active datasource from database
     if not active_datasource:
         active_datasource = await get_active_datasource()
@@ -1103,81 +1108,90 @@ def extract_answer_from_timeout(timeout_response: str, original_query: str, db,
 
 def initialize_app_state():
     """
-    Initializes critical application state, like database and LLM/Embedding models.
-    Called at application startup.
+    Initializes critical application state (database schema and base data).
+    Called at application startup; model warm-up runs separately in warm_up_models().
     """
-    logger.info("Starting initialization of application state (database, LLM, embedding model)...")
+    logger.info("Starting initialization of application state (database)...")
+    mark_component_starting("database")
+    started = time.perf_counter()
     
-    # 1. Initialize Database (ensure schema and base data)
+    # Initialize Database (ensure schema and base data)
     try:
         initialize_database() # Changed: Call the renamed function in db.py
+        mark_component_ready("database", time.perf_counter() - started)
         logger.info("Database initialization completed.")
     except Exception as e:
+        mark_component_failed("database", e, time.perf_counter() - started)
         logger.error(f"An error occurred during database initialization: {e}", exc_info=True)
         # Depending on severity, might want to raise to stop app, or continue with limited functionality.
-
-    # 2. Pre-initialize LLM and Embeddings (Bedrock optimization)
-    try:
-        logger.info("Pre-initializing LLM and Embedding models...")
-        
-        # Ensure LLM is initialized at startup (cold-start warmup)
-        global llm
-        if not llm:
-            try:
-                from ..models.llm_factory import get_llm as _get_llm
-                llm = _get_llm()
-                logger.info("LLM instance created during startup warmup.")
-            except Exception as init_llm_err:
-                logger.error(f"Failed to initialize LLM during startup: {init_llm_err}")
         
-        # Test LLM connection
-        if llm:
-            logger.info("Testing LLM connection...")
-            # Send a lightweight test request to verify connection
-            test_response = llm.invoke("test")
-            # Handle AIMessage object properly
-            if hasattr(test_response, 'content'):
-                response_text = test_response.content
-            else:
-                response_text = str(test_response)
-            logger.info(f"LLM pre-initialization successful. Test response: {response_text[:50]}...")
-        else:
-            logger.warning("LLM model not initialized. Question answering and report functionality will be limited.")
+    logger.info("Application state initialization completed.")
 
-        # Ensure Embeddings are initialized at startup (cold-start warmup)
-        global embeddings
-        if not embeddings:
-            try:
-                from ..models.embedding_factory import get_embeddings as _get_embeddings
-                embeddings = _get_embeddings()
-                logger.info("Embeddings instance created during startup warmup.")
-            except Exception as init_emb_err:
-                logger.error(f"Failed to initialize Embeddings during startup: {init_emb_err}")
-
-        # Test Embeddings connection
-        if embeddings:
-            logger.info("Testing Embeddings connection...")
-            # Test embedding generation
-            test_embedding = embeddings.embed_query("test")
-            logger.info(f"Embeddings pre-initialization successful. Test embedding dimension: {len(test_embedding)}")
-        else:
-            logger.warning("Embedding model not initialized. RAG functionality will be unavailable.")
-            
-        # Preload Cross-Encoder reranker to avoid first-request cold start
-        try:
-            from ..models.reranker import get_cross_encoder as _get_ce
-            _ = _get_ce()
-            logger.info("Cross-Encoder reranker preloaded successfully.")
-        except Exception as ce_warmup_err:
-            logger.warning(f"Cross-Encoder preload skipped/failed: {ce_warmup_err}")
 
-        logger.info("LLM, Embeddings and Reranker pre-initialization completed.")
-        
+def _warm_up_llm() -> str:
+    # The factory verifies the connection with a live ping, so no extra test call is needed
+    if get_agent_llm() is None:
+        raise RuntimeError("LLM model not initialized. Question answering and report functionality will be limited.")
+    status = get_llm_status()
+    return f"{status.get('provider')}/{status.get('model')}"
+
+
+def _warm_up_embeddings() -> str:
+    # The factory verifies the connection with a test embedding
+    if get_agent_embeddings() is None:
+        raise RuntimeError("Embedding model not initialized. RAG functionality will be unavailable.")
+    status = get_embeddings_status()
+    return f"{status.get('provider')}/{status.get('model')}"
+
+
+def _warm_up_reranker() -> str:
+    # Preload Cross-Encoder reranker to avoid first-request cold start
+    from ..models.reranker import get_cross_encoder, get_cross_encoder_model_name
+    get_cross_encoder()
+    return get_cross_encoder_model_name()
+
+
+def _warm_up_tokenizer() -> str:
+    # Loads (and on first use downloads) the tokenizer used for prompt token budgets
+    from ..prompts.prompt_builder import get_token_counter
+    counter = get_token_counter()
+    return f"{counter.model or 'default'} ({'exact' if counter.exact else 'estimated'})"
+
+
+async def _warm_up_component(name: str, func) -> bool:
+    mark_component_starting(name)
+    started = time.perf_counter()
+    try:
+        detail = await asyncio.to_thread(func)
+        duration = time.perf_counter() - started
+        mark_component_ready(name, duration, detail)
+        logger.info(f"Warm-up of {name} completed in {duration:.2f}s ({detail})")
+        return True
     except Exception as e:
-        logger.error(f"LLM/Embeddings pre-initialization failed: {e}", exc_info=True)
-        logger.warning("Service will continue but first LLM request may be slower due to cold start.")
-        
-    logger.info("Application state initialization completed.")
+        duration = time.perf_counter() - started
+        mark_component_failed(name, e, duration)
+        logger.warning(f"Warm-up of {name} failed after {duration:.2f}s: {e}")
+        return False
+
+
+async def warm_up_models() -> Dict[str, bool]:
+    """
+    Single warm-up phase: LLM ping, embedding ping, Cross-Encoder and tokenizer load run
+    concurrently in worker threads so the event loop stays responsive.
+    Progress is reported to the readiness registry (/ready).
+    """
+    logger.info("Warming up LLM, Embeddings, Reranker and tokenizer concurrently...")
+    started = time.perf_counter()
+    components = {
+        "llm": _warm_up_llm,
+        "embeddings": _warm_up_embeddings,
+        "reranker": _warm_up_reranker,
+        "tokenizer": _warm_up_tokenizer,
+    }
+    results = await asyncio.gather(*(_warm_up_component(name, func) for name, func in components.items()))
+    outcome = dict(zip(components.keys(), results))
+    logger.info(f"Model warm-up finished in {time.perf_counter() - started:.2f}s: {outcome}")
+    return outcome
 
 # Add new function for query SQL processing
 async def get_query_from_sqltable_datasource(
@@ -1188,6 +1202,7 @@ async def get_query_from_sqltable_datasource(
     Get answer from SQL table datasource with improved error handling and SQL cleaning
     Specifically optimized for data queries (not charts)
     """
+    llm = get_agent_llm()
     logger.info(f"Attempting Query SQL on datasource: {active_datasource['name']} (ID: {active_datasource['id']}) for query: '{query}'")
 
     if not llm:
@@ -3,7 +3,6 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 import os
 import uuid
-import aiofiles
 from pathlib import Path
 from ..models.data_models import (
     BaseResponse,
@@ -23,7 +22,8 @@ from ..database.db_operations import (
     get_datasources, get_datasource, create_datasource, update_datasource,
     delete_datasource, set_active_datasource, get_active_datasource,
     # File management functions
-    save_file_info, get_files_by_datasource, update_file_processing_status,
+    save_file_info, find_file_by_hash, get_files_by_datasource,
+    get_ingestion_jobs,
     delete_file_record_and_associated_data,
     # HITL functions
     list_hitl_interrupts, get_hitl_interrupt, update_hitl_interrupt_status,
@@ -33,8 +33,13 @@ from ..utils.common_utils import (
     create_api_response
 )
 from ..utils.rate_limiter import rate_limit
-from ..document_loaders.file_processor import process_uploaded_file
-from ..config.config import DATA_DIR
+from ..utils.execution_state_store import get_execution_state_store_stats
+from ..utils.hitl_checkpointer import hitl_checkpointer
+from ..utils.tracing import build_flame_graph
+from ..document_loaders.ingestion_queue import IngestionJob, ingestion_queue
+from ..document_loaders.file_processor import remove_from_index
+from ..document_loaders.upload_stream import UploadTooLargeError, stream_upload_to_disk
+from ..config.config import DATA_DIR, Config
 import json
 import time
 import sqlite3
@@ -42,7 +47,6 @@ from fastapi.responses import FileResponse, StreamingResponse
 import logging
 import asyncio
 from pydantic import BaseModel
-import pandas as pd
 
 logger = logging.getLogger(__name__)
 
@@ -297,6 +301,7 @@ async def deactivate_datasource_api(datasource_id: int):
 async def upload_file(
     datasource_id: int,
     file: UploadFile = File(...),
+    client_id: Optional[str] = Form(None),
     background_tasks: BackgroundTasks = None
 ):
     """Upload a file to a specific data source"""
@@ -311,10 +316,29 @@ async def upload_file(
         unique_filename = f"{uuid.uuid4().hex}{file_extension}"
         file_path = UPLOAD_DIR / unique_filename
 
-        # Save file
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+        # Save file in fixed-size chunks, hashing on the fly (memory stays flat for large files)
+        try:
+            stored = await stream_upload_to_disk(
+                file, file_path,
+                max_bytes=Config.UPLOAD_MAX_SIZE_MB * 1024 * 1024,
+                chunk_size=Config.UPLOAD_CHUNK_SIZE_KB * 1024,
+            )
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+
+        # Same content already ingested into this data source: skip storing and processing it again
+        existing = await find_file_by_hash(datasource_id, stored.sha256)
+        if existing:
+            os.remove(file_path)
+            logger.info(f"Upload '{file.filename}' duplicates file {existing['id']} in datasource {datasource_id}")
+            return {
+                "success": True,
+                "message": f"File '{file.filename}' was already uploaded as '{existing['original_filename']}'",
+                "file_id": existing["id"],
+                "filename": existing["filename"],
+                "processing_status": existing["processing_status"],
+                "duplicate": True
+            }
 
         # Determine file type (only document types supported)
         file_type_mapping = {
@@ -332,32 +356,33 @@ async def upload_file(
             filename=unique_filename,
             original_filename=file.filename,
             file_type=file_type.value,
-            file_size=len(content),
-            datasource_id=datasource_id
+            file_size=stored.size,
+            datasource_id=datasource_id,
+            content_hash=stored.sha256
         )
         
         if file_id:
-            # Process file in background if supported
+            # Hand processing to the durable ingestion queue; the request returns right away and
+            # progress is reported over the WebSocket (to client_id when given, else to all clients)
+            job_id = None
             if file_type != FileType.UNKNOWN:
-                try:
-                    await process_uploaded_file(
-                        file_id=file_id, 
-                        datasource_id=datasource_id,
-                        file_path=Path(str(file_path)), 
-                        original_filename=file.filename,
-                        file_type=file_type.value
-                    )
-                    await update_file_processing_status(file_id, ProcessingStatus.COMPLETED.value)
-                except Exception as processing_error:
-                    await update_file_processing_status(file_id, ProcessingStatus.FAILED.value)
-                    print(f"File processing failed: {processing_error}")
+                job_id = await ingestion_queue.submit(IngestionJob(
+                    file_id=file_id,
+                    datasource_id=datasource_id,
+                    file_path=Path(str(file_path)),
+                    original_filename=file.filename,
+                    file_type=file_type.value,
+                    client_id=client_id
+                ))
             
             return {
                 "success": True,
                 "message": f"File '{file.filename}' uploaded successfully",
                 "file_id": file_id,
                 "filename": unique_filename,
-                "processing_status": ProcessingStatus.COMPLETED.value if file_type != FileType.UNKNOWN else ProcessingStatus.PENDING.value
+                "processing_status": ProcessingStatus.PENDING.value,
+                "ingestion_job_id": job_id,
+                "duplicate": False
             }
         else:
             # Cleanup uploaded file if DB entry failed
@@ -376,6 +401,12 @@ async def upload_file(
                 print(f"Failed to remove partially uploaded file {file_path}: {e_remove}")
         return {"success": False, "error": f"File upload failed: {str(e)}"}
 
+@router.get("/api/v1/ingestion/jobs", summary="List File Ingestion Jobs")
+async def list_ingestion_jobs(datasource_id: Optional[int] = None, status: Optional[str] = None, limit: int = 100):
+    """Background ingestion jobs (newest first) with queue statistics"""
+    jobs = await get_ingestion_jobs(datasource_id=datasource_id, status=status, limit=limit)
+    return create_api_response(success=True, data={"jobs": jobs, "queue": await ingestion_queue.stats()})
+
 @router.get("/api/v1/datasources/{datasource_id}/files", response_model=FileListResponse, summary="Get Data Source File List")
 async def get_datasource_files(datasource_id: int):
     """Get all files for a specific data source"""
@@ -461,6 +492,11 @@ async def delete_file_from_datasource(datasource_id: int, file_id: int):
     try:
         success = await delete_file_record_and_associated_data(file_id)
         if success:
+            try:
+                removed = await remove_from_index(datasource_id, file_id)
+                logger.info(f"Removed {removed} vectors of file {file_id} from datasource {datasource_id} index")
+            except Exception as e:
+                logger.warning(f"Failed to remove vectors of file {file_id} from datasource {datasource_id} index: {e}")
             return BaseResponse(success=True, message=f"File ID {file_id} and its associated data deleted successfully.")
         else:
             raise HTTPException(status_code=404, detail=f"Failed to delete File ID {file_id}. File may not exist or operation was not completed.")
@@ -571,6 +607,24 @@ async def intelligent_analysis(request: Request, data: IntelligentAnalysisReques
         logger.exception(f"Error processing intelligent analysis request: {str(e)}")
         return {"error": str(e)}
 
+@router.get("/api/v1/executions/{execution_id}/trace", summary="Get Execution Trace (Flame Graph)")
+async def get_execution_trace(execution_id: str):
+    """Span tree of one execution (nodes, LLM/embedding/rerank calls, SQL, WebSocket flushes) as a flame graph"""
+    try:
+        trace = build_flame_graph(execution_id)
+        if trace is None:
+            raise HTTPException(status_code=404, detail=f"No trace found for execution {execution_id}")
+        return create_api_response(
+            success=True,
+            data=trace,
+            message=f"Retrieved {trace['span_count']} spans for execution {execution_id}"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error building trace for execution {execution_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to build execution trace: {str(e)}")
+
 @router.websocket("/ws/workflow/{client_id}")
 async def workflow_websocket(websocket: WebSocket, client_id: str):
     """WebSocket endpoint for real-time workflow tracking using client_id."""
@@ -715,6 +769,16 @@ async def get_hitl_interrupts(
         logger.error(f"Error getting HITL interrupts: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get interrupt history: {str(e)}")
 
+@router.get("/api/v1/hitl/checkpoints/{execution_id}", summary="List HITL Checkpoints")
+async def list_hitl_checkpoints(execution_id: str):
+    """Checkpoints of an execution (oldest first); any version can be passed as checkpoint_version to hitl_resume"""
+    checkpoints = await hitl_checkpointer.alist(execution_id)
+    return create_api_response(
+        success=True,
+        data={"execution_id": execution_id, "checkpoints": checkpoints},
+        message=f"Retrieved {len(checkpoints)} checkpoints"
+    )
+
 @router.get("/api/v1/hitl/interrupts/{execution_id}", summary="Get Specific HITL Interrupt")
 async def get_hitl_interrupt(execution_id: str):
     """Get specific HITL interrupt by execution ID"""
@@ -855,6 +919,25 @@ async def cancel_interrupt(execution_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to cancel interrupt: {str(e)}")
 
 # ==================== Health and Info ======================
+@router.get("/api/v1/metrics/execution-states", summary="Execution State Store Metrics")
+async def execution_state_metrics():
+    """Entry counts and approximate memory usage of the execution state stores"""
+    try:
+        stores = get_execution_state_store_stats()
+        return create_api_response(
+            success=True,
+            data={
+                "stores": stores,
+                "total_entries": sum(store["entries"] for store in stores),
+                "total_approx_bytes": sum(store["approx_bytes"] for store in stores),
+                "total_spilled_entries": sum(store["spilled_entries"] for store in stores)
+            },
+            message=f"Retrieved metrics for {len(stores)} execution state stores"
+        )
+    except Exception as e:
+        logger.error(f"Error collecting execution state metrics: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to collect execution state metrics: {str(e)}")
+
 @router.get("/health", summary="Health Check")
 async def health_check():
     return {"status": "OK"} 
\ No newline at end of file
@@ -1,5 +1,7 @@
 """
 Callbacks module - Contains custom callback handlers for monitoring and logging
 """
- 
-# Custom callback handlers will be organized here 
\ No newline at end of file
+
+from .metrics_callback import LLMMetricsCallbackHandler
+
+__all__ = ['LLMMetricsCallbackHandler']
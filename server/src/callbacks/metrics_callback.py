@@ -0,0 +1,158 @@
+"""
+LLM metrics callback - records latency and token usage of every LLM call
+per provider/model into the metrics registry, and an llm.call span per call.
+
+Input tokens are split into cached (served from the provider's prompt prefix
+cache) and uncached, and streamed calls record time to first token labelled
+by cache hit/miss, so the effect of prefix caching can be measured.
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from ..utils.metrics import LLM_PROMPT_TOKENS, LLM_REQUEST_DURATION, LLM_TIME_TO_FIRST_TOKEN, LLM_TOKENS
+from ..utils.tracing import SPAN_KIND_CLIENT, Span, start_span
+
+
+def _int(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def extract_token_usage(response: LLMResult) -> Dict[str, int]:
+    """
+    Extract input/output token counts from an LLM result.
+
+    Providers report usage in different places: chat messages carry
+    usage_metadata (input_tokens/output_tokens), while OpenAI and Bedrock also
+    put token_usage/usage (prompt_tokens/completion_tokens) into llm_output.
+
+    Prompt cache usage is reported as cache_read (input tokens served from the
+    cache) and cache_write (input tokens written to it). usage_metadata and
+    OpenAI's prompt_tokens already include cached tokens; Anthropic's raw
+    input_tokens do not, so those are added to the input total.
+    """
+    input_tokens = 0
+    output_tokens = 0
+    cache_read = 0
+    cache_write = 0
+
+    for generation_list in response.generations or []:
+        for generation in generation_list:
+            message = getattr(generation, "message", None)
+            usage = getattr(message, "usage_metadata", None) if message is not None else None
+            if usage:
+                input_tokens += _int(usage.get("input_tokens"))
+                output_tokens += _int(usage.get("output_tokens"))
+                details = usage.get("input_token_details") or {}
+                cache_read += _int(details.get("cache_read"))
+                cache_write += _int(details.get("cache_creation"))
+
+    if not input_tokens and not output_tokens:
+        llm_output = response.llm_output or {}
+        usage = llm_output.get("token_usage") or llm_output.get("usage") or {}
+        if isinstance(usage, dict):
+            output_tokens = _int(usage.get("completion_tokens", usage.get("output_tokens")))
+            if "prompt_tokens" in usage:
+                # OpenAI: cached tokens are part of prompt_tokens
+                input_tokens = _int(usage.get("prompt_tokens"))
+                cache_read = _int((usage.get("prompt_tokens_details") or {}).get("cached_tokens"))
+            else:
+                # Anthropic: input_tokens counts only the tokens after the last cache point
+                cache_read = _int(usage.get("cache_read_input_tokens"))
+                cache_write = _int(usage.get("cache_creation_input_tokens"))
+                input_tokens = _int(usage.get("input_tokens")) + cache_read + cache_write
+
+    return {
+        "input": input_tokens,
+        "output": output_tokens,
+        "cache_read": cache_read,
+        "cache_write": cache_write,
+        "uncached": max(input_tokens - cache_read, 0),
+    }
+
+
+class LLMMetricsCallbackHandler(BaseCallbackHandler):
+    """Callback handler timing, tracing and counting tokens of LLM calls"""
+
+    def __init__(self, provider: str, model: str):
+        super().__init__()
+        self.provider = provider or "unknown"
+        self.model = model or "unknown"
+        self._start_times: Dict[UUID, float] = {}
+        self._first_token_times: Dict[UUID, float] = {}
+        self._spans: Dict[UUID, Span] = {}
+
+    def _start(self, run_id: UUID) -> None:
+        self._start_times[run_id] = time.perf_counter()
+        self._spans[run_id] = start_span(
+            "llm.call",
+            {"gen_ai.system": self.provider, "gen_ai.request.model": self.model},
+            kind=SPAN_KIND_CLIENT,
+        )
+
+    def _elapsed(self, run_id: UUID) -> Optional[float]:
+        start = self._start_times.pop(run_id, None)
+        return time.perf_counter() - start if start is not None else None
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        start = self._start_times.get(run_id)
+        if start is not None and run_id not in self._first_token_times:
+            self._first_token_times[run_id] = time.perf_counter() - start
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        elapsed = self._elapsed(run_id)
+        if elapsed is not None:
+            LLM_REQUEST_DURATION.observe(elapsed, provider=self.provider, model=self.model, status="ok")
+
+        usage = extract_token_usage(response)
+        labels = {"provider": self.provider, "model": self.model}
+        if usage["input"]:
+            LLM_TOKENS.inc(usage["input"], type="input", **labels)
+            LLM_TOKENS.inc(usage["uncached"], type="input_uncached", **labels)
+            LLM_PROMPT_TOKENS.observe(usage["input"], **labels)
+        if usage["cache_read"]:
+            LLM_TOKENS.inc(usage["cache_read"], type="input_cached", **labels)
+        if usage["cache_write"]:
+            LLM_TOKENS.inc(usage["cache_write"], type="input_cache_write", **labels)
+        if usage["output"]:
+            LLM_TOKENS.inc(usage["output"], type="output", **labels)
+
+        first_token = self._first_token_times.pop(run_id, None)
+        if first_token is not None:
+            prompt_cache = "hit" if usage["cache_read"] else "miss"
+            LLM_TIME_TO_FIRST_TOKEN.observe(first_token, prompt_cache=prompt_cache, **labels)
+
+        llm_span = self._spans.pop(run_id, None)
+        if llm_span is not None:
+            llm_span.set_attributes({
+                "gen_ai.usage.input_tokens": usage["input"],
+                "gen_ai.usage.output_tokens": usage["output"],
+                "gen_ai.usage.cache_read_input_tokens": usage["cache_read"],
+                "gen_ai.usage.cache_creation_input_tokens": usage["cache_write"],
+            })
+            if first_token is not None:
+                llm_span.set_attributes({"gen_ai.response.time_to_first_token": round(first_token, 4)})
+            llm_span.end()
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        elapsed = self._elapsed(run_id)
+        self._first_token_times.pop(run_id, None)
+        if elapsed is not None:
+            LLM_REQUEST_DURATION.observe(elapsed, provider=self.provider, model=self.model, status="error")
+        llm_span = self._spans.pop(run_id, None)
+        if llm_span is not None:
+            llm_span.record_exception(error)
+            llm_span.end()
@@ -0,0 +1,437 @@
+"""
+Chart data engine - turns a query result into chart labels and values.
+
+The result is loaded once into a columnar frame and everything after that
+works on whole columns: label/value column selection, numeric coercion,
+time bucketing to the requested time_grouping, aggregation, downsampling of
+long series (LTTB for line charts, min/max for the others) and folding long
+category tails into "Other" for pie charts.
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .time_axis import (
+    MONTH_NAMES,
+    PERIOD_FREQ,
+    detect_time_format,
+    effective_grouping,
+    format_time_buckets,
+    month_numbers,
+    parse_time_column,
+)
+
+logger = logging.getLogger(__name__)
+
+VALUE_FIELD_NAMES = ("value", "sales_revenue", "revenue", "amount", "total", "sum")
+
+TIME_KEYWORDS = ('trend', 'monthly', 'yearly', 'daily', 'weekly', 'over time',
+                 '时间', '趋势', '月度', '年度', '日期', '天', '周')
+DISTRIBUTION_KEYWORDS = ('distribution', 'proportion', 'percentage', 'share', 'breakdown', 'composition',
+                         '分布', '占比', '比例', '构成')
+
+_AGGREGATIONS = {"sum": "sum", "average": "mean", "avg": "mean", "mean": "mean",
+                 "count": "count", "max": "max", "min": "min"}
+
+OTHER_LABEL = "Other"
+
+# Rows inspected when choosing the label/value columns
+SELECTION_SAMPLE_ROWS = 200
+
+
+@dataclass
+class ChartSeries:
+    """Labels/values ready for a single-dataset chart"""
+    labels: List[str] = field(default_factory=list)
+    values: List[float] = field(default_factory=list)
+    label_column: Optional[str] = None
+    value_column: Optional[str] = None
+    is_time_series: bool = False
+    time_grouping: str = "none"
+    source_rows: int = 0
+    downsampled: bool = False
+    # Bucket start times (ns) of a time series; x positions for LTTB
+    positions: Optional[np.ndarray] = field(default=None, repr=False)
+
+
+def to_frame(data: Dict[str, Any], columns: Optional[List[str]] = None, limit: Optional[int] = None) -> pd.DataFrame:
+    """
+    Build a DataFrame from structured_data ({"rows": [...], "columns": [...]}).
+
+    Rows may be dicts or sequences. Only the requested columns (default: all)
+    and the first `limit` rows are materialized.
+    """
+    rows = data.get("rows") or []
+    if limit is not None:
+        rows = rows[:limit]
+    if not rows:
+        return pd.DataFrame(columns=columns or data.get("columns") or [])
+
+    if isinstance(rows[0], dict):
+        names = list(data.get("columns") or rows[0].keys())
+        wanted = columns or names
+        return pd.DataFrame({name: [row.get(name) for row in rows] for name in wanted}, columns=wanted)
+
+    width = len(rows[0])
+    declared = [str(c) for c in data.get("columns") or []]
+    names = declared if len(declared) == width else [f"col_{i}" for i in range(width)]
+    wanted = columns or names
+    positions = [names.index(name) for name in wanted]
+    return pd.DataFrame({name: [row[pos] if pos < len(row) else None for row in rows]
+                         for name, pos in zip(wanted, positions)}, columns=wanted)
+
+
+def coerce_numeric(series: pd.Series) -> pd.Series:
+    """Numeric view of a column; TEXT numbers such as '1,234' or '$12.5' are recovered"""
+    if pd.api.types.is_bool_dtype(series):
+        return series.astype(float)
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    numeric = pd.to_numeric(series, errors="coerce")
+    unparsed = numeric.isna() & series.notna()
+    if unparsed.any():
+        extracted = (series[unparsed].astype(str).str.replace(",", "", regex=False)
+                     .str.extract(r'(-?\d+\.?\d*)', expand=False))
+        numeric[unparsed] = pd.to_numeric(extracted, errors="coerce")
+    return numeric
+
+
+def numeric_ratio(series: pd.Series) -> float:
+    """Share of non-empty values in a column that are numeric"""
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return 1.0 if series.notna().any() else 0.0
+    text = series.dropna().astype(str).str.strip()
+    text = text[text != ""]
+    if text.empty:
+        return 0.0
+    cleaned = text.str.replace(",", "", regex=False).str.replace("%", "", regex=False)
+    return float(pd.to_numeric(cleaned, errors="coerce").notna().mean())
+
+
+def has_time_intent(chart_analysis: Dict[str, Any], user_input: str = "") -> bool:
+    user_input_lower = (user_input or "").lower()
+    return bool(
+        chart_analysis.get("is_time_series", False)
+        or chart_analysis.get("time_grouping", "none") not in (None, "", "none")
+        or any(kw in user_input_lower for kw in TIME_KEYWORDS)
+    )
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of the points that best keep the line's shape"""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = x.astype(float)
+    y = y.astype(float)
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y: np.ndarray, threshold: int) -> np.ndarray:
+    """Keep the minimum and maximum of each bucket so peaks and troughs stay visible"""
+    n = len(y)
+    if threshold >= n or threshold < 2:
+        return np.arange(n)
+    bucket_count = threshold // 2
+    edges = np.linspace(0, n, bucket_count + 1).astype(int)
+    bucket_of = np.repeat(np.arange(bucket_count), np.diff(edges))
+    # Sort by (bucket, value): each bucket's min and max are its first and last entries
+    order = np.lexsort((y, bucket_of))
+    sorted_buckets = bucket_of[order]
+    first = np.searchsorted(sorted_buckets, np.arange(bucket_count), side="left")
+    last = np.searchsorted(sorted_buckets, np.arange(bucket_count), side="right") - 1
+    return np.unique(np.concatenate([order[first], order[last]]))
+
+
+def fold_tail(labels: np.ndarray, values: np.ndarray, max_items: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the top max_items - 1 entries (values sorted descending) and sum the rest into Other"""
+    if max_items < 2 or len(values) <= max_items:
+        return labels, values
+    head = max_items - 1
+    other_total = float(np.nansum(values[head:]))
+    return (np.append(labels[:head], OTHER_LABEL).astype(object),
+            np.append(values[:head], other_total))
+
+
+def _aggregation(chart_analysis: Dict[str, Any]) -> str:
+    return _AGGREGATIONS.get(str(chart_analysis.get("aggregation_method") or "sum").lower(), "sum")
+
+
+def select_columns(frame: pd.DataFrame, chart_analysis: Dict[str, Any], time_intent: bool) -> Tuple[Optional[str], Optional[str]]:
+    """Pick the label and value columns of the result"""
+    columns = list(frame.columns)
+    if len(columns) < 2:
+        return None, None
+
+    def resolve(spec: Any) -> Optional[str]:
+        if spec is None:
+            return None
+        if spec in columns:
+            return spec
+        if str(spec).isdigit() and int(spec) < len(columns):
+            return columns[int(spec)]
+        return None
+
+    numeric_columns = [c for c in columns if numeric_ratio(frame[c]) > 0.5]
+
+    if "category" in columns:
+        label_column = "category"
+    elif "label" in columns and "value" in columns:
+        label_column = "label"
+    else:
+        label_column = resolve(chart_analysis.get("data_field_for_labels"))
+        if label_column is None and time_intent:
+            label_column = next((c for c in columns
+                                 if detect_time_format(frame[c], allow_ambiguous=False)), None)
+        if label_column is None:
+            label_column = next((c for c in columns if c not in numeric_columns), columns[0])
+
+    value_column = None
+    if label_column not in ("category", "label"):
+        value_column = resolve(chart_analysis.get("data_field_for_values"))
+    if value_column is None or value_column == label_column:
+        value_column = next((c for c in VALUE_FIELD_NAMES if c in columns and c != label_column), None)
+    if value_column is None:
+        value_column = next((c for c in numeric_columns if c != label_column), None)
+    if value_column is None:
+        value_column = next((c for c in columns if c != label_column), None)
+    return label_column, value_column
+
+
+def build_chart_series(data: Dict[str, Any], chart_analysis: Dict[str, Any], user_input: str = "",
+                       chart_type: Optional[str] = None, max_points: int = 500,
+                       max_slices: int = 10) -> ChartSeries:
+    """
+    Build chart labels/values from structured query data.
+
+    chart_analysis is updated in place with the detected is_time_series and
+    time_grouping, as the LLM guidance may not have set them.
+    """
+    chart_type = chart_type or chart_analysis.get("chart_type") or "bar"
+    series = ChartSeries(source_rows=len(data.get("rows") or []))
+    if not series.source_rows:
+        return series
+
+    # Columns are chosen on a sample; only the two chosen columns are materialized
+    time_intent = has_time_intent(chart_analysis, user_input)
+    label_column, value_column = select_columns(to_frame(data, limit=SELECTION_SAMPLE_ROWS), chart_analysis, time_intent)
+    if label_column is None or value_column is None:
+        return series
+    series.label_column, series.value_column = label_column, value_column
+
+    frame = to_frame(data, columns=[label_column, value_column])
+    labels = frame[label_column]
+    values = coerce_numeric(frame[value_column]).fillna(0.0)
+    aggregation = _aggregation(chart_analysis)
+
+    time_format = detect_time_format(labels, allow_ambiguous=time_intent or label_column == "category")
+    if time_format and chart_type != "pie":
+        chart_analysis["is_time_series"] = True
+        series.is_time_series = True
+        if time_format == "month_of_year":
+            _month_of_year_series(series, labels, values, aggregation)
+        else:
+            _time_bucket_series(series, labels, values, time_format, chart_analysis, aggregation)
+        chart_analysis["time_grouping"] = series.time_grouping
+        _downsample(series, chart_type, max_points)
+        return series
+
+    labels_are_years = (time_format or detect_time_format(labels)) == "year"
+    _category_series(series, labels, values, aggregation, labels_are_years)
+    limit = max_slices if chart_type == "pie" else max_points
+    folded_labels, folded_values = fold_tail(np.asarray(series.labels, dtype=object),
+                                             np.asarray(series.values, dtype=float), limit)
+    series.labels = folded_labels.tolist()
+    series.values = folded_values.tolist()
+    return series
+
+
+def _unparsed_buckets(labels: pd.Series, values: pd.Series, aggregation: str,
+                      time_format: str) -> Tuple[List[str], List[float]]:
+    """
+    Buckets for labels that do not parse in the detected time format, one per raw
+    label in first-seen order. The format is detected from a sample, so later
+    labels may not fit it; they are kept (after the time buckets) rather than dropped.
+    """
+    if labels.empty:
+        return [], []
+    logger.warning(f"{len(labels)} chart rows have labels that are not {time_format} values; "
+                   f"kept as {labels.nunique(dropna=False)} trailing buckets")
+    keys = labels.astype(str).str.strip()
+    grouped = values.groupby(keys, sort=False).agg(aggregation)
+    return grouped.index.astype(str).tolist(), grouped.to_numpy(dtype=float).tolist()
+
+
+def _month_of_year_series(series: ChartSeries, labels: pd.Series, values: pd.Series, aggregation: str) -> None:
+    months = pd.Series(month_numbers(labels), index=labels.index)
+    valid = months.notna()
+    grouped = values[valid].groupby(months[valid]).agg(aggregation).sort_index()
+    extra_labels, extra_values = _unparsed_buckets(labels[~valid], values[~valid], aggregation, "month_of_year")
+    series.labels = MONTH_NAMES[grouped.index.to_numpy(dtype=int) - 1].tolist() + extra_labels
+    series.values = grouped.to_numpy(dtype=float).tolist() + extra_values
+    series.time_grouping = "month"
+
+
+def _time_bucket_series(series: ChartSeries, labels: pd.Series, values: pd.Series, time_format: str,
+                        chart_analysis: Dict[str, Any], aggregation: str) -> None:
+    timestamps = parse_time_column(labels, time_format)
+    valid = timestamps.notna()
+    extra_labels, extra_values = _unparsed_buckets(labels[~valid], values[~valid], aggregation, time_format)
+    timestamps, values = timestamps[valid], values[valid]
+
+    grouping = effective_grouping(time_format, chart_analysis.get("time_grouping"))
+    periods = timestamps.dt.to_period(PERIOD_FREQ[grouping])
+    grouped = values.groupby(periods).agg(aggregation).sort_index()
+    starts = pd.Series(grouped.index.to_timestamp(how="start"))
+    positions = starts.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    # Unparsed buckets sort last, like UNPARSED_SORT_KEY; they sit just after the last time bucket on the x axis
+    last = positions[-1] if len(positions) else 0
+    series.labels = format_time_buckets(starts, grouping).tolist() + extra_labels
+    series.values = grouped.to_numpy(dtype=float).tolist() + extra_values
+    series.time_grouping = grouping
+    series.positions = np.concatenate([positions, last + np.arange(1, len(extra_labels) + 1, dtype=np.int64)])
+
+
+def _category_series(series: ChartSeries, labels: pd.Series, values: pd.Series, aggregation: str,
+                     labels_are_years: bool) -> None:
+    keys = labels.astype(str).str.strip()
+    missing = labels.isna() | (keys == "")
+    if missing.any():
+        placeholders = "Item" + pd.Series(np.arange(1, len(keys) + 1), index=keys.index).astype(str)
+        keys = keys.where(~missing, placeholders)
+    grouped = values.groupby(keys, sort=False).agg(aggregation)
+    if labels_are_years:
+        years = pd.to_numeric(grouped.index.str.extract(r'(\d{4})', expand=False), errors="coerce")
+        grouped = grouped.iloc[np.argsort(years.to_numpy(), kind="stable")]
+    else:
+        grouped = grouped.sort_values(ascending=False, kind="stable")
+    series.labels = grouped.index.astype(str).tolist()
+    series.values = grouped.to_numpy(dtype=float).tolist()
+
+
+def _downsample(series: ChartSeries, chart_type: str, max_points: int) -> None:
+    if max_points <= 0 or len(series.values) <= max_points:
+        return
+    y = np.asarray(series.values, dtype=float)
+    x = series.positions if series.positions is not None else np.arange(len(y))
+    if chart_type == "line":
+        keep = lttb_indices(x, y, max_points)
+    else:
+        keep = minmax_indices(y, max_points)
+    series.labels = [series.labels[i] for i in keep]
+    series.values = y[keep].tolist()
+    series.downsampled = True
+
+
+# ==================== Rule-based chart spec inference ====================
+
+# Whole words only: "online", "pieces" or "barcode" do not ask for a chart type
+_EXPLICIT_CHART_TYPES = {
+    chart_type: re.compile(rf"\b{chart_type}s?\s*(?:chart|graph|plot)?s?\b") for chart_type in ("pie", "line", "bar")
+}
+
+
+def _explicit_chart_type(user_input_lower: str) -> Optional[str]:
+    for chart_type, pattern in _EXPLICIT_CHART_TYPES.items():
+        if pattern.search(user_input_lower):
+            return chart_type
+    return None
+
+
+def _humanize(column: Optional[str]) -> str:
+    return str(column or "").replace("_", " ").strip().title()
+
+
+def infer_chart_spec(data: Dict[str, Any], user_input: str = "") -> Dict[str, Any]:
+    """
+    Infer chart type and label/value fields from column dtypes without an LLM.
+
+    Rules: a date-like label column gives a line chart; one category plus one
+    measure with distribution intent gives a pie; anything else is a bar.
+    The returned dict has the chart_analysis fields used by the chart
+    pipeline plus a confidence in [0, 1] and the reason for the decision.
+    """
+    user_input_lower = (user_input or "").lower()
+    sample = to_frame(data, limit=SELECTION_SAMPLE_ROWS)
+    spec: Dict[str, Any] = {"chart_type": "bar", "confidence": 0.0, "reason": "no data",
+                            "is_time_series": False, "time_grouping": "none", "aggregation_method": "sum"}
+    if sample.empty or sample.shape[1] < 2:
+        return spec
+
+    time_intent = any(kw in user_input_lower for kw in TIME_KEYWORDS)
+    distribution_intent = any(kw in user_input_lower for kw in DISTRIBUTION_KEYWORDS)
+    explicit_type = _explicit_chart_type(user_input_lower)
+
+    label_column, value_column = select_columns(sample, {}, time_intent or explicit_type == "line")
+    numeric_columns = [c for c in sample.columns if numeric_ratio(sample[c]) > 0.5]
+    measures = [c for c in numeric_columns if c != label_column]
+    if label_column is None or value_column not in measures:
+        spec["reason"] = "no numeric measure column"
+        return spec
+
+    spec.update({
+        "data_field_for_labels": label_column,
+        "data_field_for_values": value_column,
+        "x_axis_label": _humanize(label_column),
+        "y_axis_label": _humanize(value_column),
+    })
+
+    time_format = detect_time_format(sample[label_column], allow_ambiguous=time_intent)
+    dimensions = [c for c in sample.columns if c not in numeric_columns]
+    # Several measures or several dimensions leave the field choice open
+    confidence = 0.9 if len(measures) == 1 and len(dimensions) <= 1 else 0.75 if len(measures) <= 2 else 0.5
+
+    # Time series stay line charts even when a pie is requested, as in the LLM path
+    if time_format:
+        requested = next((grouping for word, grouping in (("daily", "day"), ("weekly", "week"), ("monthly", "month"),
+                                                          ("quarter", "quarter"), ("yearly", "year"), ("annual", "year"))
+                          if word in user_input_lower), "none")
+        spec.update({
+            "chart_type": "bar" if explicit_type == "bar" else "line",
+            "is_time_series": True,
+            "time_grouping": requested,
+            "title": f"{_humanize(value_column)} Trend",
+            "reason": f"date-like label column ({time_format})",
+        })
+        # Ambiguous formats (bare years / month numbers) were only accepted with time intent
+        spec["confidence"] = confidence if time_format not in ("year", "month_of_year") else min(confidence, 0.8)
+        return spec
+
+    if explicit_type == "pie" or (distribution_intent and len(measures) == 1 and len(dimensions) <= 1):
+        spec.update({
+            "chart_type": "pie",
+            "title": f"{_humanize(value_column)} Distribution by {_humanize(label_column)}",
+            "reason": "one category and one measure with distribution intent",
+            "confidence": confidence,
+        })
+        return spec
+
+    spec.update({
+        "chart_type": explicit_type or "bar",
+        "title": f"{_humanize(value_column)} by {_humanize(label_column)}",
+        "reason": "category comparison",
+        # Without an explicit request or a clear single measure the LLM may know better
+        "confidence": confidence if explicit_type else min(confidence, 0.8),
+    })
+    return spec
@@ -13,22 +13,25 @@ import requests
 from langgraph.graph import StateGraph
 from langchain_community.utilities import SQLDatabase
 
-# Import databricks-sqlalchemy to register SQLAlchemy dialect for Databricks
-# This must be imported before sqlalchemy.create_engine is called
-try:
-    from databricks.sqlalchemy import base  # noqa: F401
-except ImportError:
-    pass  # databricks-sqlalchemy is optional if not using Databricks
-
-# Also import databricks.sql for fallback direct connection
-try:
-    import databricks.sql  # noqa: F401
-except ImportError:
-    pass  # databricks-sql-connector is optional if not using Databricks
-
-# Import smart SQLDatabase factory that uses SQLAlchemy dialect for Databricks
+# Import smart SQLDatabase factory (registers the Databricks SQLAlchemy dialect on first Databricks connection)
 from ..utils.databricks_adapter import create_sql_database
-from ..agents.intelligent_agent import llm, perform_rag_query, get_answer_from_sqltable_datasource, get_query_from_sqltable_datasource
+from ..utils.execution_state_store import get_execution_state_store
+from ..utils.hitl_checkpointer import hitl_checkpointer
+from ..utils.metrics import CHART_SPEC_DECISIONS, NODE_DURATION, record_sql_result_rows
+from ..utils.tracing import traced_node, traced_execution
+from ..utils.table_index import get_dbt_table_index, get_erp_table_index
+from .chart_data import SELECTION_SAMPLE_ROWS, build_chart_series, infer_chart_spec, numeric_ratio, to_frame
+from .time_axis import chronological_order
+from ..prompts.prompt_builder import PromptBuilder, get_token_counter, summarize_table
+from ..prompts.final_answer import FINAL_ANSWER_INSTRUCTIONS
+from ..prompts.sql_agent import SQL_AGENT_GUIDANCE, build_sql_agent_tables_context
+from ..prompts.chart_analysis import CHART_ANALYSIS_RULES
+from ..models.llm_factory import cache_breakpoint, with_cached_prefix
+from .state_deltas import (
+    declares_changes, declares_inputs, register_node_changes, extract_node_delta, apply_node_delta,
+    build_node_event_data, node_input_fingerprint, NODE_CHANGED_KEYS, NODE_INPUT_KEYS,
+)
+from ..agents.intelligent_agent import get_agent_llm, perform_rag_query, get_answer_from_sqltable_datasource, get_query_from_sqltable_datasource
 # re is already imported at line 8, no need to import again
 import difflib
 from ..models.data_models import WorkflowEvent, WorkflowEventType, NodeStatus, DataSourceType
@@ -127,6 +130,7 @@ async def stream_llm_response(prompt: str, execution_id: str, node_id: str = "ll
     Returns:
         Complete response text
     """
+    llm = get_agent_llm()
     from ..websocket.websocket_manager import websocket_manager
     
     if not llm:
@@ -414,8 +418,12 @@ def _extract_content(response) -> str:
     else:
         return str(response).strip()
 
+@traced_node
+@declares_changes("need_sql_agent", "router_reasoning", "node_outputs")
+@declares_inputs("user_input", "rag_answer", "reranked_documents")
 def router_node(state: GraphState) -> GraphState:
     """Router Node: Determine whether to trigger SQL-Agent"""
+    llm = get_agent_llm()
     user_input = state["user_input"]
     rag_answer = state.get("rag_answer", "")
     reranked_documents = state.get("reranked_documents", [])
@@ -641,67 +649,39 @@ def _parse_json_response(response) -> dict:
         return {"need_sql": False, "reasoning": "Failed to parse response"}
 
 
-def extract_table_names_from_rag(rag_answer: str, user_input: str) -> List[str]:
-    """Extract relevant table names from RAG answer and user input"""
-    import re
-    
-    # Common table names in the system
-    known_tables = [
-        'customers', 'products', 'orders', 'sales', 'inventory',
-        'dim_customer', 'dim_product', 'dwd_sales_detail', 'dwd_inventory_detail',
-        'dws_sales_cube', 'dws_inventory_cube'
-    ]
-    
-    # Extract table names from RAG answer and user input
-    text_to_search = f"{rag_answer} {user_input}".lower()
-    relevant_tables = []
-    
-    for table in known_tables:
-        if table.lower() in text_to_search:
-            relevant_tables.append(table)
-    
-    # Additional pattern matching for table references
-    table_patterns = [
-        r'\b(sales?|sale)\b',
-        r'\b(product|products?)\b', 
-        r'\b(customer|customers?)\b',
-        r'\b(order|orders?)\b',
-        r'\b(inventory|stock)\b'
-    ]
-    
-    for pattern in table_patterns:
-        if re.search(pattern, text_to_search):
-            # Map patterns to actual table names
-            if 'sales' in pattern or 'sale' in pattern:
-                if 'dws_sales_cube' not in relevant_tables:
-                    relevant_tables.append('dws_sales_cube')
-                if 'sales' not in relevant_tables:
-                    relevant_tables.append('sales')
-            elif 'product' in pattern:
-                if 'dim_product' not in relevant_tables:
-                    relevant_tables.append('dim_product')
-                if 'products' not in relevant_tables:
-                    relevant_tables.append('products')
-            elif 'customer' in pattern:
-                if 'dim_customer' not in relevant_tables:
-                    relevant_tables.append('dim_customer')
-                if 'customers' not in relevant_tables:
-                    relevant_tables.append('customers')
-            elif 'order' in pattern:
-                if 'orders' not in relevant_tables:
-                    relevant_tables.append('orders')
-            elif 'inventory' in pattern or 'stock' in pattern:
-                if 'dws_inventory_cube' not in relevant_tables:
-                    relevant_tables.append('dws_inventory_cube')
-                if 'inventory' not in relevant_tables:
-                    relevant_tables.append('inventory')
-    
+def extract_table_names_from_rag(rag_answer: str, user_input: str, datasource_type: Optional[str] = None) -> List[str]:
+    """
+    Extract relevant table names from RAG answer and user input
+
+    Tables named or described (synonyms) in the text are looked up in the table index,
+    followed by the tables they are built from: the built-in ERP index for the DEFAULT
+    datasource, the dbt table index (data_warehouse/dbt/rag_docs/table_index.json) otherwise.
+    Without a dbt index no tables are returned for other datasources (their schema is explored),
+    since ERP table names do not exist there.
+    """
+    if datasource_type == DataSourceType.DEFAULT.value:
+        index = get_erp_table_index()
+    else:
+        index = get_dbt_table_index()
+        if not len(index):
+            logger.info("dbt table index is empty or missing, not restricting tables")
+            return []
+
+    relevant_tables = index.resolve(f"{rag_answer} {user_input}")
     logger.info(f"Extracted relevant tables from RAG: {relevant_tables}")
     return relevant_tables
 
 
+@traced_node
+@declares_changes(
+    "sql_agent_answer", "executed_sqls", "agent_intermediate_steps", "sql_execution_success",
+    "structured_data", "chart_suitable", "chart_error", "sql_error", "react_mode_used",
+    "react_fallback_reason", "error", "node_outputs"
+)
+@declares_inputs("user_input", "datasource", "rag_answer")
 async def sql_agent_node(state: GraphState) -> GraphState:
     """SQL Agent Node: Use ReAct mode to autonomously explore database"""
+    llm = get_agent_llm()
     user_input = state["user_input"]
     rag_answer = state.get("rag_answer", "")
     datasource = state["datasource"]
@@ -714,7 +694,7 @@ async def sql_agent_node(state: GraphState) -> GraphState:
     
     try:
         # 1. Extract relevant table names from RAG answer
-        relevant_tables = extract_table_names_from_rag(rag_answer, user_input)
+        relevant_tables = extract_table_names_from_rag(rag_answer, user_input, datasource.get('type'))
         
         # 2. Initialize database connection with table restrictions
         if datasource['type'] == DataSourceType.DEFAULT.value:
@@ -867,6 +847,7 @@ async def sql_agent_node(state: GraphState) -> GraphState:
         if llm:
             try:
                 from langchain_community.agent_toolkits import create_sql_agent
+                from langchain_community.agent_toolkits.sql.prompt import SQL_PREFIX, SQL_SUFFIX
                 from langchain.agents import AgentType
                 
                 # Create callback for streaming ReAct steps
@@ -874,10 +855,15 @@ async def sql_agent_node(state: GraphState) -> GraphState:
                 
                 # Try to create SQL agent with ReAct mode
                 logger.info("Attempting to create SQL agent with ReAct mode...")
+                # Static parts first (prefix, guidance, tools, format instructions) so the
+                # provider can cache them; the breakpoint ends the cacheable prefix
+                agent_prefix = f"{SQL_PREFIX}\n{SQL_AGENT_GUIDANCE}" if is_databricks else SQL_PREFIX
                 agent = create_sql_agent(
                     llm=llm,
                     db=db,
                     agent_type=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+                    prefix=agent_prefix,
+                    suffix=f"{cache_breakpoint(llm)}{SQL_SUFFIX}",
                     verbose=True,
                     callbacks=[react_callback]
                 )
@@ -899,95 +885,13 @@ async def sql_agent_node(state: GraphState) -> GraphState:
                 # Build input with context and guidance
                 # Add guidance about using marts layer for statistics and RAG for metadata
                 guidance = ""
-                available_tables_info = ""
                 if is_databricks:
-                    # Build available tables information from pre-discovered tables
-                    if all_discovered_tables:
-                        available_tables_info = f"\n\nAVAILABLE TABLES (discovered from schema '{target_schema}'):\n"
-                        # Group by schema for better readability
-                        for schema, tables in all_tables_by_schema.items():
-                            available_tables_info += f"  {schema} schema: {', '.join([t.split('.')[-1] for t in tables])}\n"
-                        available_tables_info += f"\nTotal: {len(all_discovered_tables)} tables from schema '{target_schema}'\n"
-                        
-                        if marts_tables_detected:
-                            available_tables_info += f"\n⚠️  IMPORTANT - MARTS LAYER TABLES (preferred for statistics):\n"
-                            for marts_table in marts_tables_detected:
-                                available_tables_info += f"  - {marts_table}\n"
-                    
-                    guidance = f"""
-IMPORTANT GUIDANCE FOR SQL QUERY GENERATION:
-
-📊 DATA WAREHOUSE ARCHITECTURE (Kimball/Medallion Design):
-This database follows a layered data warehouse architecture with table name prefixes indicating data layers:
-
-LAYER 1 - src_* (Source Layer):
-   - Raw data from source systems (Airbyte ETL)
-   - Use: Rarely in analytics, mainly for data quality checks
-   - Examples: src_users, src_transactions, src_stations
-
-LAYER 2 - stg_* (Staging Layer):
-   - Cleaned and validated data
-   - Use: For custom joins when mart_* doesn't exist, building custom aggregations
-   - Examples: stg_users, stg_transactions, stg_stations
-
-LAYER 3 - dim_* (Dimension Layer):
-   - Master reference data with surrogate keys
-   - Use: When need dimension attributes (user info, station details, route info, time attributes)
-   - Examples: dim_user, dim_station, dim_route, dim_time
-   - Key: Contains *_key (surrogate key) and descriptive attributes
-
-LAYER 4 - fact_* (Fact Layer):
-   - Transactional fact tables with measures
-   - Use: Only when mart_* tables don't provide required detail or granularity
-   - Examples: fact_transactions, fact_topups
-   - Key: Contains dimension keys and measures (amount, count, etc.)
-
-LAYER 5 - mart_* (Marts Layer) - ⭐ STRONGLY PREFERRED:
-   - Pre-aggregated analytical tables optimized for reporting
-   - Use: MANDATORY for ALL statistical, metric, trend, and aggregation queries
-   - Examples: mart_daily_active_users, mart_daily_topup_summary, mart_station_flow_daily
-   - Benefits: Pre-computed, faster, optimized for analytics
-
-QUERY TYPE TO TABLE SELECTION GUIDE:
-- Statistical queries (counts, sums, averages) → mart_* (MANDATORY)
-- Time series trends (daily, monthly, yearly) → mart_* (MANDATORY)
-- Category/group comparisons → mart_* (MANDATORY)
-- Station/route rankings → mart_station_flow_daily, mart_route_usage_summary (MANDATORY)
-- User distributions → mart_user_card_type_summary (MANDATORY)
-- Detailed transaction records → fact_* (only if mart_* insufficient)
-- Dimension attributes → dim_* (for descriptive data)
-- Raw source data → src_* (rarely needed)
-- Cleaned data for custom logic → stg_* (use sparingly)
-
-1. STATISTICAL/METRIC/TREND QUERIES - ALWAYS use mart_* tables (MANDATORY for data warehouse design):
-   - For ANY aggregated statistics, metrics, summaries, trends, or pre-calculated data, MANDATORY to use mart_* tables in public schema
-   - The mart_* tables follow Kimball/Medallion Architecture data warehouse design patterns and contain pre-aggregated metrics optimized for analytical queries
-   - Design principle: mart_* tables are specifically designed for reporting and analytics, containing daily/weekly/monthly summaries, aggregations, and business metrics
-   - When querying for statistics (counts, sums, averages, trends, comparisons), ALWAYS look for mart_* tables first (e.g., public.mart_daily_active_users, public.mart_daily_topup_summary)
-   - NEVER aggregate from fact_*/dim_* tables when equivalent mart_* tables exist - mart_* tables are pre-computed, more efficient, and follow best practices
-   - Only use fact_*/dim_* tables when mart_* tables don't provide the required granularity or specific metrics
-   {"   - Available mart_* tables: " + ", ".join(marts_tables_detected) + " - Use these for ALL statistical queries!" if marts_tables_detected else ""}
-
-2. METADATA INFORMATION - Use RAG knowledge base first:
-   - For table structures, column definitions, business rules, and data relationships, FIRST check the background knowledge from RAG
-   - The RAG knowledge base contains metadata documentation about tables, schemas, and business logic
-   - Only if RAG doesn't provide sufficient information, use SQL-Agent's ReAct tools to explore the database schema
-   - Use tools like sql_db_list_tables and sql_db_schema to discover table structures when RAG metadata is insufficient
-   - NOTE: The sql_db_list_tables tool may only show tables from the default schema. Use the AVAILABLE TABLES list below to see all tables from the specified schema (default: public).
-
-3. DATA EXPLORATION PRIORITY:
-   - Step 1: Check RAG background knowledge for metadata and table information
-   - Step 2: Check the AVAILABLE TABLES list below to see all available tables (all tables are in public schema)
-   - Step 3: For statistical/metric/trend queries, MANDATORY to use mart_* tables (e.g., public.mart_daily_active_users) over aggregating from fact_*/dim_* tables
-   - Step 4: Only use fact_*/dim_* tables when mart_* tables don't have the required metrics or granularity
-
-4. TABLE NAMING:
-   - All tables are in public schema. Always use public.table_name format when referencing tables (e.g., public.mart_daily_active_users, public.mart_station_flow_daily, public.fact_transactions)
-   - Use table name prefixes to identify layers: src_*, stg_*, dim_*, fact_*, mart_*
-   - For statistical queries, ALWAYS prefer mart_* tables (e.g., public.mart_daily_active_users for daily metrics, public.mart_daily_topup_summary for top-up trends)
-{available_tables_info}
-"""
-                agent_input = f"{user_input}\n\n{guidance}\nBackground knowledge from knowledge base: {rag_answer if rag_answer else '(No RAG metadata available - use ReAct tools to explore database schema)'}"
+                    # The static guidance is in the agent prefix; only the discovered tables vary per request
+                    guidance = build_sql_agent_tables_context(marts_tables_detected, all_tables_by_schema, target_schema)
+                # The tokenizer may download its BPE file on first use, so it is loaded off the event loop
+                counter = await asyncio.to_thread(get_token_counter)
+                rag_context = counter.truncate(rag_answer, Config.PROMPT_BUDGET_RAG_TOKENS) if rag_answer else ""
+                agent_input = f"{user_input}\n\n{guidance}\nBackground knowledge from knowledge base: {rag_context if rag_context else '(No RAG metadata available - use ReAct tools to explore database schema)'}"
                 
                 # Stream agent execution
                 intermediate_steps = []
@@ -1506,6 +1410,8 @@ QUERY TYPE TO TABLE SELECTION GUIDE:
                     else:
                         logger.info(f"Chart not suitable: intent={has_chart_intent}, rows={len(data_rows) if data_rows else 0}")
                 
+                record_sql_result_rows("react_agent", structured_data)
+                
                 return {
                     **state,
                     "sql_agent_answer": final_answer,
@@ -2223,6 +2129,7 @@ JOIN RESTRICTIONS:
                 logger.info(f"Chart generation not suitable: user intent={has_chart_intent}")
             
         logger.info(f"SQL Agent completed - Executed {len(executed_sqls)} queries, chart_suitable={chart_suitable}")
+        record_sql_result_rows("manual_react", structured_data)
         
         return {
             **state,
@@ -2490,8 +2397,15 @@ async def _perform_rag_guided_sql_query(user_input: str, datasource: Dict[str, A
 
 
 
+@traced_node
+@declares_changes(
+    "retrieved_documents", "reranked_documents", "rag_answer", "retrieval_success",
+    "rerank_success", "rag_success", "retrieval_error", "error", "node_outputs"
+)
+@declares_inputs("user_input", "datasource")
 async def rag_query_node(state: GraphState) -> GraphState:
     """RAG Query Node: Combined RAG retrieval, reranking, and answer generation"""
+    llm = get_agent_llm()
     user_input = state["user_input"]
     datasource = state["datasource"]
     execution_id = state.get("execution_id", "unknown")
@@ -2732,8 +2646,15 @@ async def _perform_metadata_rag_query(user_input: str, datasource: Dict[str, Any
 
 
 
+@traced_node
+@declares_changes("answer", "final_answer", "final_result", "error", "node_outputs")
+@declares_inputs(
+    "user_input", "rag_answer", "sql_agent_answer", "executed_sqls", "structured_data",
+    "chart_suitable", "chart_config"
+)
 async def llm_processing_node(state: GraphState) -> GraphState:
     """Enhanced LLM Processing Node: Integrate RAG + SQL-Agent + Chart inputs"""
+    llm = get_agent_llm()
     try:
         user_input = state["user_input"]
         execution_id = state.get("execution_id")
@@ -2747,41 +2668,43 @@ async def llm_processing_node(state: GraphState) -> GraphState:
         
         logger.info(f"LLM Processing Node - Integrating inputs: RAG={bool(rag_answer)}, SQL={bool(sql_agent_answer)}, Chart={chart_suitable}")
         
-        # Build comprehensive prompt
-        prompt_parts = []
+        # Build comprehensive prompt within the token budget
+        # The tokenizer may download its BPE file on first use, so it is loaded off the event loop
+        counter = await asyncio.to_thread(get_token_counter)
+        builder = PromptBuilder(Config.PROMPT_MAX_TOKENS, counter)
         
         # 1. Basic question
-        prompt_parts.append(f"User question: {user_input}")
+        builder.add("question", f"User question: {user_input}")
         
         # 2. RAG answer (if available)
         if rag_answer:
-            prompt_parts.append(f"Knowledge base answer: {rag_answer}")
+            builder.add("rag_answer", f"Knowledge base answer: {rag_answer}", budget=Config.PROMPT_BUDGET_RAG_TOKENS)
         
         # 3. SQL-Agent answer (if available)
         if sql_agent_answer:
-            prompt_parts.append(f"Database query results: {sql_agent_answer}")
+            builder.add("sql_answer", f"Database query results: {sql_agent_answer}", budget=Config.PROMPT_BUDGET_SQL_ANSWER_TOKENS)
             
-            # Add structured data summary
+            # Add structured data summary (columnar summary when the table is over budget)
             if structured_data:
-                data_summary = _summarize_structured_data(structured_data)
-                prompt_parts.append(f"Data summary: {data_summary}")
+                try:
+                    data_summary = summarize_table(structured_data, Config.PROMPT_BUDGET_DATA_TOKENS, counter)
+                except Exception as e:
+                    logger.warning(f"Could not summarize structured data, answering without a data summary: {e}")
+                    data_summary = None
+                if data_summary:
+                    builder.add("data_summary", f"Data summary: {data_summary}", budget=Config.PROMPT_BUDGET_DATA_TOKENS)
         
         # 4. Chart information (if available)
         if chart_suitable and chart_config:
             chart_type = chart_config.get("type", "unknown")
-            prompt_parts.append(f"Generated {chart_type} chart, please explain the chart content")
+            builder.add("chart", f"Generated {chart_type} chart, please explain the chart content")
         
         # 5. Integration instructions
-        prompt_parts.append("""
-Please generate a comprehensive, accurate, and natural answer based on the above information:
-1. Prioritize specific data from database query results
-2. Combine background information from knowledge base for explanation
-3. If there's a chart, explain what the chart shows
-4. Keep the answer concise and clear, avoid repetition
-5. If information is insufficient, please state honestly
-""")
+        builder.add("instructions", FINAL_ANSWER_INSTRUCTIONS)
         
-        final_prompt = "\n\n".join(prompt_parts)
+        final_prompt, prompt_report = builder.build()
+        section_sizes = ", ".join(f"{name}={info['used']}/{info['tokens']}" for name, info in prompt_report["sections"].items())
+        logger.info(f"Final answer prompt: {prompt_report['total_tokens']} tokens ({section_sizes})")
         
         # Generate final answer
         if llm:
@@ -2806,6 +2729,7 @@ Please generate a comprehensive, accurate, and natural answer based on the above
                     "has_rag": bool(rag_answer),
                     "has_sql": bool(sql_agent_answer),
                     "has_chart": chart_suitable,
+                    "prompt_tokens": prompt_report["total_tokens"],
                     "timestamp": time.time()
                 }
             }
@@ -2827,38 +2751,6 @@ Please generate a comprehensive, accurate, and natural answer based on the above
             }
         }
 
-def _summarize_structured_data(structured_data: Dict[str, Any]) -> str:
-    """Summarize structured data"""
-    try:
-        rows = structured_data.get("rows", [])
-        columns = structured_data.get("columns", [])
-        
-        if not rows or not columns:
-            return "No valid data"
-        
-        summary_parts = []
-        summary_parts.append(f"Data contains {len(rows)} rows, {len(columns)} columns")
-        summary_parts.append(f"Column names: {', '.join(columns)}")
-        
-        # Show first few rows of data
-        if len(rows) <= 5:
-            summary_parts.append("Complete data:")
-            for i, row in enumerate(rows):
-                row_str = ", ".join([f"{col}: {row.get(col, '')}" for col in columns])
-                summary_parts.append(f"  {i+1}. {row_str}")
-        else:
-            summary_parts.append("First 3 rows of data:")
-            for i, row in enumerate(rows[:3]):
-                row_str = ", ".join([f"{col}: {row.get(col, '')}" for col in columns])
-                summary_parts.append(f"  {i+1}. {row_str}")
-            summary_parts.append(f"  ... and {len(rows)-3} more rows")
-        
-        return "\n".join(summary_parts)
-        
-    except Exception as e:
-        logger.warning(f"Failed to summarize structured data: {e}")
-        return "Data summary generation failed"
-
 def _create_fallback_answer(rag_answer: str, sql_answer: str, has_chart: bool) -> str:
     """Create fallback answer"""
     parts = []
@@ -3159,304 +3051,186 @@ def _generate_intelligent_sql_response(user_input: str, rows: list, columns: lis
 
 # Validation and retry nodes removed - processing goes directly to end node
 
-def generate_chart_config(data: Dict[str, Any], user_input: str) -> Dict[str, Any]:
-    """Use LLM to generate chart configuration based on data and user requirements for semantic analysis"""
+def _infer_chart_analysis_with_llm(llm, data_summary: str, user_input: str) -> Optional[Dict[str, Any]]:
+    """Ask the (reasoning) LLM for the chart analysis; None when its answer cannot be parsed"""
+    # Use LLM to analyze user intent and data characteristics
+    chart_analysis_request = f"""
+    User query: "{user_input}"
+    
+    Data summary: {data_summary}
+    
+    Based on the query "{user_input}", return the complete JSON configuration:
+    """
+    
+    # Use reasoning model for chart inference
     try:
-        if not llm:
-            logger.warning("LLM not available, using fallback chart generation")
-            return generate_fallback_chart_config(data, user_input)
-        
-        # Extract data information for LLM analysis
-        data_summary = extract_data_summary(data)
-        
-        # Use LLM to analyze user intent and data characteristics
-        chart_analysis_prompt = f"""
-        User query: "{user_input}"
-        
-        Data summary: {data_summary}
-        
-        You MUST return a complete JSON configuration for the chart. Analyze the user's requirements and provide ALL required fields.
-        
-        CHART TYPE SELECTION RULES (CRITICAL):
-        1. Use "line" chart for:
-           - Time series data (trends over time)
-           - Queries containing: "trend", "monthly", "yearly", "daily", "weekly", "over time", "时间", "趋势", "月度", "年度"
-           - Data showing changes over time periods (months, years, days, etc.)
-           - Sequential time-based comparisons
-           - When categories represent time periods (e.g., months: "01", "02", ..., "12")
-        
-        2. Use "pie" chart for:
-           - Proportions and distributions
-           - Queries explicitly asking for "proportion", "distribution", "percentage", "share"
-           - Comparing parts of a whole
-           - Category-based data WITHOUT time dimension
-        
-        3. Use "bar" chart for:
-           - Comparing categories (non-time-based)
-           - Ranking and comparisons
-           - When neither trend nor proportion is the focus
-        
-        TIME SERIES DETECTION:
-        - If query contains "trend", "monthly", "yearly", "daily", "weekly", "over time", "时间", "趋势", "月度", "年度"
-        - OR if data has time-based categories (months: "01"-"12", years: "2025", dates: "2025-01-15", etc.)
-        - THEN set is_time_series: true, time_grouping: "month"/"year"/"day" as appropriate, chart_type: "line"
-        
-        Example 1 - TIME SERIES (Monthly transaction trend from mart_daily_active_users):
-        Query: "Show monthly transaction amount trend for 2025"
-        SQL: SELECT DATE_FORMAT(date, 'yyyy-MM') as Month, SUM(total_amount) as Total_Amount FROM public.mart_daily_active_users WHERE EXTRACT(YEAR FROM date) = 2025 GROUP BY Month ORDER BY Month
-        Data columns: Month (string), Total_Amount (numeric)
-        Chart config:
-        {{
-            "chart_type": "line",
-            "title": "Monthly Transaction Amount Trend (2025)",
-            "x_axis_label": "Month",
-            "y_axis_label": "Total Transaction Amount (¥)",
-            "data_field_for_labels": "Month",
-            "data_field_for_values": "Total_Amount",
-            "aggregation_method": "none",
-            "time_grouping": "month",
-            "is_time_series": true
-        }}
-        
-        Example 2 - TIME SERIES (Daily active users from mart_daily_active_users):
-        Query: "Show daily active users for November 2025"
-        SQL: SELECT date, active_users, total_transactions, total_amount FROM public.mart_daily_active_users WHERE date >= '2025-11-01' AND date <= '2025-11-30' ORDER BY date
-        Data columns: date (date), active_users (integer), total_transactions (integer), total_amount (numeric)
-        Chart config:
-        {{
-            "chart_type": "line",
-            "title": "Daily Active Users Trend (November 2025)",
-            "x_axis_label": "Date",
-            "y_axis_label": "Active Users",
-            "data_field_for_labels": "date",
-            "data_field_for_values": "active_users",
-            "aggregation_method": "none",
-            "time_grouping": "day",
-            "is_time_series": true
-        }}
-        
-        Example 3 - PROPORTION (Card type distribution from mart_user_card_type_summary):
-        Query: "Show user distribution by card type"
-        SQL: SELECT card_type, total_users, total_transaction_amount FROM public.mart_user_card_type_summary ORDER BY total_users DESC
-        Data columns: card_type (string), total_users (integer), total_transaction_amount (numeric)
-        Chart config:
-        {{
-            "chart_type": "pie",
-            "title": "User Distribution by Card Type",
-            "x_axis_label": "Card Type",
-            "y_axis_label": "Total Users",
-            "data_field_for_labels": "card_type",
-            "data_field_for_values": "total_users",
-            "aggregation_method": "none",
-            "time_grouping": "none",
-            "is_time_series": false
-        }}
-        
-        Example 4 - BAR CHART (Top stations from mart_station_flow_daily):
-        Query: "Show top 10 stations by transaction volume"
-        SQL: SELECT station_name, SUM(total_transactions) as Total_Transactions FROM public.mart_station_flow_daily WHERE date >= '2025-11-01' GROUP BY station_name ORDER BY Total_Transactions DESC LIMIT 10
-        Data columns: station_name (string), Total_Transactions (integer)
-        Chart config:
-        {{
-            "chart_type": "bar",
-            "title": "Top 10 Stations by Transaction Volume",
-            "x_axis_label": "Station Name",
-            "y_axis_label": "Total Transactions",
-            "data_field_for_labels": "station_name",
-            "data_field_for_values": "Total_Transactions",
-            "aggregation_method": "none",
-            "time_grouping": "none",
-            "is_time_series": false
-        }}
-        
-        Example 5 - TIME SERIES (Monthly top-up trend from mart_daily_topup_summary):
-        Query: "Show monthly top-up amount trend"
-        SQL: SELECT DATE_FORMAT(date, 'yyyy-MM') as Month, SUM(total_amount) as Total_Topup_Amount, SUM(total_topups) as Total_Topups FROM public.mart_daily_topup_summary WHERE EXTRACT(YEAR FROM date) = 2025 GROUP BY Month ORDER BY Month
-        Data columns: Month (string), Total_Topup_Amount (numeric), Total_Topups (integer)
-        Chart config:
-        {{
-            "chart_type": "line",
-            "title": "Monthly Top-up Amount Trend (2025)",
-            "x_axis_label": "Month",
-            "y_axis_label": "Total Top-up Amount (¥)",
-            "data_field_for_labels": "Month",
-            "data_field_for_values": "Total_Topup_Amount",
-            "aggregation_method": "none",
-            "time_grouping": "month",
-            "is_time_series": true
-        }}
-        
-        Example 6 - BAR CHART (Route usage from mart_route_usage_summary):
-        Query: "Show top routes by usage"
-        SQL: SELECT route_name, total_transactions, unique_users, total_amount FROM public.mart_route_usage_summary ORDER BY total_transactions DESC LIMIT 10
-        Data columns: route_name (string), total_transactions (integer), unique_users (integer), total_amount (numeric)
-        Chart config:
-        {{
-            "chart_type": "bar",
-            "title": "Top 10 Routes by Transaction Volume",
-            "x_axis_label": "Route Name",
-            "y_axis_label": "Total Transactions",
-            "data_field_for_labels": "route_name",
-            "data_field_for_values": "total_transactions",
-            "aggregation_method": "none",
-            "time_grouping": "none",
-            "is_time_series": false
-        }}
-        
-        IMPORTANT: 
-        1. Always provide a meaningful title based on the query - NEVER leave title empty
-        2. Title should be descriptive and include relevant time periods if mentioned
-        3. For time series queries, use chart_type: "line" and set is_time_series: true
-        4. For sales data, use y_axis_label: "Sales Revenue ($)" or "Sales Amount ($)"
-        5. For time series, use x_axis_label: "Month", "Year", "Date", etc.
-        6. Return ONLY valid JSON, no additional text
-        
-        Based on the query "{user_input}", return the complete JSON configuration:
-        """
+        from ..models.llm_factory import get_reasoning_llm
+        reasoning_llm = get_reasoning_llm()
+        response = reasoning_llm.invoke(with_cached_prefix(reasoning_llm, CHART_ANALYSIS_RULES, chart_analysis_request))
+    except Exception:
+        # Fallback to default chat model
+        response = llm.invoke(with_cached_prefix(llm, CHART_ANALYSIS_RULES, chart_analysis_request))
+    
+    # Process LLM response
+    if hasattr(response, 'content'):
+        analysis_text = response.content
+    elif isinstance(response, str):
+        analysis_text = response
+    else:
+        analysis_text = str(response)
+    
+    # Parse JSON configuration returned by LLM
+    try:
+        import json
+        import re
         
-        # Use reasoning model for chart inference
-        try:
-            from ..models.llm_factory import get_reasoning_llm
-            reasoning_llm = get_reasoning_llm()
-            response = reasoning_llm.invoke(chart_analysis_prompt)
-        except Exception:
-            # Fallback to default chat model
-            response = llm.invoke(chart_analysis_prompt)
+        # Try multiple JSON extraction methods
+        chart_analysis = None
         
-        # Process LLM response
-        if hasattr(response, 'content'):
-            analysis_text = response.content
-        elif isinstance(response, str):
-            analysis_text = response
-        else:
-            analysis_text = str(response)
+        # Method 1: Look for complete JSON object
+        json_match = re.search(r'\{.*\}', analysis_text, re.DOTALL)
+        if json_match:
+            try:
+                chart_analysis = json.loads(json_match.group())
+            except json.JSONDecodeError:
+                pass
         
-        # Parse JSON configuration returned by LLM
-        try:
-            import json
-            import re
-            
-            # Try multiple JSON extraction methods
-            chart_analysis = None
-            
-            # Method 1: Look for complete JSON object
-            json_match = re.search(r'\{.*\}', analysis_text, re.DOTALL)
-            if json_match:
+        # Method 2: Look for JSON with code block markers
+        if not chart_analysis:
+            code_block_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', analysis_text, re.DOTALL)
+            if code_block_match:
                 try:
-                    chart_analysis = json.loads(json_match.group())
+                    chart_analysis = json.loads(code_block_match.group(1))
                 except json.JSONDecodeError:
                     pass
+        
+        # Method 3: Try to extract individual fields
+        if not chart_analysis:
+            chart_analysis = {}
+            # Extract chart_type
+            chart_type_match = re.search(r'"chart_type":\s*"([^"]+)"', analysis_text)
+            if chart_type_match:
+                chart_analysis["chart_type"] = chart_type_match.group(1)
             
-            # Method 2: Look for JSON with code block markers
-            if not chart_analysis:
-                code_block_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', analysis_text, re.DOTALL)
-                if code_block_match:
-                    try:
-                        chart_analysis = json.loads(code_block_match.group(1))
-                    except json.JSONDecodeError:
-                        pass
+            # Extract title
+            title_match = re.search(r'"title":\s*"([^"]+)"', analysis_text)
+            if title_match:
+                chart_analysis["title"] = title_match.group(1)
             
-            # Method 3: Try to extract individual fields
-            if not chart_analysis:
-                chart_analysis = {}
-                # Extract chart_type
-                chart_type_match = re.search(r'"chart_type":\s*"([^"]+)"', analysis_text)
-                if chart_type_match:
-                    chart_analysis["chart_type"] = chart_type_match.group(1)
-                
-                # Extract title
-                title_match = re.search(r'"title":\s*"([^"]+)"', analysis_text)
-                if title_match:
-                    chart_analysis["title"] = title_match.group(1)
-                
-                # Extract other fields similarly
-                y_axis_match = re.search(r'"y_axis_label":\s*"([^"]+)"', analysis_text)
-                if y_axis_match:
-                    chart_analysis["y_axis_label"] = y_axis_match.group(1)
-                
-                x_axis_match = re.search(r'"x_axis_label":\s*"([^"]+)"', analysis_text)
-                if x_axis_match:
-                    chart_analysis["x_axis_label"] = x_axis_match.group(1)
-                
-                # Extract aggregation method
-                agg_match = re.search(r'"aggregation_method":\s*"([^"]+)"', analysis_text)
-                if agg_match:
-                    chart_analysis["aggregation_method"] = agg_match.group(1)
-                
-                # Extract time grouping
-                time_match = re.search(r'"time_grouping":\s*"([^"]+)"', analysis_text)
-                if time_match:
-                    chart_analysis["time_grouping"] = time_match.group(1)
-                
-                # Extract is_time_series
-                time_series_match = re.search(r'"is_time_series":\s*(true|false)', analysis_text)
-                if time_series_match:
-                    chart_analysis["is_time_series"] = time_series_match.group(1).lower() == 'true'
-                
-                # If we found at least chart_type, consider it valid
-                if chart_analysis.get("chart_type"):
-                    logger.info(f"Successfully extracted chart analysis: {chart_analysis}")
-                else:
-                    raise ValueError("No valid chart configuration found")
+            # Extract other fields similarly
+            y_axis_match = re.search(r'"y_axis_label":\s*"([^"]+)"', analysis_text)
+            if y_axis_match:
+                chart_analysis["y_axis_label"] = y_axis_match.group(1)
+            
+            x_axis_match = re.search(r'"x_axis_label":\s*"([^"]+)"', analysis_text)
+            if x_axis_match:
+                chart_analysis["x_axis_label"] = x_axis_match.group(1)
+            
+            # Extract aggregation method
+            agg_match = re.search(r'"aggregation_method":\s*"([^"]+)"', analysis_text)
+            if agg_match:
+                chart_analysis["aggregation_method"] = agg_match.group(1)
             
-            if not chart_analysis:
+            # Extract time grouping
+            time_match = re.search(r'"time_grouping":\s*"([^"]+)"', analysis_text)
+            if time_match:
+                chart_analysis["time_grouping"] = time_match.group(1)
+            
+            # Extract is_time_series
+            time_series_match = re.search(r'"is_time_series":\s*(true|false)', analysis_text)
+            if time_series_match:
+                chart_analysis["is_time_series"] = time_series_match.group(1).lower() == 'true'
+            
+            # If we found at least chart_type, consider it valid
+            if chart_analysis.get("chart_type"):
+                logger.info(f"Successfully extracted chart analysis: {chart_analysis}")
+            else:
                 raise ValueError("No valid chart configuration found")
-                
-        except (json.JSONDecodeError, AttributeError, ValueError) as e:
-            logger.warning(f"Failed to parse LLM chart analysis: {e}, using fallback")
-            return generate_fallback_chart_config(data, user_input)
         
-        # Generate chart configuration based on LLM analysis results
-        # Fallback chart type detection if LLM didn't specify correctly
+        if not chart_analysis:
+            raise ValueError("No valid chart configuration found")
+            
+    except (json.JSONDecodeError, AttributeError, ValueError) as e:
+        logger.warning(f"Failed to parse LLM chart analysis: {e}, using fallback")
+        return None
+
+    return chart_analysis
+
+def generate_chart_config(data: Dict[str, Any], user_input: str) -> Dict[str, Any]:
+    """Generate chart configuration from rule-based inference, consulting the LLM only when the data shape is ambiguous"""
+    llm = get_agent_llm()
+    try:
+        data_summary = None
+        
+        # Most result shapes are obvious from column dtypes; skip the LLM round trip for those
+        chart_analysis = infer_chart_spec(data, user_input)
+        decided_by_rules = chart_analysis["confidence"] >= Config.CHART_RULE_MIN_CONFIDENCE
+        if decided_by_rules:
+            logger.info(f"Chart spec inferred by rules: {chart_analysis['chart_type']} "
+                        f"(confidence {chart_analysis['confidence']:.2f}, {chart_analysis['reason']})")
+        else:
+            if not llm:
+                logger.warning("LLM not available, using fallback chart generation")
+                return _fallback_chart_config(data, user_input, "fallback")
+            logger.info(f"Chart spec rule confidence {chart_analysis['confidence']:.2f} is low "
+                        f"({chart_analysis['reason']}), consulting LLM")
+            data_summary = extract_data_summary(data)
+            chart_analysis = _infer_chart_analysis_with_llm(llm, data_summary, user_input)
+            if chart_analysis is None:
+                return _fallback_chart_config(data, user_input, "fallback")
+        
+        # Generate chart configuration based on the analysis results
+        # Fallback chart type detection if LLM didn't specify correctly (rule decisions already account for it)
         detected_type = chart_analysis.get("chart_type", "bar")
         user_input_lower = user_input.lower()
         
-        # Check if this is a time series query (trend, monthly, yearly, etc.)
-        is_time_series_query = any(kw in user_input_lower for kw in [
-            'trend', 'monthly', 'yearly', 'daily', 'weekly', 'over time', 
-            '时间', '趋势', '月度', '年度', '日期', '天', '周'
-        ])
-        
-        # Check if data indicates time series (categories are months, years, dates)
-        data_summary_lower = (data_summary or "").lower()
-        has_time_categories = any(indicator in data_summary_lower for indicator in [
-            'month', 'year', 'date', '01', '02', '03', '12', '2025', '2024'
-        ])
-        
-        # Priority-based chart type detection
-        if "pie chart" in user_input_lower or "pie" in user_input_lower:
-            # Only use pie if explicitly requested AND not a time series query
-            if not is_time_series_query and not has_time_categories:
-                detected_type = "pie"
-            else:
-                detected_type = "line"  # Override to line for time series
-                logger.info("Overriding pie chart to line chart for time series query")
-        elif "line chart" in user_input_lower or "line" in user_input_lower:
-            detected_type = "line"
-        elif "bar chart" in user_input_lower or "bar" in user_input_lower:
-            detected_type = "bar"
-        elif is_time_series_query or has_time_categories:
-            # Force line chart for time series queries
-            detected_type = "line"
-            # Update chart_analysis to reflect time series detection
-            chart_analysis["is_time_series"] = True
-            if chart_analysis.get("time_grouping", "none") == "none":
-                # Detect time grouping from query
-                if "monthly" in user_input_lower or "month" in user_input_lower:
-                    chart_analysis["time_grouping"] = "month"
-                elif "yearly" in user_input_lower or "year" in user_input_lower:
-                    chart_analysis["time_grouping"] = "year"
-                elif "daily" in user_input_lower or "day" in user_input_lower:
-                    chart_analysis["time_grouping"] = "day"
-                elif "weekly" in user_input_lower or "week" in user_input_lower:
-                    chart_analysis["time_grouping"] = "week"
+        if not decided_by_rules:
+            # Check if this is a time series query (trend, monthly, yearly, etc.)
+            is_time_series_query = any(kw in user_input_lower for kw in [
+                'trend', 'monthly', 'yearly', 'daily', 'weekly', 'over time', 
+                '时间', '趋势', '月度', '年度', '日期', '天', '周'
+            ])
+        
+            # Check if data indicates time series (categories are months, years, dates)
+            data_summary_lower = (data_summary or "").lower()
+            has_time_categories = any(indicator in data_summary_lower for indicator in [
+                'month', 'year', 'date', '01', '02', '03', '12', '2025', '2024'
+            ])
+        
+            # Priority-based chart type detection
+            if "pie chart" in user_input_lower or "pie" in user_input_lower:
+                # Only use pie if explicitly requested AND not a time series query
+                if not is_time_series_query and not has_time_categories:
+                    detected_type = "pie"
                 else:
-                    chart_analysis["time_grouping"] = "month"  # Default for trend queries
-            logger.info(f"Detected time series query/data, forcing chart_type to 'line', time_grouping: {chart_analysis.get('time_grouping')}")
+                    detected_type = "line"  # Override to line for time series
+                    logger.info("Overriding pie chart to line chart for time series query")
+            elif "line chart" in user_input_lower or "line" in user_input_lower:
+                detected_type = "line"
+            elif "bar chart" in user_input_lower or "bar" in user_input_lower:
+                detected_type = "bar"
+            elif is_time_series_query or has_time_categories:
+                # Force line chart for time series queries
+                detected_type = "line"
+                # Update chart_analysis to reflect time series detection
+                chart_analysis["is_time_series"] = True
+                if chart_analysis.get("time_grouping", "none") == "none":
+                    # Detect time grouping from query
+                    if "monthly" in user_input_lower or "month" in user_input_lower:
+                        chart_analysis["time_grouping"] = "month"
+                    elif "yearly" in user_input_lower or "year" in user_input_lower:
+                        chart_analysis["time_grouping"] = "year"
+                    elif "daily" in user_input_lower or "day" in user_input_lower:
+                        chart_analysis["time_grouping"] = "day"
+                    elif "weekly" in user_input_lower or "week" in user_input_lower:
+                        chart_analysis["time_grouping"] = "week"
+                    else:
+                        chart_analysis["time_grouping"] = "month"  # Default for trend queries
+                logger.info(f"Detected time series query/data, forcing chart_type to 'line', time_grouping: {chart_analysis.get('time_grouping')}")
         
         # Generate intelligent chart title
         chart_title = chart_analysis.get("title", "")
-        logger.info(f"LLM provided title: '{chart_title}'")
+        logger.info(f"Analysis provided title: '{chart_title}'")
         
         if not chart_title or chart_title == "Chart title":
             # Generate title based on user input and chart type
@@ -3566,7 +3340,8 @@ def generate_chart_config(data: Dict[str, Any], user_input: str) -> Dict[str, An
             }
         }
         
-        # Process data using LLM-guided approach
+        # Process data using LLM-guided approach (downsampling/folding depend on the final chart type)
+        chart_analysis["chart_type"] = detected_type
         labels, values = extract_chart_data_with_llm_guidance(data, chart_analysis, user_input)
         
         if labels and values:
@@ -3600,13 +3375,22 @@ def generate_chart_config(data: Dict[str, Any], user_input: str) -> Dict[str, An
             logger.info(f"Final chart configuration - Type: {chart_config['type']}, Title: '{chart_config['options']['plugins']['title']['text']}'")
         else:
             logger.warning("No data extracted with LLM guidance, using fallback")
-            return generate_fallback_chart_config(data, user_input)
+            return _fallback_chart_config(data, user_input, "fallback")
         
+        CHART_SPEC_DECISIONS.inc(source="rule" if decided_by_rules else "llm", chart_type=detected_type)
         return chart_config
         
     except Exception as e:
         logger.error(f"Error in LLM-guided chart generation: {e}")
-        return generate_fallback_chart_config(data, user_input)
+        return _fallback_chart_config(data, user_input, "error")
+
+
+def _fallback_chart_config(data: Dict[str, Any], user_input: str, source: str) -> Dict[str, Any]:
+    """Fallback chart configuration, counted in the chart spec decisions under `source` (fallback or error)"""
+    chart_config = generate_fallback_chart_config(data, user_input)
+    CHART_SPEC_DECISIONS.inc(source=source, chart_type=(chart_config or {}).get("type", "none"))
+    return chart_config
+
 
 def extract_data_summary(data: Dict[str, Any]) -> str:
     """Extract data summary for LLM analysis"""
@@ -3642,422 +3426,32 @@ def extract_data_summary(data: Dict[str, Any]) -> str:
         return "Data summary extraction failed"
 
 def extract_chart_data_with_llm_guidance(data: Dict[str, Any], chart_analysis: Dict[str, Any], user_input: str = "") -> tuple:
-    """Extract chart data - simplified logic without fallback"""
-    import re
+    """Extract chart labels/values with the vectorized chart data engine (bucketing, downsampling, pie folding)"""
     try:
-        labels = []
-        values = []
-        
         if not isinstance(data, dict) or "rows" not in data or not data["rows"]:
             logger.error("No valid data found in extract_chart_data_with_llm_guidance")
-            return labels, values
-        
-        rows = data["rows"]
-        sample_row = rows[0] if rows else {}
-        logger.info(f"Processing sample row: {sample_row}, type: {type(sample_row)}")
-        
-        # Handle dictionary format with category/value keys (from parsed string results)
-        # Support various value field names: "value", "sales_revenue", etc.
-        value_field_names = ["value", "sales_revenue", "revenue", "amount", "total", "sum"]
-        value_field = None
-        if isinstance(sample_row, dict) and "category" in sample_row:
-            # Find the value field
-            for field_name in value_field_names:
-                if field_name in sample_row:
-                    value_field = field_name
-                    break
-            # If no standard field found, try to find the second numeric field
-            if not value_field:
-                for key, val in sample_row.items():
-                    if key != "category" and isinstance(val, (int, float)):
-                        value_field = key
-                        break
-        
-        if isinstance(sample_row, dict) and "category" in sample_row and value_field:
-            logger.info(f"Processing {len(rows)} rows of category-value data (value field: {value_field})")
-            
-            # Detect if this is time series data
-            # First check chart_analysis and user_input (most reliable)
-            user_input_lower = (user_input or "").lower()
-            is_time_series_from_analysis = (
-                chart_analysis.get("is_time_series", False) or 
-                chart_analysis.get("time_grouping", "none") != "none" or
-                any(kw in user_input_lower for kw in ['trend', 'monthly', 'yearly', 'daily', 'weekly', 'over time', '时间', '趋势', '月度', '年度', '日期', '天', '周'])
-            )
-            
-            # Check sample categories to detect time format (even if analysis doesn't suggest it)
-            is_time_series = is_time_series_from_analysis
-            time_sort_keys = {}
-            sample_categories = [str(row.get("category", "")) for row in rows[:min(5, len(rows))]]
-            
-            # Always check category format to detect time series, regardless of analysis
-            for cat in sample_categories:
-                ts_detected, sort_key = _detect_time_series_category(cat, chart_analysis, user_input)
-                if ts_detected and sort_key is not None:
-                    is_time_series = True
-                    # Update chart_analysis if it wasn't set correctly
-                    if not chart_analysis.get("is_time_series", False):
-                        chart_analysis["is_time_series"] = True
-                    if chart_analysis.get("time_grouping", "none") == "none":
-                        # Detect time grouping from category format
-                        if re.match(r'^(0?[1-9]|1[0-2])$', str(cat)):
-                            chart_analysis["time_grouping"] = "month"
-                        elif re.match(r'^\d{4}$', str(cat)):
-                            chart_analysis["time_grouping"] = "year"
-                    break
-            
-            # Build sort keys for all rows
-            for row in rows:
-                category = str(row.get("category", ""))
-                ts_detected, sort_key = _detect_time_series_category(category, chart_analysis, user_input)
-                logger.info(f"Category '{category}': ts_detected={ts_detected}, sort_key={sort_key}, chart_analysis.is_time_series={chart_analysis.get('is_time_series')}, time_grouping={chart_analysis.get('time_grouping')}")
-                if ts_detected and sort_key is not None:
-                    time_sort_keys[category] = sort_key
-                    if not is_time_series:
-                        is_time_series = True
-                        # Update chart_analysis
-                        chart_analysis["is_time_series"] = True
-                        if chart_analysis.get("time_grouping", "none") == "none":
-                            if re.match(r'^(0?[1-9]|1[0-2])$', category):
-                                chart_analysis["time_grouping"] = "month"
-                            elif re.match(r'^\d{4}$', category):
-                                chart_analysis["time_grouping"] = "year"
-                else:
-                    # Log when detection fails for debugging
-                    logger.warning(f"Time series detection failed for category '{category}': ts_detected={ts_detected}, sort_key={sort_key}, chart_analysis={chart_analysis.get('is_time_series')}, time_grouping={chart_analysis.get('time_grouping')}")
-            
-            logger.info(f"Time series detection result: is_time_series={is_time_series}, time_sort_keys={len(time_sort_keys)} keys, sample_keys={list(time_sort_keys.items())[:5] if time_sort_keys else []}")
-            
-            # Sort rows based on data type
-            if is_time_series and time_sort_keys:
-                # Sort by time order (ascending for chronological order)
-                def time_sort_key(row):
-                    category = str(row.get("category", ""))
-                    return time_sort_keys.get(category, float('inf'))
-                sorted_rows = sorted(rows, key=time_sort_key)
-                logger.info(f"Is time series: True, Time grouping: {chart_analysis.get('time_grouping', 'none')}, time_sort_keys count: {len(time_sort_keys)}")
-                logger.info("Sorted by time (chronological order)")
-            else:
-                # Sort by value descending for non-time series data
-                sorted_rows = sorted(rows, key=lambda x: float(x.get(value_field, 0)), reverse=True)
-                logger.info(f"Sorted by value (descending), value_field: {value_field}")
-            
-            processed_rows = sorted_rows  # Use all data points
-            
-            # Extract final labels and values
-            for row in processed_rows:
-                try:
-                    category = str(row["category"]) if row["category"] else f"Item{len(labels)+1}"
-                    value = float(row[value_field]) if isinstance(row.get(value_field), (int, float)) else 0
-                    
-                    # Format label based on context (especially for time series)
-                    if is_time_series:
-                        # Format time labels appropriately
-                        time_grouping = chart_analysis.get("time_grouping", "none")
-                        if time_grouping == "month" and category.isdigit() and 1 <= int(category) <= 12:
-                            # Format month number as month name (English)
-                            month_names = ["January", "February", "March", "April", "May", "June",
-                                          "July", "August", "September", "October", "November", "December"]
-                            month_num = int(category)
-                            label = month_names[month_num - 1]
-                        elif time_grouping == "day" or time_grouping == "daily":
-                            # Format as date
-                            label = _format_date_label(category)
-                        elif time_grouping != "none":
-                            # Use time formatting function if available
-                            label = _format_time_label(category, time_grouping) if time_grouping != "none" else category
-                        else:
-                            # Try to detect date format even if time_grouping is not set
-                            import re
-                            if re.match(r'^(\d{4})[-/](\d{1,2})[-/](\d{1,2})$', category) or \
-                               re.match(r'^(\d{1,2})[-/](\d{1,2})[-/](\d{4})$', category) or \
-                               re.match(r'^(\d{8})$', category):
-                                label = _format_date_label(category)
-                            else:
-                                label = category
-                    else:
-                        label = category
-                    
-                    labels.append(label)
-                    values.append(value)
-                    logger.info(f"Added data point: {label} -> {value}")
-                    
-                except (ValueError, TypeError, KeyError) as e:
-                    logger.warning(f"Error processing row: {e}")
-                    continue
-            
-            logger.info(f"Successfully extracted {len(labels)} data points using {'time-series' if is_time_series else 'value-based'} analysis")
-            logger.info(f"Final chart data: labels={labels}, values={values}")
-            return labels, values
-        
-        # Handle original logic for other data formats
-        num_cols = len(sample_row) if isinstance(sample_row, (list, tuple)) else len(sample_row.keys()) if isinstance(sample_row, dict) else 0
-        
-        # For time series queries, intelligently detect time and value fields
-        if chart_analysis.get("is_time_series") or chart_analysis.get("time_grouping") != "none" or any(keyword in user_input.lower() for keyword in ['trend', 'monthly', 'yearly', 'over time']):
-            # This is likely a time series query
-            if num_cols == 2:
-                # Two columns: likely (time/period, value)
-                label_idx, value_idx = 0, 1
-            elif isinstance(sample_row, dict) and "label" in sample_row and "value" in sample_row:
-                # Dictionary format from parsed results
-                label_field, value_field = "label", "value"  
-                label_idx, value_idx = "label", "value"
-            else:
-                # Multi-column: use field specification or defaults
-                label_field = chart_analysis.get("data_field_for_labels", "0")  # First column for time
-                value_field = chart_analysis.get("data_field_for_values", "1")  # Second column for values
-                try:
-                    label_idx = int(label_field) if str(label_field).isdigit() else 0
-                    value_idx = int(value_field) if str(value_field).isdigit() else 1
-                    # Ensure indices are within bounds
-                    if label_idx >= num_cols: label_idx = 0
-                    if value_idx >= num_cols: value_idx = min(1, num_cols - 1)
-                except (ValueError, TypeError):
-                    label_idx, value_idx = 0, min(1, num_cols - 1)
-        else:
-            # Non-time series: use dynamic field selection
-            label_field = chart_analysis.get("data_field_for_labels", "0")  # Default to first column
-            value_field = chart_analysis.get("data_field_for_values", "1")  # Default to second column
-            try:
-                label_idx = int(label_field) if str(label_field).isdigit() else 0
-                value_idx = int(value_field) if str(value_field).isdigit() else 1
-                # Ensure indices are within bounds
-                if num_cols > 0:
-                    if label_idx >= num_cols: label_idx = min(0, num_cols - 1)
-                    if value_idx >= num_cols: value_idx = min(1, num_cols - 1)
-            except (ValueError, TypeError):
-                label_idx, value_idx = 0, min(1, num_cols - 1)
-        
-        logger.info(f"Using label_idx: {label_idx}, value_idx: {value_idx}")
-        logger.info(f"Sample row: {sample_row}")
-        logger.info(f"Is time series: {chart_analysis.get('is_time_series', False)}, Time grouping: {chart_analysis.get('time_grouping', 'none')}")
-        
-        if chart_analysis.get("time_grouping") != "none" and len(rows[0]) > 7:
-            # Time series data processing
-            time_data = {}
-            
-            for row in rows:
-                # Handle both dict and list/tuple formats
-                if isinstance(row, dict):
-                    row_values = list(row.values())
-                    if len(row_values) > 7:
-                        try:
-                            date_str = str(row_values[7]) if row_values[7] else ""
-                            # Handle TEXT type numeric fields
-                            value_str = str(row_values[value_idx]) if row_values[value_idx] else "0"
-                            # Try to convert to float
-                            try:
-                                value = float(value_str)
-                            except ValueError:
-                                # If conversion fails, try to extract numbers
-                                import re
-                                numbers = re.findall(r'-?\d+\.?\d*', value_str)
-                                value = float(numbers[0]) if numbers else 0
-                        except (IndexError, KeyError, ValueError):
-                            continue
-                else:
-                    if len(row) > max(label_idx, value_idx, 7):
-                        try:
-                            date_str = str(row[7]) if row[7] else ""
-                            # Handle TEXT type numeric fields
-                            value_str = str(row[value_idx]) if row[value_idx] else "0"
-                            # Try to convert to float
-                            try:
-                                value = float(value_str)
-                            except ValueError:
-                                # If conversion fails, try to extract numbers
-                                import re
-                                numbers = re.findall(r'-?\d+\.?\d*', value_str)
-                                value = float(numbers[0]) if numbers else 0
-                        except (IndexError, KeyError, ValueError):
-                            continue
-                        except (IndexError, KeyError, ValueError):
-                            continue
-                        
-                        if date_str and len(date_str) >= 7:
-                            if chart_analysis.get("time_grouping") == "month":
-                                # Extract year-month, support different date formats
-                                if '-' in date_str:
-                                    time_key = date_str[:7] if len(date_str) >= 7 else date_str
-                                else:
-                                    time_key = date_str[:7] if len(date_str) >= 7 else date_str
-                            elif chart_analysis.get("time_grouping") == "quarter":
-                                year = date_str[:4]
-                                month_str = date_str[5:7] if len(date_str) > 6 else "01"
-                                try:
-                                    month = int(month_str)
-                                    quarter = (month - 1) // 3 + 1
-                                    time_key = f"{year}-Q{quarter}"
-                                except ValueError:
-                                    time_key = f"{year}-Q1"
-                            elif chart_analysis.get("time_grouping") == "year":
-                                time_key = date_str[:4]  # YYYY
-                            else:
-                                time_key = date_str[:7]
-                            
-                            if chart_analysis.get("aggregation_method") == "sum":
-                                time_data[time_key] = time_data.get(time_key, 0) + value
-                            elif chart_analysis.get("aggregation_method") == "average":
-                                if time_key in time_data:
-                                    time_data[time_key] = (time_data[time_key] + value) / 2
-                                else:
-                                    time_data[time_key] = value
-                            else:
-                                time_data[time_key] = value
-            
-            # Convert time data to chart format with proper time-based sorting
-            def sort_time_key(key):
-                """Custom time key sorting function"""
-                try:
-                    if chart_analysis.get("time_grouping") == "year":
-                        return int(key)
-                    elif chart_analysis.get("time_grouping") == "month":
-                        year, month = key.split('-')
-                        return int(year) * 100 + int(month)
-                    elif chart_analysis.get("time_grouping") == "week":
-                        year, week_str = key.split('-W')
-                        return int(year) * 100 + int(week_str)
-                    elif chart_analysis.get("time_grouping") == "quarter":
-                        year, quarter = key.split('-Q')
-                        return int(year) * 10 + int(quarter)
-                    else:
-                        return key
-                except:
-                    return key
-            
-            for time_key in sorted(time_data.keys(), key=sort_time_key):
-                labels.append(_format_time_label(time_key, chart_analysis.get("time_grouping", "none")))
-                values.append(time_data[time_key])
-                
-        else:
-            # Non-time series data processing
-            data_dict = {}
-            
-            logger.info(f"Processing {len(rows)} rows of data")
-            
-            for i, row in enumerate(rows):
-                logger.info(f"Processing row {i}: {row}, length: {len(row)}")
-                
-                # Handle dictionary format with label/value keys (from parsed string results)
-                if isinstance(row, dict) and "label" in row and "value" in row:
-                    try:
-                        label = str(row["label"]) if row["label"] else f"Item{len(labels)+1}"
-                        value = float(row["value"]) if isinstance(row["value"], (int, float)) else 0
-                        
-                        # Smart label formatting for better display based on context
-                        label = _format_label_based_on_context(label, chart_analysis, user_input)
-                        
-                        data_dict[label] = value
-                        logger.info(f"Added data point: {label} -> {value}")
-                        
-                    except (ValueError, TypeError, IndexError) as e:
-                        logger.warning(f"Error processing dictionary row data: {e}")
-                        continue
-                        
-                elif len(row) == 2:
-                    # Handle aggregated query results (e.g., month and sales)
-                    try:
-                        # Handle both dict and list formats
-                        if isinstance(row, dict):
-                            # For dict format like {'category': 'OFFICE SUPPLIES', 'sales_revenue': 71}
-                            # Get the first and second values
-                            values = list(row.values())
-                            if len(values) >= 2:
-                                label = str(values[0]) if values[0] else f"Item{len(labels)+1}"
-                                value_str = str(values[1]) if values[1] else "0"
-                            else:
-                                continue
-                        else:
-                            # For list/tuple format
-                            label = str(row[0]) if row[0] else f"Item{len(labels)+1}"
-                            value_str = str(row[1]) if row[1] else "0"
-                        
-                        # Handle TEXT type numeric fields
-                        try:
-                            value = float(value_str)
-                        except ValueError:
-                            # If conversion fails, try to extract numbers
-                            import re
-                            numbers = re.findall(r'-?\d+\.?\d*', value_str)
-                            value = float(numbers[0]) if numbers else 0
-                        
-                        # Smart label formatting for better display based on context
-                        label = _format_label_based_on_context(label, chart_analysis, user_input)
-                        
-                        data_dict[label] = value
-                        logger.info(f"Added data point: {label} -> {value}")
-                        
-                    except (ValueError, TypeError, IndexError) as e:
-                        logger.warning(f"Error processing 2-column row data: {e}")
-                        continue
-                        
-                elif len(row) > max(label_idx, value_idx):
-                    # Handle multi-column data
-                    try:
-                        # Handle both dict and list formats
-                        if isinstance(row, dict):
-                            # For dict format like {'col_0': '2025-01', 'col_1': 42, 'col_2': 88293.43}
-                            row_keys = list(row.keys())
-                            if label_idx < len(row_keys) and value_idx < len(row_keys):
-                                label_key = row_keys[label_idx]
-                                value_key = row_keys[value_idx]
-                                label = str(row[label_key]) if row[label_key] else f"Item{len(labels)+1}"
-                                value_str = str(row[value_key]) if row[value_key] else "0"
-                            else:
-                                continue
-                        else:
-                            # For list format
-                            if label_idx < len(row) and value_idx < len(row):
-                                label = str(row[label_idx]) if row[label_idx] else f"Item{len(labels)+1}"
-                                value_str = str(row[value_idx]) if row[value_idx] else "0"
-                            else:
-                                continue
-                        try:
-                            value = float(value_str)
-                        except ValueError:
-                            # If conversion fails, try to extract numbers
-                            import re
-                            numbers = re.findall(r'-?\d+\.?\d*', value_str)
-                            value = float(numbers[0]) if numbers else 0
-                        
-                        if chart_analysis.get("aggregation_method") == "sum":
-                            data_dict[label] = data_dict.get(label, 0) + value
-                        elif chart_analysis.get("aggregation_method") == "average":
-                            if label in data_dict:
-                                data_dict[label] = (data_dict[label] + value) / 2
-                            else:
-                                data_dict[label] = value
-                        elif chart_analysis.get("aggregation_method") == "count":
-                            data_dict[label] = data_dict.get(label, 0) + 1
-                        else:
-                            data_dict[label] = value
-                            
-                    except (ValueError, TypeError, IndexError) as e:
-                        logger.warning(f"Error processing row data: {e}")
-                        continue
-            
-            # Limit data points and apply intelligent sorting
-            if data_dict:
-                # Detect if labels represent years (numeric values in reasonable year range)
-                labels_are_years = _detect_year_labels(list(data_dict.keys()))
-                
-                if labels_are_years:
-                    # Sort by year in ascending order
-                    sorted_items = sorted(data_dict.items(), key=lambda x: _extract_year_from_label(x[0]))
-                    logger.info("Sorted by year (ascending)")
-                else:
-                    # Sort by value in descending order (show all data points)
-                    sorted_items = sorted(data_dict.items(), key=lambda x: x[1], reverse=True)
-                    logger.info("Sorted by value (descending)")
-                
-                labels = [item[0] for item in sorted_items]
-                values = [item[1] for item in sorted_items]
-                logger.info(f"Final chart data: labels={labels}, values={values}")
-            else:
-                logger.warning("No data extracted from rows")
-        
-        return labels, values
+            return [], []
+        
+        started = time.perf_counter()
+        series = build_chart_series(
+            data,
+            chart_analysis,
+            user_input,
+            chart_type=chart_analysis.get("chart_type"),
+            max_points=Config.CHART_MAX_POINTS,
+            max_slices=Config.CHART_PIE_MAX_SLICES,
+        )
+        labels = series.labels
+        if not series.is_time_series and series.label_column != "category":
+            # Numeric ids/periods get readable labels (e.g. "Product 3", "2025-01")
+            labels = [_format_label_based_on_context(label, chart_analysis, user_input) for label in labels]
+        
+        logger.info(
+            f"Extracted {len(labels)} chart points from {series.source_rows} rows in "
+            f"{(time.perf_counter() - started) * 1000:.1f}ms (label: {series.label_column}, value: {series.value_column}, "
+            f"time_series: {series.is_time_series}, grouping: {series.time_grouping}, downsampled: {series.downsampled})"
+        )
+        return labels, series.values
         
     except Exception as e:
         logger.error(f"Error extracting chart data with LLM guidance: {e}")
@@ -4065,262 +3459,6 @@ def extract_chart_data_with_llm_guidance(data: Dict[str, Any], chart_analysis: D
         logger.error(f"Traceback: {traceback.format_exc()}")
         return [], []
 
-def _detect_time_series_category(category: str, chart_analysis: Dict[str, Any], user_input: str = "") -> tuple:
-    """
-    Detect if a category value represents time series data and return sorting key
-    
-    Returns:
-        (is_time_series, sort_key) tuple
-        - is_time_series: bool indicating if this is time series data
-        - sort_key: value to use for sorting (time-based or None)
-    """
-    if not category:
-        return False, None
-    
-    category_str = str(category).strip()
-    import re
-    
-    # First, try to detect time format directly from category (most reliable)
-    # This doesn't depend on chart_analysis state
-    
-    # Month format: '01', '02', ..., '12' (1-12) - check this first as it's common
-    if re.match(r'^(0?[1-9]|1[0-2])$', category_str):
-        month_num = int(category_str)
-        return True, month_num
-    
-    # Check chart_analysis and user input for additional context
-    is_time_series = chart_analysis.get("is_time_series", False)
-    time_grouping = chart_analysis.get("time_grouping", "none")
-    
-    # Check user input for time-related keywords
-    user_input_lower = (user_input or "").lower()
-    has_time_keywords = any(kw in user_input_lower for kw in [
-        'trend', 'monthly', 'yearly', 'daily', 'weekly', 'over time', 
-        'date', 'day', '时间', '趋势', '月度', '年度', '日期', '天', '周'
-    ])
-    
-    # If explicitly marked as time series or has time grouping, treat as time series
-    if is_time_series or time_grouping != "none" or has_time_keywords:
-        # Detect other time formats and create sort key
-        
-        # Date format: '2025-01-15', '2025/01/15' (YYYY-MM-DD or YYYY/MM/DD)
-        date_match_iso = re.match(r'^(\d{4})[-/](\d{1,2})[-/](\d{1,2})$', category_str)
-        if date_match_iso:
-            year = int(date_match_iso.group(1))
-            month = int(date_match_iso.group(2))
-            day = int(date_match_iso.group(3))
-            if 1900 <= year <= 2100 and 1 <= month <= 12 and 1 <= day <= 31:
-                # Return YYYYMMDD as integer for sorting
-                return True, year * 10000 + month * 100 + day
-        
-        # Date format: '01-15-2025', '01/15/2025' (MM-DD-YYYY or MM/DD/YYYY) - US format
-        date_match_us = re.match(r'^(\d{1,2})[-/](\d{1,2})[-/](\d{4})$', category_str)
-        if date_match_us:
-            month = int(date_match_us.group(1))
-            day = int(date_match_us.group(2))
-            year = int(date_match_us.group(3))
-            if 1900 <= year <= 2100 and 1 <= month <= 12 and 1 <= day <= 31:
-                return True, year * 10000 + month * 100 + day
-        
-        # Date format: '15-01-2025', '15/01/2025' (DD-MM-YYYY or DD/MM/YYYY) - EU format
-        date_match_eu = re.match(r'^(\d{1,2})[-/](\d{1,2})[-/](\d{4})$', category_str)
-        if date_match_eu:
-            # Try to distinguish: if first part > 12, it's likely DD-MM-YYYY
-            first_part = int(date_match_eu.group(1))
-            second_part = int(date_match_eu.group(2))
-            year = int(date_match_eu.group(3))
-            if first_part > 12 and 1 <= second_part <= 12:
-                # DD-MM-YYYY format
-                day = first_part
-                month = second_part
-                if 1900 <= year <= 2100 and 1 <= day <= 31:
-                    return True, year * 10000 + month * 100 + day
-        
-        # Date format: '20250115' (YYYYMMDD) - compact format
-        date_match_compact = re.match(r'^(\d{8})$', category_str)
-        if date_match_compact:
-            year = int(category_str[:4])
-            month = int(category_str[4:6])
-            day = int(category_str[6:8])
-            if 1900 <= year <= 2100 and 1 <= month <= 12 and 1 <= day <= 31:
-                return True, year * 10000 + month * 100 + day
-        
-        # Month format: '01', '02', ..., '12' (1-12)
-        if re.match(r'^(0?[1-9]|1[0-2])$', category_str):
-            month_num = int(category_str)
-            return True, month_num
-        
-        # Year-month format: '2025-01', '2025-1', etc.
-        year_month_match = re.match(r'^(\d{4})[-/]?(\d{1,2})$', category_str)
-        if year_month_match:
-            year = int(year_month_match.group(1))
-            month = int(year_month_match.group(2))
-            if 1 <= month <= 12:
-                return True, year * 100 + month
-        
-        # Year format: '2025', '2024', etc.
-        if re.match(r'^\d{4}$', category_str):
-            year = int(category_str)
-            if 1900 <= year <= 2100:
-                return True, year
-        
-        # Quarter format: '2025-Q1', 'Q1-2025', etc.
-        quarter_match = re.match(r'(\d{4})[-/]?Q(\d)|Q(\d)[-/]?(\d{4})', category_str, re.IGNORECASE)
-        if quarter_match:
-            if quarter_match.group(1):  # Year-Q format
-                year = int(quarter_match.group(1))
-                quarter = int(quarter_match.group(2))
-            else:  # Q-Year format
-                quarter = int(quarter_match.group(3))
-                year = int(quarter_match.group(4))
-            if 1 <= quarter <= 4:
-                return True, year * 10 + quarter
-        
-        # Week format: '2025-W01', '2025-W1', etc.
-        week_match = re.match(r'(\d{4})[-/]?W(\d{1,2})', category_str, re.IGNORECASE)
-        if week_match:
-            year = int(week_match.group(1))
-            week = int(week_match.group(2))
-            if 1 <= week <= 53:
-                return True, year * 100 + week
-        
-        # If time_grouping is set but format doesn't match, still treat as time series
-        # and use string comparison as fallback
-        if time_grouping != "none":
-            return True, category_str
-    
-    return False, None
-
-def _detect_year_labels(labels: list) -> bool:
-    """Detect if labels represent years by checking if they are numeric values in reasonable year range"""
-    if not labels:
-        return False
-    
-    try:
-        for label in labels:
-            year_value = _extract_year_from_label(label)
-            if not (1900 <= year_value <= 2100):
-                return False
-        return True
-    except:
-        return False
-
-def _extract_year_from_label(label) -> int:
-    """Extract year value from label, handling various formats"""
-    label_str = str(label)
-    
-    # Remove common year suffixes and prefixes
-    import re
-    # Remove non-digit characters except those that might be part of year format
-    year_pattern = r'(\d{4})'
-    matches = re.findall(year_pattern, label_str)
-    
-    if matches:
-        return int(matches[0])
-    
-    # If no 4-digit pattern found, try to extract any digits
-    digits_only = re.sub(r'[^\d]', '', label_str)
-    if digits_only.isdigit():
-        year_candidate = int(digits_only)
-        if 1900 <= year_candidate <= 2100:
-            return year_candidate
-    
-    # Fallback: try to convert directly
-    try:
-        return int(float(label_str))
-    except:
-        raise ValueError(f"Cannot extract year from label: {label}")
-
-def _format_date_label(date_str: str) -> str:
-    """Format date string for display"""
-    import re
-    try:
-        # ISO format: '2025-01-15' or '2025/01/15'
-        date_match_iso = re.match(r'^(\d{4})[-/](\d{1,2})[-/](\d{1,2})$', date_str)
-        if date_match_iso:
-            year = int(date_match_iso.group(1))
-            month = int(date_match_iso.group(2))
-            day = int(date_match_iso.group(3))
-            month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
-                          "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-            if 1 <= month <= 12:
-                return f"{month_names[month - 1]} {day}, {year}"
-        
-        # US format: '01-15-2025' or '01/15/2025'
-        date_match_us = re.match(r'^(\d{1,2})[-/](\d{1,2})[-/](\d{4})$', date_str)
-        if date_match_us:
-            month = int(date_match_us.group(1))
-            day = int(date_match_us.group(2))
-            year = int(date_match_us.group(3))
-            month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
-                          "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-            if 1 <= month <= 12:
-                return f"{month_names[month - 1]} {day}, {year}"
-        
-        # EU format: '15-01-2025' or '15/01/2025' (if first part > 12)
-        date_match_eu = re.match(r'^(\d{1,2})[-/](\d{1,2})[-/](\d{4})$', date_str)
-        if date_match_eu:
-            first_part = int(date_match_eu.group(1))
-            second_part = int(date_match_eu.group(2))
-            year = int(date_match_eu.group(3))
-            if first_part > 12 and 1 <= second_part <= 12:
-                day = first_part
-                month = second_part
-                month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
-                              "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-                return f"{month_names[month - 1]} {day}, {year}"
-        
-        # Compact format: '20250115'
-        date_match_compact = re.match(r'^(\d{8})$', date_str)
-        if date_match_compact:
-            year = int(date_str[:4])
-            month = int(date_str[4:6])
-            day = int(date_str[6:8])
-            month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
-                          "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-            if 1 <= month <= 12:
-                return f"{month_names[month - 1]} {day}, {year}"
-        
-        # If no match, return original
-        return date_str
-    except:
-        return date_str
-
-def _format_time_label(time_key: str, time_grouping: str) -> str:
-    """Format time key for display based on grouping type"""
-    try:
-        if time_grouping == "year":
-            return time_key
-        elif time_grouping == "month":
-            year, month = time_key.split('-')
-            month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
-                          "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-            try:
-                month_name = month_names[int(month) - 1]
-                return f"{month_name} {year}"
-            except (ValueError, IndexError):
-                return time_key
-        elif time_grouping == "week":
-            year, week = time_key.split('-W')
-            return f"Week {week}, {year}"
-        elif time_grouping == "quarter":
-            year, quarter = time_key.split('-Q')
-            return f"Q{quarter} {year}"
-        elif time_grouping == "day" or time_grouping == "daily":
-            # Try to format as date
-            return _format_date_label(time_key)
-        else:
-            # Try to detect if it's a date format
-            import re
-            if re.match(r'^(\d{4})[-/](\d{1,2})[-/](\d{1,2})$', time_key) or \
-               re.match(r'^(\d{1,2})[-/](\d{1,2})[-/](\d{4})$', time_key) or \
-               re.match(r'^(\d{8})$', time_key):
-                return _format_date_label(time_key)
-            return time_key
-    except:
-        return time_key
-
-
 def _format_label_based_on_context(label: str, chart_analysis: Dict[str, Any], user_input: str) -> str:
     """Format label based on query context and chart analysis"""
     try:
@@ -4369,31 +3507,6 @@ def _format_label_based_on_context(label: str, chart_analysis: Dict[str, Any], u
     except (ValueError, TypeError):
         return str(label)
 
-def format_time_label(time_key: str, time_grouping: str) -> str:
-    """Format time labels for display"""
-    try:
-        if time_grouping == "month":
-            year, month = time_key.split('-')
-            month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
-                          "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-            month_idx = int(month) - 1
-            if 0 <= month_idx < 12:
-                return f"{month_names[month_idx]} {year[-2:]}"
-        elif time_grouping == "week":
-            if '-W' in time_key:
-                year, week_str = time_key.split('-W')
-                return f"{year}-W{week_str}"
-            else:
-                return time_key
-        elif time_grouping == "quarter":
-            return time_key  # Already formatted as YYYY-Q1
-        elif time_grouping == "year":
-            return time_key  # Already formatted as YYYY
-        
-        return time_key
-    except:
-        return time_key
-
 def generate_fallback_chart_config(data: Dict[str, Any], user_input: str) -> Dict[str, Any]:
     """Generate fallback chart configuration (simplified version)"""
     
@@ -4491,6 +3604,8 @@ def create_workflow():
     workflow.add_node("llm_processing_node", llm_processing_node)  # LLM integration processing node
     workflow.add_node("interrupt_node", interrupt_node)  # HITL interrupt node
     workflow.add_node("end_node", lambda state: {"success": True})
+    register_node_changes("start_node", ())
+    register_node_changes("end_node", ("success",))
 
     # Set entry point
     workflow.set_entry_point("start_node")
@@ -4645,39 +3760,34 @@ def _analyze_chart_suitability(structured_data: Dict[str, Any], user_input: str)
         rows = structured_data.get("rows", [])
         columns = structured_data.get("columns", [])
         
-        # 1. Check data row count
+        # 1. Check data row count (large results are bucketed/downsampled by the chart data engine)
         if len(rows) < 2:
             return {"suitable": False, "reason": "Insufficient data rows (at least 2 rows required)"}
         
-        if len(rows) > 1000:
-            return {"suitable": False, "reason": "Too many data rows (exceeds 1000 rows)"}
-        
         # 2. Check column count
         if len(columns) < 2:
             return {"suitable": False, "reason": "Insufficient data columns (at least 2 columns required)"}
         
-        # 3. Check for numeric columns
-        numeric_columns = []
-        for col in columns:
-            if _has_numeric_column(rows, col):
-                numeric_columns.append(col)
-        
-        if not numeric_columns:
-            return {"suitable": False, "reason": "No numeric columns found"}
-        
-        # 4. Check if user input contains chart-related keywords
+        # 3. Check if user input contains chart-related keywords
         chart_keywords = ["chart", "pie", "bar", "line", "graph", "visualization", "proportion", "distribution", "trend"]
         has_chart_intent = any(keyword.lower() in user_input.lower() for keyword in chart_keywords)
         
         if not has_chart_intent:
             return {"suitable": False, "reason": "User question does not involve chart generation"}
         
+        # 4. Check for numeric columns (column-wise over a sample of rows)
+        sample = to_frame(structured_data, limit=SELECTION_SAMPLE_ROWS)
+        numeric_columns = [col for col in sample.columns if _has_numeric_column(sample, col)]
+        
+        if not numeric_columns:
+            return {"suitable": False, "reason": "No numeric columns found"}
+        
         # 5. Data quality check
         if len(rows) > 50:
-            # For large datasets, check for duplicates or excessive empty values
-            sample_rows = rows[:10]
-            empty_count = sum(1 for row in sample_rows if any(str(val).strip() == "" for val in row.values()))
-            if empty_count > len(sample_rows) * 0.5:
+            # For large datasets, check for excessive empty values
+            head = sample.head(10).astype(str).apply(lambda col: col.str.strip() == "")
+            empty_count = int(head.any(axis=1).sum())
+            if empty_count > len(head) * 0.5:
                 return {"suitable": False, "reason": "Poor data quality (too many empty values)"}
         
         return {
@@ -4692,32 +3802,16 @@ def _analyze_chart_suitability(structured_data: Dict[str, Any], user_input: str)
         logger.warning(f"Chart suitability analysis failed: {e}")
         return {"suitable": False, "reason": f"Data suitability analysis failed: {str(e)}"}
 
-def _has_numeric_column(rows: List[Dict], column_name: str) -> bool:
-    """Check if specified column contains numeric data"""
+def _has_numeric_column(frame, column_name: str) -> bool:
+    """Check if specified column contains numeric data (more than 50% of non-empty values)"""
     try:
-        numeric_count = 0
-        total_count = 0
-        
-        for row in rows[:20]:  # Only check first 20 rows
-            value = row.get(column_name, "")
-            if value is None or str(value).strip() == "":
-                continue
-            
-            total_count += 1
-            
-            # Try to convert to number
-            try:
-                float(str(value).replace(",", "").replace("%", ""))
-                numeric_count += 1
-            except (ValueError, TypeError):
-                pass
-        
-        # If more than 50% of values are numbers, consider it a numeric column
-        return total_count > 0 and (numeric_count / total_count) > 0.5
-        
+        return numeric_ratio(frame[column_name]) > 0.5
     except Exception:
         return False
 
+@traced_node
+@declares_changes("chart_suitable", "chart_config", "chart_data", "chart_type", "chart_error", "node_outputs")
+@declares_inputs("user_input", "structured_data")
 def chart_process_node(state: GraphState) -> GraphState:
     """Enhanced Chart Process Node: Integrate data suitability analysis + generate chart config + render chart"""
     try:
@@ -4821,134 +3915,130 @@ def chart_process_node(state: GraphState) -> GraphState:
 
     # Use the new workflow structure
     return create_workflow()
+
+# Main workflow nodes in graph order (resume walks them with the graph's routing)
+RESUME_NODE_ORDER = ("rag_query_node", "router_node", "sql_agent_node", "chart_process_node", "llm_processing_node")
+_RESUME_NODE_ALIASES = {"rag_answer_node": "rag_query_node"}
+
+
+def _next_resume_node(node_name: str, state: Dict[str, Any]) -> Optional[str]:
+    """Successor of a main node, mirroring the graph's conditional edges"""
+    if node_name == "rag_query_node":
+        return "router_node"
+    if node_name == "router_node":
+        return "sql_agent_node" if state.get("need_sql_agent", False) else "llm_processing_node"
+    if node_name == "sql_agent_node":
+        return "chart_process_node" if state.get("chart_suitable", False) else "llm_processing_node"
+    if node_name == "chart_process_node":
+        return "llm_processing_node"
+    return None
+
+
+def _completed_before_resume(paused_node: str) -> set:
+    """Nodes whose outputs a checkpoint paused at paused_node already holds"""
+    paused_node = _RESUME_NODE_ALIASES.get(paused_node, paused_node)
+    if paused_node in RESUME_NODE_ORDER:
+        return set(RESUME_NODE_ORDER[:RESUME_NODE_ORDER.index(paused_node) + 1])
+    if paused_node in ("", "start_node"):
+        return set()
+    # Unknown pause point: everything up to the final LLM step is considered done
+    return set(RESUME_NODE_ORDER[:-1])
+
+
+@traced_execution("workflow.resume")
 async def resume_workflow_from_paused_state(
     execution_id: str,
     paused_state: Dict[str, Any],
-    paused_node: str
+    paused_node: str,
+    overrides: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
     """
     Resume workflow execution from a paused state at a specific node.
+
+    Walks the main nodes from the start with the graph's routing. A node is
+    skipped when its output for the same inputs is memoized for this execution
+    (execution_id, node, input fingerprint), so a resume re-runs only from the
+    first node whose inputs changed. Without memo entries (e.g. expired), nodes
+    up to paused_node are taken from the paused state as long as no override
+    touches their inputs. Overrides (HITL parameters) always win over node outputs.
     """
     from ..websocket.websocket_manager import websocket_manager
-    
+    from ..utils.metrics import record_cache_lookup
+
+    node_functions = {
+        "rag_query_node": rag_query_node,
+        "router_node": router_node,
+        "sql_agent_node": sql_agent_node,
+        "chart_process_node": chart_process_node,
+        "llm_processing_node": llm_processing_node,
+    }
+    overrides = {k: v for k, v in (overrides or {}).items() if v is not None and v != ""}
+
     try:
         logger.info(f"Resuming workflow execution {execution_id} from paused node {paused_node}")
         
         # Use the paused state as initial state
-        initial_state = paused_state.copy()
-        initial_state["execution_id"] = execution_id
+        state: Dict[str, Any] = paused_state.copy()
+        state["execution_id"] = execution_id
         
         # Clear pause flags but keep paused node info for logging
-        initial_state["hitl_status"] = "running"
-        # Keep hitl_paused for debugging - don't remove it yet
-        # initial_state.pop("hitl_paused", None)
-        initial_state.pop("hitl_reason", None)
-        
-        # Strictly continue from the paused node without re-running upstream nodes
-        logger.info(f"Resuming execution from node {paused_node} with state keys: {list(initial_state.keys())}")
-
-        state: Dict[str, Any] = initial_state
+        state["hitl_status"] = "running"
+        state.pop("hitl_reason", None)
 
         # Helper to broadcast snapshot
         async def _emit(snapshot: Dict[str, Any]):
             await websocket_manager.broadcast_execution_update(execution_id, snapshot)
 
-        try:
-            # Get the query path to determine continuation logic
-            query_path = state.get("query_path", "rag_only")
-            
-            if paused_node == "chart_process_node":
-                # Continue from chart processing to LLM processing
-                state = await llm_processing_node(state)
-                await _emit(state)
-
-            elif paused_node == "sql_agent_node":
-                # Continue from SQL agent to chart process or LLM processing
-                chart_suitable = state.get("chart_suitable", False)
-                if chart_suitable:
-                    state = chart_process_node(state)
-                    await _emit(state)
-
-                state = await llm_processing_node(state)
-                await _emit(state)
-
-            elif paused_node == "rag_query_node":
-                # Continue from RAG query to router
-                state = router_node(state)
-                await _emit(state)
-                    
-                # Then continue based on router decision
-                need_sql_agent = state.get("need_sql_agent", False)
-                if need_sql_agent:
-                    state = await sql_agent_node(state)
-                    await _emit(state)
-                    
-                    chart_suitable = state.get("chart_suitable", False)
-                    if chart_suitable:
-                        state = chart_process_node(state)
-                        await _emit(state)
-                    
-                    state = await llm_processing_node(state)
-                    await _emit(state)
-                else:
-                    # RAG only path - go directly to LLM processing
-                    state = await llm_processing_node(state)
-                    await _emit(state)
-
-            elif paused_node == "rag_answer_node":
-                # Continue from RAG answer to router
-                state = router_node(state)
-                await _emit(state)
-                    
-                # Then continue based on router decision
-                need_sql_agent = state.get("need_sql_agent", False)
-                if need_sql_agent:
-                    state = await sql_agent_node(state)
-                    await _emit(state)
-                    
-                    chart_suitable = state.get("chart_suitable", False)
-                    if chart_suitable:
-                        state = chart_process_node(state)
-                        await _emit(state)
-                    
-                    state = await llm_processing_node(state)
-                    await _emit(state)
-                else:
-                    # RAG only path - go directly to LLM processing
-                    state = await llm_processing_node(state)
-                    await _emit(state)
-
-            elif paused_node == "router_node":
-                # Continue from router based on decision
-                need_sql_agent = state.get("need_sql_agent", False)
-                if need_sql_agent:
-                    state = await sql_agent_node(state)
-                    await _emit(state)
-                    
-                    chart_suitable = state.get("chart_suitable", False)
-                    if chart_suitable:
-                        state = chart_process_node(state)
-                        await _emit(state)
-                    
-                    state = await llm_processing_node(state)
-                    await _emit(state)
-                else:
-                    # RAG only path - go directly to LLM processing
-                    state = await llm_processing_node(state)
-                    await _emit(state)
-
+        completed = _completed_before_resume(paused_node or "")
+        reused, executed = [], []
+        upstream_rerun = False
+        node_name = RESUME_NODE_ORDER[0]
+        while node_name:
+            fingerprint = node_input_fingerprint(node_name, state)
+            cached = None
+            if fingerprint and Config.HITL_NODE_CHECKPOINTS:
+                try:
+                    cached = await hitl_checkpointer.aget_memo(execution_id, node_name, fingerprint)
+                except Exception as memo_error:
+                    logger.warning(f"Node memo lookup failed for {node_name}: {memo_error}")
+                record_cache_lookup("workflow_node_memo", cached is not None)
+
+            changed_keys = NODE_CHANGED_KEYS.get(node_name, ())
+            if cached is not None:
+                apply_node_delta(state, cached)
+                reused.append(node_name)
+            elif (not upstream_rerun and node_name in completed
+                  and not overrides.keys() & set(NODE_INPUT_KEYS.get(node_name, ()))):
+                # Paused state already holds this node's outputs and nothing it reads was adjusted
+                reused.append(node_name)
             else:
-                # Fallback: continue to LLM processing
-                logger.warning(f"Unknown paused node {paused_node}, continuing to LLM processing")
-                state = await llm_processing_node(state)
+                result = node_functions[node_name](state)
+                if asyncio.iscoroutine(result):
+                    result = await result
+                delta = extract_node_delta(node_name, result, state)
+                apply_node_delta(state, delta)
+                upstream_rerun = True
+                executed.append(node_name)
+                if fingerprint and delta and Config.HITL_NODE_CHECKPOINTS:
+                    try:
+                        await hitl_checkpointer.aput(execution_id, delta, node_name=node_name)
+                        await hitl_checkpointer.aput_memo(execution_id, node_name, fingerprint, delta)
+                    except Exception as checkpoint_error:
+                        logger.warning(f"Could not checkpoint {node_name} for execution {execution_id}: {checkpoint_error}")
+
+            # Explicit HITL adjustments of a node's outputs (e.g. need_sql_agent) take precedence
+            state.update({k: v for k, v in overrides.items() if k in changed_keys})
+            if node_name in executed:
                 await _emit(state)
+            node_name = _next_resume_node(node_name, state)
 
-            set_execution_final_state(execution_id, state)
-            logger.info(f"Workflow execution {execution_id} resumed and completed successfully")
-            return state
-        except Exception:
-            # Re-raise to outer handler
-            raise
+        if not executed:
+            await _emit(state)
+        logger.info(f"Workflow execution {execution_id} resumed: reused {reused}, executed {executed}")
+
+        set_execution_final_state(execution_id, state)
+        logger.info(f"Workflow execution {execution_id} resumed and completed successfully")
+        return state
         
     except Exception as e:
         logger.error(f"Error resuming workflow execution {execution_id}: {e}")
@@ -4959,6 +4049,7 @@ async def resume_workflow_from_paused_state(
         }
 
 
+@traced_execution("workflow.execution")
 async def process_intelligent_query(
     user_input: str, 
     datasource: Dict[str, Any], 
@@ -5072,6 +4163,24 @@ async def process_intelligent_query(
             'start_node', 'rag_query_node', 'router_node', 'sql_agent_node', 
             'chart_process_node', 'llm_processing_node', 'end_node'
         }
+        # run_id -> perf_counter at node start (for node duration metrics)
+        node_start_times: Dict[str, float] = {}
+
+        # Durable per-node checkpoints: the initial state once, then only the keys each node changed
+        checkpoint_nodes = bool(execution_id) and Config.HITL_NODE_CHECKPOINTS
+
+        node_fingerprints: Dict[str, Optional[str]] = {}
+
+        async def checkpoint(values: Dict[str, Any], node: str, kind: str = "node", fingerprint: Optional[str] = None) -> None:
+            try:
+                await hitl_checkpointer.aput(execution_id, values, node_name=node, kind=kind)
+                if fingerprint:
+                    await hitl_checkpointer.aput_memo(execution_id, node, fingerprint, values)
+            except Exception as checkpoint_error:
+                logger.warning(f"Could not checkpoint {node} for execution {execution_id}: {checkpoint_error}")
+
+        if checkpoint_nodes:
+            await checkpoint(initial_state, "start_node", kind="start")
         
         try:
             async for event in app.astream_events(initial_state, config, version="v1"):
@@ -5082,6 +4191,10 @@ async def process_intelligent_query(
                     # Only log and emit events for main workflow nodes, not internal LangChain components
                     if node_name in main_workflow_nodes:
                         logger.info(f"Node started: {node_name}")
+                        node_start_times[event.get("run_id")] = time.perf_counter()
+                        if checkpoint_nodes:
+                            # Inputs are fixed at node start (nodes run one at a time)
+                            node_fingerprints[event.get("run_id")] = node_input_fingerprint(node_name, accumulated_state)
                         await emit_event("node_started", node_id=node_name)
                     else:
                         logger.debug(f"Internal component started: {node_name}")
@@ -5090,12 +4203,17 @@ async def process_intelligent_query(
                     # Only log and emit events for main workflow nodes, not internal LangChain components
                     if node_name in main_workflow_nodes:
                         logger.info(f"Node completed: {node_name}")
-                        data = event.get("data")
-                        # Accumulate any state-like data emitted by nodes
-                        if isinstance(data, dict):
-                            for key, value in data.items():
-                                accumulated_state[key] = value
-                        await emit_event("node_completed", node_id=node_name, data=data)
+                        started = node_start_times.pop(event.get("run_id"), None)
+                        if started is not None:
+                            NODE_DURATION.observe(time.perf_counter() - started, node=node_name.replace("_node", ""), status="ok")
+                        data = event.get("data") or {}
+                        output = data.get("output") if isinstance(data, dict) else None
+                        # Merge only the keys the node changed (by reference, no state copies)
+                        delta = extract_node_delta(node_name, output, accumulated_state)
+                        apply_node_delta(accumulated_state, delta)
+                        if checkpoint_nodes and delta:
+                            await checkpoint(delta, node_name, fingerprint=node_fingerprints.pop(event.get("run_id"), None))
+                        await emit_event("node_completed", node_id=node_name, data=build_node_event_data(node_name, delta))
                     else:
                         logger.debug(f"Internal component completed: {node_name}")
 
@@ -5103,6 +4221,9 @@ async def process_intelligent_query(
                     # Log errors for all nodes, but only emit events for main workflow nodes
                     if node_name in main_workflow_nodes:
                         logger.error(f"Node error: {node_name} - {event.get('data')}")
+                        started = node_start_times.pop(event.get("run_id"), None)
+                        if started is not None:
+                            NODE_DURATION.observe(time.perf_counter() - started, node=node_name.replace("_node", ""), status="error")
                         await emit_event("node_error", node_id=node_name, error=str(event.get("data", "")))
                     else:
                         logger.error(f"Internal component error: {node_name} - {event.get('data')}")
@@ -5406,22 +4527,9 @@ def _apply_standard_analysis_strategy(rows: List[Dict], analysis: Dict[str, Any]
     sort_strategy = analysis.get("sort_strategy", "value_desc")
     
     if sort_strategy == "chronological":
-        def sort_time_key(row):
-            category = str(row.get("category", ""))
-            try:
-                if re.match(r'^\d{4}-\d{2}$', category):  # YYYY-MM
-                    year, month = category.split('-')
-                    return int(year) * 100 + int(month)
-                elif re.match(r'^\d{4}-\d{2}-\d{2}$', category):  # YYYY-MM-DD
-                    return category  # String comparison works for ISO dates
-                elif re.match(r'^\d{4}$', category):  # YYYY
-                    return int(category)
-                else:
-                    return category
-            except:
-                return category
-                
-        processed_rows = sorted(processed_rows, key=sort_time_key)
+        # Format detected once for the column, then one argsort over typed keys
+        categories = [str(row.get("category", "")) for row in processed_rows]
+        processed_rows = [processed_rows[i] for i in chronological_order(categories)]
         logger.info("Applied chronological sorting")
         
     elif sort_strategy == "value_desc":
@@ -5583,8 +4691,8 @@ def _apply_flexible_transformations(rows: List[Dict], transform_config: Any, use
         return rows 
 
 
-# Global state storage for execution states
-_execution_states: Dict[str, Dict[str, Any]] = {}
+# Global state storage for execution states (bounded by size cap and TTL)
+_execution_states: Dict[str, Dict[str, Any]] = get_execution_state_store("langgraph_final_states")
 
 def get_execution_final_state(execution_id: str) -> Dict[str, Any]:
     """Get the final state of an execution for HITL operations"""
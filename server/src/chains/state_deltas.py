@@ -0,0 +1,179 @@
+"""
+Delta-based node outputs for workflow events
+
+Graph nodes return the whole GraphState ({**state, ...}), so forwarding the
+node output as-is copies retrieved documents, SQL result rows and node_outputs
+into every node_completed event. Nodes instead declare which keys they change;
+events carry only those keys as size-capped previews and the final state is
+assembled incrementally from the same deltas. Nodes also declare the keys they
+read, so a resumed execution can reuse a node's delta when its inputs are unchanged.
+"""
+
+import hashlib
+import json
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+# Preview limits for node_completed event payloads
+MAX_PREVIEW_ITEMS = 10  # list items (documents, SQL statements, agent steps)
+MAX_PREVIEW_ROWS = 20  # structured_data rows
+MAX_PREVIEW_CHARS = 2000  # long strings (answers, observations)
+MAX_PREVIEW_DOC_CHARS = 500  # document page_content
+MAX_PREVIEW_DEPTH = 4
+
+# node name -> keys the node may change in the graph state
+NODE_CHANGED_KEYS: Dict[str, Tuple[str, ...]] = {}
+# node name -> keys the node's result depends on (used to memoize node outputs on resume)
+NODE_INPUT_KEYS: Dict[str, Tuple[str, ...]] = {}
+
+
+def declares_changes(*keys: str) -> Callable:
+    """
+    Decorator declaring the graph state keys a node changes.
+
+    The function itself is returned unchanged so LangGraph still sees the
+    original (sync or async) callable.
+    """
+    def decorator(func: Callable) -> Callable:
+        func.changed_keys = tuple(keys)
+        NODE_CHANGED_KEYS[func.__name__] = tuple(keys)
+        return func
+    return decorator
+
+
+def register_node_changes(node_name: str, keys: Iterable[str]) -> None:
+    """Declare changed keys for nodes that are not plain decorated functions (e.g. lambdas)"""
+    NODE_CHANGED_KEYS[node_name] = tuple(keys)
+
+
+def declares_inputs(*keys: str) -> Callable:
+    """Decorator declaring the graph state keys a node reads; the function is returned unchanged"""
+    def decorator(func: Callable) -> Callable:
+        func.input_keys = tuple(keys)
+        NODE_INPUT_KEYS[func.__name__] = tuple(keys)
+        return func
+    return decorator
+
+
+def _fingerprint_default(obj: Any) -> Any:
+    if hasattr(obj, "page_content"):
+        return {"page_content": obj.page_content, "metadata": getattr(obj, "metadata", None)}
+    if hasattr(obj, "__dict__"):
+        return {k: v for k, v in vars(obj).items() if not k.startswith("_")}
+    return str(obj)
+
+
+def node_input_fingerprint(node_name: str, state: Dict[str, Any]) -> Optional[str]:
+    """Stable hash of the declared inputs of a node, or None if the node declares none"""
+    keys = NODE_INPUT_KEYS.get(node_name)
+    if not keys:
+        return None
+    try:
+        payload = json.dumps(
+            {key: state.get(key) for key in keys}, sort_keys=True, default=_fingerprint_default, ensure_ascii=False
+        )
+    except (TypeError, ValueError, RecursionError):
+        # Inputs that cannot be fingerprinted are never memoized
+        return None
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def extract_node_delta(node_name: str, output: Any, current_state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extract the keys a node changed from its (full-state) output.
+
+    Declared keys are taken as-is; keys the node added that were not in the
+    current state are included as well so undeclared additions are not lost.
+    Values are passed by reference - no copies are made.
+    """
+    if not isinstance(output, dict):
+        return {}
+
+    declared = NODE_CHANGED_KEYS.get(node_name)
+    if declared is None:
+        # Undeclared node: keep keys whose value object changed (identity check, no deep compare)
+        return {k: v for k, v in output.items() if k not in current_state or current_state[k] is not v}
+
+    delta = {k: output[k] for k in declared if k in output}
+    for key, value in output.items():
+        if key not in delta and key not in current_state:
+            delta[key] = value
+    return delta
+
+
+def apply_node_delta(state: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge a node delta into the accumulated state in place"""
+    state.update(delta)
+    return state
+
+
+def _preview_document(doc: Any) -> Dict[str, Any]:
+    content = getattr(doc, "page_content", None)
+    if content is None and isinstance(doc, dict):
+        content = doc.get("page_content", "")
+    metadata = getattr(doc, "metadata", None)
+    if metadata is None and isinstance(doc, dict):
+        metadata = doc.get("metadata", {})
+    content = content or ""
+    return {
+        "page_content": content[:MAX_PREVIEW_DOC_CHARS],
+        "metadata": preview_value(metadata or {}, depth=1),
+        "content_length": len(content),
+        "truncated": len(content) > MAX_PREVIEW_DOC_CHARS,
+    }
+
+
+def _preview_structured_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    rows = data.get("rows") or []
+    preview = {k: preview_value(v, depth=1) for k, v in data.items() if k != "rows"}
+    preview["rows"] = [preview_value(row, depth=1) for row in rows[:MAX_PREVIEW_ROWS]]
+    preview["row_count"] = data.get("row_count", len(rows))
+    preview["rows_truncated"] = len(rows) > MAX_PREVIEW_ROWS
+    return preview
+
+
+def preview_value(value: Any, depth: int = 0) -> Any:
+    """Build a size-capped, JSON-friendly preview of a state value"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        if len(value) > MAX_PREVIEW_CHARS:
+            return value[:MAX_PREVIEW_CHARS] + f"... [truncated {len(value) - MAX_PREVIEW_CHARS} chars]"
+        return value
+    if hasattr(value, "page_content"):
+        return _preview_document(value)
+    if depth >= MAX_PREVIEW_DEPTH:
+        return str(value)[:MAX_PREVIEW_CHARS]
+    if isinstance(value, dict):
+        if "page_content" in value:
+            return _preview_document(value)
+        if isinstance(value.get("rows"), list):
+            return _preview_structured_data(value)
+        return {str(k): preview_value(v, depth + 1) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [preview_value(item, depth + 1) for item in value[:MAX_PREVIEW_ITEMS]]
+        if len(value) > MAX_PREVIEW_ITEMS:
+            items.append({"truncated": True, "total_items": len(value)})
+        return items
+    return str(value)[:MAX_PREVIEW_CHARS]
+
+
+def build_node_event_data(node_name: str, delta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the slim node_completed event payload.
+
+    Kept under "output" because the frontend reads node results from
+    event.data.output.<key>.
+    """
+    output: Dict[str, Any] = {}
+    for key, value in delta.items():
+        output[key] = preview_value(value)
+    # Surface document counts that the previews may have truncated
+    for key in ("retrieved_documents", "reranked_documents"):
+        if isinstance(delta.get(key), list):
+            output[f"{key.replace('_documents', '')}_count"] = len(delta[key])
+    return {
+        "output": output,
+        "changed_keys": list(delta.keys()),
+        "node": node_name,
+    }
+
@@ -0,0 +1,251 @@
+"""
+Time axis - detection, sorting and formatting of time-like chart labels.
+
+The label format is detected once per column from a sample using
+precompiled patterns; the column is then parsed (per distinct value) into a
+typed sort-key array, so sorting and formatting are single vectorized passes
+instead of a regex match per row or per sort comparison.
+
+Supported formats: ISO dates (optionally with a time part), US/EU slash
+dates, compact YYYYMMDD, year-month, quarters (2025-Q1 / Q1-2025), ISO weeks
+(2025-W01), bare years and month-of-year numbers (1-12).
+"""
+
+import re
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+# Time resolutions from finest to coarsest; bucketing never goes finer than the data
+TIME_RESOLUTIONS = ("day", "week", "month", "quarter", "year")
+_GROUPING_ALIASES = {"daily": "day", "weekly": "week", "monthly": "month",
+                     "quarterly": "quarter", "yearly": "year", "annual": "year"}
+
+MONTH_NAMES = np.array(["January", "February", "March", "April", "May", "June", "July",
+                        "August", "September", "October", "November", "December"])
+MONTH_ABBREVIATIONS = np.array(["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                                "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"])
+
+# Label formats, checked in order against a sample of the label column
+_ISO_DATE = re.compile(r'^\d{4}[-/]\d{1,2}[-/]\d{1,2}([ T].*)?$')
+_SLASH_DATE = re.compile(r'^(\d{1,2})[-/](\d{1,2})[-/](\d{4})$')
+_COMPACT_DATE = re.compile(r'^\d{8}$')
+_YEAR_MONTH = re.compile(r'^\d{4}[-/](0?[1-9]|1[0-2])$')
+# Compact YYYYMM is ambiguous with numeric ids, so it needs a plausible year and month
+_COMPACT_YEAR_MONTH = re.compile(r'^(19|20|21)\d{2}(0[1-9]|1[0-2])$')
+_QUARTER = re.compile(r'^(\d{4})[-/ ]?Q([1-4])$|^Q([1-4])[-/ ]?(\d{4})$', re.IGNORECASE)
+_WEEK = re.compile(r'^(\d{4})[-/]?W(\d{1,2})$', re.IGNORECASE)
+_YEAR = re.compile(r'^(19|20|21)\d{2}$')
+_MONTH_OF_YEAR = re.compile(r'^(0?[1-9]|1[0-2])$')
+
+# Extraction patterns used when parsing a column in a detected format
+_SLASH_DATE_PARTS = r'^(\d{1,2})[-/](\d{1,2})[-/](\d{4})$'
+_YEAR_MONTH_PARTS = r'^(\d{4})[-/]?(\d{1,2})$'
+_WEEK_PARTS = r'^(\d{4})[-/]?W(\d{1,2})$'
+
+
+def normalize_time_grouping(time_grouping: Optional[str]) -> str:
+    grouping = (time_grouping or "none").lower()
+    grouping = _GROUPING_ALIASES.get(grouping, grouping)
+    return grouping if grouping in TIME_RESOLUTIONS else "none"
+
+
+def detect_time_format(series: pd.Series, allow_ambiguous: bool = True, sample_size: int = 50) -> Optional[str]:
+    """
+    Detect the time format of a label column once, from a sample of its values.
+
+    Returns one of date, us_date, eu_date, compact_date, year_month, quarter,
+    week, year, month_of_year or None. Bare years, compact YYYYMM and month
+    numbers are ambiguous with ids, so they only count when allow_ambiguous is set.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "date"
+    sample = [str(value).strip() for value in series.dropna().head(sample_size * 2).tolist()]
+    sample = [value for value in sample if value][:sample_size]
+    if not sample:
+        return None
+
+    def all_match(pattern: re.Pattern) -> bool:
+        return all(pattern.match(value) for value in sample)
+
+    if all_match(_ISO_DATE):
+        return "date"
+    if all_match(_SLASH_DATE):
+        day_first = any(int(_SLASH_DATE.match(value).group(1)) > 12 for value in sample)
+        return "eu_date" if day_first else "us_date"
+    if all_match(_COMPACT_DATE):
+        return "compact_date"
+    if all_match(_QUARTER):
+        return "quarter"
+    if all_match(_WEEK):
+        return "week"
+    if allow_ambiguous and all_match(_YEAR):
+        return "year"
+    if all_match(_YEAR_MONTH) or (allow_ambiguous and all_match(_COMPACT_YEAR_MONTH)):
+        return "year_month"
+    if allow_ambiguous and all_match(_MONTH_OF_YEAR):
+        return "month_of_year"
+    return None
+
+
+def parse_time_column(series: pd.Series, time_format: str) -> pd.Series:
+    """
+    Parse a label column in the detected format to datetime64 (NaT when unparseable).
+
+    Only distinct labels are parsed: a year of daily rows for many stations
+    repeats the same few hundred dates, so parsing is O(unique labels).
+    """
+    if time_format == "date" and pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    codes, uniques = pd.factorize(series)
+    parsed = _parse_time_values(pd.Series(uniques, dtype=object), time_format).to_numpy(dtype="datetime64[ns]")
+    result = np.full(len(codes), np.datetime64("NaT"), dtype="datetime64[ns]")
+    found = codes >= 0
+    result[found] = parsed[codes[found]]
+    return pd.Series(result, index=series.index)
+
+
+def _parse_time_values(series: pd.Series, time_format: str) -> pd.Series:
+    text = series.astype(str).str.strip()
+    if time_format == "date":
+        date_part = text.str.split(r'[ T]', n=1, regex=True).str[0].str.replace("/", "-", regex=False)
+        return pd.to_datetime(date_part, format="%Y-%m-%d", errors="coerce")
+    if time_format in ("us_date", "eu_date"):
+        parts = text.str.extract(_SLASH_DATE_PARTS)
+        month, day = (parts[0], parts[1]) if time_format == "us_date" else (parts[1], parts[0])
+        return _from_parts(parts[2], month, day)
+    if time_format == "compact_date":
+        return pd.to_datetime(text, format="%Y%m%d", errors="coerce")
+    if time_format == "year_month":
+        parts = text.str.extract(_YEAR_MONTH_PARTS)
+        return _from_parts(parts[0], parts[1], "1")
+    if time_format == "year":
+        return _from_parts(text, "1", "1")
+    if time_format == "quarter":
+        parts = text.str.extract(_QUARTER.pattern, flags=re.IGNORECASE)
+        year = parts[0].fillna(parts[3])
+        quarter = pd.to_numeric(parts[1].fillna(parts[2]), errors="coerce")
+        return _from_parts(year, (quarter - 1) * 3 + 1, "1")
+    if time_format == "week":
+        parts = text.str.extract(_WEEK_PARTS, flags=re.IGNORECASE)
+        iso = parts[0] + "-W" + parts[1].str.zfill(2) + "-1"
+        return pd.to_datetime(iso, format="%G-W%V-%u", errors="coerce")
+    raise ValueError(f"Unsupported time format: {time_format}")
+
+
+def _from_parts(year: Any, month: Any, day: Any) -> pd.Series:
+    parts = pd.DataFrame({"year": year, "month": month, "day": day})
+    parts = parts.apply(pd.to_numeric, errors="coerce")
+    return pd.to_datetime(parts, errors="coerce")
+
+
+# Native resolution of each parsed format (the finest grouping that makes sense)
+NATIVE_RESOLUTION = {"date": "day", "us_date": "day", "eu_date": "day", "compact_date": "day",
+                      "week": "week", "year_month": "month", "quarter": "quarter", "year": "year"}
+
+PERIOD_FREQ = {"day": "D", "week": "W-SUN", "month": "M", "quarter": "Q", "year": "Y"}
+
+
+def format_time_buckets(starts: pd.Series, grouping: str) -> np.ndarray:
+    """Vectorized display labels for bucket start timestamps"""
+    years = starts.dt.year.astype(str)
+    # object dtype: numpy < 2 cannot add str to a fixed-width unicode array
+    months = pd.Series(MONTH_ABBREVIATIONS[starts.dt.month.to_numpy() - 1], index=starts.index, dtype=object)
+    if grouping == "year":
+        labels = years
+    elif grouping == "quarter":
+        labels = "Q" + starts.dt.quarter.astype(str) + " " + years
+    elif grouping == "month":
+        labels = months + " " + years
+    elif grouping == "week":
+        iso = starts.dt.isocalendar()
+        labels = "Week " + iso["week"].astype(str).str.zfill(2) + ", " + iso["year"].astype(str)
+    else:
+        labels = months + " " + starts.dt.day.astype(str) + ", " + years
+    return np.asarray(labels, dtype=object)
+
+
+def effective_grouping(time_format: str, time_grouping: Optional[str]) -> str:
+    """Requested grouping, but never finer than the resolution of the data itself"""
+    native = NATIVE_RESOLUTION.get(time_format, "day")
+    requested = normalize_time_grouping(time_grouping)
+    if requested != "none" and TIME_RESOLUTIONS.index(requested) > TIME_RESOLUTIONS.index(native):
+        return requested
+    return native
+
+
+def month_numbers(series: pd.Series) -> np.ndarray:
+    """Month-of-year labels as floats 1-12, NaN for anything else"""
+    months = pd.to_numeric(series.astype(str).str.strip(), errors="coerce").to_numpy(dtype=float)
+    valid = (months >= 1) & (months <= 12) & (months == np.floor(months))
+    return np.where(valid, months, np.nan)
+
+
+# Sort key for labels that cannot be parsed: after every real time value
+UNPARSED_SORT_KEY = np.iinfo(np.int64).max
+
+
+def time_sort_keys(series: pd.Series, time_format: Optional[str] = None) -> np.ndarray:
+    """
+    Typed int64 sort keys for a label column.
+
+    Month-of-year labels sort by month number, every other format by its
+    timestamp (ns); labels that do not parse sort last.
+    """
+    series = pd.Series(series) if not isinstance(series, pd.Series) else series
+    time_format = time_format or detect_time_format(series)
+    if time_format is None:
+        return np.full(len(series), UNPARSED_SORT_KEY, dtype=np.int64)
+    if time_format == "month_of_year":
+        months = month_numbers(series)
+        # Filled after the cast: float64(INT64_MAX) would overflow to INT64_MIN and sort first
+        unparsed = np.isnan(months)
+        return np.where(unparsed, UNPARSED_SORT_KEY, np.where(unparsed, 0, months).astype(np.int64))
+    parsed = parse_time_column(series, time_format).to_numpy(dtype="datetime64[ns]")
+    keys = parsed.astype(np.int64)
+    keys[np.isnat(parsed)] = UNPARSED_SORT_KEY
+    return keys
+
+
+def chronological_order(series: pd.Series, time_format: Optional[str] = None) -> np.ndarray:
+    """Stable argsort of a label column in time order (plain string order when no format is detected)"""
+    series = pd.Series(series) if not isinstance(series, pd.Series) else series
+    time_format = time_format or detect_time_format(series)
+    if time_format is None:
+        return np.argsort(series.astype(str).to_numpy(), kind="stable")
+    return np.argsort(time_sort_keys(series, time_format), kind="stable")
+
+
+def format_time_labels(series: pd.Series, time_format: Optional[str] = None,
+                       time_grouping: Optional[str] = None) -> np.ndarray:
+    """
+    Display labels for a time label column (e.g. "Jan 15, 2025", "Mar 2025",
+    "Q1 2025", "Week 03, 2025", "March"); labels that do not parse are kept.
+    """
+    series = pd.Series(series) if not isinstance(series, pd.Series) else series
+    original = series.astype(str).to_numpy(dtype=object)
+    time_format = time_format or detect_time_format(series)
+    if time_format is None:
+        return original
+    if time_format == "month_of_year":
+        # Detection only sees a sample, so labels outside 1-12 are kept like other unparsed labels
+        months = month_numbers(series)
+        valid = ~np.isnan(months)
+        labels = original.copy()
+        labels[valid] = MONTH_NAMES[months[valid].astype(int) - 1]
+        return labels
+
+    codes, uniques = pd.factorize(series)
+    parsed = pd.Series(parse_time_column(pd.Series(uniques, dtype=object), time_format))
+    valid = parsed.notna().to_numpy()
+    formatted = np.empty(len(uniques), dtype=object)
+    if valid.any():
+        formatted[valid] = format_time_buckets(parsed[valid].reset_index(drop=True),
+                                               effective_grouping(time_format, time_grouping))
+    labels = original.copy()
+    found = codes >= 0
+    usable = found.copy()
+    usable[found] = valid[codes[found]]
+    labels[usable] = formatted[codes[usable]]
+    return labels
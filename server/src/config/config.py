@@ -142,6 +142,82 @@ class Config:
     
     # Cache configuration
     CACHE_TTL: int = 300  # 5 minutes
+
+    # Execution state store configuration (workflow/HITL state kept per execution)
+    EXECUTION_STATE_MAX_ENTRIES: int = int(os.getenv("EXECUTION_STATE_MAX_ENTRIES", "200"))
+    EXECUTION_STATE_TTL_SECONDS: int = int(os.getenv("EXECUTION_STATE_TTL_SECONDS", "3600"))  # 1 hour
+    EXECUTION_STATE_SPILL_TTL_SECONDS: int = int(os.getenv("EXECUTION_STATE_SPILL_TTL_SECONDS", "86400"))  # 24 hours
+    EXECUTION_STATE_SPILL_DIR: Path = DATA_DIR / "execution_states"
+    EXECUTION_STATE_CLEANUP_INTERVAL_SECONDS: int = int(os.getenv("EXECUTION_STATE_CLEANUP_INTERVAL_SECONDS", "300"))
+
+    # HITL checkpoints: versioned per-node/pause/interrupt snapshots in SQLite (resumable after restart)
+    HITL_CHECKPOINT_DB_PATH: Path = Path(os.getenv("HITL_CHECKPOINT_DB_PATH", str(DATA_DIR / "hitl_checkpoints.db")))
+    HITL_CHECKPOINT_TTL_SECONDS: int = int(os.getenv("HITL_CHECKPOINT_TTL_SECONDS", "86400"))  # 24 hours
+    HITL_CHECKPOINT_CLEANUP_INTERVAL_SECONDS: int = int(os.getenv("HITL_CHECKPOINT_CLEANUP_INTERVAL_SECONDS", "900"))
+    HITL_NODE_CHECKPOINTS: bool = os.getenv("HITL_NODE_CHECKPOINTS", "true").lower() == "true"
+
+    # Metrics configuration (exposed at /metrics)
+    EVENT_LOOP_LAG_INTERVAL_SECONDS: float = float(os.getenv("EVENT_LOOP_LAG_INTERVAL_SECONDS", "0.5"))
+    EVENT_LOOP_LAG_WARN_SECONDS: float = float(os.getenv("EVENT_LOOP_LAG_WARN_SECONDS", "0.2"))
+
+    # Tracing configuration (OTLP/JSON spans; exporter: file, otlp or none)
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "file")
+    TRACING_FILE_DIR: Path = DATA_DIR / "traces"
+    OTLP_TRACES_ENDPOINT: str = os.getenv("OTLP_TRACES_ENDPOINT", "http://localhost:4318/v1/traces")
+    TRACING_MAX_SPANS_PER_EXECUTION: int = int(os.getenv("TRACING_MAX_SPANS_PER_EXECUTION", "2000"))
+
+    # Startup configuration (import-time profile is logged after model warm-up)
+    STARTUP_IMPORT_PROFILE: bool = os.getenv("STARTUP_IMPORT_PROFILE", "false").lower() == "true"
+    STARTUP_IMPORT_PROFILE_TOP_N: int = int(os.getenv("STARTUP_IMPORT_PROFILE_TOP_N", "15"))
+
+    # Chart data configuration (long series are downsampled, pie tails folded into "Other")
+    CHART_MAX_POINTS: int = int(os.getenv("CHART_MAX_POINTS", "500"))
+    CHART_PIE_MAX_SLICES: int = int(os.getenv("CHART_PIE_MAX_SLICES", "10"))
+    # Rule-based chart specs at or above this confidence skip the chart LLM call
+    CHART_RULE_MIN_CONFIDENCE: float = float(os.getenv("CHART_RULE_MIN_CONFIDENCE", "0.75"))
+
+    # Prompt budgets in tokens (final answer prompt; oversized sections are summarized/truncated)
+    PROMPT_MAX_TOKENS: int = int(os.getenv("PROMPT_MAX_TOKENS", "8000"))
+    PROMPT_BUDGET_RAG_TOKENS: int = int(os.getenv("PROMPT_BUDGET_RAG_TOKENS", "2000"))
+    PROMPT_BUDGET_SQL_ANSWER_TOKENS: int = int(os.getenv("PROMPT_BUDGET_SQL_ANSWER_TOKENS", "2500"))
+    PROMPT_BUDGET_DATA_TOKENS: int = int(os.getenv("PROMPT_BUDGET_DATA_TOKENS", "1500"))
+    
+    # API rate limiting (GCRA per client IP). Backends: memory (per worker process),
+    # sqlite (shared by the workers on one host) or redis (shared across hosts)
+    RATE_LIMIT_MAX_REQUESTS: int = int(os.getenv("RATE_LIMIT_MAX_REQUESTS", "10"))
+    RATE_LIMIT_WINDOW_SECONDS: int = int(os.getenv("RATE_LIMIT_WINDOW_SECONDS", "600"))
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_SQLITE_PATH: Path = Path(os.getenv("RATE_LIMIT_SQLITE_PATH", str(DATA_DIR / "rate_limits.db")))
+    RATE_LIMIT_REDIS_URL: str = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+    
+    # File uploads: streamed to disk in chunks, then processed by background ingestion workers
+    UPLOAD_MAX_SIZE_MB: int = int(os.getenv("UPLOAD_MAX_SIZE_MB", "512"))
+    UPLOAD_CHUNK_SIZE_KB: int = int(os.getenv("UPLOAD_CHUNK_SIZE_KB", "1024"))
+    # Durable ingestion queue
+    INGESTION_WORKERS: int = int(os.getenv("INGESTION_WORKERS", "2"))
+    INGESTION_EMBEDDING_CONCURRENCY: int = int(os.getenv("INGESTION_EMBEDDING_CONCURRENCY", "2"))
+    INGESTION_EMBED_BATCH_SIZE: int = int(os.getenv("INGESTION_EMBED_BATCH_SIZE", "64"))
+    INGESTION_MAX_ATTEMPTS: int = int(os.getenv("INGESTION_MAX_ATTEMPTS", "3"))
+    INGESTION_RETRY_BASE_SECONDS: float = float(os.getenv("INGESTION_RETRY_BASE_SECONDS", "10"))
+    INGESTION_JOB_LEASE_SECONDS: float = float(os.getenv("INGESTION_JOB_LEASE_SECONDS", "600"))
+    INGESTION_POLL_SECONDS: float = float(os.getenv("INGESTION_POLL_SECONDS", "5"))
+    
+    # Table index written by data_warehouse/dbt/generate_rag_docs.py (table -> layer, columns, lineage, synonyms)
+    TABLE_INDEX_PATH: Path = Path(os.getenv("TABLE_INDEX_PATH", str(PROJECT_ROOT / "data_warehouse" / "dbt" / "rag_docs" / "table_index.json")))
+    # dbt target directory (run_results.json of the last dbt run)
+    DBT_TARGET_DIR: Path = Path(os.getenv("DBT_TARGET_DIR", str(PROJECT_ROOT / "data_warehouse" / "dbt" / "target")))
+
+    # SQL result cache for mart tables: results stored as Parquet, keyed by normalized SQL plus a
+    # freshness token per table (dbt: last dbt run of the model; probe: MAX(<probe column>))
+    RESULT_CACHE_ENABLED: bool = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+    RESULT_CACHE_DIR: Path = Path(os.getenv("RESULT_CACHE_DIR", str(DATA_DIR / "result_cache")))
+    RESULT_CACHE_FRESHNESS: str = os.getenv("RESULT_CACHE_FRESHNESS", "dbt")
+    RESULT_CACHE_TABLE_PREFIXES: str = os.getenv("RESULT_CACHE_TABLE_PREFIXES", "mart_")
+    RESULT_CACHE_MAX_ENTRIES: int = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1000"))
+    RESULT_CACHE_TTL_SECONDS: int = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "604800"))  # 7 days
+    RESULT_CACHE_PROBE_COLUMN: str = os.getenv("RESULT_CACHE_PROBE_COLUMN", "updated_at")
+    RESULT_CACHE_PROBE_INTERVAL_SECONDS: float = float(os.getenv("RESULT_CACHE_PROBE_INTERVAL_SECONDS", "60"))
     
     # Logging configuration
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
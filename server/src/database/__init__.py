@@ -8,6 +8,8 @@ __all__ = [
     'initialize_database', 'get_datasources', 'get_datasource', 
     'create_datasource', 'update_datasource', 'delete_datasource',
     'set_active_datasource', 'get_active_datasource',
-    'save_file_info', 'get_files_by_datasource', 
-    'update_file_processing_status', 'delete_file_record_and_associated_data'
+    'save_file_info', 'find_file_by_hash', 'get_files_by_datasource', 
+    'update_file_processing_status', 'delete_file_record_and_associated_data',
+    'create_ingestion_job', 'claim_next_ingestion_job', 'update_ingestion_job',
+    'get_ingestion_jobs', 'count_ingestion_jobs_by_status'
 ] 
\ No newline at end of file
@@ -1,3 +1,4 @@
+import asyncio
 import sqlite3
 import os
 from pathlib import Path
@@ -5,6 +6,7 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 import csv
 import json
+import time
 # Import DataSourceType to check the type of datasource being deleted
 from ..models.data_models import DataSourceType # Updated import path
 
@@ -164,9 +166,34 @@ def initialize_database_schema():
                 error_message TEXT,
                 uploaded_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
                 processed_at DATETIME,
+                content_hash TEXT,                      -- SHA-256 of the file content (dedup)
                 FOREIGN KEY (datasource_id) REFERENCES datasources (id) ON DELETE CASCADE
             )
         ''')
+        ensure_column("files", "content_hash", "ALTER TABLE files ADD COLUMN content_hash TEXT")
+        
+        # Create ingestion jobs table (durable background processing queue for uploaded files)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_id INTEGER NOT NULL,
+                datasource_id INTEGER NOT NULL,
+                file_path TEXT NOT NULL,
+                original_filename TEXT NOT NULL,
+                file_type TEXT NOT NULL,
+                client_id TEXT,                         -- WebSocket client receiving progress events
+                status TEXT NOT NULL DEFAULT 'queued',  -- queued, running, completed, failed
+                step TEXT,                              -- last completed pipeline step
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 3,
+                error_message TEXT,
+                next_attempt_at REAL NOT NULL DEFAULT 0, -- epoch seconds; retries are delayed
+                lease_expires_at REAL,                  -- running jobs whose lease expired are reclaimed
+                created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (file_id) REFERENCES files (id) ON DELETE CASCADE
+            )
+        ''')
         
         # vector_chunks table removed - no longer needed
         
@@ -176,6 +203,8 @@ def initialize_database_schema():
         
         # Create indexes for better performance (guarded)
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_files_datasource_id ON files(datasource_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_files_datasource_hash ON files(datasource_id, content_hash)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_status ON ingestion_jobs(status, next_attempt_at)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_datasources_is_active ON datasources(is_active)')
         
         # Insert default datasource if not exists
@@ -568,16 +597,16 @@ async def get_datasource_schema_info(datasource_id: int) -> Dict[str, List[Dict]
 # ================== File Management Functions ==================
 
 async def save_file_info(filename: str, original_filename: str, file_type: str, 
-                        file_size: int, datasource_id: int) -> Optional[int]:
+                        file_size: int, datasource_id: int, content_hash: str = None) -> Optional[int]:
     """Save file information to the database"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
         cursor.execute('''
-            INSERT INTO files (filename, original_filename, file_type, file_size, datasource_id)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (filename, original_filename, file_type, file_size, datasource_id))
+            INSERT INTO files (filename, original_filename, file_type, file_size, datasource_id, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (filename, original_filename, file_type, file_size, datasource_id, content_hash))
         
         file_id = cursor.lastrowid
         
@@ -598,6 +627,28 @@ async def save_file_info(filename: str, original_filename: str, file_type: str,
     finally:
         conn.close()
 
+async def find_file_by_hash(datasource_id: int, content_hash: str) -> Optional[Dict[str, Any]]:
+    """Find a file with the same content in a data source that was not rejected by processing"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute('''
+            SELECT id, filename, original_filename, processing_status
+            FROM files 
+            WHERE datasource_id = ? AND content_hash = ? AND processing_status != 'failed'
+            ORDER BY id DESC
+            LIMIT 1
+        ''', (datasource_id, content_hash))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+        
+    except Exception as e:
+        print(f"[DB-SQLite] Error looking up file by hash: {e}")
+        return None
+    finally:
+        conn.close()
+
 async def get_files_by_datasource(datasource_id: int) -> List[Dict[str, Any]]:
     """Fetch all files associated with a specific data source"""
     conn = get_db_connection()
@@ -607,7 +658,7 @@ async def get_files_by_datasource(datasource_id: int) -> List[Dict[str, Any]]:
         cursor.execute('''
             SELECT id, filename, original_filename, file_type, file_size, 
                    datasource_id, processing_status, processed_chunks, 
-                   error_message, uploaded_at, processed_at
+                   error_message, uploaded_at, processed_at, content_hash
             FROM files 
             WHERE datasource_id = ?
             ORDER BY uploaded_at DESC
@@ -627,7 +678,8 @@ async def get_files_by_datasource(datasource_id: int) -> List[Dict[str, Any]]:
                 'processed_chunks': row['processed_chunks'],
                 'error_message': row['error_message'],
                 'uploaded_at': row['uploaded_at'],
-                'processed_at': row['processed_at']
+                'processed_at': row['processed_at'],
+                'content_hash': row['content_hash']
             })
         
         return files
@@ -730,6 +782,141 @@ async def delete_file_record_and_associated_data(file_id: int) -> bool:
     finally:
         conn.close()
 
+# ================== Ingestion Job Functions ==================
+
+INGESTION_JOB_FIELDS = (
+    "id", "file_id", "datasource_id", "file_path", "original_filename", "file_type", "client_id",
+    "status", "step", "attempts", "max_attempts", "error_message", "next_attempt_at",
+    "lease_expires_at", "created_at", "updated_at",
+)
+
+async def create_ingestion_job(file_id: int, datasource_id: int, file_path: str, original_filename: str,
+                               file_type: str, client_id: Optional[str] = None, max_attempts: int = 3) -> Optional[int]:
+    """Queue a file for background ingestion"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute('''
+            INSERT INTO ingestion_jobs (file_id, datasource_id, file_path, original_filename, file_type, client_id, max_attempts)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (file_id, datasource_id, file_path, original_filename, file_type, client_id, max_attempts))
+        conn.commit()
+        return cursor.lastrowid
+        
+    except Exception as e:
+        print(f"[DB-SQLite] Error creating ingestion job: {e}")
+        conn.rollback()
+        return None
+    finally:
+        conn.close()
+
+async def claim_next_ingestion_job(lease_seconds: float) -> Optional[Dict[str, Any]]:
+    """
+    Atomically claim the oldest runnable job: queued and due, or running with an
+    expired lease (its worker died, e.g. the process was restarted).
+
+    Runs in a thread: BEGIN IMMEDIATE waits for the SQLite write lock (up to the busy
+    timeout) and must not block the event loop while other workers hold it.
+    """
+    return await asyncio.to_thread(_claim_next_ingestion_job, lease_seconds)
+
+def _claim_next_ingestion_job(lease_seconds: float) -> Optional[Dict[str, Any]]:
+    conn = get_db_connection()
+    now = time.time()
+    
+    try:
+        # IMMEDIATE takes the write lock up front, so two workers (or processes) never claim the same job
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute('''
+            SELECT id FROM ingestion_jobs
+            WHERE (status = 'queued' AND next_attempt_at <= ?)
+               OR (status = 'running' AND lease_expires_at < ?)
+            ORDER BY id
+            LIMIT 1
+        ''', (now, now)).fetchone()
+        if not row:
+            conn.rollback()
+            return None
+        conn.execute('''
+            UPDATE ingestion_jobs
+            SET status = 'running', attempts = attempts + 1, lease_expires_at = ?, updated_at = ?
+            WHERE id = ?
+        ''', (now + lease_seconds, datetime.now().strftime(DATE_FORMAT), row['id']))
+        job = conn.execute(f"SELECT {', '.join(INGESTION_JOB_FIELDS)} FROM ingestion_jobs WHERE id = ?", (row['id'],)).fetchone()
+        conn.commit()
+        return dict(job)
+        
+    except Exception as e:
+        print(f"[DB-SQLite] Error claiming ingestion job: {e}")
+        conn.rollback()
+        return None
+    finally:
+        conn.close()
+
+async def update_ingestion_job(job_id: int, **fields: Any) -> bool:
+    """Update columns of an ingestion job (e.g. status, step, error_message, lease_expires_at)"""
+    unknown = set(fields) - set(INGESTION_JOB_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown ingestion job fields: {sorted(unknown)}")
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        fields["updated_at"] = datetime.now().strftime(DATE_FORMAT)
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        cursor.execute(f"UPDATE ingestion_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+        conn.commit()
+        return cursor.rowcount > 0
+        
+    except Exception as e:
+        print(f"[DB-SQLite] Error updating ingestion job {job_id}: {e}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+async def get_ingestion_jobs(datasource_id: Optional[int] = None, status: Optional[str] = None,
+                             limit: int = 100) -> List[Dict[str, Any]]:
+    """List ingestion jobs, newest first"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        conditions, params = [], []
+        if datasource_id is not None:
+            conditions.append("datasource_id = ?")
+            params.append(datasource_id)
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor.execute(
+            f"SELECT {', '.join(INGESTION_JOB_FIELDS)} FROM ingestion_jobs {where} ORDER BY id DESC LIMIT ?",
+            (*params, limit),
+        )
+        return [dict(row) for row in cursor.fetchall()]
+        
+    except Exception as e:
+        print(f"[DB-SQLite] Error fetching ingestion jobs: {e}")
+        return []
+    finally:
+        conn.close()
+
+async def count_ingestion_jobs_by_status() -> Dict[str, int]:
+    """Number of ingestion jobs per status"""
+    conn = get_db_connection()
+    
+    try:
+        rows = conn.execute("SELECT status, COUNT(*) AS n FROM ingestion_jobs GROUP BY status").fetchall()
+        return {row['status']: row['n'] for row in rows}
+        
+    except Exception as e:
+        print(f"[DB-SQLite] Error counting ingestion jobs: {e}")
+        return {}
+    finally:
+        conn.close()
+
 # ================== HITL (Human-in-the-Loop) Operations ==================
 
 def create_hitl_interrupt(execution_id: str, user_input: str, datasource_id: Optional[int], 
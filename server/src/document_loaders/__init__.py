@@ -2,6 +2,12 @@
 Document Loaders module - Contains file processing and document loading functionality
 """
 
-from .file_processor import process_uploaded_file
- 
-__all__ = ['process_uploaded_file'] 
\ No newline at end of file
+from .file_processor import PermanentIngestionError, process_uploaded_file
+from .ingestion_queue import IngestionJob, ingestion_queue, start_ingestion_workers, stop_ingestion_workers
+from .upload_stream import UploadTooLargeError, stream_upload_to_disk
+
+__all__ = [
+    'PermanentIngestionError', 'process_uploaded_file',
+    'IngestionJob', 'ingestion_queue', 'start_ingestion_workers', 'stop_ingestion_workers',
+    'UploadTooLargeError', 'stream_upload_to_disk',
+]
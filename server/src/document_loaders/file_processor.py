@@ -1,65 +1,227 @@
 import asyncio
+import json
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from ..database.db_operations import update_file_processing_status, get_datasource
 from ..models.data_models import ProcessingStatus, DataSourceType, FileType
 import logging
 
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock below applies
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
+SUPPORTED_FILE_TYPES = (FileType.PDF.value, FileType.DOCX.value, FileType.TEXT.value, FileType.MD.value)
+# Same splitter settings as query-time retrieval, so merged chunks match a full rebuild
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+# One index writer per datasource: FAISS indexes are loaded, extended and saved as a whole.
+# The asyncio lock orders the writers of this process; the file lock (_index_file_lock) orders
+# worker processes on the same host. On platforms without fcntl (Windows) only the asyncio lock
+# applies, so run a single worker process there.
+_index_locks: Dict[int, asyncio.Lock] = {}
+
+ProgressCallback = Callable[..., Any]
+
+
+class PermanentIngestionError(Exception):
+    """Ingestion failure that retrying cannot fix (unsupported file, missing datasource)"""
+
+
+async def check_ingestible(datasource_id: int, file_type: str) -> Dict[str, Any]:
+    """Return the datasource, or raise PermanentIngestionError if the file cannot be ingested into it"""
+    datasource = await get_datasource(datasource_id)
+    if not datasource:
+        raise PermanentIngestionError("Associated datasource not found.")
+    ds_type = datasource.get('type')
+    if ds_type not in [DataSourceType.KNOWLEDGE_BASE.value, DataSourceType.HYBRID.value] or file_type.lower() not in SUPPORTED_FILE_TYPES:
+        raise PermanentIngestionError(
+            f"File type '{file_type}' is not supported for datasource type '{ds_type}'. "
+            f"Only PDF, DOCX, TXT, and MD files are supported for document processing."
+        )
+    return datasource
+
+
+def extract_pages(file_path: Path, file_type: str) -> List[str]:
+    """Extract text per page (PDF) or as a single page (DOCX, TXT, MD)"""
+    file_type = file_type.lower()
+    if file_type == FileType.PDF.value:
+        import PyPDF2
+        with open(file_path, 'rb') as f:
+            return [page.extract_text() or "" for page in PyPDF2.PdfReader(f).pages]
+    if file_type == FileType.DOCX.value:
+        from docx import Document as DocxDocument
+        return ["\n".join(paragraph.text for paragraph in DocxDocument(file_path).paragraphs)]
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        return [f.read()]
+
+
+def split_into_chunks(pages: List[str], source: str, file_id: int) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Chunk page texts; metadata carries source/file_id like query-time retrieval documents"""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    texts, metadatas = [], []
+    for page_number, page in enumerate(pages, start=1):
+        if not page.strip():
+            continue
+        for chunk in splitter.split_text(page):
+            texts.append(chunk)
+            metadatas.append({"source": source, "file_id": file_id, "page": page_number})
+    return texts, metadatas
+
+
+async def embed_texts(texts: List[str], batch_size: int,
+                      on_batch: Optional[Callable[[int], Any]] = None) -> List[List[float]]:
+    """Embed texts in batches, calling on_batch(embedded_so_far) after each batch"""
+    from ..agents.intelligent_agent import get_agent_embeddings
+
+    embeddings = get_agent_embeddings()
+    if not embeddings:
+        raise RuntimeError("Embeddings not initialized")
+    vectors: List[List[float]] = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(await embeddings.aembed_documents(texts[start:start + batch_size]))
+        if on_batch:
+            await on_batch(len(vectors))
+    return vectors
+
+
+@contextmanager
+def _index_file_lock(index_path: Path):
+    """Exclusive lock on <index>.lock, held by one process on the host at a time (no-op without fcntl)"""
+    if fcntl is None:
+        yield
+        return
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(index_path.with_suffix(".lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _merge_into_index_sync(datasource_id: int, file_id: int, texts: List[str],
+                           metadatas: List[Dict[str, Any]], vectors: List[List[float]]) -> int:
+    from langchain_community.vectorstores import FAISS
+    from ..agents.intelligent_agent import VECTOR_STORE_DIR, get_agent_embeddings
+
+    embeddings = get_agent_embeddings()
+    index_path = VECTOR_STORE_DIR / f"datasource_{datasource_id}.faiss"
+    # Deterministic ids make a retried merge replace the chunks of an interrupted one
+    ids = [f"{file_id}:{i}" for i in range(len(texts))]
+    pairs = list(zip(texts, vectors))
+    with _index_file_lock(index_path):
+        if index_path.exists():
+            store = FAISS.load_local(str(index_path), embeddings, allow_dangerous_deserialization=True)
+            stale = set(ids) & set(store.index_to_docstore_id.values())
+            if stale:
+                store.delete(list(stale))
+            store.add_embeddings(pairs, metadatas=metadatas, ids=ids)
+        else:
+            store = FAISS.from_embeddings(pairs, embeddings, metadatas=metadatas, ids=ids)
+        store.save_local(str(index_path))
+        return store.index.ntotal
+
+
+async def merge_into_index(datasource_id: int, file_id: int, texts: List[str],
+                           metadatas: List[Dict[str, Any]], vectors: List[List[float]]) -> int:
+    """Add a file's chunk vectors to the datasource's persistent FAISS index; returns the index size"""
+    lock = _index_locks.setdefault(datasource_id, asyncio.Lock())
+    async with lock:
+        return await asyncio.to_thread(_merge_into_index_sync, datasource_id, file_id, texts, metadatas, vectors)
+
+
+def _chunk_file_id(doc: Any) -> Optional[int]:
+    """file_id from a docstore entry's metadata (None for missing entries or foreign metadata)"""
+    metadata = getattr(doc, "metadata", None) or {}
+    try:
+        return int(metadata.get("file_id"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _remove_from_index_sync(datasource_id: int, file_id: int) -> int:
+    from langchain_community.vectorstores import FAISS
+    from ..agents.intelligent_agent import VECTOR_STORE_DIR, get_agent_embeddings
+
+    index_path = VECTOR_STORE_DIR / f"datasource_{datasource_id}.faiss"
+    with _index_file_lock(index_path):
+        if not index_path.exists():
+            return 0
+        store = FAISS.load_local(str(index_path), get_agent_embeddings(), allow_dangerous_deserialization=True)
+        # Match on chunk metadata rather than the id: indexes rebuilt at query time or before
+        # deterministic ids were introduced carry uuid ids for the same file's chunks
+        ids = [doc_id for doc_id in store.index_to_docstore_id.values()
+               if _chunk_file_id(store.docstore.search(doc_id)) == file_id]
+        if ids:
+            store.delete(ids)
+            store.save_local(str(index_path))
+        return len(ids)
+
+
+async def remove_from_index(datasource_id: int, file_id: int) -> int:
+    """Remove a file's chunk vectors from the datasource's persistent FAISS index; returns the number removed"""
+    lock = _index_locks.setdefault(datasource_id, asyncio.Lock())
+    async with lock:
+        return await asyncio.to_thread(_remove_from_index_sync, datasource_id, file_id)
+
+
+def save_chunks(path: Path, texts: List[str], metadatas: List[Dict[str, Any]], page_count: int) -> None:
+    path.write_text(json.dumps({"texts": texts, "metadatas": metadatas, "pages": page_count}), encoding='utf-8')
+
+
+def load_chunks(path: Path) -> Tuple[List[str], List[Dict[str, Any]], int]:
+    data = json.loads(path.read_text(encoding='utf-8'))
+    return data["texts"], data["metadatas"], data.get("pages", 0)
+
+
 async def process_uploaded_file(
-    file_id: int, 
-    datasource_id: int, 
-    file_path: Path, 
-    original_filename: str, 
-    file_type: str 
+    file_id: int,
+    datasource_id: int,
+    file_path: Path,
+    original_filename: str,
+    file_type: str,
+    embed_batch_size: int = 64,
+    progress: Optional[ProgressCallback] = None,
 ):
     """
-    Background task to process uploaded files for RAG (document knowledge base).
-    Only supports PDF, DOCX, and TXT files for document processing.
+    Process an uploaded file for RAG (document knowledge base) in one go:
+    extract pages, chunk, embed and merge into the datasource's vector index.
+    Only supports PDF, DOCX, TXT and MD files. The ingestion queue runs the
+    same steps with checkpoints and retries.
     """
     logger.info(f"[FileProcessor] Starting processing for file ID: {file_id}, DS_ID: {datasource_id}, Name: {original_filename}")
 
-    datasource_details = await get_datasource(datasource_id)
-    if not datasource_details:
-        logger.error(f"[FileProcessor] Datasource {datasource_id} not found. Cannot process file {file_id}.")
-        await update_file_processing_status(file_id, status=ProcessingStatus.FAILED.value, error_message="Associated datasource not found.")
-        return
-
-    ds_type = datasource_details.get('type')
+    async def report(stage: str, **details: Any) -> None:
+        if progress:
+            await progress(stage, **details)
 
     try:
+        await check_ingestible(datasource_id, file_type)
         await update_file_processing_status(file_id, status=ProcessingStatus.PROCESSING.value)
-        logger.info(f"[FileProcessor] File ID: {file_id} - Status set to PROCESSING. Datasource type: {ds_type}")
-
-        # Only process document files for KNOWLEDGE_BASE and HYBRID data sources
-        if ds_type in [DataSourceType.KNOWLEDGE_BASE.value, DataSourceType.HYBRID.value] and file_type.lower() in [FileType.PDF.value, FileType.DOCX.value, FileType.TEXT.value, FileType.MD.value]:
-            
-            logger.info(f"[FileProcessor] Processing '{file_type}' file '{original_filename}' for document knowledge base (DS type: {ds_type}).")
-            
-            # Simulate document processing (text extraction and chunking)
-            # In a real implementation, this would:
-            # 1. Extract text from PDF/DOCX/TXT/MD files
-            # 2. Split text into chunks
-            # 3. Generate embeddings
-            # 4. Store in vector database
-            
-            # For now, simulate processing time
-            await asyncio.sleep(2)
-            
-            # Update processing status to completed (compat without processed_chunks kw)
-            try:
-                await update_file_processing_status(file_id, status=ProcessingStatus.COMPLETED.value, processed_chunks=10)
-            except TypeError:
-                await update_file_processing_status(file_id, status=ProcessingStatus.COMPLETED.value)
-            logger.info(f"[FileProcessor] File ID: {file_id} - Document processing completed successfully.")
-            
-        else:
-            # Unsupported file type or datasource type
-            error_msg = f"File type '{file_type}' is not supported for datasource type '{ds_type}'. Only PDF, DOCX, TXT, and MD files are supported for document processing."
-            logger.warning(f"[FileProcessor] {error_msg}")
-            await update_file_processing_status(file_id, status=ProcessingStatus.FAILED.value, error_message=error_msg)
+
+        pages = await asyncio.to_thread(extract_pages, file_path, file_type)
+        texts, metadatas = split_into_chunks(pages, original_filename, file_id)
+        await report("extracted", pages=len(pages), chunks=len(texts))
+        if not texts:
+            raise PermanentIngestionError("No text content could be extracted from the file.")
+
+        async def on_batch(done: int) -> None:
+            await report("embedding", chunks_embedded=done, chunks_total=len(texts))
+
+        vectors = await embed_texts(texts, embed_batch_size, on_batch)
+        index_size = await merge_into_index(datasource_id, file_id, texts, metadatas, vectors)
+        await report("indexed", chunks=len(texts), index_size=index_size)
+
+        await update_file_processing_status(file_id, status=ProcessingStatus.COMPLETED.value, chunks=len(texts))
+        logger.info(f"[FileProcessor] File ID: {file_id} - {len(pages)} pages, {len(texts)} chunks indexed.")
 
     except Exception as e:
         logger.error(f"[FileProcessor] Error processing file ID: {file_id}, Error: {e}", exc_info=True)
-        await update_file_processing_status(file_id, status=ProcessingStatus.FAILED.value, error_message=str(e))
\ No newline at end of file
+        await update_file_processing_status(file_id, status=ProcessingStatus.FAILED.value, error_message=str(e))
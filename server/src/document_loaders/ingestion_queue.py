@@ -0,0 +1,285 @@
+"""
+Ingestion queue - durable background processing of uploaded files.
+
+Uploads are acknowledged as soon as the file is on disk and a job row is
+written to the ingestion_jobs table; worker tasks claim jobs from there and
+run the document pipeline in checkpointed steps:
+- extract: pages are extracted and chunked; chunks are saved to the job's work dir
+- embed:   chunks are embedded in batches; vectors are saved to the work dir
+- index:   vectors are merged into the datasource's FAISS index
+
+A retry (or a worker picking the job up after a restart) skips the steps whose
+output is already saved. Claimed jobs hold a lease that is renewed on a timer
+while the worker runs them; a job whose lease expires (its process died) is
+claimed again.
+Failed jobs are retried with exponential backoff up to max_attempts.
+
+Concurrency is bounded: INGESTION_WORKERS jobs run at once (default: 2; the heavy
+steps run in threads, so a few workers keep the CPU busy) and at most INGESTION_EMBEDDING_CONCURRENCY of them call the embedding
+model at the same time. Progress events (pages extracted, chunks embedded,
+index merged) are sent over the WebSocket manager.
+"""
+
+import asyncio
+import logging
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..config.config import DATA_DIR, Config
+from ..database.db_operations import (
+    claim_next_ingestion_job,
+    count_ingestion_jobs_by_status,
+    create_ingestion_job,
+    update_file_processing_status,
+    update_ingestion_job,
+)
+from ..models.data_models import ProcessingStatus
+from ..websocket.websocket_manager import websocket_manager
+from .file_processor import (
+    PermanentIngestionError,
+    check_ingestible,
+    embed_texts,
+    extract_pages,
+    load_chunks,
+    merge_into_index,
+    save_chunks,
+    split_into_chunks,
+)
+
+logger = logging.getLogger(__name__)
+
+INGESTION_WORK_DIR = DATA_DIR / "ingestion"
+INGESTION_STEPS = ("extract", "embed", "index")
+
+# Job statuses
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+@dataclass
+class IngestionJob:
+    file_id: int
+    datasource_id: int
+    file_path: Path
+    original_filename: str
+    file_type: str
+    client_id: Optional[str] = None
+
+
+class IngestionQueue:
+    """SQLite-backed job queue drained by a bounded pool of worker tasks"""
+
+    def __init__(self, workers: int, embedding_concurrency: int):
+        self.workers = max(1, workers)
+        self.embedding_concurrency = max(1, embedding_concurrency)
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._embedding_slots: Optional[asyncio.Semaphore] = None
+        self._active = 0
+
+    def start(self) -> None:
+        """Start the worker tasks (idempotent); must be called from the running event loop"""
+        if self._tasks and not all(task.done() for task in self._tasks):
+            return
+        INGESTION_WORK_DIR.mkdir(parents=True, exist_ok=True)
+        self._wakeup = asyncio.Event()
+        self._embedding_slots = asyncio.Semaphore(self.embedding_concurrency)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(
+            f"Ingestion queue started with {self.workers} workers, "
+            f"embedding concurrency {self.embedding_concurrency}"
+        )
+
+    async def stop(self) -> None:
+        # Interrupted jobs keep their checkpoints and are put back in the queue; jobs of a
+        # process that died without stopping are reclaimed once their lease expires
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Ingestion queue stopped")
+
+    async def submit(self, job: IngestionJob) -> Optional[int]:
+        """Persist the job and wake a worker; returns the job id"""
+        job_id = await create_ingestion_job(
+            file_id=job.file_id,
+            datasource_id=job.datasource_id,
+            file_path=str(job.file_path),
+            original_filename=job.original_filename,
+            file_type=job.file_type,
+            client_id=job.client_id,
+            max_attempts=Config.INGESTION_MAX_ATTEMPTS,
+        )
+        if job_id is None:
+            raise RuntimeError(f"Could not queue file {job.file_id} for ingestion")
+        self.start()
+        self._wakeup.set()
+        logger.info(f"Queued ingestion job {job_id} for file {job.file_id} ('{job.original_filename}')")
+        return job_id
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            try:
+                job = await claim_next_ingestion_job(Config.INGESTION_JOB_LEASE_SECONDS)
+            except Exception as e:
+                logger.error(f"Ingestion worker {index} could not claim a job: {e}")
+                job = None
+            if job is None:
+                # Idle: wait for a submit, or poll for retries that became due
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=Config.INGESTION_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            self._active += 1
+            try:
+                await self._run_with_lease(job)
+            except asyncio.CancelledError:
+                # Shutting down: hand the job back so the next start resumes it from its checkpoint
+                await update_ingestion_job(job["id"], status=JOB_QUEUED, next_attempt_at=0, lease_expires_at=None)
+                raise
+            except Exception as e:
+                await self._handle_failure(job, e)
+            finally:
+                self._active -= 1
+
+    async def _run_with_lease(self, job: Dict[str, Any]) -> None:
+        heartbeat = asyncio.create_task(self._renew_lease(job))
+        try:
+            await self._run(job)
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+
+    async def _renew_lease(self, job: Dict[str, Any]) -> None:
+        """Extend the job lease every third of its length, so long steps are not reclaimed by another worker"""
+        interval = max(1.0, Config.INGESTION_JOB_LEASE_SECONDS / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await update_ingestion_job(job["id"], lease_expires_at=time.time() + Config.INGESTION_JOB_LEASE_SECONDS)
+            except Exception as e:
+                logger.warning(f"Could not renew the lease of ingestion job {job['id']}: {e}")
+
+    async def _progress(self, job: Dict[str, Any], stage: str, **details: Any) -> None:
+        """Send a progress event"""
+        message = {
+            "type": "ingestion_progress",
+            "job_id": job["id"],
+            "file_id": job["file_id"],
+            "datasource_id": job["datasource_id"],
+            "filename": job["original_filename"],
+            "stage": stage,
+            "attempt": job["attempts"],
+            "timestamp": time.time(),
+            **details,
+        }
+        if job.get("client_id"):
+            await websocket_manager.send_to_client(job["client_id"], message)
+        else:
+            await websocket_manager.broadcast(message)
+
+    async def _complete_step(self, job: Dict[str, Any], step: str) -> None:
+        job["step"] = step
+        await update_ingestion_job(job["id"], step=step)
+
+    def _step_done(self, job: Dict[str, Any], step: str) -> bool:
+        return job.get("step") in INGESTION_STEPS and INGESTION_STEPS.index(job["step"]) >= INGESTION_STEPS.index(step)
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        work_dir = INGESTION_WORK_DIR / f"job_{job['id']}"
+        work_dir.mkdir(parents=True, exist_ok=True)
+        chunks_path = work_dir / "chunks.json"
+        vectors_path = work_dir / "vectors.npy"
+        logger.info(f"Ingestion job {job['id']} (file {job['file_id']}) attempt {job['attempts']}, last step: {job.get('step')}")
+
+        await check_ingestible(job["datasource_id"], job["file_type"])
+        await update_file_processing_status(job["file_id"], status=ProcessingStatus.PROCESSING.value)
+        await self._progress(job, "started", resumed_from=job.get("step"))
+
+        # 1. Extract pages and chunk them (CPU-bound, runs in a thread)
+        if self._step_done(job, "extract") and chunks_path.exists():
+            texts, metadatas, page_count = load_chunks(chunks_path)
+        else:
+            pages = await asyncio.to_thread(extract_pages, Path(job["file_path"]), job["file_type"])
+            texts, metadatas = await asyncio.to_thread(split_into_chunks, pages, job["original_filename"], job["file_id"])
+            page_count = len(pages)
+            if not texts:
+                raise PermanentIngestionError("No text content could be extracted from the file.")
+            await asyncio.to_thread(save_chunks, chunks_path, texts, metadatas, page_count)
+            await self._complete_step(job, "extract")
+        await self._progress(job, "extracted", pages=page_count, chunks=len(texts))
+
+        # 2. Embed in batches, bounded by the shared embedding concurrency
+        import numpy as np
+
+        if self._step_done(job, "embed") and vectors_path.exists():
+            vectors = np.load(vectors_path).tolist()
+        else:
+            async def on_batch(done: int) -> None:
+                await self._progress(job, "embedding", chunks_embedded=done, chunks_total=len(texts))
+
+            async with self._embedding_slots:
+                vectors = await embed_texts(texts, Config.INGESTION_EMBED_BATCH_SIZE, on_batch)
+            await asyncio.to_thread(np.save, vectors_path, np.asarray(vectors, dtype=np.float32))
+            await self._complete_step(job, "embed")
+
+        # 3. Merge into the datasource index (one writer per datasource)
+        index_size = await merge_into_index(job["datasource_id"], job["file_id"], texts, metadatas, vectors)
+        await self._complete_step(job, "index")
+        await self._progress(job, "indexed", chunks=len(texts), index_size=index_size)
+
+        await update_file_processing_status(job["file_id"], status=ProcessingStatus.COMPLETED.value, chunks=len(texts))
+        await update_ingestion_job(job["id"], status=JOB_COMPLETED, error_message=None, lease_expires_at=None)
+        await self._progress(job, "completed", chunks=len(texts))
+        shutil.rmtree(work_dir, ignore_errors=True)
+        logger.info(f"Ingestion job {job['id']} completed: {page_count} pages, {len(texts)} chunks")
+
+    async def _handle_failure(self, job: Dict[str, Any], error: Exception) -> None:
+        permanent = isinstance(error, PermanentIngestionError)
+        if not permanent and job["attempts"] < job["max_attempts"]:
+            delay = Config.INGESTION_RETRY_BASE_SECONDS * (2 ** (job["attempts"] - 1))
+            logger.warning(
+                f"Ingestion job {job['id']} failed at attempt {job['attempts']}/{job['max_attempts']}, "
+                f"retrying in {delay:.0f}s: {error}"
+            )
+            await update_ingestion_job(
+                job["id"], status=JOB_QUEUED, error_message=str(error),
+                next_attempt_at=time.time() + delay, lease_expires_at=None,
+            )
+            await self._progress(job, "retrying", error=str(error), retry_in_seconds=delay)
+            return
+
+        logger.error(f"Ingestion job {job['id']} failed permanently: {error}", exc_info=not permanent)
+        await update_ingestion_job(job["id"], status=JOB_FAILED, error_message=str(error), lease_expires_at=None)
+        await update_file_processing_status(job["file_id"], status=ProcessingStatus.FAILED.value, error_message=str(error))
+        await self._progress(job, "failed", error=str(error))
+        shutil.rmtree(INGESTION_WORK_DIR / f"job_{job['id']}", ignore_errors=True)
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "embedding_concurrency": self.embedding_concurrency,
+            "active": self._active,
+            "jobs": await count_ingestion_jobs_by_status(),
+        }
+
+
+ingestion_queue = IngestionQueue(Config.INGESTION_WORKERS, Config.INGESTION_EMBEDDING_CONCURRENCY)
+
+
+def start_ingestion_workers() -> None:
+    """Start the ingestion workers; jobs left over from a previous run are picked up. Should be called during application startup."""
+    ingestion_queue.start()
+
+
+async def stop_ingestion_workers() -> None:
+    """Stop the ingestion workers. Should be called during application shutdown."""
+    await ingestion_queue.stop()
@@ -0,0 +1,71 @@
+"""
+Upload streaming - copy uploaded files to disk in fixed-size chunks.
+
+Files are written chunk by chunk while their SHA-256 is computed, so memory
+stays flat regardless of file size. The size limit is checked up front when
+the size is known and enforced while copying otherwise. Data goes to a
+`.part` file that is renamed once complete, so no half-written upload is ever
+visible under its final name.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured maximum size"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File exceeds the maximum upload size of {max_bytes / (1024 * 1024):g} MB")
+        self.max_bytes = max_bytes
+
+
+@dataclass
+class StoredUpload:
+    path: Path
+    size: int
+    sha256: str
+
+
+def _copy_and_hash(source: BinaryIO, destination: Path, max_bytes: int, chunk_size: int) -> StoredUpload:
+    partial = destination.with_name(destination.name + ".part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(partial, "wb") as target:
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                # hashlib releases the GIL for large buffers, so hashing overlaps other threads
+                digest.update(chunk)
+                target.write(chunk)
+        os.replace(partial, destination)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    return StoredUpload(destination, size, digest.hexdigest())
+
+
+async def stream_upload_to_disk(upload, destination: Path, max_bytes: int,
+                                chunk_size: int = 1024 * 1024) -> StoredUpload:
+    """
+    Copy a FastAPI UploadFile to `destination` in chunks, hashing on the fly.
+
+    Runs in a worker thread so the event loop is not blocked by disk I/O or hashing.
+    Raises UploadTooLargeError (and removes the partial file) when the upload is larger than max_bytes.
+    """
+    known_size: Optional[int] = getattr(upload, "size", None)
+    if known_size is not None and known_size > max_bytes:
+        raise UploadTooLargeError(max_bytes)
+    return await asyncio.to_thread(_copy_and_hash, upload.file, destination, max_bytes, chunk_size)
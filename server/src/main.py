@@ -8,20 +8,33 @@ Following LangChain best practices for project structure and organization.
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, JSONResponse
 from typing import Dict
 import os
 from pathlib import Path
 import logging
 import sys
+import asyncio
 from .config.config import config
 from fastapi import Request
 import time
 
 # Import from the restructured modules
-from .agents.intelligent_agent import initialize_app_state
+from .agents.intelligent_agent import initialize_app_state, warm_up_models
 from .api.routes import router
-from .utils.rate_limiter import start_cleanup_task, stop_cleanup_task
+from .utils.rate_limiter import apply_rate_limit_headers, start_cleanup_task, stop_cleanup_task
+from .utils.hitl_checkpointer import start_checkpoint_cleanup_task, stop_checkpoint_cleanup_task
+from .utils.execution_state_store import start_execution_state_cleanup_task, stop_execution_state_cleanup_task
+from .document_loaders.ingestion_queue import start_ingestion_workers, stop_ingestion_workers
+from .utils.metrics import (
+    HTTP_REQUEST_DURATION,
+    PROMETHEUS_CONTENT_TYPE,
+    render_prometheus,
+    start_event_loop_monitor,
+    stop_event_loop_monitor,
+)
+from .utils.tracing import shutdown_tracing
+from .utils.startup import get_readiness, log_import_profile
 
 # ===== CRITICAL FIX: Configure logging in worker process =====
 # Uvicorn reload spawns worker processes that don't inherit log_config from parent
@@ -74,7 +87,14 @@ class AccessLogMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         start = time.perf_counter()
         response = await call_next(request)
-        duration_ms = int((time.perf_counter() - start) * 1000)
+        elapsed = time.perf_counter() - start
+        duration_ms = int(elapsed * 1000)
+        apply_rate_limit_headers(request, response)
+        
+        # Record latency by route template (not raw path) to keep label cardinality bounded
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", None) or "unmatched"
+        HTTP_REQUEST_DURATION.observe(elapsed, method=request.method, route=route_path, status=str(response.status_code))
         
         # Log access
         try:
@@ -150,10 +170,26 @@ async def startup_event():
     print("Application starting up...")
     initialize_app_state()
     
+    # Warm up LLM, embeddings and reranker concurrently in the background;
+    # /health answers immediately, /ready reports when warm-up has finished
+    app.state.warm_up_task = asyncio.create_task(_warm_up())
+    
     # Start rate limit cleanup task
     start_cleanup_task()
     print("Rate limit cleanup task started")
     
+    # Start background workers for uploaded file ingestion
+    start_ingestion_workers()
+    
+    # Start TTL cleanup of HITL checkpoints
+    start_checkpoint_cleanup_task()
+    
+    # Start TTL cleanup of execution states (workflow/HITL state stores)
+    start_execution_state_cleanup_task()
+    
+    # Start event-loop lag sampling for /metrics
+    start_event_loop_monitor()
+    
     # Check if frontend is available
     frontend_available = static_dir.exists()
     print(f"Frontend available: {frontend_available}")
@@ -165,12 +201,26 @@ async def startup_event():
     
     print("Application startup completed.")
 
+async def _warm_up():
+    """Background warm-up phase followed by the optional import-time profile."""
+    await warm_up_models()
+    if config.STARTUP_IMPORT_PROFILE:
+        await asyncio.to_thread(log_import_profile, "src.main")
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up resources on shutdown."""
     print("Application shutting down...")
     stop_cleanup_task()
     print("Rate limit cleanup task stopped")
+    await stop_ingestion_workers()
+    stop_checkpoint_cleanup_task()
+    stop_execution_state_cleanup_task()
+    warm_up_task = getattr(app.state, "warm_up_task", None)
+    if warm_up_task and not warm_up_task.done():
+        warm_up_task.cancel()
+    stop_event_loop_monitor()
+    shutdown_tracing()
     print("Application shutdown completed.")
 
 @app.get("/ping", tags=["Health Check"])
@@ -180,7 +230,7 @@ async def ping():
 
 @app.get("/health", tags=["Health Check"])
 async def health():
-    """Health check endpoint for Docker and monitoring."""
+    """Liveness check endpoint for Docker and monitoring (process is up and serving)."""
     frontend_available = static_dir.exists()
     return {
         "status": "healthy",
@@ -191,6 +241,20 @@ async def health():
         }
     }
 
+@app.get("/ready", tags=["Health Check"])
+async def ready():
+    """Readiness check: 200 once warm-up has finished and required components are ready, else 503."""
+    readiness = get_readiness()
+    return JSONResponse(
+        status_code=200 if readiness["ready"] else 503,
+        content={"status": "ready" if readiness["ready"] else "not_ready", "version": "0.5.0", **readiness}
+    )
+
+@app.get("/metrics", tags=["Health Check"], include_in_schema=False)
+async def metrics():
+    """Prometheus metrics (text exposition format)."""
+    return PlainTextResponse(render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 # API information endpoint
 @app.get("/api/v1/info", tags=["System Info"])
 async def api_info():
@@ -6,9 +6,47 @@ from typing import Optional, Dict, Any, Union
 from pathlib import Path
 from langchain_core.embeddings.embeddings import Embeddings
 from ..config.config import config, Config
+from ..utils.metrics import EMBEDDING_BATCH_DURATION, EMBEDDING_BATCH_SIZE, record_cache_lookup
+from ..utils.tracing import SPAN_KIND_CLIENT, span
 
 logger = logging.getLogger(__name__)
 
+
+class InstrumentedEmbeddings(Embeddings):
+    """Embeddings wrapper recording batch size, latency and a span for every embedding call"""
+
+    def __init__(self, embeddings: Embeddings, provider: str):
+        self.embeddings = embeddings
+        self.provider = provider or "unknown"
+
+    def _span(self, operation: str, batch_size: int):
+        return span(f"embedding.{operation}", {"embedding.provider": self.provider, "embedding.batch_size": batch_size}, kind=SPAN_KIND_CLIENT)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        EMBEDDING_BATCH_SIZE.observe(len(texts), provider=self.provider, operation="documents")
+        with self._span("documents", len(texts)), EMBEDDING_BATCH_DURATION.time(provider=self.provider, operation="documents"):
+            return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        with self._span("query", 1), EMBEDDING_BATCH_DURATION.time(provider=self.provider, operation="query"):
+            return self.embeddings.embed_query(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        EMBEDDING_BATCH_SIZE.observe(len(texts), provider=self.provider, operation="documents")
+        with self._span("documents", len(texts)), EMBEDDING_BATCH_DURATION.time(provider=self.provider, operation="documents"):
+            return await self.embeddings.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        with self._span("query", 1), EMBEDDING_BATCH_DURATION.time(provider=self.provider, operation="query"):
+            return await self.embeddings.aembed_query(text)
+
+    def __getattr__(self, name: str) -> Any:
+        # Delegate provider-specific attributes to the wrapped instance
+        wrapped = self.__dict__.get("embeddings")
+        if wrapped is None:
+            raise AttributeError(name)
+        return getattr(wrapped, name)
+
 class EmbeddingFactory:
     """Embedding Factory class - Manages creation and management of different embedding providers"""
     
@@ -21,7 +59,9 @@ class EmbeddingFactory:
         embedding_config = config.get_embedding_config()
         
         # If configuration unchanged and instance exists, return directly
-        if cls._instance and cls._current_config == embedding_config:
+        cached = bool(cls._instance) and cls._current_config == embedding_config
+        record_cache_lookup("embeddings_instance", cached)
+        if cached:
             return cls._instance
         
         # Configuration changed or first creation, reinitialize
@@ -60,7 +100,7 @@ class EmbeddingFactory:
             if embeddings and not cls._verify_embeddings_connection(embeddings, provider):
                 logger.warning(f"Embeddings connection verification failed: {provider}, but continuing...")
             
-            return embeddings
+            return InstrumentedEmbeddings(embeddings, provider)
                 
         except Exception as e:
             logger.error(f"Failed to create embeddings ({provider}): {e}")
@@ -75,7 +115,7 @@ class EmbeddingFactory:
                     retry_embeddings = cls._create_bedrock_embeddings(embedding_config)
                     if retry_embeddings and cls._verify_embeddings_connection(retry_embeddings, "bedrock"):
                         logger.info("Successfully initialized Bedrock embeddings after SSO refresh")
-                        return retry_embeddings
+                        return InstrumentedEmbeddings(retry_embeddings, "bedrock")
             
             raise
     
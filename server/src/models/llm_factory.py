@@ -2,12 +2,90 @@
 LLM Factory - Factory class supporting multiple LLM providers (no simulation mode)
 """
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, ClassVar, List
 from langchain_core.language_models.base import BaseLanguageModel
+from langchain_core.messages import BaseMessage
 from ..config.config import config, Config
+from ..callbacks.metrics_callback import LLMMetricsCallbackHandler
+from ..utils.metrics import record_cache_lookup
 
 logger = logging.getLogger(__name__)
 
+# Separates a static prompt prefix (system rules, schema guidance) from the
+# per-request remainder. It is only inserted for models that take explicit
+# cache points (Anthropic on Bedrock/OpenRouter); OpenAI caches identical
+# prefixes automatically, so there callers just put the static part first.
+PROMPT_CACHE_BREAKPOINT = "\n<<prompt-cache-breakpoint>>\n"
+# Anthropic accepts at most four cache points per request
+MAX_CACHE_POINTS = 4
+
+
+def uses_cache_points(ai_config: Dict[str, Any]) -> bool:
+    """Whether the configured model needs explicit cache points for prefix caching"""
+    if not Config.ENABLE_PROMPT_CACHE:
+        return False
+    model = (ai_config.get("model") or "").lower()
+    return ai_config.get("provider") in ("bedrock", "openrouter") and "anthropic" in model
+
+
+def mark_cache_points(messages: List[BaseMessage]) -> List[BaseMessage]:
+    """
+    Split message text at PROMPT_CACHE_BREAKPOINT into content blocks and mark
+    the block before it as cacheable (Anthropic `cache_control`).
+    """
+    marked = []
+    remaining = MAX_CACHE_POINTS
+    for message in messages:
+        content = message.content
+        if not isinstance(content, str) or PROMPT_CACHE_BREAKPOINT not in content:
+            marked.append(message)
+            continue
+        prefix, rest = content.split(PROMPT_CACHE_BREAKPOINT, 1)
+        rest = rest.replace(PROMPT_CACHE_BREAKPOINT, "\n")
+        if remaining <= 0 or not prefix.strip():
+            marked.append(message.model_copy(update={"content": f"{prefix}\n{rest}"}))
+            continue
+        blocks = [{"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}}]
+        if rest.strip():
+            blocks.append({"type": "text", "text": rest})
+        marked.append(message.model_copy(update={"content": blocks}))
+        remaining -= 1
+    return marked
+
+
+def _with_cache_points(chat_model_cls):
+    """Subclass a chat model so prompt cache breakpoints become provider cache points"""
+
+    class CachePointChatModel(chat_model_cls):
+        supports_cache_points: ClassVar[bool] = True
+
+        def _generate(self, messages, *args, **kwargs):
+            return super()._generate(mark_cache_points(messages), *args, **kwargs)
+
+        async def _agenerate(self, messages, *args, **kwargs):
+            return await super()._agenerate(mark_cache_points(messages), *args, **kwargs)
+
+        def _stream(self, messages, *args, **kwargs):
+            return super()._stream(mark_cache_points(messages), *args, **kwargs)
+
+        def _astream(self, messages, *args, **kwargs):
+            return super()._astream(mark_cache_points(messages), *args, **kwargs)
+
+    CachePointChatModel.__name__ = f"{chat_model_cls.__name__}WithCachePoints"
+    return CachePointChatModel
+
+
+def cache_breakpoint(llm: Any) -> str:
+    """Breakpoint to put after a static prompt prefix ("" when the model caches prefixes on its own)"""
+    return PROMPT_CACHE_BREAKPOINT if getattr(llm, "supports_cache_points", False) else ""
+
+
+def with_cached_prefix(llm: Any, static_prefix: str, dynamic: str) -> str:
+    """Prompt with the static prefix first, marked cacheable for models that need cache points"""
+    separator = cache_breakpoint(llm) or "\n"
+    return f"{static_prefix}{separator}{dynamic}"
+
+
 def refresh_sso_token(profile: str = "DevOpsPermissionSet-412381743093") -> bool:
     """
     Refresh SSO token by opening browser and running aws sso login
@@ -86,7 +164,9 @@ class LLMFactory:
         ai_config = config.get_ai_config()
         
         # If configuration unchanged and instance exists, return directly
-        if cls._instance and cls._current_config == ai_config:
+        cached = bool(cls._instance) and cls._current_config == ai_config
+        record_cache_lookup("llm_instance", cached)
+        if cached:
             return cls._instance
         
         # Configuration changed or first creation, reinitialize
@@ -122,7 +202,7 @@ class LLMFactory:
             if llm and not cls._verify_llm_connection(llm, provider):
                 raise ConnectionError(f"LLM connection verification failed: {provider}")
             
-            return llm
+            return cls._attach_metrics(llm, ai_config)
                 
         except Exception as e:
             logger.error(f"Failed to create LLM ({provider}): {e}")
@@ -136,10 +216,24 @@ class LLMFactory:
                     retry_llm = cls._create_bedrock_llm(ai_config)
                     if retry_llm and cls._verify_llm_connection(retry_llm, "bedrock"):
                         logger.info("Successfully initialized Bedrock LLM after SSO refresh")
-                        return retry_llm
+                        return cls._attach_metrics(retry_llm, ai_config)
             
             raise
     
+    @classmethod
+    def _attach_metrics(cls, llm: BaseLanguageModel, ai_config: Dict[str, Any]) -> BaseLanguageModel:
+        """Attach the metrics callback so every call records latency and token usage"""
+        handler = LLMMetricsCallbackHandler(ai_config.get("provider"), ai_config.get("model"))
+        try:
+            existing = llm.callbacks
+            if existing is None or isinstance(existing, list):
+                llm.callbacks = list(existing or []) + [handler]
+            else:
+                existing.add_handler(handler)
+        except Exception as e:
+            logger.warning(f"Could not attach LLM metrics callback: {e}")
+        return llm
+    
     @classmethod
     def _create_openai_llm(cls, ai_config: Dict[str, Any]) -> BaseLanguageModel:
         """Create OpenAI LLM instance"""
@@ -189,7 +283,11 @@ class LLMFactory:
             if ai_config.get("timeout"):
                 kwargs["request_timeout"] = ai_config.get("timeout")
             
-            llm = ChatOpenAI(**kwargs)
+            if uses_cache_points(ai_config):
+                # OpenRouter forwards Anthropic cache_control blocks to the provider
+                llm = _with_cache_points(ChatOpenAI)(**kwargs)
+            else:
+                llm = ChatOpenAI(**kwargs)
             logger.info(f"OpenRouter LLM initialized successfully - Model: {ai_config['model']}, Base URL: {ai_config['base_url']}")
             return llm
             
@@ -296,10 +394,14 @@ class LLMFactory:
                 },
             }
             
-            llm = ChatBedrock(**kwargs)
+            if uses_cache_points(ai_config):
+                llm = _with_cache_points(ChatBedrock)(**kwargs)
+            else:
+                llm = ChatBedrock(**kwargs)
             logger.info(
                 f"Bedrock LLM initialized successfully - Model: {ai_config['model']}, "
-                f"Region: {ai_config['region']}, Env: {deployment_env}"
+                f"Region: {ai_config['region']}, Env: {deployment_env}, "
+                f"Prompt cache points: {cache_breakpoint(llm) != ''}"
             )
             return llm
             
@@ -12,6 +12,9 @@ from typing import List, Tuple, Optional
 
 from sentence_transformers import CrossEncoder
 
+from ..utils.metrics import RERANK_BATCH_DURATION, RERANK_BATCH_SIZE
+from ..utils.tracing import span
+
 try:
     # Import only for type hints; avoid hard dependency in runtime imports
     from langchain_core.documents import Document  # type: ignore
@@ -23,19 +26,27 @@ except Exception:  # pragma: no cover
 
 
 _cross_encoder_model: Optional[CrossEncoder] = None
+_cross_encoder_model_name: Optional[str] = None
+DEFAULT_CROSS_ENCODER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
 
 
-def get_cross_encoder(model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2") -> CrossEncoder:
+def get_cross_encoder(model_name: str = DEFAULT_CROSS_ENCODER_MODEL) -> CrossEncoder:
     """Get or initialize a global Cross-Encoder model.
 
     The chosen model balances speed and quality and is adequate for short reranking.
     """
-    global _cross_encoder_model
+    global _cross_encoder_model, _cross_encoder_model_name
     if _cross_encoder_model is None:
         _cross_encoder_model = CrossEncoder(model_name)
+        _cross_encoder_model_name = model_name
     return _cross_encoder_model
 
 
+def get_cross_encoder_model_name() -> str:
+    """Name of the loaded Cross-Encoder model (the default until one is loaded)"""
+    return _cross_encoder_model_name or DEFAULT_CROSS_ENCODER_MODEL
+
+
 def rerank_with_cross_encoder(
     query: str,
     documents: List[Document],
@@ -54,6 +65,7 @@ def rerank_with_cross_encoder(
         return []
 
     model = get_cross_encoder()
+    model_name = get_cross_encoder_model_name()
 
     pairs: List[Tuple[str, str]] = []
     truncated_texts: List[str] = []
@@ -63,7 +75,10 @@ def rerank_with_cross_encoder(
         truncated_texts.append(text)
         pairs.append((query, text))
 
-    scores = model.predict(pairs, batch_size=batch_size, show_progress_bar=False)
+    RERANK_BATCH_SIZE.observe(len(pairs), model=model_name)
+    rerank_attributes = {"rerank.model": model_name, "rerank.documents": len(pairs), "rerank.batch_size": batch_size}
+    with span("rerank.cross_encoder", rerank_attributes), RERANK_BATCH_DURATION.time(model=model_name):
+        scores = model.predict(pairs, batch_size=batch_size, show_progress_bar=False)
 
     # Attach CE scores into document metadata
     for d, s in zip(documents, scores):
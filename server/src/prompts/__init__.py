@@ -1,5 +1,18 @@
 """
 Prompts module - Contains prompt templates and management
 """
- 
-# Prompt templates will be organized here in the future 
\ No newline at end of file
+
+from .final_answer import FINAL_ANSWER_INSTRUCTIONS
+from .prompt_builder import PromptBuilder, TokenCounter, get_token_counter, summarize_table
+from .sql_agent import SQL_AGENT_GUIDANCE, build_sql_agent_guidance, build_sql_agent_tables_context
+
+__all__ = [
+    'FINAL_ANSWER_INSTRUCTIONS',
+    'PromptBuilder',
+    'TokenCounter',
+    'get_token_counter',
+    'summarize_table',
+    'SQL_AGENT_GUIDANCE',
+    'build_sql_agent_guidance',
+    'build_sql_agent_tables_context',
+]
@@ -0,0 +1,145 @@
+"""
+Chart analysis prompt - static chart-type rules and examples for the chart LLM.
+
+The rules are identical across requests and go first in the prompt, ahead of
+the user query and data summary, so providers with prefix caching can reuse
+them across calls.
+"""
+
+CHART_ANALYSIS_RULES = """
+You MUST return a complete JSON configuration for the chart. Analyze the user's requirements and provide ALL required fields.
+
+CHART TYPE SELECTION RULES (CRITICAL):
+1. Use "line" chart for:
+   - Time series data (trends over time)
+   - Queries containing: "trend", "monthly", "yearly", "daily", "weekly", "over time", "时间", "趋势", "月度", "年度"
+   - Data showing changes over time periods (months, years, days, etc.)
+   - Sequential time-based comparisons
+   - When categories represent time periods (e.g., months: "01", "02", ..., "12")
+
+2. Use "pie" chart for:
+   - Proportions and distributions
+   - Queries explicitly asking for "proportion", "distribution", "percentage", "share"
+   - Comparing parts of a whole
+   - Category-based data WITHOUT time dimension
+
+3. Use "bar" chart for:
+   - Comparing categories (non-time-based)
+   - Ranking and comparisons
+   - When neither trend nor proportion is the focus
+
+TIME SERIES DETECTION:
+- If query contains "trend", "monthly", "yearly", "daily", "weekly", "over time", "时间", "趋势", "月度", "年度"
+- OR if data has time-based categories (months: "01"-"12", years: "2025", dates: "2025-01-15", etc.)
+- THEN set is_time_series: true, time_grouping: "month"/"year"/"day" as appropriate, chart_type: "line"
+
+Example 1 - TIME SERIES (Monthly transaction trend from mart_daily_active_users):
+Query: "Show monthly transaction amount trend for 2025"
+SQL: SELECT DATE_FORMAT(date, 'yyyy-MM') as Month, SUM(total_amount) as Total_Amount FROM public.mart_daily_active_users WHERE EXTRACT(YEAR FROM date) = 2025 GROUP BY Month ORDER BY Month
+Data columns: Month (string), Total_Amount (numeric)
+Chart config:
+{
+    "chart_type": "line",
+    "title": "Monthly Transaction Amount Trend (2025)",
+    "x_axis_label": "Month",
+    "y_axis_label": "Total Transaction Amount (¥)",
+    "data_field_for_labels": "Month",
+    "data_field_for_values": "Total_Amount",
+    "aggregation_method": "none",
+    "time_grouping": "month",
+    "is_time_series": true
+}
+
+Example 2 - TIME SERIES (Daily active users from mart_daily_active_users):
+Query: "Show daily active users for November 2025"
+SQL: SELECT date, active_users, total_transactions, total_amount FROM public.mart_daily_active_users WHERE date >= '2025-11-01' AND date <= '2025-11-30' ORDER BY date
+Data columns: date (date), active_users (integer), total_transactions (integer), total_amount (numeric)
+Chart config:
+{
+    "chart_type": "line",
+    "title": "Daily Active Users Trend (November 2025)",
+    "x_axis_label": "Date",
+    "y_axis_label": "Active Users",
+    "data_field_for_labels": "date",
+    "data_field_for_values": "active_users",
+    "aggregation_method": "none",
+    "time_grouping": "day",
+    "is_time_series": true
+}
+
+Example 3 - PROPORTION (Card type distribution from mart_user_card_type_summary):
+Query: "Show user distribution by card type"
+SQL: SELECT card_type, total_users, total_transaction_amount FROM public.mart_user_card_type_summary ORDER BY total_users DESC
+Data columns: card_type (string), total_users (integer), total_transaction_amount (numeric)
+Chart config:
+{
+    "chart_type": "pie",
+    "title": "User Distribution by Card Type",
+    "x_axis_label": "Card Type",
+    "y_axis_label": "Total Users",
+    "data_field_for_labels": "card_type",
+    "data_field_for_values": "total_users",
+    "aggregation_method": "none",
+    "time_grouping": "none",
+    "is_time_series": false
+}
+
+Example 4 - BAR CHART (Top stations from mart_station_flow_daily):
+Query: "Show top 10 stations by transaction volume"
+SQL: SELECT station_name, SUM(total_transactions) as Total_Transactions FROM public.mart_station_flow_daily WHERE date >= '2025-11-01' GROUP BY station_name ORDER BY Total_Transactions DESC LIMIT 10
+Data columns: station_name (string), Total_Transactions (integer)
+Chart config:
+{
+    "chart_type": "bar",
+    "title": "Top 10 Stations by Transaction Volume",
+    "x_axis_label": "Station Name",
+    "y_axis_label": "Total Transactions",
+    "data_field_for_labels": "station_name",
+    "data_field_for_values": "Total_Transactions",
+    "aggregation_method": "none",
+    "time_grouping": "none",
+    "is_time_series": false
+}
+
+Example 5 - TIME SERIES (Monthly top-up trend from mart_daily_topup_summary):
+Query: "Show monthly top-up amount trend"
+SQL: SELECT DATE_FORMAT(date, 'yyyy-MM') as Month, SUM(total_amount) as Total_Topup_Amount, SUM(total_topups) as Total_Topups FROM public.mart_daily_topup_summary WHERE EXTRACT(YEAR FROM date) = 2025 GROUP BY Month ORDER BY Month
+Data columns: Month (string), Total_Topup_Amount (numeric), Total_Topups (integer)
+Chart config:
+{
+    "chart_type": "line",
+    "title": "Monthly Top-up Amount Trend (2025)",
+    "x_axis_label": "Month",
+    "y_axis_label": "Total Top-up Amount (¥)",
+    "data_field_for_labels": "Month",
+    "data_field_for_values": "Total_Topup_Amount",
+    "aggregation_method": "none",
+    "time_grouping": "month",
+    "is_time_series": true
+}
+
+Example 6 - BAR CHART (Route usage from mart_route_usage_summary):
+Query: "Show top routes by usage"
+SQL: SELECT route_name, total_transactions, unique_users, total_amount FROM public.mart_route_usage_summary ORDER BY total_transactions DESC LIMIT 10
+Data columns: route_name (string), total_transactions (integer), unique_users (integer), total_amount (numeric)
+Chart config:
+{
+    "chart_type": "bar",
+    "title": "Top 10 Routes by Transaction Volume",
+    "x_axis_label": "Route Name",
+    "y_axis_label": "Total Transactions",
+    "data_field_for_labels": "route_name",
+    "data_field_for_values": "total_transactions",
+    "aggregation_method": "none",
+    "time_grouping": "none",
+    "is_time_series": false
+}
+
+IMPORTANT: 
+1. Always provide a meaningful title based on the query - NEVER leave title empty
+2. Title should be descriptive and include relevant time periods if mentioned
+3. For time series queries, use chart_type: "line" and set is_time_series: true
+4. For sales data, use y_axis_label: "Sales Revenue ($)" or "Sales Amount ($)"
+5. For time series, use x_axis_label: "Month", "Year", "Date", etc.
+6. Return ONLY valid JSON, no additional text
+"""
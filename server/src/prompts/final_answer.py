@@ -0,0 +1,12 @@
+"""
+Final answer prompts - instructions for integrating RAG, SQL and chart inputs.
+"""
+
+FINAL_ANSWER_INSTRUCTIONS = """
+Please generate a comprehensive, accurate, and natural answer based on the above information:
+1. Prioritize specific data from database query results
+2. Combine background information from knowledge base for explanation
+3. If there's a chart, explain what the chart shows
+4. Keep the answer concise and clear, avoid repetition
+5. If information is insufficient, please state honestly
+"""
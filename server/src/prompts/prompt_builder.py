@@ -0,0 +1,268 @@
+"""
+Prompt builder - token-budgeted prompt assembly.
+
+Sections are counted with the target model's tokenizer and each gets a
+token budget; budget left unused by short sections is handed to longer ones.
+Sections over budget are compressed (tables are summarized columnarly:
+aggregates per column plus head/tail rows) or truncated head+tail, so prompt
+size - and with it latency and cost - stays predictable.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Used for models without a local tokenizer (Bedrock/Anthropic, Ollama)
+DEFAULT_ENCODING = "cl100k_base"
+
+_CJK_CHARS = re.compile(r'[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]')
+
+
+class TokenCounter:
+    """Counts and truncates text in tokens of a given model"""
+
+    def __init__(self, model: Optional[str] = None):
+        self.model = model
+        self._encoding = self._load_encoding(model)
+
+    @staticmethod
+    def _load_encoding(model: Optional[str]):
+        try:
+            import tiktoken
+        except ImportError:
+            logger.info("tiktoken not installed, token counts are estimated from text length")
+            return None
+        try:
+            try:
+                # OpenAI model names (also behind OpenRouter, e.g. "openai/gpt-4o") map to their exact encoding
+                return tiktoken.encoding_for_model((model or "").split("/")[-1])
+            except KeyError:
+                return tiktoken.get_encoding(DEFAULT_ENCODING)
+        except Exception as e:
+            # Encodings are downloaded on first use; offline hosts fall back to estimates
+            logger.warning(f"Tokenizer for {model or DEFAULT_ENCODING} unavailable, estimating token counts: {e}")
+            return None
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        # ~4 characters per token for Latin text, ~1 token per CJK character
+        cjk = len(_CJK_CHARS.findall(text))
+        return cjk + (len(text) - cjk + 3) // 4
+
+    def truncate(self, text: str, max_tokens: int, keep_tail: bool = True) -> str:
+        """
+        Cut text to max_tokens. With keep_tail the end is kept too (agent
+        answers put their conclusion last), joined by a truncation marker.
+        """
+        total = self.count(text)
+        if total <= max_tokens:
+            return text
+        if max_tokens <= 0:
+            return ""
+        marker = "\n... [{omitted} tokens omitted] ...\n"
+        budget = max(max_tokens - self.count(marker.format(omitted=total)), 1)
+        head_tokens = budget // 2 if keep_tail else budget
+        tail_tokens = budget - head_tokens if keep_tail else 0
+
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text, disallowed_special=())
+            head = self._encoding.decode(tokens[:head_tokens])
+            tail = self._encoding.decode(tokens[len(tokens) - tail_tokens:]) if tail_tokens else ""
+        else:
+            ratio = len(text) / total
+            head = text[:int(head_tokens * ratio)]
+            tail = text[len(text) - int(tail_tokens * ratio):] if tail_tokens else ""
+        return head + marker.format(omitted=total - head_tokens - tail_tokens) + tail
+
+
+@lru_cache(maxsize=8)
+def get_token_counter(model: Optional[str] = None) -> TokenCounter:
+    """Token counter for `model` (default: the configured chat model), cached per model"""
+    if model is None:
+        try:
+            from ..config.config import Config
+            model = Config.get_ai_config().get("model")
+        except Exception:
+            model = None
+    return TokenCounter(model)
+
+
+# ==================== Table summarization ====================
+
+def _table_frame(structured_data: Dict[str, Any]):
+    import pandas as pd
+
+    rows = structured_data.get("rows") or []
+    columns = [str(c) for c in structured_data.get("columns") or []]
+    if rows and isinstance(rows[0], dict):
+        names = columns or list(rows[0].keys())
+        return pd.DataFrame({name: [row.get(name) for row in rows] for name in names}, columns=names)
+    frame = pd.DataFrame.from_records(rows)
+    if columns and len(columns) == frame.shape[1]:
+        frame.columns = columns
+    return frame
+
+
+def _format_number(value: float) -> str:
+    if value != value:  # NaN
+        return "n/a"
+    if float(value).is_integer():
+        return f"{int(value):,}"
+    return f"{value:,.2f}"
+
+
+def _column_profiles(frame) -> List[str]:
+    """One line per column: numeric aggregates, or distinct count and top values"""
+    import pandas as pd
+
+    lines = []
+    for name in frame.columns:
+        column = frame[name]
+        nulls = int(column.isna().sum())
+        numeric = pd.to_numeric(column, errors="coerce")
+        null_note = f", {nulls} null" if nulls else ""
+        if numeric.notna().sum() > 0 and numeric.notna().sum() >= 0.8 * column.notna().sum():
+            lines.append(
+                f"  {name}: numeric, min {_format_number(numeric.min())}, max {_format_number(numeric.max())}, "
+                f"mean {_format_number(numeric.mean())}, sum {_format_number(numeric.sum())}{null_note}"
+            )
+        else:
+            text = column.dropna().astype(str)
+            counts = text.value_counts()
+            top = ", ".join(f"{value} ({count})" for value, count in counts.head(5).items())
+            span = ""
+            if not text.empty:
+                span = f", range {text.min()} .. {text.max()}"
+            lines.append(f"  {name}: {counts.size} distinct{span}{null_note}; top: {top}")
+    return lines
+
+
+def _format_rows(frame, start: int = 0) -> List[str]:
+    lines = []
+    for offset, record in enumerate(frame.to_dict(orient="records")):
+        row_str = ", ".join(f"{col}: {'' if value is None else value}" for col, value in record.items())
+        lines.append(f"  {start + offset + 1}. {row_str}")
+    return lines
+
+
+def summarize_table(structured_data: Dict[str, Any], max_tokens: int, counter: TokenCounter) -> str:
+    """
+    Describe a query result within max_tokens.
+
+    Small results are rendered completely. Larger ones get per-column
+    aggregates plus as many head/tail rows as the budget allows.
+    """
+    frame = _table_frame(structured_data)
+    if frame.empty or frame.shape[1] == 0:
+        return "No valid data"
+
+    header = [f"Data contains {len(frame)} rows, {frame.shape[1]} columns",
+              f"Column names: {', '.join(str(c) for c in frame.columns)}"]
+    # Every cell costs at least a token, so only small results can be rendered whole
+    if frame.size <= max_tokens:
+        complete = "\n".join(header + ["Complete data:"] + _format_rows(frame))
+        if counter.count(complete) <= max_tokens:
+            return complete
+
+    profile = header + ["Column statistics:"] + _column_profiles(frame)
+    for edge_rows in (10, 5, 3, 2, 1):
+        if 2 * edge_rows >= len(frame):
+            continue
+        lines = profile + [f"First {edge_rows} rows:"] + _format_rows(frame.head(edge_rows))
+        lines += [f"  ... {len(frame) - 2 * edge_rows} rows omitted ..."]
+        lines += [f"Last {edge_rows} rows:"] + _format_rows(frame.tail(edge_rows), start=len(frame) - edge_rows)
+        summary = "\n".join(lines)
+        if counter.count(summary) <= max_tokens:
+            return summary
+    return counter.truncate("\n".join(profile), max_tokens, keep_tail=False)
+
+
+# ==================== Budgeted assembly ====================
+
+@dataclass
+class PromptSection:
+    name: str
+    text: str
+    budget: Optional[int] = None  # None: always included in full
+    compress: Optional[Callable[[int], str]] = None
+    tokens: int = 0
+
+
+class PromptBuilder:
+    """
+    Assemble a prompt from sections under a total token budget.
+
+    Sections without a budget (question, instructions) are kept whole.
+    Budgeted sections get min(size, budget); tokens left over go to sections
+    that still need more, in the order they were added. Over-budget sections
+    are compressed with their `compress(max_tokens)` callback when given,
+    otherwise truncated head+tail.
+    """
+
+    def __init__(self, max_tokens: int, counter: Optional[TokenCounter] = None, separator: str = "\n\n"):
+        self.max_tokens = max_tokens
+        self.counter = counter or get_token_counter()
+        self.separator = separator
+        self.sections: List[PromptSection] = []
+
+    def add(self, name: str, text: str, budget: Optional[int] = None,
+            compress: Optional[Callable[[int], str]] = None) -> "PromptBuilder":
+        if text:
+            self.sections.append(PromptSection(name, text, budget, compress, self.counter.count(text)))
+        return self
+
+    def _allocate(self) -> Dict[str, int]:
+        fixed = sum(s.tokens for s in self.sections if s.budget is None)
+        available = max(self.max_tokens - fixed, 0)
+        budgeted = [s for s in self.sections if s.budget is not None]
+
+        allocation = {s.name: min(s.tokens, s.budget) for s in budgeted}
+        requested = sum(allocation.values())
+        if requested > available and requested:
+            # Budgets exceed what is left: shrink proportionally
+            scale = available / requested
+            allocation = {name: int(tokens * scale) for name, tokens in allocation.items()}
+        leftover = available - sum(allocation.values())
+        for section in budgeted:
+            if leftover <= 0:
+                break
+            extra = min(section.tokens - allocation[section.name], leftover)
+            if extra > 0:
+                allocation[section.name] += extra
+                leftover -= extra
+        return allocation
+
+    def build(self) -> Tuple[str, Dict[str, Any]]:
+        """Return the prompt and a report of tokens per section"""
+        allocation = self._allocate()
+        parts = []
+        report: Dict[str, Any] = {"max_tokens": self.max_tokens, "sections": {}}
+        for section in self.sections:
+            text = section.text
+            limit = allocation.get(section.name)
+            if limit is not None and section.tokens > limit:
+                text = section.compress(limit) if section.compress else self.counter.truncate(text, limit)
+                text = self.counter.truncate(text, limit)
+            used = self.counter.count(text) if text is not section.text else section.tokens
+            report["sections"][section.name] = {
+                "tokens": section.tokens,
+                "used": used,
+                "compressed": text is not section.text,
+            }
+            if text:
+                parts.append(text)
+        prompt = self.separator.join(parts)
+        report["total_tokens"] = sum(s["used"] for s in report["sections"].values())
+        report["exact"] = self.counter.exact
+        return prompt, report
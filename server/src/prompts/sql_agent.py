@@ -0,0 +1,111 @@
+"""
+SQL agent prompts - static data-warehouse guidance for the ReAct SQL agent.
+
+The guidance is identical across requests, so it is kept as a module-level
+constant (built once). The agent puts it in its prompt prefix, ahead of the
+per-request table discovery and question, so providers with prefix caching
+can reuse it across calls.
+"""
+
+from typing import Dict, List, Optional
+
+SQL_AGENT_GUIDANCE = """
+IMPORTANT GUIDANCE FOR SQL QUERY GENERATION:
+
+📊 DATA WAREHOUSE ARCHITECTURE (Kimball/Medallion Design):
+This database follows a layered data warehouse architecture with table name prefixes indicating data layers:
+
+LAYER 1 - src_* (Source Layer):
+   - Raw data from source systems (Airbyte ETL)
+   - Use: Rarely in analytics, mainly for data quality checks
+   - Examples: src_users, src_transactions, src_stations
+
+LAYER 2 - stg_* (Staging Layer):
+   - Cleaned and validated data
+   - Use: For custom joins when mart_* doesn't exist, building custom aggregations
+   - Examples: stg_users, stg_transactions, stg_stations
+
+LAYER 3 - dim_* (Dimension Layer):
+   - Master reference data with surrogate keys
+   - Use: When need dimension attributes (user info, station details, route info, time attributes)
+   - Examples: dim_user, dim_station, dim_route, dim_time
+   - Key: Contains *_key (surrogate key) and descriptive attributes
+
+LAYER 4 - fact_* (Fact Layer):
+   - Transactional fact tables with measures
+   - Use: Only when mart_* tables don't provide required detail or granularity
+   - Examples: fact_transactions, fact_topups
+   - Key: Contains dimension keys and measures (amount, count, etc.)
+
+LAYER 5 - mart_* (Marts Layer) - ⭐ STRONGLY PREFERRED:
+   - Pre-aggregated analytical tables optimized for reporting
+   - Use: MANDATORY for ALL statistical, metric, trend, and aggregation queries
+   - Examples: mart_daily_active_users, mart_daily_topup_summary, mart_station_flow_daily
+   - Benefits: Pre-computed, faster, optimized for analytics
+
+QUERY TYPE TO TABLE SELECTION GUIDE:
+- Statistical queries (counts, sums, averages) → mart_* (MANDATORY)
+- Time series trends (daily, monthly, yearly) → mart_* (MANDATORY)
+- Category/group comparisons → mart_* (MANDATORY)
+- Station/route rankings → mart_station_flow_daily, mart_route_usage_summary (MANDATORY)
+- User distributions → mart_user_card_type_summary (MANDATORY)
+- Detailed transaction records → fact_* (only if mart_* insufficient)
+- Dimension attributes → dim_* (for descriptive data)
+- Raw source data → src_* (rarely needed)
+- Cleaned data for custom logic → stg_* (use sparingly)
+
+1. STATISTICAL/METRIC/TREND QUERIES - ALWAYS use mart_* tables (MANDATORY for data warehouse design):
+   - For ANY aggregated statistics, metrics, summaries, trends, or pre-calculated data, MANDATORY to use mart_* tables in public schema
+   - The mart_* tables follow Kimball/Medallion Architecture data warehouse design patterns and contain pre-aggregated metrics optimized for analytical queries
+   - Design principle: mart_* tables are specifically designed for reporting and analytics, containing daily/weekly/monthly summaries, aggregations, and business metrics
+   - When querying for statistics (counts, sums, averages, trends, comparisons), ALWAYS look for mart_* tables first (e.g., public.mart_daily_active_users, public.mart_daily_topup_summary)
+   - NEVER aggregate from fact_*/dim_* tables when equivalent mart_* tables exist - mart_* tables are pre-computed, more efficient, and follow best practices
+   - Only use fact_*/dim_* tables when mart_* tables don't provide the required granularity or specific metrics
+
+2. METADATA INFORMATION - Use RAG knowledge base first:
+   - For table structures, column definitions, business rules, and data relationships, FIRST check the background knowledge from RAG
+   - The RAG knowledge base contains metadata documentation about tables, schemas, and business logic
+   - Only if RAG doesn't provide sufficient information, use SQL-Agent's ReAct tools to explore the database schema
+   - Use tools like sql_db_list_tables and sql_db_schema to discover table structures when RAG metadata is insufficient
+   - NOTE: The sql_db_list_tables tool may only show tables from the default schema. Use the AVAILABLE TABLES list below to see all tables from the specified schema (default: public).
+
+3. DATA EXPLORATION PRIORITY:
+   - Step 1: Check RAG background knowledge for metadata and table information
+   - Step 2: Check the AVAILABLE TABLES list below to see all available tables (all tables are in public schema)
+   - Step 3: For statistical/metric/trend queries, MANDATORY to use mart_* tables (e.g., public.mart_daily_active_users) over aggregating from fact_*/dim_* tables
+   - Step 4: Only use fact_*/dim_* tables when mart_* tables don't have the required metrics or granularity
+
+4. TABLE NAMING:
+   - All tables are in public schema. Always use public.table_name format when referencing tables (e.g., public.mart_daily_active_users, public.mart_station_flow_daily, public.fact_transactions)
+   - Use table name prefixes to identify layers: src_*, stg_*, dim_*, fact_*, mart_*
+   - For statistical queries, ALWAYS prefer mart_* tables (e.g., public.mart_daily_active_users for daily metrics, public.mart_daily_topup_summary for top-up trends)
+"""
+
+
+def build_sql_agent_tables_context(marts_tables: Optional[List[str]] = None,
+                                   tables_by_schema: Optional[Dict[str, List[str]]] = None,
+                                   target_schema: str = "public") -> str:
+    """The per-request part of the guidance: tables discovered for this request"""
+    parts = []
+    if marts_tables:
+        parts.append(f"Available mart_* tables: {', '.join(marts_tables)} - Use these for ALL statistical queries!\n")
+
+    discovered = [table for tables in (tables_by_schema or {}).values() for table in tables]
+    if discovered:
+        parts.append(f"\nAVAILABLE TABLES (discovered from schema '{target_schema}'):\n")
+        # Group by schema for better readability
+        for schema, tables in tables_by_schema.items():
+            parts.append(f"  {schema} schema: {', '.join([t.split('.')[-1] for t in tables])}\n")
+        parts.append(f"\nTotal: {len(discovered)} tables from schema '{target_schema}'\n")
+
+        if marts_tables:
+            parts.append("\n⚠️  IMPORTANT - MARTS LAYER TABLES (preferred for statistics):\n")
+            parts.extend(f"  - {marts_table}\n" for marts_table in marts_tables)
+    return "".join(parts)
+
+
+def build_sql_agent_guidance(marts_tables: Optional[List[str]] = None,
+                             tables_by_schema: Optional[Dict[str, List[str]]] = None,
+                             target_schema: str = "public") -> str:
+    """Static guidance followed by the tables discovered for this request"""
+    return f"{SQL_AGENT_GUIDANCE}\n{build_sql_agent_tables_context(marts_tables, tables_by_schema, target_schema)}"
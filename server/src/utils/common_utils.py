@@ -127,6 +127,31 @@ def create_api_response(success: bool = True, data: Any = None, message: str = N
     response.update(kwargs)
     return response
 
+def make_serializable(obj: Any) -> Any:
+    """Converts workflow state (LangChain documents, messages, arbitrary objects) to plain JSON-like data."""
+    if isinstance(obj, dict):
+        return {k: make_serializable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [make_serializable(item) for item in obj]
+    if isinstance(obj, (str, int, float, bool)) or obj is None:
+        return obj
+    if hasattr(obj, 'page_content'):
+        # LangChain Document
+        return {
+            'page_content': getattr(obj, 'page_content', ''),
+            'metadata': make_serializable(getattr(obj, 'metadata', {})),
+            'type': 'Document'
+        }
+    if hasattr(obj, '__dict__'):
+        # For complex objects, extract public attributes
+        try:
+            return {k: make_serializable(v) for k, v in obj.__dict__.items() if not k.startswith('_')}
+        except Exception:
+            return str(obj)
+    if hasattr(obj, 'content'):
+        return {'content': getattr(obj, 'content', ''), 'type': type(obj).__name__}
+    return obj
+
 def format_sql_date(dt: datetime) -> str:
     """Formats a date for SQL queries."""
     return dt.strftime('%Y-%m-%d %H:%M:%S')
@@ -14,19 +14,12 @@ import os
 import logging
 from typing import List, Optional, Any, Dict
 
-# Import databricks-sqlalchemy to register SQLAlchemy dialect
-# This must be imported before sqlalchemy.create_engine is called
-# The dialect is registered when databricks.sqlalchemy.base is imported
+from .metrics import instrument_sql_engine
+from .result_cache import install_result_cache
+
+# The databricks-sqlalchemy dialect is registered lazily (on the first Databricks
+# connection) so that importing this module does not pull in the connector
 logger = logging.getLogger(__name__)
-databricks_sqlalchemy_available = False
-try:
-    from databricks.sqlalchemy import base  # noqa: F401
-    databricks_sqlalchemy_available = True
-    logger.info("✅ databricks.sqlalchemy.base imported - dialect should be registered")
-except ImportError as e:
-    logger.warning(f"⚠️  Failed to import databricks.sqlalchemy.base: {e}")
-    logger.warning("databricks-sqlalchemy is required for SQLAlchemy dialect connection")
-    logger.warning("Please install: pip install databricks-sqlalchemy")
 
 # Import SQLDatabase to inherit from it
 try:
@@ -71,15 +64,15 @@ def create_sql_database(
             from langchain_community.utilities import SQLDatabase
             
             # Ensure databricks SQLAlchemy dialect is imported to register dialect
-            if not databricks_sqlalchemy_available:
-                try:
-                    from databricks.sqlalchemy import base  # noqa: F401
-                    logger.info("✅ databricks.sqlalchemy.base imported - dialect should be registered")
-                except ImportError as e:
-                    logger.error(f"❌ databricks SQLAlchemy dialect not found: {e}")
-                    logger.error("Cannot use SQLAlchemy dialect without databricks-sqlalchemy")
-                    logger.error("Please install: pip install databricks-sqlalchemy")
-                    raise ImportError("databricks SQLAlchemy dialect is required for SQLAlchemy dialect connection")
+            # (must happen before sqlalchemy.create_engine is called)
+            try:
+                from databricks.sqlalchemy import base  # noqa: F401
+                logger.debug("databricks.sqlalchemy.base imported - dialect registered")
+            except ImportError as e:
+                logger.error(f"❌ databricks SQLAlchemy dialect not found: {e}")
+                logger.error("Cannot use SQLAlchemy dialect without databricks-sqlalchemy")
+                logger.error("Please install: pip install databricks-sqlalchemy")
+                raise ImportError("databricks SQLAlchemy dialect is required for SQLAlchemy dialect connection")
             
             # Normalize URI: databricks+connector:// -> databricks://
             # databricks-sqlalchemy ONLY supports databricks:// format (not databricks+connector://)
@@ -171,6 +164,10 @@ def create_sql_database(
                 **kwargs
             )
             
+            instrument_sql_engine(getattr(db, "_engine", None), "databricks")
+            # SELECTs over mart tables are served from the local result cache until dbt rebuilds them
+            install_result_cache(db)
+            
             logger.info("✅ Using SQLAlchemy dialect connection (databricks-sqlalchemy)")
             logger.info("   This matches the implementation in test_databricks_connection.py")
             return db
@@ -185,12 +182,14 @@ def create_sql_database(
     try:
         from langchain_community.utilities import SQLDatabase
         logger.info("Using standard SQLDatabase (SQLAlchemy)")
-        return SQLDatabase.from_uri(
+        db = SQLDatabase.from_uri(
             database_uri,
             include_tables=include_tables,
             sample_rows_in_table_info=sample_rows_in_table_info,
             **kwargs
         )
+        instrument_sql_engine(getattr(db, "_engine", None))
+        return db
     except Exception as e:
         logger.error(f"❌ Failed to create SQLDatabase: {e}", exc_info=True)
         raise
@@ -0,0 +1,371 @@
+"""
+Execution state store - bounded, TTL-evicted storage for per-execution state.
+
+Replaces the plain dicts that used to hold workflow/HITL state for the lifetime
+of the worker process:
+- Size cap: least recently written entries are evicted once max_entries is exceeded
+- TTL: entries not written for ttl_seconds are evicted lazily on access
+- Spill-to-disk: stores created with spill=True write evicted entries to JSON files
+  so paused/interrupted HITL executions can still be resumed later (enum members are
+  written as tagged values and come back as the same enum)
+- A background task (started with the application) purges expired entries and spill
+  files of all stores, so states of executions that are never accessed again are freed
+"""
+
+import asyncio
+import importlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..config.config import Config
+
+logger = logging.getLogger(__name__)
+
+_SAFE_KEY_PATTERN = re.compile(r"[^A-Za-z0-9_.-]")
+_ENUM_TAG = "__enum__"
+
+# Registry of all stores created in this process (used by the metrics endpoint)
+_stores: Dict[str, "ExecutionStateStore"] = {}
+_stores_lock = threading.Lock()
+
+
+def _encode_spill_value(obj: Any) -> Any:
+    """Replace enum members by tagged values (str/int enums would otherwise be written as plain values)"""
+    if isinstance(obj, Enum):
+        return {_ENUM_TAG: f"{type(obj).__module__}:{type(obj).__qualname__}", "value": _encode_spill_value(obj.value)}
+    if isinstance(obj, dict):
+        return {k: _encode_spill_value(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_encode_spill_value(item) for item in obj]
+    return obj
+
+
+def _decode_spill_object(obj: Dict[str, Any]) -> Any:
+    """json object_hook rebuilding enum members tagged by _encode_spill_value"""
+    if _ENUM_TAG not in obj or set(obj) != {_ENUM_TAG, "value"}:
+        return obj
+    module_name, _, qualname = obj[_ENUM_TAG].partition(":")
+    try:
+        enum_cls: Any = importlib.import_module(module_name)
+        for part in qualname.split("."):
+            enum_cls = getattr(enum_cls, part)
+        if isinstance(enum_cls, type) and issubclass(enum_cls, Enum):
+            return enum_cls(obj["value"])
+    except Exception as e:
+        logger.warning(f"Could not restore enum {obj[_ENUM_TAG]} from spilled state: {e}")
+    return obj["value"]
+
+
+def _approx_size(obj: Any, seen: Optional[set] = None, depth: int = 0) -> int:
+    """Approximate the deep memory footprint of an object in bytes"""
+    if seen is None:
+        seen = set()
+    obj_id = id(obj)
+    if obj_id in seen or depth > 32:
+        return 0
+    seen.add(obj_id)
+
+    size = sys.getsizeof(obj, 0)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += _approx_size(k, seen, depth + 1) + _approx_size(v, seen, depth + 1)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += _approx_size(item, seen, depth + 1)
+    elif hasattr(obj, "__dict__"):
+        size += _approx_size(vars(obj), seen, depth + 1)
+    return size
+
+
+class ExecutionStateStore(MutableMapping):
+    """Thread-safe LRU + TTL mapping of execution_id -> state with optional disk spill"""
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        spill: bool = False,
+        spill_dir: Optional[Path] = None,
+        spill_ttl_seconds: Optional[float] = None,
+    ):
+        self.name = name
+        self.max_entries = max_entries if max_entries is not None else Config.EXECUTION_STATE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else Config.EXECUTION_STATE_TTL_SECONDS
+        self.spill = spill
+        self.spill_ttl_seconds = spill_ttl_seconds if spill_ttl_seconds is not None else Config.EXECUTION_STATE_SPILL_TTL_SECONDS
+        self.spill_dir = Path(spill_dir or Config.EXECUTION_STATE_SPILL_DIR) / name
+
+        # key -> (value, last_write_time); ordered oldest write first
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._spilled: set = set()
+        self._lock = threading.RLock()
+        self._evicted_count = 0
+        self._spilled_count = 0
+
+        if self.spill:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            # Pick up states spilled by a previous worker so they remain resumable
+            for path in self.spill_dir.glob("*.json"):
+                self._spilled.add(path.stem)
+            self._purge_expired_spills()
+
+        with _stores_lock:
+            if name in _stores:
+                raise ValueError(
+                    f"Execution state store '{name}' already exists; use get_execution_state_store() to share it"
+                )
+            _stores[name] = self
+
+    # ==================== MutableMapping interface ====================
+
+    def __getitem__(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, written_at = entry
+                if not self._is_expired(written_at):
+                    return value
+                self._evict(key)
+            if self._spill_stem(key) in self._spilled:
+                value = self._load_spilled(key)
+                if value is not None:
+                    return value
+            raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            if self._spilled and self._spill_stem(key) in self._spilled:
+                self._remove_spilled(key)
+            self._enforce_limits()
+
+    def __delitem__(self, key: str) -> None:
+        with self._lock:
+            found = self._entries.pop(key, None) is not None
+            if self._spill_stem(key) in self._spilled:
+                self._remove_spilled(key)
+                found = True
+            if not found:
+                raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._is_expired(entry[1]):
+                    return True
+                self._evict(key)
+            return bool(self._spilled) and self._spill_stem(key) in self._spilled
+
+    def __iter__(self) -> Iterator[str]:
+        # Iterate over a snapshot of live in-memory keys; spilled entries are not listed
+        with self._lock:
+            self._enforce_limits()
+            return iter(list(self._entries.keys()))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        """Atomic get-or-insert (MutableMapping's check-then-set is not thread-safe)"""
+        with self._lock:
+            try:
+                return self[key]
+            except KeyError:
+                self[key] = default
+                return default
+
+    def touch(self, key: str) -> None:
+        """Refresh the TTL/LRU position of an entry that was mutated in place"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], time.time())
+                self._entries.move_to_end(key)
+
+    # ==================== Eviction ====================
+
+    def _is_expired(self, written_at: float) -> bool:
+        return bool(self.ttl_seconds) and (time.time() - written_at) > self.ttl_seconds
+
+    def _enforce_limits(self) -> None:
+        """Evict expired entries from the oldest end, then trim to max_entries"""
+        while self._entries:
+            oldest_key, (_, written_at) = next(iter(self._entries.items()))
+            if self._is_expired(written_at) or (self.max_entries and len(self._entries) > self.max_entries):
+                self._evict(oldest_key)
+            else:
+                break
+
+    def _evict(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self._evicted_count += 1
+        if self.spill:
+            self._spill_to_disk(key, value)
+        logger.debug(f"[{self.name}] Evicted execution state {key}")
+
+    def purge_expired(self) -> int:
+        """Evict all expired entries and delete stale spill files; returns evicted count"""
+        with self._lock:
+            before = self._evicted_count
+            expired = [k for k, (_, written_at) in self._entries.items() if self._is_expired(written_at)]
+            for key in expired:
+                self._evict(key)
+            self._purge_expired_spills()
+            return self._evicted_count - before
+
+    # ==================== Disk spill ====================
+
+    @staticmethod
+    def _spill_stem(key: str) -> str:
+        return _SAFE_KEY_PATTERN.sub("_", str(key))
+
+    def _spill_path(self, key: str) -> Path:
+        return self.spill_dir / f"{self._spill_stem(key)}.json"
+
+    def _spill_to_disk(self, key: str, value: Any) -> None:
+        try:
+            path = self._spill_path(key)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "spilled_at": time.time(), "value": _encode_spill_value(value)},
+                          f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, path)
+            self._spilled.add(path.stem)
+            self._spilled_count += 1
+            logger.info(f"[{self.name}] Spilled evicted execution state {key} to {path}")
+        except Exception as e:
+            logger.error(f"[{self.name}] Failed to spill execution state {key}: {e}")
+
+    def _load_spilled(self, key: str) -> Optional[Any]:
+        """Load a spilled entry back into memory (and remove its file)"""
+        path = self._spill_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f, object_hook=_decode_spill_object)
+        except Exception as e:
+            logger.warning(f"[{self.name}] Failed to load spilled execution state {key}: {e}")
+            self._spilled.discard(path.stem)
+            return None
+
+        value = payload.get("value")
+        self._remove_spilled(key)
+        self._entries[key] = (value, time.time())
+        self._enforce_limits()
+        logger.info(f"[{self.name}] Restored spilled execution state {key}")
+        return value
+
+    def _remove_spilled(self, key: str) -> None:
+        path = self._spill_path(key)
+        self._spilled.discard(path.stem)
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"[{self.name}] Failed to delete spill file {path}: {e}")
+
+    def _purge_expired_spills(self) -> None:
+        if not self.spill or not self.spill_ttl_seconds:
+            return
+        cutoff = time.time() - self.spill_ttl_seconds
+        for path in list(self.spill_dir.glob("*.json")):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    self._spilled.discard(path.stem)
+            except FileNotFoundError:
+                self._spilled.discard(path.stem)
+
+    # ==================== Metrics ====================
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry counts and approximate memory usage of this store"""
+        with self._lock:
+            self._enforce_limits()
+            approx_bytes = sum(_approx_size(value) for value, _ in self._entries.values())
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "approx_bytes": approx_bytes,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "evicted_total": self._evicted_count,
+                "spill_enabled": self.spill,
+                "spilled_entries": len(self._spilled),
+                "spilled_total": self._spilled_count,
+            }
+
+
+def get_execution_state_store(name: str, **options: Any) -> ExecutionStateStore:
+    """The store registered under `name`, created with `options` if it does not exist yet"""
+    with _stores_lock:
+        store = _stores.get(name)
+    if store is not None:
+        return store
+    try:
+        return ExecutionStateStore(name, **options)
+    except ValueError:
+        # Created concurrently by another thread
+        with _stores_lock:
+            return _stores[name]
+
+
+def get_execution_state_store_stats() -> List[Dict[str, Any]]:
+    """Collect stats for every execution state store in this process"""
+    with _stores_lock:
+        stores = list(_stores.values())
+    return [store.stats() for store in stores]
+
+
+def purge_expired_execution_states() -> int:
+    """Run TTL eviction across all stores; returns the number of evicted entries"""
+    with _stores_lock:
+        stores = list(_stores.values())
+    return sum(store.purge_expired() for store in stores)
+
+
+_cleanup_task: Optional[asyncio.Task] = None
+
+
+async def periodic_execution_state_cleanup():
+    """Background task that evicts expired execution states from all stores"""
+    while True:
+        try:
+            await asyncio.sleep(Config.EXECUTION_STATE_CLEANUP_INTERVAL_SECONDS)
+            purged = await asyncio.to_thread(purge_expired_execution_states)
+            if purged:
+                logger.info(f"Purged {purged} expired execution states")
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f"Error in execution state cleanup task: {e}")
+
+
+def start_execution_state_cleanup_task():
+    """Start the execution state TTL cleanup task. Should be called during application startup."""
+    global _cleanup_task
+    if _cleanup_task is None or _cleanup_task.done():
+        _cleanup_task = asyncio.create_task(periodic_execution_state_cleanup())
+
+
+def stop_execution_state_cleanup_task():
+    """Stop the execution state TTL cleanup task. Should be called during application shutdown."""
+    global _cleanup_task
+    if _cleanup_task and not _cleanup_task.done():
+        _cleanup_task.cancel()
@@ -0,0 +1,505 @@
+"""
+HITL checkpointer - durable, compact workflow state snapshots in SQLite.
+
+Every execution (thread) gets a sequence of versioned checkpoints:
+- "start":     the initial workflow state (full snapshot)
+- "node":      the keys a node changed (delta against the previous checkpoint)
+- "pause" / "interrupt": the complete state at a HITL action (full snapshot)
+
+Checkpoints are addressed like LangGraph checkpoints (thread_id = execution_id,
+checkpoint_id = version). Any version can be loaded again: the state is rebuilt
+from the closest full snapshot plus the node deltas after it, so a resume can
+continue from that node without re-running the earlier ones.
+
+This is a side store that HITLStateManager and the workflow call directly; it
+is not a LangGraph BaseCheckpointSaver and is not passed to
+graph.compile(checkpointer=...).
+
+Alongside, each node's delta is memoized under (execution_id, node, input
+fingerprint) so a resume can reuse it instead of running the node again.
+
+Payloads are msgpack (zlib-compressed when large). Retrieved documents are not
+copied into every snapshot: their contents are stored once in a chunk table and
+snapshots hold only the chunk id. Checkpoints expire after
+HITL_CHECKPOINT_TTL_SECONDS; cleanup removes them and chunks no longer in use.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config.config import Config
+from .common_utils import make_serializable
+
+logger = logging.getLogger(__name__)
+
+# Bump when the payload layout changes and add a decoder for the new format below;
+# rows keep the format they were written with and are decoded by it
+SNAPSHOT_FORMAT_VERSION = 1
+COMPRESS_MIN_BYTES = 4096
+
+FULL_SNAPSHOT_KINDS = ("start", "pause", "interrupt")
+_CHUNK_REF = "__chunk__"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hitl_checkpoints (
+    execution_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    node_name TEXT,
+    kind TEXT NOT NULL,
+    status TEXT,
+    reason TEXT,
+    format INTEGER NOT NULL,
+    compressed INTEGER NOT NULL DEFAULT 0,
+    payload BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (execution_id, version)
+);
+CREATE INDEX IF NOT EXISTS idx_hitl_checkpoints_expires ON hitl_checkpoints (expires_at);
+CREATE INDEX IF NOT EXISTS idx_hitl_checkpoints_kind ON hitl_checkpoints (kind, status);
+CREATE TABLE IF NOT EXISTS hitl_node_memo (
+    execution_id TEXT NOT NULL,
+    node_name TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    compressed INTEGER NOT NULL DEFAULT 0,
+    payload BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (execution_id, node_name, fingerprint)
+);
+CREATE INDEX IF NOT EXISTS idx_hitl_node_memo_expires ON hitl_node_memo (expires_at);
+CREATE TABLE IF NOT EXISTS hitl_checkpoint_chunks (
+    chunk_id TEXT PRIMARY KEY,
+    payload BLOB NOT NULL,
+    last_used_at REAL NOT NULL
+);
+"""
+
+
+def _pack(obj: Any) -> bytes:
+    import ormsgpack
+
+    return ormsgpack.packb(obj, option=ormsgpack.OPT_NON_STR_KEYS)
+
+
+def _unpack(data: bytes) -> Any:
+    import ormsgpack
+
+    return ormsgpack.unpackb(data)
+
+
+# format -> values from an unpacked payload
+_PAYLOAD_DECODERS = {
+    1: lambda body: body["values"],
+}
+
+
+class UnsupportedSnapshotFormat(ValueError):
+    """Checkpoint written in a payload format this version cannot decode (unknown or newer)"""
+
+
+def _chunk_id(content: str, metadata: Dict[str, Any], doc_id: Optional[str]) -> str:
+    if doc_id:
+        return str(doc_id)
+    digest = hashlib.sha1(content.encode("utf-8"))
+    digest.update(json.dumps(metadata, sort_keys=True, default=str).encode("utf-8"))
+    return f"sha1:{digest.hexdigest()}"
+
+
+def _externalize(obj: Any, chunks: Dict[str, Dict[str, Any]]) -> Any:
+    """Make obj serializable, replacing documents by chunk references collected into `chunks`"""
+    if isinstance(obj, dict):
+        if "page_content" in obj:
+            return _document_ref(obj.get("page_content") or "", obj.get("metadata") or {}, obj.get("id"), False, chunks)
+        return {k: _externalize(v, chunks) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_externalize(item, chunks) for item in obj]
+    if isinstance(obj, (str, int, float, bool)) or obj is None:
+        return obj
+    if hasattr(obj, "page_content"):
+        return _document_ref(obj.page_content or "", getattr(obj, "metadata", None) or {}, getattr(obj, "id", None), True, chunks)
+    if isinstance(obj, (set, frozenset)):
+        return [_externalize(item, chunks) for item in obj]
+    if isinstance(obj, bytes):
+        return obj
+    if hasattr(obj, "tolist") and hasattr(obj, "dtype"):
+        # numpy scalars and arrays
+        return _externalize(obj.tolist(), chunks)
+    serializable = make_serializable(obj)
+    if serializable is obj:
+        # Left unchanged by make_serializable (date, Decimal, ...): stored as its string form
+        return obj.isoformat() if hasattr(obj, "isoformat") else str(obj)
+    return _externalize(serializable, chunks)
+
+
+def _document_ref(content: str, metadata: Dict[str, Any], doc_id: Optional[str],
+                  is_document: bool, chunks: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    # Same conversion as state values: retrieval metadata often carries numpy scores
+    metadata = _externalize(metadata, chunks)
+    chunk_id = _chunk_id(content, metadata, doc_id)
+    chunks.setdefault(chunk_id, {"page_content": content, "metadata": metadata, "id": doc_id})
+    return {_CHUNK_REF: chunk_id, "document": is_document}
+
+
+def _collect_refs(obj: Any, refs: set) -> None:
+    if isinstance(obj, dict):
+        if _CHUNK_REF in obj:
+            refs.add(obj[_CHUNK_REF])
+            return
+        for v in obj.values():
+            _collect_refs(v, refs)
+    elif isinstance(obj, list):
+        for item in obj:
+            _collect_refs(item, refs)
+
+
+def _rehydrate(obj: Any, chunks: Dict[str, Dict[str, Any]]) -> Any:
+    if isinstance(obj, dict):
+        if _CHUNK_REF in obj:
+            chunk = chunks.get(obj[_CHUNK_REF]) or {"page_content": "", "metadata": {}}
+            doc_id = chunk.get("id")
+            if obj.get("document"):
+                try:
+                    from langchain_core.documents import Document
+                    extra = {"id": doc_id} if doc_id is not None else {}
+                    return Document(page_content=chunk["page_content"], metadata=chunk["metadata"], **extra)
+                except ImportError:
+                    pass
+            document = {"page_content": chunk["page_content"], "metadata": chunk["metadata"], "type": "Document"}
+            if doc_id is not None:
+                document["id"] = doc_id
+            return document
+        return {k: _rehydrate(v, chunks) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_rehydrate(item, chunks) for item in obj]
+    return obj
+
+
+class HITLCheckpointer:
+    """
+    Versioned workflow checkpoints per execution, stored in a local SQLite file.
+
+    Called by HITLStateManager and the workflow; not a LangGraph checkpointer.
+    """
+
+    def __init__(self, path: Path, ttl_seconds: float):
+        self.path = str(path)
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(_SCHEMA)
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    # ---- encoding ----
+
+    def _encode(self, values: Dict[str, Any]) -> Tuple[bytes, bool, Dict[str, Dict[str, Any]]]:
+        chunks: Dict[str, Dict[str, Any]] = {}
+        body = _pack({"values": _externalize(values, chunks)})
+        compressed = len(body) >= COMPRESS_MIN_BYTES
+        if compressed:
+            body = zlib.compress(body, 6)
+        return body, compressed, chunks
+
+    @staticmethod
+    def _decode(payload: bytes, compressed: int, fmt: int = SNAPSHOT_FORMAT_VERSION) -> Dict[str, Any]:
+        decoder = _PAYLOAD_DECODERS.get(fmt)
+        if decoder is None:
+            raise UnsupportedSnapshotFormat(
+                f"Checkpoint format {fmt} is not supported (this version reads {sorted(_PAYLOAD_DECODERS)})"
+            )
+        return decoder(_unpack(zlib.decompress(payload) if compressed else payload))
+
+    @staticmethod
+    def _store_chunks(conn: sqlite3.Connection, chunks: Dict[str, Dict[str, Any]], now: float) -> None:
+        if chunks:
+            conn.executemany(
+                "INSERT INTO hitl_checkpoint_chunks (chunk_id, payload, last_used_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(chunk_id) DO UPDATE SET last_used_at = excluded.last_used_at",
+                [(chunk_id, _pack(chunk), now) for chunk_id, chunk in chunks.items()],
+            )
+
+    def _resolve_chunks(self, conn: sqlite3.Connection, values: Dict[str, Any], label: str) -> Dict[str, Any]:
+        """Replace chunk references in values by the stored documents"""
+        refs: set = set()
+        _collect_refs(values, refs)
+        chunks: Dict[str, Dict[str, Any]] = {}
+        refs_list = sorted(refs)
+        for start in range(0, len(refs_list), 500):
+            batch = refs_list[start:start + 500]
+            for chunk_row in conn.execute(
+                f"SELECT chunk_id, payload FROM hitl_checkpoint_chunks WHERE chunk_id IN ({','.join('?' * len(batch))})",
+                batch,
+            ):
+                chunks[chunk_row["chunk_id"]] = _unpack(chunk_row["payload"])
+        missing = refs - chunks.keys()
+        if missing:
+            logger.warning(f"{label} references {len(missing)} expired document chunks")
+        return _rehydrate(values, chunks)
+
+    # ---- write ----
+
+    def put(self, execution_id: str, values: Dict[str, Any], node_name: Optional[str] = None,
+            kind: str = "node", status: Optional[str] = None, reason: Optional[str] = None) -> int:
+        """
+        Store a checkpoint and return its version.
+
+        For kind "node", values are the keys the node changed; for the full
+        snapshot kinds (start, pause, interrupt) they are the complete state.
+        """
+        body, compressed, chunks = self._encode(values)
+        now = time.time()
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._store_chunks(conn, chunks, now)
+            row = conn.execute(
+                "SELECT COALESCE(MAX(version), 0) FROM hitl_checkpoints WHERE execution_id = ?", (execution_id,)
+            ).fetchone()
+            version = row[0] + 1
+            conn.execute(
+                "INSERT INTO hitl_checkpoints (execution_id, version, node_name, kind, status, reason, format, "
+                "compressed, payload, created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (execution_id, version, node_name, kind, status, reason, SNAPSHOT_FORMAT_VERSION,
+                 int(compressed), body, now, now + self.ttl_seconds),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return version
+
+    def set_status(self, execution_id: str, version: int, status: str) -> bool:
+        cursor = self._connection().execute(
+            "UPDATE hitl_checkpoints SET status = ? WHERE execution_id = ? AND version = ?",
+            (status, execution_id, version),
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, execution_id: str) -> int:
+        """Remove all checkpoints and node memos of an execution (chunks are left to TTL cleanup)"""
+        conn = self._connection()
+        conn.execute("DELETE FROM hitl_node_memo WHERE execution_id = ?", (execution_id,))
+        return conn.execute("DELETE FROM hitl_checkpoints WHERE execution_id = ?", (execution_id,)).rowcount
+
+    def cleanup_expired(self, max_age_seconds: Optional[float] = None) -> int:
+        """Delete expired checkpoints and the chunks only they referenced; returns checkpoints removed"""
+        now = time.time()
+        conn = self._connection()
+        for table in ("hitl_checkpoints", "hitl_node_memo"):
+            if max_age_seconds is None:
+                count = conn.execute(f"DELETE FROM {table} WHERE expires_at <= ?", (now,)).rowcount
+            else:
+                count = conn.execute(f"DELETE FROM {table} WHERE created_at <= ?", (now - max_age_seconds,)).rowcount
+            if table == "hitl_checkpoints":
+                removed = count
+        # A chunk is refreshed whenever a checkpoint references it, so one unused for a full
+        # TTL is only referenced by checkpoints that have expired as well
+        chunks = conn.execute(
+            "DELETE FROM hitl_checkpoint_chunks WHERE last_used_at <= ?",
+            (now - (self.ttl_seconds if max_age_seconds is None else min(max_age_seconds, self.ttl_seconds)),),
+        ).rowcount
+        if removed or chunks:
+            logger.info(f"HITL checkpoint cleanup removed {removed} checkpoints and {chunks} document chunks")
+        return removed
+
+    # ---- read ----
+
+    def list(self, execution_id: str) -> List[Dict[str, Any]]:
+        """Checkpoint metadata (no payloads) for an execution, oldest first"""
+        rows = self._connection().execute(
+            "SELECT execution_id, version, node_name, kind, status, reason, created_at, LENGTH(payload) AS size "
+            "FROM hitl_checkpoints WHERE execution_id = ? ORDER BY version", (execution_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def latest(self, execution_id: str, kinds: Tuple[str, ...], status: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Metadata of the newest checkpoint of the given kinds (and status)"""
+        query = (
+            f"SELECT execution_id, version, node_name, kind, status, reason, created_at FROM hitl_checkpoints "
+            f"WHERE execution_id = ? AND kind IN ({','.join('?' * len(kinds))}) AND expires_at > ?"
+        )
+        params: List[Any] = [execution_id, *kinds, time.time()]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        row = self._connection().execute(query + " ORDER BY version DESC LIMIT 1", params).fetchone()
+        return dict(row) if row else None
+
+    def list_open(self, kind: str, status: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Executions whose newest pause/interrupt checkpoint has the given kind and status (e.g. awaiting resume)"""
+        rows = self._connection().execute(
+            "SELECT c.execution_id, c.version, c.node_name, c.kind, c.status, c.reason, c.created_at "
+            "FROM hitl_checkpoints c JOIN ("
+            "  SELECT execution_id, MAX(version) AS version FROM hitl_checkpoints "
+            "  WHERE kind IN ('pause', 'interrupt') GROUP BY execution_id"
+            ") newest ON newest.execution_id = c.execution_id AND newest.version = c.version "
+            "WHERE c.kind = ? AND c.status = ? AND c.expires_at > ? ORDER BY c.created_at DESC LIMIT ?",
+            (kind, status, time.time(), limit),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def load(self, execution_id: str, version: Optional[int] = None) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Rebuild the state at a checkpoint (latest when version is None).
+
+        Returns (state, checkpoint metadata), or None if there is no such checkpoint.
+        """
+        conn = self._connection()
+        now = time.time()
+        if version is None:
+            row = conn.execute(
+                "SELECT MAX(version) FROM hitl_checkpoints WHERE execution_id = ? AND expires_at > ?",
+                (execution_id, now),
+            ).fetchone()
+            version = row[0] if row else None
+            if version is None:
+                return None
+        # Deltas are only meaningful on top of a full snapshot; if cleanup removed it, the state is gone
+        base = conn.execute(
+            f"SELECT MAX(version) FROM hitl_checkpoints WHERE execution_id = ? AND version <= ? "
+            f"AND kind IN ({','.join('?' * len(FULL_SNAPSHOT_KINDS))})",
+            (execution_id, version, *FULL_SNAPSHOT_KINDS),
+        ).fetchone()[0]
+        if base is None:
+            logger.warning(f"Checkpoint {execution_id}@{version} has no full snapshot to rebuild from")
+            return None
+        rows = conn.execute(
+            "SELECT version, node_name, kind, status, reason, format, compressed, payload, created_at, expires_at "
+            "FROM hitl_checkpoints WHERE execution_id = ? AND version BETWEEN ? AND ? ORDER BY version",
+            (execution_id, base, version),
+        ).fetchall()
+        if not rows or rows[-1]["version"] != version or rows[-1]["expires_at"] <= now:
+            return None
+        if len(rows) != version - base + 1:
+            logger.warning(f"Checkpoint {execution_id}@{version} is missing deltas after v{base}")
+            return None
+
+        state: Dict[str, Any] = {}
+        try:
+            for row in rows:
+                state.update(self._decode(row["payload"], row["compressed"], row["format"]))
+        except UnsupportedSnapshotFormat as e:
+            logger.warning(f"Checkpoint {execution_id}@{version} cannot be loaded: {e}")
+            return None
+
+        last = rows[-1]
+        meta = {
+            "execution_id": execution_id,
+            "version": version,
+            "node_name": last["node_name"],
+            "kind": last["kind"],
+            "status": last["status"],
+            "reason": last["reason"],
+            "created_at": last["created_at"],
+        }
+        return self._resolve_chunks(conn, state, f"Checkpoint {execution_id}@{version}"), meta
+
+    # ---- node memo (resume reuses a node's delta when its inputs are unchanged) ----
+
+    def put_memo(self, execution_id: str, node_name: str, fingerprint: str, delta: Dict[str, Any]) -> None:
+        body, compressed, chunks = self._encode(delta)
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._store_chunks(conn, chunks, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO hitl_node_memo (execution_id, node_name, fingerprint, compressed, payload, "
+                "created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (execution_id, node_name, fingerprint, int(compressed), body, now, now + self.ttl_seconds),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_memo(self, execution_id: str, node_name: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """The delta a node produced for these inputs in this execution, or None"""
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT compressed, payload FROM hitl_node_memo WHERE execution_id = ? AND node_name = ? "
+            "AND fingerprint = ? AND expires_at > ?",
+            (execution_id, node_name, fingerprint, time.time()),
+        ).fetchone()
+        if not row:
+            return None
+        delta = self._decode(row["payload"], row["compressed"])
+        return self._resolve_chunks(conn, delta, f"Memo {execution_id}/{node_name}")
+
+    def has_memo(self, execution_id: str) -> bool:
+        return self._connection().execute(
+            "SELECT 1 FROM hitl_node_memo WHERE execution_id = ? AND expires_at > ? LIMIT 1",
+            (execution_id, time.time()),
+        ).fetchone() is not None
+
+    # ---- async wrappers (SQLite work runs off the event loop) ----
+
+    async def aput(self, execution_id: str, values: Dict[str, Any], node_name: Optional[str] = None,
+                   kind: str = "node", status: Optional[str] = None, reason: Optional[str] = None) -> int:
+        return await asyncio.to_thread(self.put, execution_id, values, node_name, kind, status, reason)
+
+    async def aload(self, execution_id: str, version: Optional[int] = None):
+        return await asyncio.to_thread(self.load, execution_id, version)
+
+    async def alist(self, execution_id: str) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.list, execution_id)
+
+    async def aput_memo(self, execution_id: str, node_name: str, fingerprint: str, delta: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self.put_memo, execution_id, node_name, fingerprint, delta)
+
+    async def aget_memo(self, execution_id: str, node_name: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.get_memo, execution_id, node_name, fingerprint)
+
+
+hitl_checkpointer = HITLCheckpointer(Config.HITL_CHECKPOINT_DB_PATH, Config.HITL_CHECKPOINT_TTL_SECONDS)
+
+_cleanup_task: Optional[asyncio.Task] = None
+
+
+async def periodic_checkpoint_cleanup():
+    """Background task that removes expired HITL checkpoints"""
+    while True:
+        try:
+            await asyncio.sleep(Config.HITL_CHECKPOINT_CLEANUP_INTERVAL_SECONDS)
+            await asyncio.to_thread(hitl_checkpointer.cleanup_expired)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f"Error in HITL checkpoint cleanup task: {e}")
+
+
+def start_checkpoint_cleanup_task():
+    """Start the checkpoint TTL cleanup task. Should be called during application startup."""
+    global _cleanup_task
+    if _cleanup_task is None or _cleanup_task.done():
+        _cleanup_task = asyncio.create_task(periodic_checkpoint_cleanup())
+
+
+def stop_checkpoint_cleanup_task():
+    """Stop the checkpoint TTL cleanup task. Should be called during application shutdown."""
+    global _cleanup_task
+    if _cleanup_task and not _cleanup_task.done():
+        _cleanup_task.cancel()
@@ -1,342 +1,216 @@
 """
 HITL (Human-in-the-Loop) State Manager
 
-This module manages HITL workflow states with memory storage only:
-- Pause states: Stored in memory for quick access and temporary suspension
-- Interrupt states: Stored in memory for persistence during session
+This module manages HITL workflow states on top of the SQLite checkpointer:
+- Pause/interrupt states are stored as versioned full-state checkpoints, so they
+  survive a worker restart and cost one compact write instead of an in-memory deep copy
+- Resume loads the latest pause/interrupt checkpoint, or any earlier checkpoint by version
+- Old checkpoints are removed by TTL (see hitl_checkpointer)
 """
 
-import json
 import time
 import logging
 from typing import Dict, Any, Optional, List
-import threading
+
+from .hitl_checkpointer import hitl_checkpointer
 
 logger = logging.getLogger(__name__)
 
+# Fields the resume path expects to be present in a restored state
+_CRITICAL_FIELDS = {"user_input": "", "datasource": {}, "query_type": "", "sql_task_type": ""}
+
 
 class HITLStateManager:
-    """Manages HITL workflow states with memory storage only"""
-    
-    def __init__(self):
-        self.pause_states: Dict[str, Dict[str, Any]] = {}
-        self.lock = threading.RLock()
-        
+    """Manages HITL workflow states backed by the persistent checkpointer"""
+
+    def __init__(self, checkpointer=hitl_checkpointer):
+        self.checkpointer = checkpointer
+
     def pause_execution(self, execution_id: str, state: Dict[str, Any], node_name: str, reason: str = "user_request") -> bool:
         """
-        Pause workflow execution and store complete state in memory
-        
+        Pause workflow execution and store a checkpoint of the complete state
+
         Args:
             execution_id: Unique execution identifier
             state: Complete workflow state
             node_name: Node where pause occurred
             reason: Reason for pause
-            
+
         Returns:
             bool: Success status
         """
-        logger.info(f"🔄 [BACKEND-HITL] pause_execution called")
-        logger.info(f"📥 [BACKEND-HITL] pause_execution input params: execution_id={execution_id}, node_name={node_name}, reason={reason}")
-        logger.info(f"📥 [BACKEND-HITL] pause_execution state keys: {list(state.keys())}")
-        
-        try:
-            with self.lock:
-                # Create serializable state snapshot for pause - store complete state
-                def make_serializable(obj):
-                    """Convert complex objects to serializable format"""
-                    if isinstance(obj, dict):
-                        return {k: make_serializable(v) for k, v in obj.items()}
-                    elif isinstance(obj, (list, tuple)):
-                        return [make_serializable(item) for item in obj]
-                    elif hasattr(obj, '__dict__'):
-                        # For complex objects, extract basic attributes
-                        try:
-                            return {k: make_serializable(v) for k, v in obj.__dict__.items() 
-                                    if not k.startswith('_')}
-                        except:
-                            return str(obj)
-                    else:
-                        return obj
-                
-                # Store the complete state as-is, don't cherry-pick fields
-                complete_state = make_serializable(state.copy())
-                
-                # Ensure critical fields are present
-                if "user_input" not in complete_state:
-                    complete_state["user_input"] = ""
-                if "datasource" not in complete_state:
-                    complete_state["datasource"] = {}
-                if "query_type" not in complete_state:
-                    complete_state["query_type"] = ""
-                if "sql_task_type" not in complete_state:
-                    complete_state["sql_task_type"] = ""
-                
-                pause_data = {
-                    "execution_id": execution_id,
-                    "state": complete_state,  # Store complete state
-                    "node_name": node_name,
-                    "reason": reason,
-                    "paused_at": time.time(),
-                    "status": "paused"
-                }
-                
-                logger.info(f"📊 [BACKEND-HITL] pause_execution prepared pause_data keys: {list(pause_data.keys())}")
-                logger.info(f"📊 [BACKEND-HITL] pause_execution complete_state keys: {list(complete_state.keys())}")
-                
-                self.pause_states[execution_id] = pause_data
-                logger.info(f"📊 [BACKEND-HITL] pause_execution stored in pause_states for execution {execution_id}")
-                logger.info(f"📊 [BACKEND-HITL] pause_execution paused state keys: {list(complete_state.keys())}")
-                logger.info(f"📊 [BACKEND-HITL] pause_execution paused query_type: {complete_state.get('query_type', 'NOT_SET')}")
-                logger.info(f"📊 [BACKEND-HITL] pause_execution paused sql_task_type: {complete_state.get('sql_task_type', 'NOT_SET')}")
-                logger.info(f"📊 [BACKEND-HITL] pause_execution paused datasource: {complete_state.get('datasource', 'NOT_SET')}")
-                
-                logger.info(f"✅ [BACKEND-HITL] pause_execution completed successfully for execution {execution_id}")
-                return True
-                
-        except Exception as e:
-            logger.error(f"❌ [BACKEND-HITL] pause_execution failed: Failed to pause execution {execution_id}: {e}")
-            return False
-    
+        return self._checkpoint(execution_id, state, node_name, reason, kind="pause", status="paused")
+
     def interrupt_execution(self, execution_id: str, state: Dict[str, Any], node_name: str, reason: str = "user_request") -> bool:
         """
-        Interrupt workflow execution and store state in memory
-        
+        Interrupt workflow execution and store a checkpoint of the complete state
+
         Args:
             execution_id: Unique execution identifier
             state: Complete workflow state
             node_name: Node where interrupt occurred
             reason: Reason for interrupt
-            
+
         Returns:
             bool: Success status
         """
+        return self._checkpoint(execution_id, state, node_name, reason, kind="interrupt", status="interrupted")
+
+    def _checkpoint(self, execution_id: str, state: Dict[str, Any], node_name: str, reason: str,
+                    kind: str, status: str) -> bool:
         try:
-            with self.lock:
-                # Create serializable state snapshot for interrupt - store complete state
-                def make_serializable(obj):
-                    """Convert complex objects to serializable format"""
-                    if isinstance(obj, dict):
-                        return {k: make_serializable(v) for k, v in obj.items()}
-                    elif isinstance(obj, (list, tuple)):
-                        return [make_serializable(item) for item in obj]
-                    elif hasattr(obj, '__dict__'):
-                        # For complex objects, extract basic attributes
-                        try:
-                            return {k: make_serializable(v) for k, v in obj.__dict__.items() 
-                                    if not k.startswith('_')}
-                        except:
-                            return str(obj)
-                    elif hasattr(obj, 'page_content'):
-                        # Handle Document objects from LangChain
-                        return {
-                            'page_content': getattr(obj, 'page_content', ''),
-                            'metadata': getattr(obj, 'metadata', {}),
-                            'type': 'Document'
-                        }
-                    elif hasattr(obj, 'content'):
-                        # Handle other content objects
-                        return {
-                            'content': getattr(obj, 'content', ''),
-                            'type': type(obj).__name__
-                        }
-                    else:
-                        return obj
-                
-                # Store in memory only
-                self.pause_states[execution_id] = {
-                    "state": make_serializable(state),
-                    "node_name": node_name,
-                    "reason": reason,
-                    "timestamp": time.time(),
-                    "status": "interrupted"
-                }
-                
-                logger.info(f"Workflow execution {execution_id} interrupted at node {node_name}")
-                return True
-                
+            # Documents are stored by chunk id and everything else is encoded by the checkpointer,
+            # so no serializable deep copy is made here
+            values = {**_CRITICAL_FIELDS, **state}
+            version = self.checkpointer.put(execution_id, values, node_name=node_name, kind=kind,
+                                            status=status, reason=reason)
+            logger.info(f"✅ [BACKEND-HITL] {kind} checkpoint v{version} stored for execution {execution_id} at node {node_name}")
+            return True
         except Exception as e:
-            logger.error(f"Failed to interrupt execution {execution_id}: {e}")
+            logger.error(f"❌ [BACKEND-HITL] Failed to {kind} execution {execution_id}: {e}")
             return False
-    
-    def resume_execution(self, execution_id: str, parameters: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+
+    def load_checkpoint(self, execution_id: str, version: Optional[int] = None) -> Optional[Dict[str, Any]]:
         """
-        Resume paused execution from memory with selective parameter updates
-        
+        Load the state at a checkpoint (latest when version is None)
+
+        Returns:
+            Dict with execution_id, state, node_name, kind, status, reason, version, timestamp; or None
+        """
+        loaded = self.checkpointer.load(execution_id, version)
+        if not loaded:
+            return None
+        state, meta = loaded
+        return {**meta, "state": state, "timestamp": meta["created_at"]}
+
+    def resume_execution(self, execution_id: str, parameters: Optional[Dict[str, Any]] = None,
+                         version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Resume paused execution with selective parameter updates
+
         Args:
             execution_id: Unique execution identifier
             parameters: Optional parameter updates (only non-empty values will be applied)
-            
+            version: Checkpoint version to resume from (default: the latest pause)
+
         Returns:
             Dict[str, Any]: Restored state or None if not found
         """
-        logger.info(f"🔄 [BACKEND-HITL] resume_execution called")
-        logger.info(f"📥 [BACKEND-HITL] resume_execution input params: execution_id={execution_id}, parameters={parameters}")
-        
-        try:
-            with self.lock:
-                if execution_id not in self.pause_states:
-                    logger.warning(f"⚠️ [BACKEND-HITL] resume_execution: No paused execution found for {execution_id}")
-                    return None
-                
-                pause_data = self.pause_states[execution_id]
-                state = pause_data["state"].copy()
-                
-                logger.info(f"📊 [BACKEND-HITL] resume_execution found pause_data for execution {execution_id}")
-                logger.info(f"📊 [BACKEND-HITL] resume_execution pause_data keys: {list(pause_data.keys())}")
-                logger.info(f"📊 [BACKEND-HITL] resume_execution state keys: {list(state.keys())}")
-                
-                # Apply parameter updates selectively - only update non-empty values
-                if parameters:
-                    updated_fields = []
-                    for key, value in parameters.items():
-                        # Only update if value is not empty/None
-                        if value is not None and value != "" and value != [] and value != {}:
-                            old_value = state.get(key)
-                            state[key] = value
-                            updated_fields.append(f"{key}: {old_value} -> {value}")
-                    
-                    if updated_fields:
-                        logger.info(f"📊 [BACKEND-HITL] resume_execution applied selective parameter updates to execution {execution_id}: {', '.join(updated_fields)}")
-                    else:
-                        logger.info(f"📊 [BACKEND-HITL] resume_execution no valid parameter updates for execution {execution_id} (all values were empty)")
-                else:
-                    logger.info(f"📊 [BACKEND-HITL] resume_execution no parameters provided for execution {execution_id}")
-                
-                # Remove from pause states
-                del self.pause_states[execution_id]
-                logger.info(f"📊 [BACKEND-HITL] resume_execution removed execution {execution_id} from pause_states")
-                
-                logger.info(f"📊 [BACKEND-HITL] resume_execution resumed state keys: {list(state.keys())}")
-                logger.info(f"📊 [BACKEND-HITL] resume_execution resumed query_type: {state.get('query_type', 'NOT_SET')}")
-                logger.info(f"📊 [BACKEND-HITL] resume_execution resumed sql_task_type: {state.get('sql_task_type', 'NOT_SET')}")
-                logger.info(f"📊 [BACKEND-HITL] resume_execution resumed datasource: {state.get('datasource', 'NOT_SET')}")
-                
-                logger.info(f"✅ [BACKEND-HITL] resume_execution completed successfully for execution {execution_id}")
-                return state
-                
-        except Exception as e:
-            logger.error(f"❌ [BACKEND-HITL] resume_execution failed: Failed to resume execution {execution_id}: {e}")
-            return None
-    
-    def restore_interrupt(self, execution_id: str, parameters: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        return self._restore(execution_id, "pause", "paused", parameters, version, skip_empty=True)
+
+    def restore_interrupt(self, execution_id: str, parameters: Optional[Dict[str, Any]] = None,
+                          version: Optional[int] = None) -> Optional[Dict[str, Any]]:
         """
-        Restore interrupted execution from memory
-        
+        Restore interrupted execution
+
         Args:
             execution_id: Unique execution identifier
             parameters: Optional parameter updates
-            
+            version: Checkpoint version to restore (default: the latest interrupt)
+
         Returns:
             Dict[str, Any]: Restored state or None if not found
         """
+        return self._restore(execution_id, "interrupt", "interrupted", parameters, version, skip_empty=False)
+
+    def _restore(self, execution_id: str, kind: str, status: str, parameters: Optional[Dict[str, Any]],
+                 version: Optional[int], skip_empty: bool) -> Optional[Dict[str, Any]]:
         try:
-            with self.lock:
-                if execution_id not in self.pause_states:
-                    logger.warning(f"No interrupted execution found for {execution_id}")
-                    return None
-                
-                interrupt_data = self.pause_states[execution_id]
-                if interrupt_data.get("status") != "interrupted":
-                    logger.warning(f"Execution {execution_id} is not in interrupted status")
+            if version is None:
+                latest = self.checkpointer.latest(execution_id, (kind,), status=status)
+                if not latest:
+                    logger.warning(f"⚠️ [BACKEND-HITL] No {status} execution found for {execution_id}")
                     return None
-                
-                state = interrupt_data["state"]
-                
-                # Apply parameter updates if provided
-                if parameters:
-                    state.update(parameters)
-                    logger.info(f"Applied parameter updates to interrupted execution {execution_id}")
-                
-                # Remove from memory after restoration
-                del self.pause_states[execution_id]
-                
-                logger.info(f"Workflow execution {execution_id} restored from interrupt")
-                return state
-                
+                version = latest["version"]
+            checkpoint = self.load_checkpoint(execution_id, version)
+            if not checkpoint:
+                logger.warning(f"⚠️ [BACKEND-HITL] Checkpoint v{version} of {execution_id} not found or expired")
+                return None
+
+            state = checkpoint["state"]
+            if parameters:
+                updated = [key for key, value in parameters.items()
+                           if not skip_empty or value not in (None, "", [], {})]
+                state.update({key: parameters[key] for key in updated})
+                logger.info(f"📊 [BACKEND-HITL] Applied parameter updates to {execution_id}: {updated}")
+
+            # The checkpoint is kept (any version stays resumable until it expires); only its status changes
+            if checkpoint["kind"] == kind:
+                self.checkpointer.set_status(execution_id, version, "resumed")
+            logger.info(f"✅ [BACKEND-HITL] Execution {execution_id} restored from checkpoint v{version} ({checkpoint['node_name']})")
+            return state
+
         except Exception as e:
-            logger.error(f"Failed to restore execution {execution_id}: {e}")
+            logger.error(f"❌ [BACKEND-HITL] Failed to restore execution {execution_id}: {e}")
             return None
-    
+
     def cancel_execution(self, execution_id: str, execution_type: str = "pause") -> bool:
         """
-        Cancel paused or interrupted execution
-        
+        Cancel paused or interrupted execution (removes its checkpoints)
+
         Args:
             execution_id: Unique execution identifier
             execution_type: "pause" or "interrupt"
-            
+
         Returns:
             bool: Success status
         """
         try:
-            with self.lock:
-                if execution_id in self.pause_states:
-                    del self.pause_states[execution_id]
-                    logger.info(f"Cancelled {execution_type} execution {execution_id}")
-                    return True
-                else:
-                    logger.warning(f"No {execution_type} execution found for {execution_id}")
-                    return False
-                    
+            removed = self.checkpointer.delete(execution_id)
+            if removed:
+                logger.info(f"Cancelled {execution_type} execution {execution_id} ({removed} checkpoints removed)")
+                return True
+            logger.warning(f"No {execution_type} execution found for {execution_id}")
+            return False
+
         except Exception as e:
             logger.error(f"Failed to cancel execution {execution_id}: {e}")
             return False
-    
+
     def get_pause_state(self, execution_id: str) -> Optional[Dict[str, Any]]:
-        """Get paused execution state from memory"""
-        with self.lock:
-            return self.pause_states.get(execution_id)
-    
+        """Get the latest paused execution state"""
+        return self._get_open_state(execution_id, "pause", "paused")
+
     def get_interrupt_state(self, execution_id: str) -> Optional[Dict[str, Any]]:
-        """Get interrupted execution state from memory"""
-        with self.lock:
-            if execution_id in self.pause_states:
-                interrupt_data = self.pause_states[execution_id]
-                if interrupt_data.get("status") == "interrupted":
-                    return interrupt_data
-            return None
-    
+        """Get the latest interrupted execution state"""
+        return self._get_open_state(execution_id, "interrupt", "interrupted")
+
+    def _get_open_state(self, execution_id: str, kind: str, status: str) -> Optional[Dict[str, Any]]:
+        latest = self.checkpointer.latest(execution_id, (kind,), status=status)
+        return self.load_checkpoint(execution_id, latest["version"]) if latest else None
+
+    def list_checkpoints(self, execution_id: str) -> List[Dict[str, Any]]:
+        """All checkpoints of an execution (metadata only), oldest first"""
+        return self.checkpointer.list(execution_id)
+
     def list_paused_executions(self) -> List[Dict[str, Any]]:
         """List all paused executions"""
-        with self.lock:
-            return list(self.pause_states.values())
-    
+        return self._list_open("pause", "paused")
+
     def list_interrupted_executions(self) -> List[Dict[str, Any]]:
-        """List all interrupted executions from memory"""
-        with self.lock:
-            interrupted_executions = []
-            for execution_id, pause_data in self.pause_states.items():
-                if pause_data.get("status") == "interrupted":
-                    interrupted_executions.append({
-                        "execution_id": execution_id,
-                        "user_input": pause_data["state"].get("user_input", ""),
-                        "node_name": pause_data.get("node_name", ""),
-                        "reason": pause_data.get("reason", ""),
-                        "created_at": pause_data.get("timestamp", time.time()),
-                        "status": pause_data.get("status", ""),
-                        "id": execution_id  # Use execution_id as id for memory storage
-                    })
-            return interrupted_executions
-    
-    def cleanup_old_states(self, max_age_hours: int = 24):
-        """Clean up old paused states from memory"""
+        """List all interrupted executions"""
+        return self._list_open("interrupt", "interrupted")
+
+    def _list_open(self, kind: str, status: str) -> List[Dict[str, Any]]:
+        executions = []
+        for meta in self.checkpointer.list_open(kind, status):
+            checkpoint = self.load_checkpoint(meta["execution_id"], meta["version"]) or {"state": {}}
+            executions.append({
+                "execution_id": meta["execution_id"],
+                "user_input": checkpoint["state"].get("user_input", ""),
+                "node_name": meta.get("node_name", ""),
+                "reason": meta.get("reason", ""),
+                "created_at": meta.get("created_at", time.time()),
+                "status": meta.get("status", ""),
+                "version": meta["version"],
+                "id": meta["execution_id"]
+            })
+        return executions
+
+    def cleanup_old_states(self, max_age_hours: Optional[int] = None):
+        """Remove expired checkpoints (or those older than max_age_hours)"""
         try:
-            with self.lock:
-                # Clean up old paused states
-                current_time = time.time()
-                to_remove = []
-                
-                for execution_id, pause_data in self.pause_states.items():
-                    paused_at = pause_data.get("paused_at", current_time)
-                    age_hours = (current_time - paused_at) / 3600
-                    
-                    if age_hours > max_age_hours:
-                        to_remove.append(execution_id)
-                
-                for execution_id in to_remove:
-                    del self.pause_states[execution_id]
-                    logger.info(f"Cleaned up old paused execution {execution_id}")
-                    
+            self.checkpointer.cleanup_expired(None if max_age_hours is None else max_age_hours * 3600)
         except Exception as e:
             logger.error(f"Failed to cleanup old states: {e}")
 
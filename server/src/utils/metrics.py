@@ -0,0 +1,398 @@
+"""
+Metrics - in-process metrics registry with Prometheus text exposition.
+
+Dependency-free counters, gauges and histograms (with labels) for the hot
+paths of the query pipeline:
+- Per-node workflow durations (rag_query, router, sql_agent, chart_process, llm_processing)
+- LLM latency and token counts per provider/model
+- Embedding and rerank batch timings
+- SQL execution time and result row counts
+- Cache hit/miss counts
+- Event-loop lag
+
+Everything is exposed at GET /metrics in the Prometheus text format (0.0.4).
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..config.config import Config
+from .tracing import SPAN_KIND_CLIENT, set_current_span_attributes, start_span
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Default buckets (seconds) - from sub-millisecond SQL up to multi-minute agent runs
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000, 100000)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536)
+
+
+def _escape_label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape_label_value(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape_label_value(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Base class for labelled metrics"""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self._render_samples())
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only be incremented by non-negative amounts")
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._label_values(labels), 0.0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def get(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._label_values(labels), 0.0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed buckets"""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> [per-bucket counts, sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = [[0] * len(self.buckets), 0.0, 0]
+                self._values[key] = entry
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall-clock duration of the enclosed block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels: str) -> Dict[str, float]:
+        """Count and sum for one label set"""
+        with self._lock:
+            entry = self._values.get(self._label_values(labels))
+            if entry is None:
+                return {"count": 0, "sum": 0.0}
+            return {"count": entry[2], "sum": entry[1]}
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()]
+        lines = []
+        for key, bucket_counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds all metrics of the process and renders them"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Module reloads re-register the same metric; keep the original series
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# ==================== Metric definitions ====================
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+)
+NODE_DURATION = REGISTRY.histogram(
+    "workflow_node_duration_seconds", "LangGraph workflow node execution time", ("node", "status")
+)
+LLM_REQUEST_DURATION = REGISTRY.histogram(
+    "llm_request_duration_seconds", "LLM call latency", ("provider", "model", "status")
+)
+LLM_TOKENS = REGISTRY.counter(
+    "llm_tokens_total",
+    "LLM tokens consumed (type: input, output; input split into input_cached/input_uncached, input_cache_write)",
+    ("provider", "model", "type"),
+)
+LLM_PROMPT_TOKENS = REGISTRY.histogram(
+    "llm_prompt_tokens", "Input tokens per LLM call", ("provider", "model"), buckets=TOKEN_BUCKETS
+)
+LLM_TIME_TO_FIRST_TOKEN = REGISTRY.histogram(
+    "llm_time_to_first_token_seconds", "Time to first streamed token per LLM call",
+    ("provider", "model", "prompt_cache"),
+)
+EMBEDDING_BATCH_DURATION = REGISTRY.histogram(
+    "embedding_batch_duration_seconds", "Embedding call latency", ("provider", "operation")
+)
+EMBEDDING_BATCH_SIZE = REGISTRY.histogram(
+    "embedding_batch_size", "Texts per embedding call", ("provider", "operation"), buckets=SIZE_BUCKETS
+)
+RERANK_BATCH_DURATION = REGISTRY.histogram(
+    "rerank_duration_seconds", "Cross-encoder rerank latency", ("model",)
+)
+RERANK_BATCH_SIZE = REGISTRY.histogram(
+    "rerank_documents", "Documents scored per rerank call", ("model",), buckets=SIZE_BUCKETS
+)
+SQL_QUERY_DURATION = REGISTRY.histogram(
+    "sql_query_duration_seconds", "SQL statement execution time", ("dialect", "statement", "status")
+)
+SQL_RESULT_ROWS = REGISTRY.histogram(
+    "sql_result_rows", "Rows returned to the workflow by SQL queries", ("source",), buckets=SIZE_BUCKETS
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "cache_requests_total", "Cache lookups by result", ("cache", "result")
+)
+CHART_SPEC_DECISIONS = REGISTRY.counter(
+    "chart_spec_decisions_total",
+    "Chart specs by source: rule-based inferencer, LLM, fallback, or fallback after an error", ("source", "chart_type")
+)
+EVENT_LOOP_LAG = REGISTRY.gauge(
+    "event_loop_lag_seconds", "Most recent event-loop scheduling delay"
+)
+EVENT_LOOP_LAG_HISTOGRAM = REGISTRY.histogram(
+    "event_loop_lag_distribution_seconds", "Event-loop scheduling delay",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+# ==================== Helpers ====================
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """Count a cache hit or miss"""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def _statement_kind(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    kind = words[0].upper() if words else "UNKNOWN"
+    return kind if kind in ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "CREATE", "DROP", "PRAGMA", "SHOW", "DESCRIBE") else "OTHER"
+
+
+def instrument_sql_engine(engine, dialect: Optional[str] = None) -> None:
+    """Record execution time (and a sql.query span) for every statement run through a SQLAlchemy engine"""
+    if engine is None or getattr(engine, "_metrics_instrumented", False):
+        return
+    try:
+        from sqlalchemy import event
+    except ImportError:
+        return
+
+    dialect_name = dialect or getattr(getattr(engine, "dialect", None), "name", "unknown")
+
+    def _finish(conn, statement: str, status: str, rowcount: int = -1, error: Optional[BaseException] = None) -> None:
+        pending = conn.info.get("_metrics_query_start") if conn is not None else None
+        if not pending:
+            return
+        started, query_span = pending.pop()
+        SQL_QUERY_DURATION.observe(
+            time.perf_counter() - started, dialect=dialect_name, statement=_statement_kind(statement), status=status
+        )
+        if rowcount is not None and rowcount >= 0:
+            query_span.set_attribute("db.rowcount", rowcount)
+        if error is not None:
+            query_span.record_exception(error)
+        query_span.end()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        query_span = start_span(
+            "sql.query",
+            {"db.system": dialect_name, "db.operation": _statement_kind(statement), "db.statement": statement},
+            kind=SPAN_KIND_CLIENT,
+        )
+        conn.info.setdefault("_metrics_query_start", []).append((time.perf_counter(), query_span))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _finish(conn, statement, "ok", getattr(cursor, "rowcount", -1))
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        _finish(context.connection, context.statement or "", "error", error=context.original_exception)
+
+    engine._metrics_instrumented = True
+
+
+def record_sql_result_rows(source: str, structured_data) -> None:
+    """Record how many rows a SQL step handed to the workflow"""
+    rows = None
+    if isinstance(structured_data, dict):
+        rows = structured_data.get("rows") or structured_data.get("data")
+    elif isinstance(structured_data, list):
+        rows = structured_data
+    row_count = len(rows) if rows else 0
+    SQL_RESULT_ROWS.observe(row_count, source=source)
+    set_current_span_attributes(**{"db.result_rows": row_count})
+
+
+# ==================== Event-loop lag monitor ====================
+
+_loop_lag_task: Optional[asyncio.Task] = None
+
+
+async def _monitor_event_loop_lag(interval: float) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - scheduled)
+        EVENT_LOOP_LAG.set(lag)
+        EVENT_LOOP_LAG_HISTOGRAM.observe(lag)
+        if lag > Config.EVENT_LOOP_LAG_WARN_SECONDS:
+            logger.warning(f"Event loop lag {lag * 1000:.0f}ms exceeds {Config.EVENT_LOOP_LAG_WARN_SECONDS * 1000:.0f}ms")
+
+
+def start_event_loop_monitor() -> None:
+    """Start the background task that samples event-loop lag"""
+    global _loop_lag_task
+    if _loop_lag_task is None or _loop_lag_task.done():
+        _loop_lag_task = asyncio.create_task(_monitor_event_loop_lag(Config.EVENT_LOOP_LAG_INTERVAL_SECONDS))
+
+
+def stop_event_loop_monitor() -> None:
+    """Stop the event-loop lag sampler"""
+    global _loop_lag_task
+    if _loop_lag_task and not _loop_lag_task.done():
+        _loop_lag_task.cancel()
+    _loop_lag_task = None
+
+
+def render_prometheus() -> str:
+    """Render all metrics in the Prometheus text exposition format"""
+    return REGISTRY.render()
@@ -1,30 +1,46 @@
 """
 Rate limiter utility module for API request limiting.
 
-Implements sliding window rate limiting algorithm to prevent API abuse.
+Implements GCRA (generic cell rate algorithm), a sliding-window limiter that
+keeps a single timestamp per client - the theoretical arrival time (TAT) - so
+each check is O(1) in time and memory regardless of the limit:
+- MAX_REQUESTS per WINDOW_SECONDS, with bursts of up to MAX_REQUESTS
+- A request is allowed when TAT + interval - window <= now (interval = window / limit)
+
+State lives in a pluggable backend (RATE_LIMIT_BACKEND):
+- memory: per-process dict sharded over several locks (default)
+- sqlite: a local SQLite file shared by all workers on the host
+- redis: a Redis server shared by all workers (needs the `redis` package)
+
+Responses carry RateLimit-Limit/Remaining/Reset/Policy headers, plus Retry-After
+when the limit is exceeded.
 """
 
-import time
 import asyncio
-from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
-from fastapi import Request, HTTPException
-from functools import wraps
 import logging
+import math
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from functools import wraps
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+from ..config.config import Config
 
 logger = logging.getLogger(__name__)
 
 # Rate limit configuration
-MAX_REQUESTS = 10  # Maximum requests allowed
-WINDOW_MINUTES = 10  # Time window in minutes
-WINDOW_SECONDS = WINDOW_MINUTES * 60  # Convert to seconds
-
-# In-memory storage for rate limit data
-# Structure: {ip_address: [timestamp1, timestamp2, ...]}
-_rate_limit_store: Dict[str, List[float]] = {}
+MAX_REQUESTS = Config.RATE_LIMIT_MAX_REQUESTS  # Maximum requests allowed
+WINDOW_SECONDS = Config.RATE_LIMIT_WINDOW_SECONDS  # Time window in seconds
+WINDOW_MINUTES = WINDOW_SECONDS // 60 if WINDOW_SECONDS % 60 == 0 else round(WINDOW_SECONDS / 60, 2)
 
-# Lock for thread-safe operations
-_rate_limit_lock = asyncio.Lock()
+KEY_PREFIX = "ratelimit:"
+MEMORY_SHARDS = 16
 
 # Background task for periodic cleanup
 _cleanup_task: Optional[asyncio.Task] = None
@@ -57,9 +73,210 @@ def get_client_ip(request: Request) -> str:
     return "unknown"
 
 
+# ==================== GCRA ====================
+
+def gcra(tat: Optional[float], now: float, limit: int, window: float) -> Tuple[bool, float]:
+    """
+    One GCRA step.
+
+    Returns (allowed, tat): the stored TAT advanced by one interval when the
+    request is allowed, unchanged when it is rejected.
+    """
+    interval = window / limit
+    tat = max(tat or now, now)
+    new_tat = tat + interval
+    # Tolerance for float rounding of epoch timestamps
+    if new_tat - window > now + 1e-6:
+        return False, tat
+    return True, new_tat
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float  # seconds until the full quota is available again
+    retry_after: float  # seconds until the next request is allowed (0 when allowed)
+
+    @classmethod
+    def from_tat(cls, allowed: bool, tat: float, now: float, limit: int, window: float) -> "RateLimitResult":
+        interval = window / limit
+        used = max(tat - now, 0.0)
+        remaining = max(0, min(limit, int((window - used) / interval + 1e-9)))
+        retry_after = 0.0 if allowed else max(tat + interval - window - now, 0.0)
+        return cls(allowed, limit, remaining, used, retry_after)
+
+    def headers(self, window: float) -> Dict[str, str]:
+        """RateLimit-* headers (IETF draft), plus Retry-After when rejected"""
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset_after)),
+            "RateLimit-Policy": f"{self.limit};w={int(window)}",
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+# ==================== Backends ====================
+
+class MemoryBackend:
+    """Per-process TAT store; keys are spread over shards so checks rarely contend"""
+
+    name = "memory"
+
+    def __init__(self, shards: int = MEMORY_SHARDS):
+        self._shards: List[Tuple[threading.Lock, Dict[str, float]]] = [
+            (threading.Lock(), {}) for _ in range(shards)
+        ]
+
+    def _shard(self, key: str) -> Tuple[threading.Lock, Dict[str, float]]:
+        return self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+
+    async def acquire(self, key: str, now: float, limit: int, window: float) -> Tuple[bool, float]:
+        lock, store = self._shard(key)
+        with lock:
+            allowed, tat = gcra(store.get(key), now, limit, window)
+            if allowed:
+                store[key] = tat
+        return allowed, tat
+
+    async def cleanup(self, now: float) -> int:
+        removed = 0
+        for lock, store in self._shards:
+            with lock:
+                # A TAT in the past means the full quota is available again - same as no entry
+                expired = [key for key, tat in store.items() if tat <= now]
+                for key in expired:
+                    del store[key]
+            removed += len(expired)
+        return removed
+
+
+class SQLiteBackend:
+    """TAT store in a local SQLite file, shared by all worker processes on the host"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _acquire_sync(self, key: str, now: float, limit: int, window: float) -> Tuple[bool, float]:
+        conn = self._connection()
+        # IMMEDIATE takes the write lock up front so concurrent workers serialize per check
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            allowed, tat = gcra(row[0] if row else None, now, limit, window)
+            if allowed:
+                conn.execute(
+                    "INSERT INTO rate_limits (key, tat) VALUES (?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET tat = excluded.tat",
+                    (key, tat),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, tat
+
+    async def acquire(self, key: str, now: float, limit: int, window: float) -> Tuple[bool, float]:
+        return await asyncio.to_thread(self._acquire_sync, key, now, limit, window)
+
+    def _cleanup_sync(self, now: float) -> int:
+        return self._connection().execute("DELETE FROM rate_limits WHERE tat <= ?", (now,)).rowcount
+
+    async def cleanup(self, now: float) -> int:
+        return await asyncio.to_thread(self._cleanup_sync, now)
+
+
+# KEYS[1]: key; ARGV: now, limit, window. Returns {allowed, tat}; the key expires once fully replenished.
+_REDIS_GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local window = tonumber(ARGV[3])
+local interval = window / limit
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval
+if new_tat - window > now then
+    return {0, tostring(tat)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, tostring(new_tat)}
+"""
+
+
+class RedisBackend:
+    """TAT store in Redis, updated atomically by a Lua script; keys expire on their own"""
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis_asyncio
+
+        self._client = redis_asyncio.from_url(url)
+        self._script = self._client.register_script(_REDIS_GCRA_SCRIPT)
+
+    async def acquire(self, key: str, now: float, limit: int, window: float) -> Tuple[bool, float]:
+        allowed, tat = await self._script(keys=[key], args=[now, limit, window])
+        return bool(int(allowed)), float(tat)
+
+    async def cleanup(self, now: float) -> int:
+        return 0
+
+
+_backend: Optional[Any] = None
+_backend_lock = threading.Lock()
+
+
+def _create_backend() -> Any:
+    backend = Config.RATE_LIMIT_BACKEND.lower()
+    try:
+        if backend == "sqlite":
+            Config.RATE_LIMIT_SQLITE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            return SQLiteBackend(Config.RATE_LIMIT_SQLITE_PATH)
+        if backend == "redis":
+            return RedisBackend(Config.RATE_LIMIT_REDIS_URL)
+        if backend != "memory":
+            logger.warning(f"Unknown RATE_LIMIT_BACKEND '{backend}', using in-memory rate limiting")
+    except Exception as e:
+        logger.warning(f"Rate limit backend '{backend}' unavailable, using in-memory rate limiting: {e}")
+    return MemoryBackend()
+
+
+def get_backend() -> Any:
+    """The configured rate limit backend, created on first use"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _create_backend()
+                logger.info(f"Rate limiting with {_backend.name} backend: {MAX_REQUESTS} requests per {WINDOW_SECONDS}s")
+    return _backend
+
+
 async def check_rate_limit(ip_address: str) -> Dict[str, Any]:
     """
-    Check if the IP address has exceeded the rate limit.
+    Check if the IP address has exceeded the rate limit (and count the request if not).
     
     Args:
         ip_address: Client IP address
@@ -70,48 +287,29 @@ async def check_rate_limit(ip_address: str) -> Dict[str, Any]:
             "allowed": bool,
             "remaining_requests": int,
             "reset_time": Optional[datetime],
-            "total_requests": int
+            "total_requests": int,
+            "result": RateLimitResult
         }
     """
-    async with _rate_limit_lock:
-        current_time = time.time()
-        
-        # Get or initialize request timestamps for this IP
-        timestamps = _rate_limit_store.get(ip_address, [])
-        
-        # Clean up expired timestamps (older than WINDOW_SECONDS)
-        cutoff_time = current_time - WINDOW_SECONDS
-        valid_timestamps = [ts for ts in timestamps if ts > cutoff_time]
+    now = time.time()
+    allowed, tat = await get_backend().acquire(KEY_PREFIX + ip_address, now, MAX_REQUESTS, WINDOW_SECONDS)
+    result = RateLimitResult.from_tat(allowed, tat, now, MAX_REQUESTS, WINDOW_SECONDS)
+    wait = result.reset_after if allowed else result.retry_after
+    return {
+        "allowed": allowed,
+        "remaining_requests": result.remaining,
+        "reset_time": datetime.fromtimestamp(now + wait) if wait else None,
+        "total_requests": MAX_REQUESTS - result.remaining,
+        "result": result,
+    }
         
-        # Update store with cleaned timestamps
-        if len(valid_timestamps) < len(timestamps):
-            _rate_limit_store[ip_address] = valid_timestamps
-            # Remove IP entry if no valid timestamps remain
-            if not valid_timestamps:
-                _rate_limit_store.pop(ip_address, None)
         
-        # Check if limit exceeded
-        total_requests = len(valid_timestamps)
-        allowed = total_requests < MAX_REQUESTS
-        remaining_requests = max(0, MAX_REQUESTS - total_requests)
-        
-        # Calculate reset time (earliest timestamp + window)
-        reset_time = None
-        if valid_timestamps:
-            earliest_timestamp = min(valid_timestamps)
-            reset_time = datetime.fromtimestamp(earliest_timestamp + WINDOW_SECONDS)
-        
-        # If allowed, add current timestamp
-        if allowed:
-            valid_timestamps.append(current_time)
-            _rate_limit_store[ip_address] = valid_timestamps
-        
-        return {
-            "allowed": allowed,
-            "remaining_requests": remaining_requests,
-            "reset_time": reset_time,
-            "total_requests": total_requests
-        }
+def apply_rate_limit_headers(request: Request, response: Any) -> None:
+    """Copy the RateLimit-* headers of a rate-limited request onto its response"""
+    result = getattr(request.state, "rate_limit", None)
+    if result is not None:
+        for name, value in result.headers(WINDOW_SECONDS).items():
+            response.headers.setdefault(name, value)
 
 
 async def periodic_cleanup():
@@ -132,26 +330,11 @@ async def periodic_cleanup():
 
 async def cleanup_expired_entries():
     """
-    Clean up expired entries from rate limit store.
+    Remove entries whose quota is fully replenished (they behave like absent keys).
     """
-    async with _rate_limit_lock:
-        current_time = time.time()
-        cutoff_time = current_time - WINDOW_SECONDS
-        
-        expired_ips = []
-        for ip_address, timestamps in _rate_limit_store.items():
-            valid_timestamps = [ts for ts in timestamps if ts > cutoff_time]
-            if valid_timestamps:
-                _rate_limit_store[ip_address] = valid_timestamps
-            else:
-                expired_ips.append(ip_address)
-        
-        # Remove IPs with no valid timestamps
-        for ip_address in expired_ips:
-            _rate_limit_store.pop(ip_address, None)
-        
-        if expired_ips:
-            logger.debug(f"Cleaned up {len(expired_ips)} expired rate limit entries")
+    removed = await get_backend().cleanup(time.time())
+    if removed:
+        logger.debug(f"Cleaned up {removed} expired rate limit entries")
 
 
 def rate_limit(func):
@@ -189,6 +372,9 @@ def rate_limit(func):
         
         # Check rate limit
         rate_limit_status = await check_rate_limit(ip_address)
+        result = rate_limit_status["result"]
+        # Picked up by the HTTP middleware to add RateLimit-* headers to the response
+        request.state.rate_limit = result
         
         if not rate_limit_status["allowed"]:
             reset_time = rate_limit_status["reset_time"]
@@ -196,8 +382,7 @@ def rate_limit(func):
             
             logger.warning(
                 f"Rate limit exceeded for IP {ip_address}: "
-                f"{rate_limit_status['total_requests']}/{MAX_REQUESTS} requests "
-                f"in {WINDOW_MINUTES} minutes"
+                f"{MAX_REQUESTS} requests in {WINDOW_SECONDS}s, retry after {result.retry_after:.1f}s"
             )
             
             raise HTTPException(
@@ -208,7 +393,8 @@ def rate_limit(func):
                     "reset_time": reset_time_str,
                     "max_requests": MAX_REQUESTS,
                     "window_minutes": WINDOW_MINUTES
-                }
+                },
+                headers=result.headers(WINDOW_SECONDS),
             )
         
         # Log if approaching limit (for monitoring)
@@ -244,4 +430,3 @@ def stop_cleanup_task():
     if _cleanup_task and not _cleanup_task.done():
         _cleanup_task.cancel()
         logger.info("Rate limit cleanup task stopped")
-
@@ -0,0 +1,377 @@
+"""
+Result cache - local columnar cache for mart-level query results.
+
+Most SQL the agent runs against Databricks reads a handful of pre-aggregated mart_* tables that only
+change when dbt runs. A SELECT that reads nothing but such tables is cached under a key made of the
+normalized SQL text (comments and whitespace removed, lower-cased outside string literals) and one
+freshness token per table:
+- dbt: completion time of the table's model in the last dbt run (target/run_results.json); without
+  run results nothing is cached, since no other dbt artifact records when the marts were rebuilt
+- probe: SELECT MAX(<probe column>) on the table, repeated at most once per probe interval; the
+  column must exist in every cached table (the dbt marts have none by default). A failed probe is
+  remembered for the interval too, so the table is not cached and not probed again until then
+
+Results are stored as Parquet files (one per key, with the SQL and tokens in the file metadata) and are
+served without touching the warehouse until a token changes. Queries with volatile functions
+(current_date(), rand(), ...) are never cached. Files are evicted least-recently-used beyond the
+configured number of entries, and after the TTL.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from ..config.config import Config
+from .metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+FRESHNESS_MODES = ("dbt", "probe")
+METADATA_KEY = b"result_cache"
+
+_SQL_TOKEN = re.compile(
+    r"""
+    (?P<string>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.)*")
+  | (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<space>\s+)
+  | (?P<other>[^'"\s\-/]+|.)
+    """,
+    re.S | re.X,
+)
+# An alias is any word after a table name except a keyword that can follow the table reference
+_ALIAS = (r"(?:\s+(?:as\s+)?(?!(?:join|inner|left|right|full|outer|cross|natural|semi|anti|lateral|on|using|where|"
+          r"group|order|limit|having|union|intersect|except|minus|window|qualify|pivot|unpivot|tablesample)\b)\w+)?")
+_TABLE_REF = re.compile(rf"\b(?:from|join)\s+([\w`.]+{_ALIAS}(?:,\s*[\w`.]+{_ALIAS})*)")
+_CTE_NAME = re.compile(r"(?:\bwith|,)\s*(\w+)\s+as\s*\(")
+# "from" inside these functions is not a table reference
+_FROM_IN_FUNCTION = re.compile(r"\b(extract|trim|substring|position|overlay)\(([^()]*?)\bfrom\b")
+_VOLATILE = re.compile(
+    r"\b(current_date|current_timestamp|current_time|localtimestamp|now|curdate|getdate|"
+    r"unix_timestamp|rand|randn|random|uuid|shuffle)\b"
+)
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char in "_`'\""
+
+
+def normalize_sql(sql: str) -> str:
+    """SQL text without comments and redundant whitespace, lower-cased outside string literals"""
+    pieces: List[str] = []
+    pending_space = False
+    for match in _SQL_TOKEN.finditer(sql):
+        kind = match.lastgroup
+        if kind in ("space", "comment"):
+            pending_space = True
+            continue
+        text = match.group() if kind == "string" else match.group().lower()
+        if pending_space and pieces and _is_word_char(pieces[-1][-1]) and _is_word_char(text[0]):
+            pieces.append(" ")
+        pieces.append(text)
+        pending_space = False
+    return "".join(pieces).rstrip(";").strip()
+
+
+def _strip_strings(normalized: str) -> str:
+    """Normalized SQL with string literals emptied (so their contents are not parsed as SQL)"""
+    return "".join(
+        "''" if match.lastgroup == "string" else match.group() for match in _SQL_TOKEN.finditer(normalized)
+    )
+
+
+def referenced_tables(normalized: str) -> Optional[List[str]]:
+    """
+    Tables read by a normalized SELECT (qualified names as written, without backticks and CTE names);
+    None if the statement is not a single SELECT
+    """
+    code = _strip_strings(normalized)
+    if not (code.startswith("select") or code.startswith("with")) or ";" in code:
+        return None
+    code = _FROM_IN_FUNCTION.sub(r"\1(\2 ", code)
+    ctes = set(_CTE_NAME.findall(code)) if code.startswith("with") else set()
+    tables: Dict[str, None] = {}
+    for refs in _TABLE_REF.findall(code):
+        for ref in refs.split(","):
+            name = ref.strip().split(" ", 1)[0].replace("`", "")
+            if name and name not in ctes:
+                tables.setdefault(name, None)
+    return list(tables)
+
+
+class _JsonFile:
+    """A JSON file that is parsed again when its modification time changes"""
+
+    def __init__(self, path: Path, parse: Callable[[Dict[str, Any]], Any]):
+        self.path = Path(path)
+        self.parse = parse
+        self._mtime: Optional[int] = None
+        self._value: Any = None
+
+    def get(self) -> Any:
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except OSError:
+            self._mtime, self._value = None, None
+            return None
+        if mtime != self._mtime:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._value = self.parse(json.load(f))
+            except (OSError, ValueError, AttributeError, TypeError) as e:
+                logger.warning(f"Could not read {self.path}: {e}")
+                self._value = None
+            self._mtime = mtime
+        return self._value
+
+
+def _parse_run_results(data: Dict[str, Any]) -> Tuple[Optional[str], Dict[str, str]]:
+    """(generated_at of the run, model name -> completion time of its execution)"""
+    completed: Dict[str, str] = {}
+    for result in data.get("results", []):
+        if result.get("status") != "success":
+            continue
+        for timing in result.get("timing", []):
+            if timing.get("name") == "execute" and timing.get("completed_at"):
+                completed[result.get("unique_id", "").split(".")[-1]] = timing["completed_at"]
+    return data.get("metadata", {}).get("generated_at"), completed
+
+
+class ResultCache:
+    """Parquet-backed cache of SELECT results over tables that only change when dbt runs"""
+
+    def __init__(self, cache_dir: Path, freshness: str = "dbt", table_prefixes: Sequence[str] = ("mart_",),
+                 max_entries: int = 1000, ttl_seconds: float = 604800, probe_column: str = "updated_at",
+                 probe_interval_seconds: float = 60, run_results_path: Optional[Path] = None):
+        if freshness not in FRESHNESS_MODES:
+            raise ValueError(f"Unknown result cache freshness mode: {freshness} (expected one of {FRESHNESS_MODES})")
+        # Imported here so that importing this module does not pull in pyarrow
+        import pyarrow
+        import pyarrow.parquet
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.freshness = freshness
+        self.table_prefixes = tuple(p for p in table_prefixes if p)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.probe_column = probe_column
+        self.probe_interval_seconds = probe_interval_seconds
+        self._run_results = _JsonFile(run_results_path, _parse_run_results) if run_results_path else None
+        self._probes: Dict[str, Tuple[Optional[str], float]] = {}  # table -> (token or None if failed, checked at)
+        self._lock = threading.Lock()
+
+    def cacheable_tables(self, sql: str) -> Optional[Tuple[str, List[str]]]:
+        """(normalized SQL, tables) when the statement only reads cacheable tables, else None"""
+        normalized = normalize_sql(sql)
+        tables = referenced_tables(normalized)
+        if not tables or _VOLATILE.search(_strip_strings(normalized)):
+            return None
+        if not all(table.rsplit(".", 1)[-1].startswith(self.table_prefixes) for table in tables):
+            return None
+        return normalized, tables
+
+    def freshness_tokens(self, tables: List[str],
+                         query: Optional[Callable[[str], Sequence[Dict[str, Any]]]] = None) -> Optional[Dict[str, str]]:
+        """Freshness token per table; None when any table's freshness cannot be determined"""
+        tokens: Dict[str, str] = {}
+        for table in tables:
+            token = self._dbt_token(table) if self.freshness == "dbt" else self._probe_token(table, query)
+            if token is None:
+                return None
+            tokens[table] = token
+        return tokens
+
+    def _dbt_token(self, table: str) -> Optional[str]:
+        run = self._run_results.get() if self._run_results else None
+        if not run:
+            return None
+        generated_at, completed = run
+        return completed.get(table.rsplit(".", 1)[-1], generated_at)
+
+    def _probe_token(self, table: str, query: Optional[Callable[[str], Sequence[Dict[str, Any]]]]) -> Optional[str]:
+        with self._lock:
+            probed = self._probes.get(table)
+        if probed and time.time() - probed[1] < self.probe_interval_seconds:
+            return probed[0]
+        if query is None:
+            return None
+        try:
+            rows = query(f"SELECT MAX({self.probe_column}) AS freshness_token FROM {table}")
+        except Exception as e:
+            logger.warning(
+                f"Freshness probe on {table} failed, not caching it for {self.probe_interval_seconds:.0f}s "
+                f"(does it have a {self.probe_column} column?): {e}"
+            )
+            with self._lock:
+                self._probes[table] = (None, time.time())
+            return None
+        token = str(next(iter(rows[0].values()))) if rows else ""
+        with self._lock:
+            self._probes[table] = (token, time.time())
+        return token
+
+    @staticmethod
+    def make_key(normalized: str, fetch: str, tokens: Dict[str, str], scope: str = "") -> str:
+        payload = json.dumps([scope, fetch, normalized, sorted(tokens.items())], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.parquet"
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Cached rows for a key (None on a miss or an expired entry)"""
+        path = self._path(key)
+        try:
+            table = self._pq.read_table(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, self._pa.ArrowException) as e:
+            logger.warning(f"Dropping unreadable result cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+        info = json.loads((table.schema.metadata or {}).get(METADATA_KEY, b"{}"))
+        if self.ttl_seconds and time.time() - info.get("created_at", 0) > self.ttl_seconds:
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)  # Recently used entries are evicted last
+        return table.to_pylist()
+
+    def put(self, key: str, rows: Sequence[Dict[str, Any]], info: Dict[str, Any]) -> bool:
+        """Store rows under a key; False if they cannot be represented as a Parquet table"""
+        try:
+            table = self._pa.Table.from_pylist(list(rows))
+        except (self._pa.ArrowException, TypeError, ValueError) as e:
+            logger.debug(f"Result not cacheable as Parquet: {e}")
+            return False
+        metadata = {METADATA_KEY: json.dumps({**info, "created_at": time.time()}, default=str).encode("utf-8")}
+        table = table.replace_schema_metadata(metadata)
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self._pq.write_table(table, tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write result cache entry {path.name}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return False
+        self._evict()
+        return True
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            for path in self.cache_dir.glob("*.parquet"):
+                try:
+                    entries.append((path.stat().st_mtime, path))
+                except OSError:
+                    continue
+            if len(entries) <= self.max_entries:
+                return
+            entries.sort()
+            for _, path in entries[:len(entries) - self.max_entries]:
+                path.unlink(missing_ok=True)
+
+    def clear(self) -> int:
+        """Remove all entries; returns the number removed"""
+        removed = 0
+        for path in self.cache_dir.glob("*.parquet"):
+            path.unlink(missing_ok=True)
+            removed += 1
+        with self._lock:
+            self._probes.clear()
+        return removed
+
+    def execute(self, sql: str, fetch: str, run: Callable[[], Sequence[Dict[str, Any]]],
+                query: Optional[Callable[[str], Sequence[Dict[str, Any]]]] = None,
+                scope: str = "") -> Sequence[Dict[str, Any]]:
+        """
+        Rows of a statement: from the cache when it only reads cacheable tables whose tokens are
+        unchanged, otherwise from run() (and stored when cacheable)
+
+        Args:
+            sql: Statement text
+            fetch: Fetch mode of the statement ("all" or "one"; part of the key)
+            run: Executes the statement on the warehouse
+            query: Executes a freshness probe (probe mode)
+            scope: Identifies the database (e.g. its URL without password); part of the key
+        """
+        plan = self.cacheable_tables(sql)
+        if plan is None:
+            return run()
+        normalized, tables = plan
+        tokens = self.freshness_tokens(tables, query)
+        if tokens is None:
+            return run()
+        key = self.make_key(normalized, fetch, tokens, scope)
+        rows = self.get(key)
+        record_cache_lookup("sql_result", rows is not None)
+        if rows is not None:
+            logger.info(f"SQL result cache hit ({len(rows)} rows, tables: {', '.join(tables)})")
+            return rows
+        rows = run()
+        if self.put(key, rows, {"sql": normalized, "tables": tables, "tokens": tokens}):
+            logger.info(f"SQL result cached ({len(rows)} rows, tables: {', '.join(tables)})")
+        return rows
+
+
+_result_cache: Optional[ResultCache] = None
+_result_cache_unavailable = False
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """The configured result cache (None when disabled or pyarrow is not installed)"""
+    global _result_cache, _result_cache_unavailable
+    if _result_cache is None and Config.RESULT_CACHE_ENABLED and not _result_cache_unavailable:
+        with _cache_lock:
+            if _result_cache is None and not _result_cache_unavailable:
+                try:
+                    _result_cache = ResultCache(
+                        Config.RESULT_CACHE_DIR,
+                        freshness=Config.RESULT_CACHE_FRESHNESS,
+                        table_prefixes=[p.strip() for p in Config.RESULT_CACHE_TABLE_PREFIXES.split(",")],
+                        max_entries=Config.RESULT_CACHE_MAX_ENTRIES,
+                        ttl_seconds=Config.RESULT_CACHE_TTL_SECONDS,
+                        probe_column=Config.RESULT_CACHE_PROBE_COLUMN,
+                        probe_interval_seconds=Config.RESULT_CACHE_PROBE_INTERVAL_SECONDS,
+                        run_results_path=Config.DBT_TARGET_DIR / "run_results.json",
+                    )
+                except ImportError:
+                    logger.warning("pyarrow is not installed; SQL result cache disabled")
+                    _result_cache_unavailable = True
+                except (OSError, ValueError) as e:
+                    logger.error(f"SQL result cache disabled: {e}")
+                    _result_cache_unavailable = True
+    return _result_cache
+
+
+def install_result_cache(db, cache: Optional[ResultCache] = None):
+    """
+    Route the SELECTs of a LangChain SQLDatabase through the result cache (the sql_db_query tool and
+    direct db.run calls both execute through SQLDatabase._execute)
+    """
+    cache = cache or get_result_cache()
+    if cache is None or getattr(db, "_result_cache_installed", False):
+        return db
+    execute = db._execute
+    engine = getattr(db, "_engine", None)
+    scope = engine.url.render_as_string(hide_password=True) if engine is not None else ""
+
+    def query(sql: str) -> Sequence[Dict[str, Any]]:
+        return execute(sql, "one")
+
+    def cached_execute(command, fetch="all", **kwargs):
+        if not isinstance(command, str) or fetch not in ("all", "one") or kwargs.get("parameters"):
+            return execute(command, fetch, **kwargs)
+        return cache.execute(command, fetch, lambda: execute(command, fetch, **kwargs), query=query, scope=scope)
+
+    db._execute = cached_execute
+    db._result_cache_installed = True
+    return db
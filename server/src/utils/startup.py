@@ -0,0 +1,135 @@
+"""
+Startup - readiness tracking for the warm-up phase and import-time profiling.
+
+Liveness (/health, /ping) only says the process is serving; readiness (/ready)
+says the warm-up phase has finished and every required component is usable.
+Components report their state here while warming up.
+"""
+
+import logging
+import re
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ..config.config import Config, SERVER_ROOT
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_STARTING = "starting"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+
+# Components that must be ready before the service reports ready
+REQUIRED_COMPONENTS = ("database", "llm")
+
+_components: Dict[str, Dict[str, Any]] = {}
+_components_lock = threading.Lock()
+_started_at = time.time()
+
+
+def _update_component(name: str, **fields: Any) -> None:
+    with _components_lock:
+        component = _components.setdefault(name, {"status": STATUS_PENDING})
+        component.update(fields)
+        component["updated_at"] = time.time()
+
+
+def mark_component_starting(name: str) -> None:
+    _update_component(name, status=STATUS_STARTING, error=None)
+
+
+def mark_component_ready(name: str, duration_seconds: Optional[float] = None, detail: Optional[str] = None) -> None:
+    _update_component(name, status=STATUS_READY, duration_seconds=duration_seconds, detail=detail, error=None)
+
+
+def mark_component_failed(name: str, error: Any, duration_seconds: Optional[float] = None) -> None:
+    _update_component(name, status=STATUS_FAILED, duration_seconds=duration_seconds, error=str(error))
+
+
+def get_readiness() -> Dict[str, Any]:
+    """Readiness summary: ready only when every required component is ready"""
+    with _components_lock:
+        components = {name: dict(state) for name, state in _components.items()}
+    for name in REQUIRED_COMPONENTS:
+        components.setdefault(name, {"status": STATUS_PENDING})
+
+    ready = all(components[name]["status"] == STATUS_READY for name in REQUIRED_COMPONENTS)
+    degraded = [name for name, state in components.items()
+                if state["status"] == STATUS_FAILED and name not in REQUIRED_COMPONENTS]
+    return {
+        "ready": ready,
+        "degraded_components": degraded,
+        "uptime_seconds": round(time.time() - _started_at, 3),
+        "components": components,
+    }
+
+
+# ==================== Import-time profile ====================
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(output: str) -> List[Dict[str, Any]]:
+    """Parse `python -X importtime` stderr into entries (times in microseconds)"""
+    entries = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            entries.append({
+                "self_us": int(match.group(1)),
+                "cumulative_us": int(match.group(2)),
+                "depth": len(match.group(3)) // 2,
+                "module": match.group(4),
+            })
+    return entries
+
+
+def summarize_importtime(entries: List[Dict[str, Any]], top_n: int = 15) -> Dict[str, Any]:
+    """Total import time plus the top-level packages with the most self time"""
+    by_package: Dict[str, int] = {}
+    for entry in entries:
+        package = entry["module"].split(".", 1)[0]
+        by_package[package] = by_package.get(package, 0) + entry["self_us"]
+    top_packages = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top_n]
+    return {
+        "total_ms": round(sum(e["self_us"] for e in entries) / 1000, 1),
+        "module_count": len(entries),
+        "top_packages": [{"package": name, "self_ms": round(us / 1000, 1)} for name, us in top_packages],
+    }
+
+
+def profile_imports(module: str = "src.main", top_n: int = 15, timeout: int = 180) -> Optional[Dict[str, Any]]:
+    """
+    Import `module` in a fresh interpreter with `-X importtime` and summarize it.
+
+    A subprocess is used because the running interpreter cannot re-measure
+    modules it already imported.
+    """
+    try:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=str(SERVER_ROOT), capture_output=True, text=True, timeout=timeout,
+        )
+    except Exception as e:
+        logger.warning(f"Import-time profiling failed: {e}")
+        return None
+
+    entries = parse_importtime(result.stderr)
+    if not entries:
+        logger.warning(f"Import-time profiling produced no data (exit code {result.returncode})")
+        return None
+    return summarize_importtime(entries, top_n=top_n)
+
+
+def log_import_profile(module: str = "src.main") -> None:
+    """Write the import-time summary to the startup log"""
+    summary = profile_imports(module, top_n=Config.STARTUP_IMPORT_PROFILE_TOP_N)
+    if not summary:
+        return
+    logger.info(f"Import-time profile for {module}: {summary['total_ms']}ms across {summary['module_count']} modules")
+    for item in summary["top_packages"]:
+        logger.info(f"  import {item['package']:<32} {item['self_ms']:>9.1f}ms")
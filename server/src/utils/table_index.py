@@ -0,0 +1,184 @@
+"""
+Table index - resolves the tables a question refers to.
+
+The dbt doc generator (data_warehouse/dbt/generate_rag_docs.py) writes table_index.json:
+table -> layer, columns, upstream, downstream and synonyms for every dbt model and source.
+It is loaded once; a lookup table from table names and synonyms to tables makes resolving a
+text one dictionary lookup per word n-gram, and the transitive upstream closure of each table
+is computed once and memoized.
+
+The built-in ERP database (DEFAULT datasource) is described by a static index in the same format.
+"""
+
+import json
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from ..config.config import Config
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9_]+")
+
+# Upstream tables in these layers are not added by the closure (raw data the agent should not need)
+CLOSURE_EXCLUDED_LAYERS = ("source", "staging")
+
+# Built-in ERP database (server/data/smart.db); lineage follows scripts/etl_implementation.py
+ERP_TABLE_INDEX: Dict[str, Any] = {
+    "version": 1,
+    "tables": {
+        "customers": {"layer": "source", "upstream": [], "downstream": ["dim_customer"],
+                      "synonyms": ["customer", "customers"]},
+        "products": {"layer": "source", "upstream": [], "downstream": ["dim_product", "dwd_inventory_detail"],
+                     "synonyms": ["product", "products"]},
+        "orders": {"layer": "source", "upstream": [], "downstream": [], "synonyms": ["order", "orders"]},
+        "sales": {"layer": "source", "upstream": [], "downstream": ["dwd_sales_detail"], "synonyms": ["sale", "sales"]},
+        "inventory": {"layer": "source", "upstream": [], "downstream": ["dwd_inventory_detail"],
+                      "synonyms": ["inventory", "stock"]},
+        "dim_customer": {"layer": "dim", "upstream": ["customers"], "downstream": [],
+                         "synonyms": ["customer", "customers"]},
+        "dim_product": {"layer": "dim", "upstream": ["products"], "downstream": ["dws_sales_cube", "dws_inventory_cube"],
+                        "synonyms": ["product", "products"]},
+        "dwd_sales_detail": {"layer": "dwd", "upstream": ["sales"], "downstream": ["dws_sales_cube"], "synonyms": []},
+        "dwd_inventory_detail": {"layer": "dwd", "upstream": ["inventory", "products"],
+                                 "downstream": ["dws_inventory_cube"], "synonyms": []},
+        "dws_sales_cube": {"layer": "dws", "upstream": ["dwd_sales_detail", "dim_product"], "downstream": [],
+                           "synonyms": ["sale", "sales"]},
+        "dws_inventory_cube": {"layer": "dws", "upstream": ["dwd_inventory_detail", "dim_product"], "downstream": [],
+                               "synonyms": ["inventory", "stock"]},
+    },
+}
+
+
+class TableIndex:
+    """Table metadata with O(1) name/synonym lookup and memoized transitive lineage"""
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        self.tables: Dict[str, Dict[str, Any]] = {}
+        self._terms: Dict[str, List[str]] = {}  # table name or synonym -> tables
+        self._max_words = 1
+        self._upstream: Dict[str, Set[str]] = {}
+        self._downstream: Dict[str, Set[str]] = {}
+        if data:
+            self._load(data)
+
+    def _load(self, data: Dict[str, Any]) -> None:
+        self.tables = data.get("tables", {})
+        for name, info in self.tables.items():
+            for term in [name, *info.get("synonyms", [])]:
+                term = " ".join(_WORD.findall(term.lower()))
+                if not term:
+                    continue
+                targets = self._terms.setdefault(term, [])
+                if name not in targets:
+                    targets.append(name)
+                self._max_words = max(self._max_words, term.count(" ") + 1)
+
+    @classmethod
+    def from_file(cls, path: Path) -> "TableIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    def __contains__(self, table: str) -> bool:
+        return table in self.tables
+
+    def lookup(self, term: str) -> List[str]:
+        """Tables named or described by a term"""
+        return list(self._terms.get(" ".join(_WORD.findall(term.lower())), []))
+
+    def find_tables(self, text: str) -> List[str]:
+        """Tables referred to in a text (by name or synonym), in order of first mention"""
+        words = _WORD.findall(text.lower())
+        found: Dict[str, None] = {}
+        for start in range(len(words)):
+            for size in range(1, min(self._max_words, len(words) - start) + 1):
+                for table in self._terms.get(" ".join(words[start:start + size]), ()):
+                    found.setdefault(table, None)
+        return list(found)
+
+    def upstream(self, table: str) -> Set[str]:
+        """All tables the given table is built from (transitive)"""
+        return self._closure(table, "upstream", self._upstream)
+
+    def downstream(self, table: str) -> Set[str]:
+        """All tables built from the given table (transitive)"""
+        return self._closure(table, "downstream", self._downstream)
+
+    def _closure(self, table: str, direction: str, memo: Dict[str, Set[str]]) -> Set[str]:
+        if table in memo:
+            return memo[table]
+        # Iterative DFS over the lineage; visited tables are skipped, so cycles terminate
+        closure: Set[str] = set()
+        stack = list(self.tables.get(table, {}).get(direction, []))
+        while stack:
+            current = stack.pop()
+            if current in closure or current == table:
+                continue
+            closure.add(current)
+            if current in memo:
+                closure |= memo[current]
+            else:
+                stack.extend(self.tables.get(current, {}).get(direction, []))
+        closure.discard(table)
+        memo[table] = closure
+        return closure
+
+    def resolve(self, text: str, include_upstream: bool = True,
+                excluded_layers: Iterable[str] = CLOSURE_EXCLUDED_LAYERS) -> List[str]:
+        """
+        Tables a question needs: the tables it refers to, followed by the tables they are built
+        from (transitive, without the excluded layers) when include_upstream is set
+        """
+        tables = self.find_tables(text)
+        if not include_upstream:
+            return tables
+        excluded = set(excluded_layers)
+        resolved: Dict[str, None] = dict.fromkeys(tables)
+        for table in tables:
+            for parent in sorted(self.upstream(table)):
+                if parent in self.tables and self.tables[parent].get("layer") not in excluded:
+                    resolved.setdefault(parent, None)
+        return list(resolved)
+
+
+_dbt_index: Optional[TableIndex] = None
+_erp_index = TableIndex(ERP_TABLE_INDEX)
+_lock = threading.Lock()
+
+
+def get_dbt_table_index() -> TableIndex:
+    """The dbt table index (loaded once from Config.TABLE_INDEX_PATH; empty if the file is missing)"""
+    global _dbt_index
+    if _dbt_index is None:
+        with _lock:
+            if _dbt_index is None:
+                path = Config.TABLE_INDEX_PATH
+                try:
+                    _dbt_index = TableIndex.from_file(path)
+                    logger.info(f"Loaded table index with {len(_dbt_index)} tables from {path}")
+                except FileNotFoundError:
+                    logger.warning(f"Table index not found at {path}; run data_warehouse/dbt/generate_rag_docs.py")
+                    _dbt_index = TableIndex()
+                except (OSError, ValueError) as e:
+                    logger.error(f"Failed to load table index from {path}: {e}")
+                    _dbt_index = TableIndex()
+    return _dbt_index
+
+
+def get_erp_table_index() -> TableIndex:
+    """Static index of the built-in ERP database"""
+    return _erp_index
+
+
+def reload_dbt_table_index() -> TableIndex:
+    """Drop the loaded dbt table index so the next lookup reads the file again"""
+    global _dbt_index
+    with _lock:
+        _dbt_index = None
+    return get_dbt_table_index()
@@ -0,0 +1,456 @@
+"""
+Tracing - one OpenTelemetry-compatible tracing layer for the query pipeline.
+
+Spans are created for graph nodes, LLM / embedding / rerank calls, SQL
+statements and WebSocket broadcasts. The current span is tracked in a
+contextvar so spans opened inside a node become its children.
+
+Finished spans are:
+- kept per execution (bounded ExecutionStateStore) to build a flame-graph view
+- exported in OTLP/JSON format by a background thread, either appended to a
+  local JSONL file (data/traces) or POSTed to an OTLP/HTTP collector
+
+Replaces the per-module workflow trackers and their bottleneck helpers.
+"""
+
+import functools
+import inspect
+import json
+import logging
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from ..config.config import Config
+from .execution_state_store import get_execution_state_store
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "smart-ai-assistant"
+INSTRUMENTATION_SCOPE = "src.utils.tracing"
+
+# OTLP enum values
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+MAX_ATTRIBUTE_CHARS = 1000
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+# execution_id -> list of finished span dicts (for the flame-graph view)
+_execution_spans = get_execution_state_store("trace_spans")
+
+
+class Span:
+    """A timed operation with attributes, compatible with the OTLP span model"""
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_span_id: Optional[str] = None,
+        execution_id: Optional[str] = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.execution_id = execution_id
+        self.kind = kind
+        self.attributes: Dict[str, Any] = {}
+        self.status_code = STATUS_UNSET
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        if attributes:
+            self.set_attributes(attributes)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is None:
+            return
+        if isinstance(value, str) and len(value) > MAX_ATTRIBUTE_CHARS:
+            value = value[:MAX_ATTRIBUTE_CHARS] + "..."
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_exception(self, error: BaseException) -> None:
+        self.status_code = STATUS_ERROR
+        self.status_message = str(error)[:MAX_ATTRIBUTE_CHARS]
+        self.set_attribute("exception.type", type(error).__name__)
+
+    def end(self) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self.status_code == STATUS_UNSET:
+            self.status_code = STATUS_OK
+        _on_span_end(self)
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "execution_id": self.execution_id,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": self.duration_ms,
+            "attributes": dict(self.attributes),
+            "status": self.status_code,
+            "status_message": self.status_message,
+        }
+
+
+# ==================== Span API ====================
+
+
+def get_current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def start_span(
+    name: str,
+    attributes: Optional[Dict[str, Any]] = None,
+    kind: int = SPAN_KIND_INTERNAL,
+    execution_id: Optional[str] = None,
+    parent: Optional[Span] = None,
+) -> Span:
+    """Start a span as a child of `parent` (default: the current span); the caller must end() it"""
+    parent = parent if parent is not None else _current_span.get()
+    if parent is not None and (execution_id is None or execution_id == parent.execution_id):
+        span = Span(name, parent.trace_id, parent.span_id, parent.execution_id, kind, attributes)
+    else:
+        span = Span(name, secrets.token_hex(16), None, execution_id, kind, attributes)
+    if span.execution_id:
+        span.set_attribute("execution.id", span.execution_id)
+    return span
+
+
+def attach_span(span: Span) -> Token:
+    """Make `span` the current span; returns a token for detach_span()"""
+    return _current_span.set(span)
+
+
+def detach_span(token: Token) -> None:
+    try:
+        _current_span.reset(token)
+    except ValueError:
+        # Token created in another context (e.g. generator finalised elsewhere)
+        _current_span.set(None)
+
+
+@contextmanager
+def span(
+    name: str,
+    attributes: Optional[Dict[str, Any]] = None,
+    kind: int = SPAN_KIND_INTERNAL,
+    execution_id: Optional[str] = None,
+) -> Iterator[Span]:
+    """Context manager opening a span and making it current for the enclosed block"""
+    current = start_span(name, attributes, kind=kind, execution_id=execution_id)
+    token = attach_span(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_exception(e)
+        raise
+    finally:
+        detach_span(token)
+        current.end()
+
+
+def set_current_span_attributes(**attributes: Any) -> None:
+    """Add attributes to the current span, if any"""
+    current = _current_span.get()
+    if current is not None:
+        current.set_attributes(attributes)
+
+
+def traced_node(func: Callable) -> Callable:
+    """
+    Decorator opening a span around a graph node.
+
+    Keeps the node sync or async so LangGraph schedules it the same way;
+    attributes set by declares_changes are preserved by functools.wraps.
+    """
+    node_name = func.__name__
+
+    def _start(state: Any) -> Span:
+        execution_id = state.get("execution_id") if isinstance(state, dict) else None
+        return start_span(f"node.{node_name}", {"node.name": node_name}, execution_id=execution_id)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(state, *args, **kwargs):
+            node_span = _start(state)
+            token = attach_span(node_span)
+            try:
+                return await func(state, *args, **kwargs)
+            except BaseException as e:
+                node_span.record_exception(e)
+                raise
+            finally:
+                detach_span(token)
+                node_span.end()
+        return async_wrapper
+
+    @functools.wraps(func)
+    def sync_wrapper(state, *args, **kwargs):
+        node_span = _start(state)
+        token = attach_span(node_span)
+        try:
+            return func(state, *args, **kwargs)
+        except BaseException as e:
+            node_span.record_exception(e)
+            raise
+        finally:
+            detach_span(token)
+            node_span.end()
+    return sync_wrapper
+
+
+def traced_execution(name: str) -> Callable:
+    """Decorator for async workflow entry points: opens the root span of an execution"""
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                execution_id = signature.bind_partial(*args, **kwargs).arguments.get("execution_id")
+            except TypeError:
+                execution_id = None
+            with span(name, execution_id=execution_id):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ==================== Span processing ====================
+
+
+def _on_span_end(finished: Span) -> None:
+    if not Config.TRACING_ENABLED:
+        return
+    if finished.execution_id:
+        try:
+            spans = _execution_spans.setdefault(finished.execution_id, [])
+            if len(spans) < Config.TRACING_MAX_SPANS_PER_EXECUTION:
+                spans.append(finished.to_dict())
+                _execution_spans.touch(finished.execution_id)
+        except Exception as e:
+            logger.debug(f"Failed to buffer span {finished.name}: {e}")
+    _get_exporter().enqueue(finished)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def _to_otlp_span(finished: Span) -> Dict[str, Any]:
+    otlp = {
+        "traceId": finished.trace_id,
+        "spanId": finished.span_id,
+        "name": finished.name,
+        "kind": finished.kind,
+        "startTimeUnixNano": str(finished.start_ns),
+        "endTimeUnixNano": str(finished.end_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in finished.attributes.items()],
+        "status": {"code": finished.status_code},
+    }
+    if finished.parent_span_id:
+        otlp["parentSpanId"] = finished.parent_span_id
+    if finished.status_message:
+        otlp["status"]["message"] = finished.status_message
+    return otlp
+
+
+def build_otlp_payload(spans: List[Span]) -> Dict[str, Any]:
+    """Wrap spans into an OTLP/JSON ExportTraceServiceRequest"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{
+                "scope": {"name": INSTRUMENTATION_SCOPE},
+                "spans": [_to_otlp_span(s) for s in spans],
+            }],
+        }]
+    }
+
+
+class BatchSpanExporter:
+    """Background thread exporting finished spans in batches (file or OTLP/HTTP)"""
+
+    def __init__(self, exporter: str, max_queue_size: int = 10000, batch_size: int = 512, flush_interval: float = 2.0):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.dropped_spans = 0
+
+    def enqueue(self, finished: Span) -> None:
+        if self.exporter == "none":
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(finished)
+        except queue.Full:
+            self.dropped_spans += 1
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._flush(wait=self.flush_interval)
+        self._flush(wait=0)
+
+    def _flush(self, wait: float) -> None:
+        batch: List[Span] = []
+        deadline = time.monotonic() + wait
+        while len(batch) < self.batch_size:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                batch.append(self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._export(batch)
+
+    def _export(self, batch: List[Span]) -> None:
+        payload = build_otlp_payload(batch)
+        try:
+            if self.exporter == "otlp":
+                import requests
+                response = requests.post(Config.OTLP_TRACES_ENDPOINT, json=payload, timeout=5)
+                if response.status_code >= 400:
+                    logger.warning(f"OTLP exporter rejected {len(batch)} spans: HTTP {response.status_code}")
+            else:
+                Config.TRACING_FILE_DIR.mkdir(parents=True, exist_ok=True)
+                path = Config.TRACING_FILE_DIR / f"traces-{datetime.now().strftime('%Y%m%d')}.jsonl"
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(payload, ensure_ascii=False, default=str) + "\n")
+        except Exception as e:
+            logger.warning(f"Failed to export {len(batch)} spans via {self.exporter}: {e}")
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+
+_exporter: Optional[BatchSpanExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def _get_exporter() -> BatchSpanExporter:
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = BatchSpanExporter(Config.TRACING_EXPORTER.lower())
+    return _exporter
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans and stop the exporter thread"""
+    global _exporter
+    if _exporter is not None:
+        _exporter.shutdown()
+        _exporter = None
+
+
+# ==================== Flame-graph view ====================
+
+
+def get_execution_spans(execution_id: str) -> List[Dict[str, Any]]:
+    return list(_execution_spans.get(execution_id) or [])
+
+
+def build_flame_graph(execution_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Build a flame-graph tree (d3-flame-graph compatible: name/value/children)
+    for one execution, plus the spans with the most self time.
+    """
+    spans = get_execution_spans(execution_id)
+    if not spans:
+        return None
+
+    spans.sort(key=lambda s: s["start_ns"])
+    trace_start = spans[0]["start_ns"]
+    nodes: Dict[str, Dict[str, Any]] = {}
+    for s in spans:
+        nodes[s["span_id"]] = {
+            "name": s["name"],
+            "value": round(s["duration_ms"], 3),
+            "start_ms": round((s["start_ns"] - trace_start) / 1e6, 3),
+            "status": "error" if s["status"] == STATUS_ERROR else "ok",
+            "attributes": s["attributes"],
+            "children": [],
+        }
+
+    roots = []
+    for s in spans:
+        parent = nodes.get(s["parent_span_id"]) if s["parent_span_id"] else None
+        (parent["children"] if parent is not None else roots).append(nodes[s["span_id"]])
+
+    # Self time = own duration minus time covered by children
+    self_time: Dict[str, float] = {}
+    for node in nodes.values():
+        node["self_ms"] = round(max(0.0, node["value"] - sum(c["value"] for c in node["children"])), 3)
+        self_time[node["name"]] = self_time.get(node["name"], 0.0) + node["self_ms"]
+
+    if len(roots) == 1:
+        root = roots[0]
+    else:
+        end_ms = max(n["start_ms"] + n["value"] for n in roots)
+        root = {"name": f"execution {execution_id}", "value": round(end_ms, 3), "start_ms": 0.0,
+                "status": "ok", "attributes": {}, "children": roots, "self_ms": 0.0}
+
+    hotspots = sorted(self_time.items(), key=lambda item: item[1], reverse=True)[:10]
+    return {
+        "execution_id": execution_id,
+        "trace_id": spans[0]["trace_id"],
+        "span_count": len(spans),
+        "total_ms": root["value"],
+        "flame_graph": root,
+        "hotspots": [{"name": name, "self_ms": round(ms, 3)} for name, ms in hotspots],
+    }
@@ -8,6 +8,10 @@ import time
 from typing import Dict, List, Optional, Any
 from fastapi import WebSocket, WebSocketDisconnect
 from ..models.data_models import WorkflowEvent, ExecutionState, NodeState, NodeStatus
+from ..utils.common_utils import make_serializable
+from ..utils.execution_state_store import get_execution_state_store
+from ..utils.hitl_state_manager import hitl_state_manager
+from ..utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -18,42 +22,15 @@ class WebSocketManager:
         self.active_connections: Dict[str, WebSocket] = {}
         self.client_to_execution: Dict[str, str] = {}
         self.execution_to_client: Dict[str, str] = {}
-        self.execution_states: Dict[str, Dict[str, Any]] = {}
+        # Per-execution state is bounded (size cap + TTL) so completed executions
+        # kept "for review" cannot grow without limit in a long-running worker
+        self.execution_states: Dict[str, Dict[str, Any]] = get_execution_state_store("ws_execution_states")
         self.pending_cleanup: List[str] = []
-        self.execution_paused: Dict[str, bool] = {}
-        self.execution_cancelled: Dict[str, bool] = {}
+        self.execution_paused: Dict[str, bool] = get_execution_state_store("ws_execution_paused")
+        self.execution_cancelled: Dict[str, bool] = get_execution_state_store("ws_execution_cancelled")
         
-        # HITL state management
-        self.hitl_interrupted_executions: Dict[str, Dict[str, Any]] = {}
-    
-    def make_serializable(self, obj):
-        """Convert complex objects to serializable format"""
-        if isinstance(obj, dict):
-            return {k: self.make_serializable(v) for k, v in obj.items()}
-        elif isinstance(obj, (list, tuple)):
-            return [self.make_serializable(item) for item in obj]
-        elif hasattr(obj, '__dict__'):
-            # For complex objects, extract basic attributes
-            try:
-                return {k: self.make_serializable(v) for k, v in obj.__dict__.items() 
-                        if not k.startswith('_')}
-            except:
-                return str(obj)
-        elif hasattr(obj, 'page_content'):
-            # Handle Document objects from LangChain
-            return {
-                'page_content': getattr(obj, 'page_content', ''),
-                'metadata': getattr(obj, 'metadata', {}),
-                'type': 'Document'
-            }
-        elif hasattr(obj, 'content'):
-            # Handle other content objects
-            return {
-                'content': getattr(obj, 'content', ''),
-                'type': type(obj).__name__
-            }
-        else:
-            return obj
+        # HITL: execution_id -> interrupted node; the state itself is checkpointed by hitl_state_manager
+        self.hitl_interrupted_executions: Dict[str, str] = get_execution_state_store("ws_hitl_interrupted_executions")
     
     async def connect(self, websocket: WebSocket, client_id: str):
         """Connect a new WebSocket client."""
@@ -127,15 +104,19 @@ class WebSocketManager:
         
         # Send to all connected clients for this execution
         disconnected_clients = []
-        for cid, websocket in self.active_connections.items():
-            if self.execution_to_client.get(execution_id) == cid:
-                try:
-                    await self.send_to_websocket(websocket, message)
-                except WebSocketDisconnect:
-                    disconnected_clients.append((websocket, cid))
-                except Exception as e:
-                    logger.error(f"Error broadcasting to WebSocket: {e}")
-                    disconnected_clients.append((websocket, cid))
+        with span("websocket.broadcast", {"event.type": str(getattr(event.type, "value", event.type)), "node.id": event.node_id}, execution_id=execution_id) as flush_span:
+            recipients = 0
+            for cid, websocket in self.active_connections.items():
+                if self.execution_to_client.get(execution_id) == cid:
+                    recipients += 1
+                    try:
+                        await self.send_to_websocket(websocket, message)
+                    except WebSocketDisconnect:
+                        disconnected_clients.append((websocket, cid))
+                    except Exception as e:
+                        logger.error(f"Error broadcasting to WebSocket: {e}")
+                        disconnected_clients.append((websocket, cid))
+            flush_span.set_attribute("websocket.recipients", recipients)
         
         # Clean up disconnected WebSockets
         for websocket, client_id in disconnected_clients:
@@ -236,7 +217,7 @@ class WebSocketManager:
             react_step_index=step_index,
             react_step_content=content,
             react_tool_name=tool_name,
-            react_tool_input=self.make_serializable(tool_input) if tool_input else None
+            react_tool_input=make_serializable(tool_input) if tool_input else None
         )
         
         # Prepare message
@@ -264,6 +245,7 @@ class WebSocketManager:
             self.execution_states[execution_id] = {}
         
         execution_state = self.execution_states[execution_id]
+        self.execution_states.touch(execution_id)
         
         if event.type == "execution_started":
             execution_state["status"] = NodeStatus.RUNNING
@@ -429,7 +411,7 @@ class WebSocketManager:
             await self.send_error(client_id, f"Error processing HITL message: {str(e)}")
     
     async def interrupt_execution(self, client_id: str, execution_id: str, message: Dict[str, Any]):
-        """Interrupt workflow execution (memory checkpoint only)"""
+        """Interrupt workflow execution and checkpoint its state"""
         try:
             # Get current execution state
             execution_state = self.execution_states.get(execution_id)
@@ -449,7 +431,6 @@ class WebSocketManager:
             logger.info(f"⏳ Waiting for LangGraph interrupt_node to save state...")
             interrupt_state = None
             try:
-                import asyncio
                 from ..chains.langgraph_flow import get_execution_final_state
                 
                 # Wait up to 3 seconds for LangGraph interrupt_node to complete
@@ -520,11 +501,16 @@ class WebSocketManager:
                     "error": str(e)
                 }
 
-            # Make all state values JSON serializable
-            interrupt_state = self.make_serializable(interrupt_state)
-
-            # Store checkpoint in memory only
-            self.hitl_interrupted_executions[execution_id] = interrupt_state
+            # Persist a compact checkpoint (survives restarts) and flag the execution as interrupted
+            checkpointed = await asyncio.to_thread(
+                hitl_state_manager.interrupt_execution, execution_id, interrupt_state, node_name, reason
+            )
+            if not checkpointed:
+                # Without a checkpoint there is nothing to resume from; don't report a paused execution
+                logger.error(f"❌ Execution {execution_id} stopped at node {node_name} but its state could not be checkpointed")
+                await self.send_error(client_id, f"Execution {execution_id} was stopped but its state could not be saved, so it cannot be resumed")
+                return
+            self.hitl_interrupted_executions[execution_id] = node_name
 
             # Notify client
             await self.send_to_client(client_id, {
@@ -542,7 +528,7 @@ class WebSocketManager:
             await self.send_error(client_id, f"Error interrupting execution: {str(e)}")
     
     async def resume_execution(self, client_id: str, execution_id: str, message: Dict[str, Any]):
-        """Resume interrupted execution from memory checkpoint"""
+        """Resume interrupted execution from its checkpoint (or from a chosen checkpoint version)"""
         logger.info(f"🔄 [BACKEND-WS] resume_execution called")
         logger.info(f"📥 [BACKEND-WS] resume_execution input params: client_id={client_id}, execution_id={execution_id}, message={message}")
         
@@ -553,13 +539,24 @@ class WebSocketManager:
             logger.info(f"📊 [BACKEND-WS] resume_execution parameters: {parameters}")
             logger.info(f"📊 [BACKEND-WS] resume_execution execution_type: {execution_type}")
             
-            # Restore state from memory
-            base_state = self.hitl_interrupted_executions.get(execution_id)
+            # Restore state from the checkpointer: a specific checkpoint version (any node) when
+            # requested, otherwise the latest interrupt; fall back to the live execution state
+            checkpoint_version = message.get("checkpoint_version")
+            base_state = None
+            if checkpoint_version is not None:
+                checkpoint = await asyncio.to_thread(
+                    hitl_state_manager.load_checkpoint, execution_id, int(checkpoint_version)
+                )
+                if checkpoint:
+                    base_state = checkpoint["state"]
+                    if checkpoint["kind"] == "node":
+                        # Continue after the checkpointed node
+                        base_state["hitl_paused"] = checkpoint["node_name"]
+            else:
+                base_state = await asyncio.to_thread(hitl_state_manager.restore_interrupt, execution_id)
             if not base_state:
                 base_state = self.execution_states.get(execution_id, {}).copy()
-            else:
-                base_state = base_state.copy()
-            if base_state is None:
+            if not base_state:
                 await self.send_error(client_id, f"No checkpoint found for {execution_id}")
                 return
             # Enrich from LangGraph final state
@@ -620,7 +617,9 @@ class WebSocketManager:
                 # Restart workflow execution from the restored state
                 logger.info(f"🔄 [BACKEND-WS] resume_execution calling restart_workflow_execution")
                 paused_node = restored_state.get("hitl_paused") or restored_state.get("hitl_node") or ""
-                await self.restart_workflow_execution(execution_id, {**restored_state, "hitl_paused": paused_node})
+                await self.restart_workflow_execution(
+                    execution_id, {**restored_state, "hitl_paused": paused_node}, overrides=parameters
+                )
                 logger.info(f"✅ [BACKEND-WS] resume_execution restart_workflow_execution completed")
                 
             else:
@@ -631,8 +630,9 @@ class WebSocketManager:
             logger.error(f"❌ [BACKEND-WS] resume_execution failed: Error resuming execution {execution_id}: {e}")
             await self.send_error(client_id, f"Error resuming execution: {str(e)}")
     
-    async def restart_workflow_execution(self, execution_id: str, restored_state: Dict[str, Any]):
-        """Resume workflow execution from paused state"""
+    async def restart_workflow_execution(self, execution_id: str, restored_state: Dict[str, Any],
+                                         overrides: Optional[Dict[str, Any]] = None):
+        """Resume workflow execution from paused state (nodes with unchanged inputs are reused, not re-run)"""
         try:
             from ..chains.langgraph_flow import resume_workflow_from_paused_state
             
@@ -657,7 +657,8 @@ class WebSocketManager:
             result = await resume_workflow_from_paused_state(
                 execution_id=execution_id,
                 paused_state=restored_state,
-                paused_node=paused_node
+                paused_node=paused_node,
+                overrides=overrides
             )
             
             logger.info(f"Workflow execution {execution_id} resumed successfully")
@@ -674,12 +675,10 @@ class WebSocketManager:
     async def cancel_execution(self, client_id: str, execution_id: str, message: Dict[str, Any]):
         """Cancel paused or interrupted execution"""
         try:
-            from ..utils.hitl_state_manager import hitl_state_manager
-            
             execution_type = message.get("execution_type", "interrupt")
             
             # Cancel execution
-            success = hitl_state_manager.cancel_execution(execution_id, execution_type)
+            success = await asyncio.to_thread(hitl_state_manager.cancel_execution, execution_id, execution_type)
             
             if success:
                 # Clean up local state
@@ -710,7 +709,7 @@ class WebSocketManager:
             if client_id in self.active_connections:
                 websocket = self.active_connections[client_id]
                 # Ensure message is JSON serializable
-                serializable_message = self.make_serializable(message)
+                serializable_message = make_serializable(message)
                 await websocket.send_text(json.dumps(serializable_message, ensure_ascii=False))
                 logger.debug(f"Sent message to client {client_id}: {message.get('type', 'unknown')}")
         except Exception as e:
@@ -724,6 +723,11 @@ class WebSocketManager:
             "timestamp": time.time()
         })
 
+    async def broadcast(self, message: dict):
+        """Send a message to every connected client (e.g. file ingestion progress)"""
+        for client_id in list(self.active_connections):
+            await self.send_to_client(client_id, message)
+
     async def broadcast_execution_update(self, execution_id: str, state: Dict[str, Any]):
         """Broadcast a state snapshot to the client during resume/replay.
 
@@ -791,7 +795,7 @@ class WebSocketManager:
             payload = {
                 "type": "execution_update",
                 "execution_id": execution_id,
-                "state": self.make_serializable(state),
+                "state": make_serializable(state),
                 "timestamp": time.time(),
             }
             await self.send_to_client(client_id, payload)
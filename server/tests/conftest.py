@@ -0,0 +1,12 @@
+"""Shared pytest setup: import the server package as `src` and keep config off the real warehouse."""
+
+import os
+import sys
+from pathlib import Path
+
+SERVER_ROOT = Path(__file__).resolve().parents[1]
+if str(SERVER_ROOT) not in sys.path:
+    sys.path.insert(0, str(SERVER_ROOT))
+
+# Config falls back to Databricks settings when DATABASE_URL is unset; tests use a local SQLite URL
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{SERVER_ROOT / 'data' / 'smart.db'}")
@@ -0,0 +1,60 @@
+import pytest
+
+from src.chains.chart_data import _explicit_chart_type, build_chart_series, infer_chart_spec
+
+CATEGORY_DATA = {
+    "columns": ["channel", "sales"],
+    "rows": [{"channel": "Online", "sales": 120}, {"channel": "Store", "sales": 80}, {"channel": "Phone", "sales": 15}],
+}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("show a pie chart of sales", "pie"),
+    ("line graph of revenue", "line"),
+    ("plot it as bars", "bar"),
+    ("bar chart please", "bar"),
+    ("online sales by channel", None),
+    ("how many pieces were sold", None),
+    ("sales by barcode", None),
+    ("orders under embargo", None),
+    ("pipeline throughput", None),
+])
+def test_explicit_chart_type_matches_whole_words(text, expected):
+    assert _explicit_chart_type(text) == expected
+
+
+def test_substring_of_chart_type_does_not_force_chart():
+    spec = infer_chart_spec(CATEGORY_DATA, "compare online sales by channel")
+    assert spec["chart_type"] == "bar"
+    # Without an explicit request the rule-based spec stays below the LLM-skip threshold
+    assert spec["confidence"] <= 0.8
+
+
+def test_explicit_pie_request():
+    spec = infer_chart_spec(CATEGORY_DATA, "Pie chart of sales by channel")
+    assert spec["chart_type"] == "pie"
+    assert spec["data_field_for_labels"] == "channel"
+    assert spec["data_field_for_values"] == "sales"
+
+
+def test_month_labels_outside_the_detection_sample_are_kept_last():
+    months = [str(m) for m in range(1, 13)] * 5 + ["13", "0", "1.5"]
+    data = {"columns": ["month", "sales"], "rows": [{"month": m, "sales": 1} for m in months]}
+
+    series = build_chart_series(data, {"time_grouping": "month"}, "monthly sales trend", chart_type="line")
+
+    assert series.labels[:12] == ["January", "February", "March", "April", "May", "June", "July",
+                                  "August", "September", "October", "November", "December"]
+    assert series.values[:12] == [5.0] * 12
+    assert series.labels[12:] == ["13", "0", "1.5"]
+
+
+def test_unparsed_date_labels_become_trailing_buckets():
+    dates = [f"2025-01-{day:02d}" for day in range(1, 29)] * 2 + ["unknown", "unknown"]
+    data = {"columns": ["day", "sales"], "rows": [{"day": d, "sales": 2} for d in dates]}
+
+    series = build_chart_series(data, {"time_grouping": "month"}, "monthly sales trend", chart_type="line")
+
+    assert series.labels == ["Jan 2025", "unknown"]
+    assert series.values == [112.0, 4.0]
+    assert len(series.positions) == 2
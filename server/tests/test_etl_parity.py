@@ -0,0 +1,156 @@
+"""The set-based SQL engine (full and incremental) writes the same warehouse as the row-by-row Python engine."""
+
+import sqlite3
+import sys
+
+import pytest
+
+from conftest import SERVER_ROOT
+
+sys.path.insert(0, str(SERVER_ROOT / "scripts"))
+
+from etl_implementation import ELTProcessor  # noqa: E402
+
+WAREHOUSE_TABLES = [
+    "dim_customer", "dim_product", "dwd_sales_detail",
+    "dwd_inventory_detail", "dws_sales_cube", "dws_inventory_cube",
+]
+# Stamped per run rather than derived from the source rows
+RUN_COLUMNS = {"etl_batch_id", "etl_timestamp"}
+
+CUSTOMERS = [
+    ("C1", " Acme ", "Ann", "+86 138-0000-0001", "SALES@ACME.COM", "Beijing Road 1", "vip",
+     "2024-01-02 03:04:05", "2024-03-04 05:06:07.250000"),
+    ("C2", "Beta", None, None, None, "Shanghai", "", "2024-02-03T04:05:06", "2024-02-03T04:05:06.5"),
+]
+PRODUCTS = [
+    ("P1", "Widget", "tools", 2.675, "2024-01-01 00:00:00"),
+    ("P2", "Gadget", "toys", 10.045, "2024-01-01 00:00:00"),
+    ("P3", "Gizmo", "", 1234.565, "2024-01-01 00:00:00"),
+]
+SALES = [
+    # Averages of 1.00/1.01 and 2.67/2.68 land on x.xx5, where SQLite's ROUND() and Python's round() disagree
+    ("S1", "P1", "Widget", 1, 1.00, 1.00, "2024-05-01 10:00:00", "2024-05-01 10:00:00"),
+    ("S2", "P1", "Widget", 1, 1.01, 1.01, "2024-05-01 11:00:00", "2024-05-01 11:00:00"),
+    ("S3", "P2", "Gadget", 1, 2.67, 2.67, "2024-05-02 09:30:00.123456", "2024-05-02 09:30:00"),
+    ("S4", "P2", "Gadget", 1, 2.68, 2.68, "2024-05-02T12:00:00", "2024-05-02 12:00:00"),
+    ("S5", "P3", "Gizmo", 3, 1234.565, 3703.695, "2024-05-03 08:00:00", "2024-05-03 08:00:00"),
+]
+INVENTORY = [
+    ("P1", 5, "2024-05-01 10:20:30.123456"),
+    ("P2", 0, "2024-05-02T08:00:00"),
+    ("P3", 40, "2024-05-03 18:45:00"),
+]
+
+
+def _create_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript((SERVER_ROOT / "database.sql").read_text(encoding="utf-8"))
+    conn.executescript((SERVER_ROOT / "create_wide_table_schema.sql").read_text(encoding="utf-8"))
+    conn.close()
+    return str(path)
+
+
+def _load_sources(db_path, customers=CUSTOMERS, products=PRODUCTS, sales=SALES, inventory=INVENTORY):
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("""
+            INSERT OR REPLACE INTO customers (
+                customer_id, customer_name, contact_person, phone, email, address, customer_type, created_at, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, customers)
+        conn.executemany("""
+            INSERT OR REPLACE INTO products (product_id, product_name, category, unit_price, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, products)
+        conn.executemany("""
+            INSERT OR REPLACE INTO sales (
+                sale_id, product_id, product_name, quantity_sold, price_per_unit, total_amount, sale_date, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, sales)
+        conn.executemany("INSERT OR REPLACE INTO inventory (product_id, stock_level, last_updated) VALUES (?, ?, ?)",
+                         inventory)
+    conn.close()
+
+
+def _snapshot(db_path):
+    conn = sqlite3.connect(db_path)
+    snapshot = {}
+    for table in WAREHOUSE_TABLES:
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})") if row[1] not in RUN_COLUMNS]
+        rows = conn.execute(f"SELECT {', '.join(columns)} FROM {table}").fetchall()
+        snapshot[table] = sorted(([dict(zip(columns, row)) for row in rows]), key=repr)
+    conn.close()
+    return snapshot
+
+
+def _run(db_path, engine):
+    ELTProcessor(db_path).run_full_elt_process(engine=engine)
+    return _snapshot(db_path)
+
+
+def test_sql_engine_matches_python_engine(tmp_path):
+    python_db = _create_db(tmp_path / "python.db")
+    sql_db = _create_db(tmp_path / "sql.db")
+    _load_sources(python_db)
+    _load_sources(sql_db)
+
+    expected = _run(python_db, "python")
+    actual = _run(sql_db, "sql")
+
+    for table in WAREHOUSE_TABLES:
+        assert expected[table], table
+        assert actual[table] == expected[table], table
+
+
+def test_engines_keep_fractional_seconds_and_round_like_python(tmp_path):
+    sql_db = _create_db(tmp_path / "sql.db")
+    _load_sources(sql_db)
+    snapshot = _run(sql_db, "sql")
+
+    inventory = {row["product_id"]: row for row in snapshot["dwd_inventory_detail"]}
+    assert inventory["P1"]["last_updated"] == "2024-05-01 10:20:30.123456"
+    assert inventory["P2"]["last_updated"] == "2024-05-02 08:00:00"
+
+    averages = {row["product_id"]: row["avg_transaction_value"] for row in snapshot["dws_sales_cube"]}
+    assert averages["P1"] == round((1.00 + 1.01) / 2, 2)
+    assert averages["P2"] == round((2.67 + 2.68) / 2, 2)
+    assert {row["product_id"]: row["total_revenue"] for row in snapshot["dws_sales_cube"]}["P1"] == 2.01
+
+
+def test_incremental_sql_engine_matches_full_python_rebuild(tmp_path):
+    incremental_db = _create_db(tmp_path / "incremental.db")
+    _load_sources(incremental_db)
+    ELTProcessor(incremental_db).run_incremental_elt_process()
+
+    # New sales, a price change and a stock movement after the first load
+    changes = dict(
+        customers=[],
+        products=[("P2", "Gadget", "toys", 12.345, "2024-06-01 00:00:00")],
+        sales=[
+            ("S6", "P1", "Widget", 2, 1.005, 2.01, "2024-05-01 12:00:00", "2024-06-01 09:00:00"),
+            ("S7", "P3", "Gizmo", 1, 1234.565, 1234.565, "2024-06-01 10:00:00.5", "2024-06-01 10:00:00"),
+        ],
+        inventory=[("P1", 12, "2024-06-01 07:00:00.75")],
+    )
+    _load_sources(incremental_db, **changes)
+    ELTProcessor(incremental_db).run_incremental_elt_process()
+
+    rebuilt_db = _create_db(tmp_path / "rebuilt.db")
+    _load_sources(rebuilt_db)
+    _load_sources(rebuilt_db, **changes)
+    expected = _run(rebuilt_db, "python")
+    actual = _snapshot(incremental_db)
+
+    for table in WAREHOUSE_TABLES:
+        assert actual[table] == expected[table], table
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-05-01 10:20:30", "2024-05-01 10:20:30"),
+    ("2024-05-01 10:20:30.123456", "2024-05-01 10:20:30.123456"),
+    ("2024-05-01T10:20:30.5", "2024-05-01 10:20:30.500000"),
+    ("not a date", None),
+    (None, None),
+])
+def test_normalize_timestamp(value, expected):
+    assert ELTProcessor(":memory:").normalize_timestamp(value) == expected
@@ -0,0 +1,44 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.models.data_models import NodeStatus
+from src.utils.execution_state_store import (
+    ExecutionStateStore, get_execution_state_store, purge_expired_execution_states,
+)
+
+
+def test_purge_expired_execution_states_evicts_untouched_entries(tmp_path):
+    store = ExecutionStateStore("test_purge", max_entries=10, ttl_seconds=0.01, spill_dir=tmp_path)
+    store["a"] = {"x": 1}
+    store["b"] = {"x": 2}
+    time.sleep(0.05)
+
+    assert purge_expired_execution_states() >= 2
+    assert len(store) == 0
+
+
+def test_setdefault_inserts_once_across_threads(tmp_path):
+    store = ExecutionStateStore("test_setdefault", max_entries=10, ttl_seconds=60, spill_dir=tmp_path)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        lists = list(pool.map(lambda _: store.setdefault("trace", []), range(64)))
+
+    assert all(spans is lists[0] for spans in lists)
+
+
+def test_store_names_are_unique(tmp_path):
+    store = get_execution_state_store("test_unique", spill_dir=tmp_path)
+
+    assert get_execution_state_store("test_unique") is store
+    with pytest.raises(ValueError):
+        ExecutionStateStore("test_unique", spill_dir=tmp_path)
+
+
+def test_spilled_enums_are_restored(tmp_path):
+    store = ExecutionStateStore("test_spill_enum", max_entries=1, ttl_seconds=60, spill=True, spill_dir=tmp_path)
+    store["a"] = {"status": NodeStatus.COMPLETED, "nodes": [NodeStatus.RUNNING]}
+    store["b"] = {}  # evicts and spills "a"
+
+    assert store["a"] == {"status": NodeStatus.COMPLETED, "nodes": [NodeStatus.RUNNING]}
+    assert type(store["a"]["status"]) is NodeStatus
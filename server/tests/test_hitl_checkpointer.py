@@ -0,0 +1,105 @@
+import asyncio
+import importlib
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from src.chains import langgraph_flow
+from src.utils.hitl_checkpointer import HITLCheckpointer
+from src.utils.hitl_state_manager import HITLStateManager
+
+
+@pytest.fixture
+def checkpointer(tmp_path):
+    return HITLCheckpointer(tmp_path / "checkpoints.db", ttl_seconds=3600)
+
+
+def test_sql_result_values_round_trip(checkpointer):
+    state = {
+        "structured_data": {
+            "columns": ["day", "amount", "users"],
+            "rows": [[date(2025, 1, 1), Decimal("12.50"), np.int64(3)], [datetime(2025, 1, 2, 8, 30), Decimal("1"), np.float32(0.5)]],
+        },
+        "tags": {"b"},
+        "vector": np.arange(3),
+    }
+    version = checkpointer.put("exec-1", state, node_name="sql_agent_node", kind="interrupt", status="interrupted")
+
+    loaded, meta = checkpointer.load("exec-1", version)
+    assert meta["kind"] == "interrupt"
+    assert loaded["structured_data"]["rows"] == [["2025-01-01", "12.50", 3], ["2025-01-02T08:30:00", "1", 0.5]]
+    assert loaded["tags"] == ["b"]
+    assert loaded["vector"] == [0, 1, 2]
+
+
+def test_documents_with_numpy_metadata_round_trip(checkpointer):
+    docs = [{"page_content": "text", "metadata": {"source": "a.pdf", "score": np.float32(0.25)}, "id": "7:0"}]
+    version = checkpointer.put("exec-5", {"retrieved_documents": docs}, kind="start")
+
+    loaded, _ = checkpointer.load("exec-5", version)
+    doc = loaded["retrieved_documents"][0]
+    assert doc["metadata"] == {"source": "a.pdf", "score": 0.25}
+    assert doc["id"] == "7:0"
+
+
+def test_interrupt_with_date_rows_is_checkpointed(checkpointer):
+    manager = HITLStateManager(checkpointer)
+    assert manager.interrupt_execution("exec-2", {"rows": [[date(2025, 1, 1)]]}, "chart_node")
+    assert manager.get_interrupt_state("exec-2")["state"]["rows"] == [["2025-01-01"]]
+
+
+def test_state_is_rebuilt_from_full_snapshot_and_deltas(checkpointer):
+    checkpointer.put("exec-3", {"user_input": "q", "answer": ""}, kind="start")
+    checkpointer.put("exec-3", {"answer": "partial"}, node_name="rag_query_node")
+    version = checkpointer.put("exec-3", {"chart_config": {"type": "bar"}}, node_name="chart_node")
+
+    state, _ = checkpointer.load("exec-3", version)
+    assert state == {"user_input": "q", "answer": "partial", "chart_config": {"type": "bar"}}
+
+
+def test_load_without_full_snapshot_returns_none(checkpointer):
+    checkpointer.put("exec-4", {"user_input": "q", "answer": ""}, kind="start")
+    version = checkpointer.put("exec-4", {"answer": "partial"}, node_name="rag_query_node")
+    # The full snapshot expired and was removed by cleanup; only the node delta is left
+    checkpointer._connection().execute("DELETE FROM hitl_checkpoints WHERE execution_id = ? AND version = 1", ("exec-4",))
+
+    assert checkpointer.load("exec-4", version) is None
+    assert checkpointer.load("exec-4") is None
+
+
+def test_checkpoint_in_unknown_format_is_not_loaded(checkpointer):
+    version = checkpointer.put("exec-7", {"user_input": "q"}, kind="start")
+    checkpointer._connection().execute("UPDATE hitl_checkpoints SET format = 99 WHERE execution_id = ?", ("exec-7",))
+
+    assert checkpointer.load("exec-7", version) is None
+
+
+def test_cleanup_removes_expired_checkpoints(tmp_path):
+    short = HITLCheckpointer(tmp_path / "short.db", ttl_seconds=0.01)
+    short.put("exec-5", {"user_input": "q"}, kind="start")
+    time.sleep(0.05)
+    assert short.cleanup_expired() == 1
+    assert short.load("exec-5") is None
+
+
+def test_failed_checkpoint_is_not_reported_as_interrupted(monkeypatch):
+    ws_module = importlib.import_module("src.websocket.websocket_manager")
+
+    manager = ws_module.WebSocketManager()
+    sent = []
+
+    async def send_to_client(client_id, message):
+        sent.append(message)
+
+    monkeypatch.setattr(manager, "send_to_client", send_to_client)
+    monkeypatch.setattr(ws_module.hitl_state_manager, "interrupt_execution", lambda *args: False)
+    monkeypatch.setattr(langgraph_flow, "get_execution_final_state", lambda execution_id: {"user_input": "q"})
+    manager.execution_states["exec-6"] = {"user_input": "q"}
+
+    asyncio.run(manager.interrupt_execution("client", "exec-6", {"node_name": "chart_node"}))
+
+    assert "exec-6" not in manager.hitl_interrupted_executions
+    assert [message["type"] for message in sent] == ["error"]
@@ -0,0 +1,62 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from src.database import db_operations
+
+
+@pytest.fixture
+def ingestion_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_operations, "DATABASE_DIR", tmp_path)
+    monkeypatch.setattr(db_operations, "DATABASE_PATH", tmp_path / "smart.db")
+    db_operations.initialize_database_schema()
+    return tmp_path / "smart.db"
+
+
+def test_claim_waits_for_write_lock_without_blocking_event_loop(ingestion_db):
+    async def scenario():
+        job_id = await db_operations.create_ingestion_job(
+            file_id=1, datasource_id=1, file_path="x.txt", original_filename="x.txt",
+            file_type="txt", client_id=None, max_attempts=3,
+        )
+        # Another process holds the SQLite write lock for a moment
+        holder = sqlite3.connect(ingestion_db, check_same_thread=False)
+        holder.execute("BEGIN IMMEDIATE")
+        threading.Timer(0.5, holder.rollback).start()
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.02)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        job = await db_operations.claim_next_ingestion_job(60)
+        waited = time.perf_counter() - started
+        ticking.cancel()
+        holder.close()
+        return job_id, job, waited, ticks
+
+    job_id, job, waited, ticks = asyncio.run(scenario())
+    assert job["id"] == job_id and job["status"] == "running" and job["attempts"] == 1
+    assert waited >= 0.4
+    # The loop kept running while the claim waited for the lock
+    assert ticks >= 10
+
+
+def test_claimed_job_is_not_claimed_twice(ingestion_db):
+    async def scenario():
+        await db_operations.create_ingestion_job(
+            file_id=1, datasource_id=1, file_path="x.txt", original_filename="x.txt",
+            file_type="txt", client_id=None, max_attempts=3,
+        )
+        return await asyncio.gather(*(db_operations.claim_next_ingestion_job(60) for _ in range(4)))
+
+    claimed = [job for job in asyncio.run(scenario()) if job]
+    assert len(claimed) == 1
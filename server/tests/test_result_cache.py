@@ -0,0 +1,111 @@
+"""Mart query results are cached only while dbt run results say when the marts were rebuilt."""
+
+import json
+import os
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.utils.result_cache import ResultCache, normalize_sql, referenced_tables  # noqa: E402
+
+SQL = "SELECT month, SUM(amount) AS total FROM public.mart_monthly_revenue GROUP BY month"
+ROWS = [{"month": "2025-01", "total": 10.5}, {"month": "2025-02", "total": 7.0}]
+
+
+def write_run_results(path, completed_at, generated_at="2025-03-01T00:00:00Z"):
+    path.write_text(json.dumps({
+        "metadata": {"generated_at": generated_at},
+        "results": [{
+            "unique_id": "model.transport.mart_monthly_revenue",
+            "status": "success",
+            "timing": [{"name": "compile", "completed_at": "x"}, {"name": "execute", "completed_at": completed_at}],
+        }],
+    }), encoding="utf-8")
+    # Make sure the cache sees a new modification time even on coarse-grained filesystems
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+class Warehouse:
+    def __init__(self):
+        self.calls = 0
+
+    def run(self):
+        self.calls += 1
+        return ROWS
+
+
+@pytest.fixture
+def run_results(tmp_path):
+    return tmp_path / "target" / "run_results.json"
+
+
+@pytest.fixture
+def cache(tmp_path, run_results):
+    run_results.parent.mkdir()
+    return ResultCache(tmp_path / "cache", freshness="dbt", run_results_path=run_results)
+
+
+def test_not_cached_without_run_results(cache):
+    warehouse = Warehouse()
+
+    assert cache.execute(SQL, "all", warehouse.run) == ROWS
+    assert cache.execute(SQL, "all", warehouse.run) == ROWS
+
+    assert warehouse.calls == 2
+    assert not list(cache.cache_dir.glob("*.parquet"))
+
+
+def test_served_from_cache_until_the_model_is_rebuilt(cache, run_results):
+    warehouse = Warehouse()
+    write_run_results(run_results, "2025-03-01T00:05:00Z")
+
+    assert cache.execute(SQL, "all", warehouse.run) == ROWS
+    assert cache.execute(SQL.lower(), "all", warehouse.run) == ROWS
+    assert warehouse.calls == 1
+
+    write_run_results(run_results, "2025-03-02T00:05:00Z")
+    assert cache.execute(SQL, "all", warehouse.run) == ROWS
+    assert warehouse.calls == 2
+
+
+def test_run_results_removed_stops_caching(cache, run_results):
+    warehouse = Warehouse()
+    write_run_results(run_results, "2025-03-01T00:05:00Z")
+    cache.execute(SQL, "all", warehouse.run)
+
+    run_results.unlink()
+    cache.execute(SQL, "all", warehouse.run)
+
+    assert warehouse.calls == 2
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM public.mart_a JOIN public.dim_users u ON u.id = mart_a.user_id",
+    "SELECT current_date(), * FROM public.mart_a",
+    "DELETE FROM public.mart_a",
+])
+def test_statements_that_are_not_cached(cache, sql):
+    assert cache.cacheable_tables(sql) is None
+
+
+def test_referenced_tables_skip_ctes_and_string_contents():
+    normalized = normalize_sql("""
+        WITH recent AS (SELECT * FROM public.mart_a WHERE note = 'from dim_x')
+        SELECT * FROM recent JOIN public.mart_b b ON b.id = recent.id  -- from dim_y
+    """)
+    assert referenced_tables(normalized) == ["public.mart_a", "public.mart_b"]
+
+
+def test_failed_probe_is_not_repeated_within_the_interval(tmp_path):
+    cache = ResultCache(tmp_path / "cache", freshness="probe", probe_interval_seconds=60)
+    probes = []
+
+    def query(sql):
+        probes.append(sql)
+        raise RuntimeError("column updated_at does not exist")
+
+    assert cache.freshness_tokens(["public.mart_a"], query) is None
+    assert cache.freshness_tokens(["public.mart_a"], query) is None
+    assert len(probes) == 1
@@ -0,0 +1,9 @@
+from src.chains import langgraph_flow
+from src.utils.table_index import TableIndex
+
+
+def test_no_erp_tables_for_databricks_without_dbt_index(monkeypatch):
+    monkeypatch.setattr(langgraph_flow, "get_dbt_table_index", lambda: TableIndex())
+
+    assert langgraph_flow.extract_table_names_from_rag("", "monthly sales", "databricks") == []
+    assert "sales" in langgraph_flow.extract_table_names_from_rag("", "monthly sales", "default")
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from src.chains.time_axis import (
+    UNPARSED_SORT_KEY, chronological_order, detect_time_format, format_time_labels, time_sort_keys,
+)
+
+
+def test_month_of_year_unparsed_labels_sort_last():
+    labels = pd.Series(["3", "unknown", "1", "12"])
+    keys = time_sort_keys(labels, "month_of_year")
+    assert keys.dtype == np.int64
+    assert keys.tolist() == [3, UNPARSED_SORT_KEY, 1, 12]
+    assert labels[chronological_order(labels, "month_of_year")].tolist() == ["1", "3", "12", "unknown"]
+
+
+def test_date_labels_sort_chronologically_with_unparsed_last():
+    labels = pd.Series(["2025-03-01", "not a date", "2024-12-31", "2025-01-15"])
+    keys = time_sort_keys(labels, "date")
+    assert keys[1] == UNPARSED_SORT_KEY
+    assert labels[chronological_order(labels, "date")].tolist() == ["2024-12-31", "2025-01-15", "2025-03-01", "not a date"]
+
+
+def test_detect_time_format_for_iso_dates():
+    assert detect_time_format(pd.Series(["2025-01-01", "2025-01-02", "2025-01-03"])) == "date"
+
+
+def test_numeric_ids_are_not_year_months():
+    assert detect_time_format(pd.Series(["100012", "100013", "200101"])) is None
+    assert detect_time_format(pd.Series(["2025-01", "2025-13"])) is None
+    assert detect_time_format(pd.Series(["202501", "202512"])) == "year_month"
+    assert detect_time_format(pd.Series(["202501", "202512"]), allow_ambiguous=False) is None
+
+
+def test_out_of_range_month_numbers_keep_their_label():
+    labels = pd.Series(["1", "12", "13"])
+    assert format_time_labels(labels, "month_of_year").tolist() == ["January", "December", "13"]
+    assert time_sort_keys(labels, "month_of_year").tolist() == [1, 12, UNPARSED_SORT_KEY]
+
+
+def test_format_time_labels_for_months_and_days():
+    labels = pd.Series(["2025-01-15", "2025-03-02"])
+    assert format_time_labels(labels, "date").tolist() == ["Jan 15, 2025", "Mar 2, 2025"]
+    assert format_time_labels(labels, "date", "month").tolist() == ["Jan 2025", "Mar 2025"]